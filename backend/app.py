@@ -1,21 +1,169 @@
-from fastapi import FastAPI, HTTPException, Query
+from fastapi import FastAPI, Header, HTTPException, Query, Request, WebSocket, WebSocketDisconnect
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse, PlainTextResponse, Response, StreamingResponse
+from pydantic import BaseModel, Field
 from datetime import date as date_module, datetime, timedelta
 from typing import Optional, Dict, List
+from contextlib import asynccontextmanager
 import logging
 import asyncio
+import itertools
+import json
+import math
+import os
+import secrets
 from concurrent.futures import ThreadPoolExecutor
 
-from services.stock_data import StockDataService
+from services.stock_data import MAG7_SYMBOLS, StockDataService, load_provider
 from services.cache import cache_instance
+from services.cache_snapshot import try_load_snapshot, write_snapshot
+from services.cluster import ForwardError, create_cluster
+from services.intraday import IntradayService, check_interval
+from services.live_quotes import LiveQuoteHub
+from services.downsample import METHODS as DOWNSAMPLE_METHODS
+from services.export import FORMATS as EXPORT_FORMATS, Exporter, has_pyarrow, parse_range
+from services.hedging import SharedCalls
+from services.portfolio import REBALANCE_SCHEDULES, normalise_weights, portfolio_returns
+from services.prefetch import ReadAhead, dense_runs, fill_returns
+from services.profiler import FORMATS as PROFILE_FORMATS, ProfilerBusy, describe_executor, describe_tasks, profiler
+from services.log_pipeline import AccessLogMiddleware, configure_logging, sampled, stop_logging
+from services.range_index import RangeIndexService
+from services.ranking import cross_section
+from services.relative import DEFAULT_BENCHMARK, SESSIONS_PER_YEAR, relative_metrics
+from services.risk import VAR_LEVEL, risk_metrics
+from services.result_cache import query_cache, query_key
+from services.series import LOOKBACK_DAYS, SeriesService
+from services.analytics_pool import AnalyticsPool, correlation_kernel
+from services.metrics import metrics
+from services.price_store import get_price_store
+from services.resilience import UpstreamUnavailableError
 
-logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-app = FastAPI(title="MAG7 Stock Returns API", version="1.0.0")
-
 executor = ThreadPoolExecutor(max_workers=4)
 
+MAX_BATCH_ITEMS = 2000
+# Missing days of one ticker in a batch are filled by one range fetch per run of this many or more,
+# where a run's days are at most BATCH_RANGE_MAX_GAP_DAYS apart (a long weekend); sparse days are fetched one by one
+BATCH_RANGE_MIN_DAYS = 2
+BATCH_RANGE_MAX_GAP_DAYS = 4
+
+# Non-standard status (as used by nginx) for requests whose client went away
+CLIENT_CLOSED_REQUEST = 499
+
+# Concurrent misses for the same ticker-day share one fetch, cancelled while queued once nobody waits
+return_fetches = SharedCalls(executor, name="returns")
+
+# One upstream poller per watched ticker, shared by every /ws/returns client
+quote_hub = LiveQuoteHub(
+    StockDataService.fetch_quote,
+    interval=float(os.getenv("LIVE_QUOTE_INTERVAL_SECONDS", "5")),
+    executor=executor,
+)
+
+# Intraday pages live in their own byte-bounded cache so they never push out daily returns
+intraday_service = IntradayService(
+    StockDataService.fetch_history,
+    max_bytes=int(os.getenv("INTRADAY_CACHE_BYTES", str(64 * 1024 * 1024))),
+)
+
+# With CLUSTER_NODES set, misses for tickers owned by another node are forwarded to it
+cluster = create_cluster()
+
+
+def _closes_from_owner(ticker: str, start: str, end: str):
+    """Closes for a ticker another node owns, loaded by that node; None to load them here"""
+    if cluster is None or cluster.is_owner(ticker):
+        return None
+    try:
+        return cluster.closes(cluster.owner(ticker), ticker, start, end)
+    except ForwardError as e:
+        logger.warning("Owner of %s unreachable, loading closes locally: %s", ticker, e, extra={"ticker": ticker})
+        return None
+
+
+# Whole query results (series, summaries, correlation matrices) share one byte budget
+series_service = SeriesService(StockDataService.fetch_history, cache=query_cache, owner_closes=_closes_from_owner)
+
+# CPU-bound analytics run in worker processes so they never occupy the I/O executor
+_analytics_workers = os.getenv("ANALYTICS_WORKERS")
+analytics_pool = AnalyticsPool(int(_analytics_workers) if _analytics_workers else None)
+range_index_service = RangeIndexService(series_service.daily_closes)
+exporter = Exporter(series_service.daily_closes, cache=query_cache)
+
+# Contiguous date requests per ticker trigger one background range fetch for the next window
+read_ahead = ReadAhead(series_service.daily_closes, cache_instance) if os.getenv("READ_AHEAD", "1") == "1" else None
+
+# Closes requested by other cluster nodes for tickers this node owns, one load per range. They get
+# their own workers: executor workers block on forwards to peers, and if peers' loads queued behind
+# them, two nodes forwarding to each other would wait on each other until the timeout.
+closes_executor = ThreadPoolExecutor(max_workers=4)
+closes_fetches = SharedCalls(closes_executor, name="closes")
+
+# Keys with a background revalidation in flight, and strong refs to those tasks
+_refreshing = set()
+_background_tasks = set()
+
+
+async def _snapshot_periodically(path: str, interval: float) -> None:
+    loop = asyncio.get_running_loop()
+    while True:
+        await asyncio.sleep(interval)
+        try:
+            await loop.run_in_executor(None, write_snapshot, cache_instance, path)
+        except Exception as e:
+            logger.warning("Cache snapshot to %s failed: %s", path, e)
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    loop = asyncio.get_running_loop()
+    # Records are formatted and written on a listener thread, never on the request path
+    configure_logging()
+    # yfinance/pandas load lazily; warm them in the background once the server is up
+    # so neither startup nor /health waits on the import
+    if os.getenv("PRELOAD_PROVIDER", "1") == "1":
+        loop.run_in_executor(None, load_provider)
+
+    snapshot_path = os.getenv("CACHE_SNAPSHOT_PATH")
+    snapshot_task = None
+    if snapshot_path:
+        # Small snapshots are restored before the first request; large ones fill in
+        # behind live traffic (restores never overwrite fresher entries)
+        sync_limit = int(os.getenv("CACHE_SNAPSHOT_SYNC_BYTES", str(4 * 1024 * 1024)))
+        try:
+            size = os.path.getsize(snapshot_path)
+        except OSError:
+            size = 0
+        if size <= sync_limit:
+            await loop.run_in_executor(None, try_load_snapshot, cache_instance, snapshot_path)
+        else:
+            loop.run_in_executor(None, try_load_snapshot, cache_instance, snapshot_path)
+        interval = float(os.getenv("CACHE_SNAPSHOT_INTERVAL", "300"))
+        if interval > 0:
+            snapshot_task = asyncio.create_task(_snapshot_periodically(snapshot_path, interval))
+
+    yield
+
+    await quote_hub.close()
+    if cluster is not None:
+        await cluster.close()
+    await loop.run_in_executor(None, analytics_pool.close)
+    if read_ahead is not None:
+        read_ahead.close()
+    if snapshot_path:
+        if snapshot_task is not None:
+            snapshot_task.cancel()
+        try:
+            await loop.run_in_executor(None, write_snapshot, cache_instance, snapshot_path)
+        except Exception as e:
+            logger.warning("Cache snapshot to %s failed: %s", snapshot_path, e)
+    stop_logging()
+
+
+app = FastAPI(title="MAG7 Stock Returns API", version="1.0.0", lifespan=lifespan)
+
+app.add_middleware(AccessLogMiddleware)
 app.add_middleware(
     CORSMiddleware,
     allow_origins=["*"],
@@ -24,12 +172,135 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+async def _revalidate(ticker: str, date: str) -> None:
+    try:
+        loop = asyncio.get_event_loop()
+        return_data = await loop.run_in_executor(executor, StockDataService.fetch_single_day_return, ticker, date)
+        stale_data = cache_instance.get_stale(ticker, date)
+        if "error" in return_data and stale_data and stale_data.get("return") is not None:
+            # A failed refresh must not replace a good value for a whole TTL; it stays stale and is retried
+            logger.warning("Background refresh for %s:%s returned an error, keeping stale value: %s",
+                           ticker, date, return_data["error"], extra={"ticker": ticker, "date": date})
+            return
+        cache_instance.set(ticker, date, return_data)
+    except Exception as e:
+        logger.warning("Background refresh failed for %s:%s: %s", ticker, date, e,
+                       extra={"ticker": ticker, "date": date})
+    finally:
+        _refreshing.discard((ticker, date))
+
+
+def _fill_range(ticker: str, start: str, end: str) -> int:
+    """Cache every session's return in [start, end] from one range fetch"""
+    return len(fill_returns(series_service.daily_closes, cache_instance, ticker, start, end))
+
+
+def _fetch_and_cache(ticker: str, date: str) -> Dict:
+    # Caches in the worker thread, so a fetch that outlives its requests still fills the cache
+    metrics.inc("return_fetches_total")
+    return_data = StockDataService.fetch_single_day_return(ticker, date)
+    cache_instance.set(ticker, date, return_data)
+    return return_data
+
+
+class ClientDisconnected(Exception):
+    pass
+
+
+async def _wait_for_disconnect(request: Request) -> None:
+    # The request body (if any) has been read, so the next message is the disconnect
+    while (await request.receive())["type"] != "http.disconnect":
+        pass
+
+
+async def unless_disconnected(request: Request, awaitable, endpoint: str):
+    """Await awaitable, cancelling it and raising ClientDisconnected if the client goes away first"""
+    work = asyncio.ensure_future(awaitable)
+    watcher = asyncio.ensure_future(_wait_for_disconnect(request))
+    try:
+        await asyncio.wait({work, watcher}, return_when=asyncio.FIRST_COMPLETED)
+    finally:
+        watcher.cancel()
+        if not work.done():
+            work.cancel()
+    if not work.done() or work.cancelled():
+        metrics.inc("requests_cancelled_total", endpoint=endpoint)
+        raise ClientDisconnected()
+    return work.result()
+
+
+def owns(request: Request, ticker: str) -> bool:
+    """Whether this node fetches ticker itself: always outside cluster mode, and for requests forwarded by a peer"""
+    return cluster is None or cluster.from_peer(request.headers) or cluster.is_owner(ticker)
+
+
+async def _forward_return(ticker: str, date: str) -> Optional[Response]:
+    """The owning node's answer for a miss, or None when it is unreachable"""
+    owner = cluster.owner(ticker)
+    try:
+        status, body, headers = await cluster.ticker_return(owner, ticker, date)
+    except ForwardError as e:
+        logger.warning("Owner of %s unreachable, fetching locally: %s", ticker, e,
+                       extra={"ticker": ticker, "date": date})
+        return None
+    if status == 200 and headers.get("x-cache-status") != "stale":
+        cache_instance.set(ticker, date, json.loads(body))
+    return Response(content=body, status_code=status, headers=headers)
+
+
+async def _forward_misses(misses: List[tuple], results: Dict) -> List[tuple]:
+    """Fill results for misses owned by other nodes, one batch per owner; returns the keys left to fetch here"""
+    local = []
+    remote: Dict[str, List[tuple]] = {}
+    for key in misses:
+        owner = cluster.owner(key[0])
+        if owner == cluster.self_url:
+            local.append(key)
+        else:
+            remote.setdefault(owner, []).append(key)
+    answers = await asyncio.gather(*(cluster.batch_returns(node, group) for node, group in remote.items()),
+                                   return_exceptions=True)
+    for (node, group), answer in zip(remote.items(), answers):
+        if isinstance(answer, Exception):
+            logger.warning("Forwarding %d keys to %s failed, fetching locally: %s", len(group), node, answer,
+                           extra={"tickers": sorted({ticker for ticker, _ in group})})
+            local.extend(group)
+            continue
+        for key, return_data in zip(group, answer):
+            results[key] = return_data
+            if not return_data.get("transient"):
+                cache_instance.set(*key, return_data)
+    return local
+
+
+def schedule_revalidation(ticker: str, date: str) -> bool:
+    """Start a background refresh for a stale key unless one is already running"""
+    key = (ticker, date)
+    if key in _refreshing:
+        return False
+    _refreshing.add(key)
+    task = asyncio.create_task(_revalidate(ticker, date))
+    _background_tasks.add(task)
+    task.add_done_callback(_background_tasks.discard)
+    return True
+
 @app.get("/health")
 async def health_check():
+    if cluster is not None:
+        return {"status": "healthy", "cluster": cluster.describe()}
     return {"status": "healthy"}
 
+@app.get("/metrics")
+async def get_metrics():
+    metrics.set_gauge("cache_bytes", cache_instance.memory_usage(), cache="returns")
+    metrics.set_gauge("cache_bytes", query_cache.memory_usage(), cache="queries")
+    metrics.set_gauge("cache_entries", len(query_cache), cache="queries")
+    metrics.set_gauge("cache_bytes", intraday_service.memory_usage(), cache="intraday")
+    return metrics.snapshot()
+
 @app.get("/ticker-return")
 async def get_ticker_return(
+    request: Request,
     ticker: str = Query(..., description="Stock ticker symbol (e.g., MSFT, AAPL)"),
     date: str = Query(..., description="Date in YYYY-MM-DD format")
 ):
@@ -42,33 +313,831 @@ async def get_ticker_return(
         raise HTTPException(status_code=400, detail="Date cannot be in the future")
     
     ticker = ticker.upper()
+    local = owns(request, ticker)
+    if read_ahead is not None and local:
+        read_ahead.observe(ticker, [date])
     
     # Check cache first
     cached_data = cache_instance.get(ticker, date)
     if cached_data:
-        logger.info(f"Cache hit for {ticker}:{date}")
+        if sampled("cache_hit"):
+            logger.info("Cache hit for %s:%s", ticker, date, extra={"ticker": ticker, "date": date})
         return cached_data
     
-    logger.info(f"Cache miss for {ticker}:{date}, fetching data...")
+    # Expired but within the grace period: answer now, refresh in the background
+    stale_data = cache_instance.get_stale(ticker, date) if local else None
+    if stale_data:
+        logger.info("Serving stale %s:%s while revalidating", ticker, date, extra={"ticker": ticker, "date": date})
+        schedule_revalidation(ticker, date)
+        return JSONResponse(content=stale_data, headers={"X-Cache-Status": "stale"})
     
+    if sampled("cache_miss"):
+        logger.info("Cache miss for %s:%s, fetching data...", ticker, date, extra={"ticker": ticker, "date": date})
+    
+    try:
+        if not local:
+            forwarded = await unless_disconnected(request, _forward_return(ticker, date), "ticker-return")
+            if forwarded is not None:
+                return forwarded
+        # Run yfinance call in thread pool; the fetch caches its own result
+        return await unless_disconnected(
+            request, return_fetches.run((ticker, date), _fetch_and_cache, ticker, date), "ticker-return"
+        )
+    except ClientDisconnected:
+        logger.info("Client disconnected before %s:%s was fetched", ticker, date,
+                    extra={"ticker": ticker, "date": date})
+        return Response(status_code=CLIENT_CLOSED_REQUEST)
+    except UpstreamUnavailableError as e:
+        logger.warning("Upstream unavailable for %s on %s: %s", ticker, date, e,
+                       extra={"ticker": ticker, "date": date})
+        raise HTTPException(
+            status_code=503,
+            detail=f"Upstream data provider unavailable: {str(e)}",
+            headers={"Retry-After": str(math.ceil(e.retry_after))},
+        )
+    except Exception as e:
+        logger.error("Error fetching return for %s on %s: %s", ticker, date, e,
+                     extra={"ticker": ticker, "date": date})
+        raise HTTPException(status_code=500, detail=f"Error fetching stock data: {str(e)}")
+
+
+class ReturnKey(BaseModel):
+    ticker: str
+    date: str
+
+
+class BatchReturnsRequest(BaseModel):
+    items: List[ReturnKey] = Field(..., max_length=MAX_BATCH_ITEMS)
+
+
+@app.post("/batch-returns")
+async def get_batch_returns(request: BatchReturnsRequest, http_request: Request):
+    """Many ticker-day returns in one round trip; failures are reported per item"""
+    keys = []
+    seen = set()
+    for item in request.items:
+        try:
+            target_date = datetime.strptime(item.date, "%Y-%m-%d").date()
+        except ValueError:
+            raise HTTPException(status_code=400, detail=f"Invalid date format: {item.date}. Use YYYY-MM-DD")
+        if target_date > date_module.today():
+            raise HTTPException(status_code=400, detail=f"Date cannot be in the future: {item.date}")
+        key = (item.ticker.upper(), item.date)
+        if key not in seen:
+            seen.add(key)
+            keys.append(key)
+
+    by_ticker: Dict[str, List[str]] = {}
+    for ticker, date in keys:
+        by_ticker.setdefault(ticker, []).append(date)
+    if read_ahead is not None:
+        for ticker, dates in by_ticker.items():
+            if owns(http_request, ticker):
+                read_ahead.observe(ticker, dates)
+
+    results = {}
+    misses = []
+    for ticker, date in keys:
+        cached_data = cache_instance.get(ticker, date)
+        if cached_data is None and owns(http_request, ticker):
+            cached_data = cache_instance.get_stale(ticker, date)
+            if cached_data is not None:
+                schedule_revalidation(ticker, date)
+        if cached_data is not None:
+            results[(ticker, date)] = cached_data
+        else:
+            misses.append((ticker, date))
+
+    if misses and cluster is not None and not cluster.from_peer(http_request.headers):
+        try:
+            misses = await unless_disconnected(http_request, _forward_misses(misses, results), "batch-returns")
+        except ClientDisconnected:
+            logger.info("Client disconnected with %d forwarded keys outstanding", len(misses))
+            return Response(status_code=CLIENT_CLOSED_REQUEST)
+
+    if misses:
+        # Each run of nearby missing days for one ticker is filled by a single range fetch, not one call per day
+        missing: Dict[str, List[str]] = {}
+        for ticker, date in misses:
+            missing.setdefault(ticker, []).append(date)
+        ranges = [(ticker, start, end) for ticker, dates in missing.items()
+                  for start, end in dense_runs(dates, BATCH_RANGE_MAX_GAP_DAYS, BATCH_RANGE_MIN_DAYS)]
+        if ranges:
+            loop = asyncio.get_event_loop()
+            try:
+                filled = await unless_disconnected(http_request, asyncio.gather(
+                    *(loop.run_in_executor(executor, _fill_range, *bounds) for bounds in ranges),
+                    return_exceptions=True,
+                ), "batch-returns")
+            except ClientDisconnected:
+                logger.info("Client disconnected with %d range fetches outstanding", len(ranges))
+                return Response(status_code=CLIENT_CLOSED_REQUEST)
+            for (ticker, start, end), count in zip(ranges, filled):
+                if isinstance(count, Exception):
+                    logger.warning("Range fetch for %s %s..%s failed: %s", ticker, start, end, count,
+                                   extra={"ticker": ticker})
+            still_missing = []
+            for key in misses:
+                cached_data = cache_instance.get(*key)
+                if cached_data is None:
+                    still_missing.append(key)
+                else:
+                    results[key] = cached_data
+            misses = still_missing
+
+    if misses:
+        if sampled("cache_miss"):
+            logger.info("Batch of %d: %d cache misses, fetching data...", len(keys), len(misses),
+                        extra={"batch_size": len(keys), "misses": len(misses)})
+        try:
+            fetched = await unless_disconnected(http_request, asyncio.gather(
+                *(return_fetches.run((ticker, date), _fetch_and_cache, ticker, date) for ticker, date in misses),
+                return_exceptions=True,
+            ), "batch-returns")
+        except ClientDisconnected:
+            logger.info("Client disconnected with %d batch fetches outstanding", len(misses))
+            return Response(status_code=CLIENT_CLOSED_REQUEST)
+        for (ticker, date), return_data in zip(misses, fetched):
+            if isinstance(return_data, Exception):
+                # Transient failures are not cached, so the client can retry just these keys
+                logger.warning("Error fetching return for %s on %s: %s", ticker, date, return_data,
+                               extra={"ticker": ticker, "date": date})
+                detail = ("Upstream data provider unavailable" if isinstance(return_data, UpstreamUnavailableError)
+                          else f"Error fetching stock data: {str(return_data)}")
+                results[(ticker, date)] = {"ticker": ticker, "date": date, "return": None, "error": detail,
+                                           "transient": True}
+                continue
+            results[(ticker, date)] = return_data
+
+    return {"results": [results[key] for key in keys]}
+
+
+@app.get("/intraday-return")
+async def get_intraday_return(
+    request: Request,
+    ticker: str = Query(..., description="Stock ticker symbol (e.g., MSFT, AAPL)"),
+    date: str = Query(..., description="Trading day in YYYY-MM-DD format"),
+    interval: str = Query("5m", description="Bar interval: 1m, 5m, 15m, 30m or 1h"),
+):
+    try:
+        target_date = datetime.strptime(date, "%Y-%m-%d").date()
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid date format. Use YYYY-MM-DD")
+
+    if target_date > date_module.today():
+        raise HTTPException(status_code=400, detail="Date cannot be in the future")
+
+    interval_error = check_interval(interval, date)
+    if interval_error:
+        raise HTTPException(status_code=400, detail=interval_error)
+
+    ticker = ticker.upper()
+    if not owns(request, ticker):
+        # Intraday pages are cached on the owner only; relay its answer as is
+        try:
+            status, body, headers = await cluster.get(cluster.owner(ticker), "/intraday-return",
+                                                      {"ticker": ticker, "date": date, "interval": interval})
+            return Response(content=body, status_code=status, headers=headers)
+        except ForwardError as e:
+            logger.warning("Owner of %s unreachable, fetching intraday bars locally: %s", ticker, e,
+                           extra={"ticker": ticker, "date": date})
+    loop = asyncio.get_event_loop()
+    try:
+        # The previous close comes from the (cached) daily path
+        daily = cache_instance.get(ticker, date)
+        if daily is None:
+            daily = await loop.run_in_executor(executor, StockDataService.fetch_single_day_return, ticker, date)
+            cache_instance.set(ticker, date, daily)
+        if not daily.get("previous_price"):
+            raise HTTPException(status_code=404, detail=daily.get("error") or "No previous close available")
+
+        result = await loop.run_in_executor(
+            executor, intraday_service.intraday_returns, ticker, date, interval, daily["previous_price"]
+        )
+    except HTTPException:
+        raise
+    except UpstreamUnavailableError as e:
+        logger.warning("Upstream unavailable for %s %s on %s: %s", ticker, interval, date, e,
+                       extra={"ticker": ticker, "date": date})
+        raise HTTPException(
+            status_code=503,
+            detail=f"Upstream data provider unavailable: {str(e)}",
+            headers={"Retry-After": str(math.ceil(e.retry_after))},
+        )
+    except Exception as e:
+        logger.error("Error fetching %s bars for %s on %s: %s", interval, ticker, date, e,
+                     extra={"ticker": ticker, "date": date})
+        raise HTTPException(status_code=500, detail=f"Error fetching intraday data: {str(e)}")
+
+    if not result["times"]:
+        raise HTTPException(status_code=404, detail="No intraday data available")
+    return result
+
+
+@app.get("/ticker-series")
+async def get_ticker_series(
+    ticker: str = Query(..., description="Stock ticker symbol (e.g., MSFT, AAPL)"),
+    start_date: str = Query(..., description="First date in YYYY-MM-DD format"),
+    end_date: str = Query(..., description="Last date in YYYY-MM-DD format"),
+    max_points: Optional[int] = Query(None, ge=3, le=10000, description="Downsample to at most this many points"),
+    method: str = Query("lttb", description="Downsampling method: lttb or minmax"),
+):
+    try:
+        start = datetime.strptime(start_date, "%Y-%m-%d").date()
+        end = datetime.strptime(end_date, "%Y-%m-%d").date()
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid date format. Use YYYY-MM-DD")
+    if start > end:
+        raise HTTPException(status_code=400, detail="start_date must not be after end_date")
+    if end > date_module.today():
+        raise HTTPException(status_code=400, detail="Date cannot be in the future")
+    if method not in DOWNSAMPLE_METHODS:
+        raise HTTPException(status_code=400, detail=f"Unknown method. Use one of: {', '.join(DOWNSAMPLE_METHODS)}")
+
+    ticker = ticker.upper()
     try:
-        # Run yfinance call in thread pool
         loop = asyncio.get_event_loop()
-        return_data = await loop.run_in_executor(
-            executor, 
-            StockDataService.fetch_single_day_return, 
-            ticker, 
-            date
+        return await loop.run_in_executor(
+            executor, series_service.returns_series, ticker, start_date, end_date, max_points, method
+        )
+    except UpstreamUnavailableError as e:
+        logger.warning("Upstream unavailable for %s series: %s", ticker, e, extra={"ticker": ticker})
+        raise HTTPException(
+            status_code=503,
+            detail=f"Upstream data provider unavailable: {str(e)}",
+            headers={"Retry-After": str(math.ceil(e.retry_after))},
+        )
+    except Exception as e:
+        logger.error("Error fetching series for %s: %s", ticker, e, extra={"ticker": ticker})
+        raise HTTPException(status_code=500, detail=f"Error fetching stock data: {str(e)}")
+
+
+@app.get("/summary")
+async def get_summary(
+    start_date: str = Query(..., description="First date in YYYY-MM-DD format"),
+    end_date: str = Query(..., description="Last date in YYYY-MM-DD format"),
+    tickers: Optional[str] = Query(None, description="Comma-separated tickers (default: MAG7)"),
+    risk: bool = Query(False, description="Also return drawdown, downside deviation and VaR per ticker"),
+    var_level: float = Query(VAR_LEVEL, gt=0.5, lt=1, description="Confidence level of VaR/CVaR"),
+):
+    """min/max/mean/std of daily returns per ticker over [start_date, end_date], optionally with risk metrics"""
+    try:
+        start = datetime.strptime(start_date, "%Y-%m-%d").date()
+        end = datetime.strptime(end_date, "%Y-%m-%d").date()
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid date format. Use YYYY-MM-DD")
+    if start > end:
+        raise HTTPException(status_code=400, detail="start_date must not be after end_date")
+    if end > date_module.today():
+        raise HTTPException(status_code=400, detail="Date cannot be in the future")
+
+    symbols = list(dict.fromkeys(t.strip().upper() for t in tickers.split(",") if t.strip())) if tickers else MAG7_SYMBOLS
+    key = query_key("summary", start=start_date, end=end_date, tickers=symbols,
+                    risk=var_level if risk else None)
+    cached = query_cache.get(key)
+    if cached is not None:
+        return cached
+
+    loop = asyncio.get_event_loop()
+    results = await asyncio.gather(
+        *(loop.run_in_executor(executor, range_index_service.summary, symbol, start_date, end_date)
+          for symbol in symbols),
+        *(loop.run_in_executor(executor, ticker_risk, symbol, start_date, end_date, var_level)
+          for symbol in (symbols if risk else [])),
+        return_exceptions=True,
+    )
+
+    summary, risks = {}, {}
+    for n, (symbol, result) in enumerate(zip(symbols + (symbols if risk else []), results)):
+        if isinstance(result, UpstreamUnavailableError):
+            raise HTTPException(
+                status_code=503,
+                detail=f"Upstream data provider unavailable: {str(result)}",
+                headers={"Retry-After": str(math.ceil(result.retry_after))},
+            )
+        if isinstance(result, Exception):
+            logger.error("Error computing summary for %s: %s", symbol, result, extra={"ticker": symbol})
+            raise HTTPException(status_code=500, detail=f"Error fetching stock data: {str(result)}")
+        (summary if n < len(symbols) else risks)[symbol] = result
+    response = {"start_date": start_date, "end_date": end_date, "summary": summary}
+    if risk:
+        response["risk"] = risks
+    query_cache.set(key, response, symbols, (start - timedelta(days=LOOKBACK_DAYS)).isoformat(), end_date)
+    return response
+
+
+def ticker_risk(ticker: str, start_date: str, end_date: str, var_level: float) -> Dict:
+    dates, returns = series_service.returns_panel([ticker], start_date, end_date)
+    return risk_metrics(dates, returns, var_level)[0]
+
+
+@app.get("/correlation")
+async def get_correlation(
+    start_date: str = Query(..., description="First date in YYYY-MM-DD format"),
+    end_date: str = Query(..., description="Last date in YYYY-MM-DD format"),
+    tickers: Optional[str] = Query(None, description="Comma-separated tickers (default: MAG7)"),
+):
+    """Pearson correlation of daily returns over the sessions every ticker traded in [start_date, end_date]"""
+    try:
+        start = datetime.strptime(start_date, "%Y-%m-%d").date()
+        end = datetime.strptime(end_date, "%Y-%m-%d").date()
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid date format. Use YYYY-MM-DD")
+    if start > end:
+        raise HTTPException(status_code=400, detail="start_date must not be after end_date")
+    if end > date_module.today():
+        raise HTTPException(status_code=400, detail="Date cannot be in the future")
+
+    symbols = list(dict.fromkeys(t.strip().upper() for t in tickers.split(",") if t.strip())) if tickers else MAG7_SYMBOLS
+    key = query_key("correlation", start=start_date, end=end_date, tickers=symbols)
+    cached = query_cache.get(key)
+    if cached is not None:
+        return cached
+
+    try:
+        loop = asyncio.get_event_loop()
+        dates, returns = await loop.run_in_executor(executor, series_service.returns_panel, symbols, start_date, end_date)
+        n = len(symbols)
+        matrix = await analytics_pool.map_chunks_async(correlation_kernel, returns, (n, n), n)
+    except UpstreamUnavailableError as e:
+        raise HTTPException(
+            status_code=503,
+            detail=f"Upstream data provider unavailable: {str(e)}",
+            headers={"Retry-After": str(math.ceil(e.retry_after))},
+        )
+    except Exception as e:
+        logger.error("Error computing correlation for %s: %s", symbols, e, extra={"tickers": symbols})
+        raise HTTPException(status_code=500, detail=f"Error fetching stock data: {str(e)}")
+
+    response = {
+        "start_date": start_date,
+        "end_date": end_date,
+        "tickers": symbols,
+        "sessions": len(dates),
+        # Tickers without variation (or too few sessions) have no defined correlation
+        "matrix": [[None if math.isnan(v) else round(v, 6) for v in row] for row in matrix.tolist()],
+    }
+    query_cache.set(key, response, symbols, (start - timedelta(days=LOOKBACK_DAYS)).isoformat(), end_date)
+    return response
+
+
+@app.get("/portfolio")
+async def get_portfolio(
+    start_date: str = Query(..., description="First date in YYYY-MM-DD format"),
+    end_date: str = Query(..., description="Last date in YYYY-MM-DD format"),
+    tickers: Optional[str] = Query(None, description="Comma-separated tickers (default: MAG7)"),
+    weights: Optional[str] = Query(None, description="Comma-separated weights in ticker order (default: equal)"),
+    rebalance: str = Query("none", description="Rebalancing schedule: none, monthly or quarterly"),
+    var_level: float = Query(VAR_LEVEL, gt=0.5, lt=1, description="Confidence level of VaR/CVaR"),
+):
+    """Daily and cumulative returns of a weighted basket over the sessions every ticker traded"""
+    try:
+        start = datetime.strptime(start_date, "%Y-%m-%d").date()
+        end = datetime.strptime(end_date, "%Y-%m-%d").date()
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid date format. Use YYYY-MM-DD")
+    if start > end:
+        raise HTTPException(status_code=400, detail="start_date must not be after end_date")
+    if end > date_module.today():
+        raise HTTPException(status_code=400, detail="Date cannot be in the future")
+    if rebalance not in REBALANCE_SCHEDULES:
+        raise HTTPException(status_code=400, detail=f"rebalance must be one of: {', '.join(REBALANCE_SCHEDULES)}")
+
+    symbols = list(dict.fromkeys(t.strip().upper() for t in tickers.split(",") if t.strip())) if tickers else MAG7_SYMBOLS
+    try:
+        raw = [float(w) for w in weights.split(",")] if weights else [1.0] * len(symbols)
+        if len(raw) != len(symbols):
+            raise ValueError(f"Expected {len(symbols)} weights, one per ticker, got {len(raw)}")
+        target = normalise_weights(raw)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=f"Invalid weights: {str(e)}")
+
+    key = query_key("portfolio", start=start_date, end=end_date, tickers=symbols,
+                    weights=[round(w, 10) for w in target.tolist()], rebalance=rebalance, var_level=var_level)
+    cached = query_cache.get(key)
+    if cached is not None:
+        return cached
+
+    try:
+        loop = asyncio.get_event_loop()
+        dates, returns = await loop.run_in_executor(executor, series_service.returns_panel, symbols, start_date, end_date)
+        daily, cumulative = portfolio_returns(dates, returns, target, rebalance)
+        risk = risk_metrics(dates, daily, var_level)[0]
+    except UpstreamUnavailableError as e:
+        raise HTTPException(
+            status_code=503,
+            detail=f"Upstream data provider unavailable: {str(e)}",
+            headers={"Retry-After": str(math.ceil(e.retry_after))},
+        )
+    except Exception as e:
+        logger.error("Error computing portfolio for %s: %s", symbols, e, extra={"tickers": symbols})
+        raise HTTPException(status_code=500, detail=f"Error fetching stock data: {str(e)}")
+
+    response = {
+        "start_date": start_date,
+        "end_date": end_date,
+        "tickers": symbols,
+        "weights": [round(w, 6) for w in target.tolist()],
+        "rebalance": rebalance,
+        "sessions": len(dates),
+        "dates": dates.astype(str).tolist(),
+        "returns": [round(r, 6) for r in daily.tolist()],
+        "cumulative_returns": [round(r, 6) for r in cumulative.tolist()],
+        "total_return": round(float(cumulative[-1]), 6) if len(cumulative) else None,
+        "risk": risk,
+    }
+    query_cache.set(key, response, symbols, (start - timedelta(days=LOOKBACK_DAYS)).isoformat(), end_date)
+    return response
+
+
+def _rounded(value: float) -> Optional[float]:
+    # Undefined statistics (no variance, too few sessions) are NaN
+    return None if math.isnan(value) else round(value, 6)
+
+
+@app.get("/relative")
+async def get_relative(
+    start_date: str = Query(..., description="First date in YYYY-MM-DD format"),
+    end_date: str = Query(..., description="Last date in YYYY-MM-DD format"),
+    tickers: Optional[str] = Query(None, description="Comma-separated tickers (default: MAG7)"),
+    benchmark: str = Query(DEFAULT_BENCHMARK, description="Benchmark ticker, e.g. QQQ or SPY"),
+    window: int = Query(60, ge=5, le=756, description="Rolling regression window in sessions"),
+):
+    """Excess return, beta and alpha of each ticker against a benchmark, full-period and rolling"""
+    try:
+        start = datetime.strptime(start_date, "%Y-%m-%d").date()
+        end = datetime.strptime(end_date, "%Y-%m-%d").date()
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid date format. Use YYYY-MM-DD")
+    if start > end:
+        raise HTTPException(status_code=400, detail="start_date must not be after end_date")
+    if end > date_module.today():
+        raise HTTPException(status_code=400, detail="Date cannot be in the future")
+
+    index = benchmark.strip().upper()
+    if not index:
+        raise HTTPException(status_code=400, detail="benchmark must not be empty")
+    # The benchmark is never its own peer, whether listed or part of the default universe
+    universe = dict.fromkeys(t.strip().upper() for t in tickers.split(",") if t.strip()) if tickers else MAG7_SYMBOLS
+    symbols = [s for s in universe if s != index]
+    key = query_key("relative", start=start_date, end=end_date, tickers=symbols, benchmark=index, window=window)
+    cached = query_cache.get(key)
+    if cached is not None:
+        return cached
+
+    try:
+        loop = asyncio.get_event_loop()
+        # The benchmark is one more column of the aligned panel, fetched once for every ticker
+        dates, returns = await loop.run_in_executor(
+            executor, series_service.returns_panel, symbols + [index], start_date, end_date
+        )
+        result = relative_metrics(returns[:, :-1], returns[:, -1], window)
+    except UpstreamUnavailableError as e:
+        raise HTTPException(
+            status_code=503,
+            detail=f"Upstream data provider unavailable: {str(e)}",
+            headers={"Retry-After": str(math.ceil(e.retry_after))},
+        )
+    except Exception as e:
+        logger.error("Error computing returns relative to %s for %s: %s", index, symbols, e,
+                     extra={"tickers": symbols + [index]})
+        raise HTTPException(status_code=500, detail=f"Error fetching stock data: {str(e)}")
+
+    response = {
+        "start_date": start_date,
+        "end_date": end_date,
+        "benchmark": index,
+        "window": window,
+        "sessions": len(dates),
+        "dates": dates.astype(str).tolist(),
+        "benchmark_return": _rounded(float(result["benchmark_total_return"])),
+        "tickers": {
+            symbol: {
+                "beta": _rounded(float(result["beta"][i])),
+                "alpha": _rounded(float(result["alpha"][i])),
+                "alpha_annualized": _rounded(float(result["alpha"][i]) * SESSIONS_PER_YEAR),
+                "correlation": _rounded(float(result["correlation"][i])),
+                "total_return": _rounded(float(result["total_return"][i])),
+                "excess_return": _rounded(float(result["total_return"][i] - result["benchmark_total_return"])),
+                "excess_returns": [_rounded(v) for v in result["excess"][:, i].tolist()],
+                "rolling_beta": [_rounded(v) for v in result["rolling_beta"][:, i].tolist()],
+                "rolling_alpha": [_rounded(v) for v in result["rolling_alpha"][:, i].tolist()],
+            }
+            for i, symbol in enumerate(symbols)
+        },
+    }
+    query_cache.set(key, response, symbols + [index], (start - timedelta(days=LOOKBACK_DAYS)).isoformat(), end_date)
+    return response
+
+
+@app.get("/ranking")
+async def get_ranking(
+    start_date: str = Query(..., description="First date in YYYY-MM-DD format"),
+    end_date: str = Query(..., description="Last date in YYYY-MM-DD format"),
+    tickers: Optional[str] = Query(None, description="Comma-separated universe (default: MAG7)"),
+):
+    """Tickers ranked by return for every session, with percentiles and cross-sectional dispersion"""
+    try:
+        start = datetime.strptime(start_date, "%Y-%m-%d").date()
+        end = datetime.strptime(end_date, "%Y-%m-%d").date()
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid date format. Use YYYY-MM-DD")
+    if start > end:
+        raise HTTPException(status_code=400, detail="start_date must not be after end_date")
+    if end > date_module.today():
+        raise HTTPException(status_code=400, detail="Date cannot be in the future")
+
+    symbols = list(dict.fromkeys(t.strip().upper() for t in tickers.split(",") if t.strip())) if tickers else MAG7_SYMBOLS
+    if not symbols:
+        raise HTTPException(status_code=400, detail="tickers must not be empty")
+    key = query_key("ranking", start=start_date, end=end_date, tickers=symbols)
+    cached = query_cache.get(key)
+    if cached is not None:
+        return cached
+
+    try:
+        loop = asyncio.get_event_loop()
+        dates, returns = await loop.run_in_executor(
+            executor, series_service.returns_panel, symbols, start_date, end_date
+        )
+        result = cross_section(returns)
+    except UpstreamUnavailableError as e:
+        raise HTTPException(
+            status_code=503,
+            detail=f"Upstream data provider unavailable: {str(e)}",
+            headers={"Retry-After": str(math.ceil(e.retry_after))},
+        )
+    except Exception as e:
+        logger.error("Error ranking %s: %s", symbols, e, extra={"tickers": symbols})
+        raise HTTPException(status_code=500, detail=f"Error fetching stock data: {str(e)}")
+
+    sessions = len(dates)
+    rank, percentile = result["rank"], result["percentile"]
+    response = {
+        "start_date": start_date,
+        "end_date": end_date,
+        "tickers": symbols,
+        "sessions": sessions,
+        "dates": dates.astype(str).tolist(),
+        # Best to worst, one list per session
+        "ranking": [[symbols[i] for i in row] for row in result["order"].tolist()],
+        "mean_return": [_rounded(v) for v in result["mean"].tolist()],
+        "dispersion": [_rounded(v) for v in result["dispersion"].tolist()],
+        "ranks": {symbol: rank[:, i].tolist() for i, symbol in enumerate(symbols)},
+        "percentiles": {symbol: [_rounded(v) for v in percentile[:, i].tolist()] for i, symbol in enumerate(symbols)},
+        "summary": {
+            symbol: {
+                "mean_rank": _rounded(float(rank[:, i].mean())) if sessions else None,
+                "mean_percentile": _rounded(float(percentile[:, i].mean())) if sessions else None,
+                "sessions_first": int((rank[:, i] == 1).sum()),
+                "sessions_last": int((rank[:, i] == len(symbols)).sum()),
+            }
+            for i, symbol in enumerate(symbols)
+        },
+    }
+    query_cache.set(key, response, symbols, (start - timedelta(days=LOOKBACK_DAYS)).isoformat(), end_date)
+    return response
+
+
+@app.get("/internal/closes", include_in_schema=False)
+async def get_owned_closes(
+    request: Request,
+    ticker: str = Query(...),
+    start_date: str = Query(...),
+    end_date: str = Query(...),
+):
+    """Daily closes loaded on this node, for cluster peers whose range endpoints need a ticker it owns"""
+    if cluster is None:
+        raise HTTPException(status_code=404, detail="Not in cluster mode")
+    if not cluster.from_peer(request.headers):
+        raise HTTPException(status_code=403, detail="Only cluster nodes may load closes")
+    try:
+        datetime.strptime(start_date, "%Y-%m-%d")
+        datetime.strptime(end_date, "%Y-%m-%d")
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid date format. Use YYYY-MM-DD")
+
+    ticker = ticker.upper()
+    try:
+        # Shares the closes cache with this node's own range endpoints
+        dates, closes = await closes_fetches.run((ticker, start_date, end_date), series_service.cached_closes,
+                                                 ticker, start_date, end_date, True)
+    except UpstreamUnavailableError as e:
+        raise HTTPException(
+            status_code=503,
+            detail=f"Upstream data provider unavailable: {str(e)}",
+            headers={"Retry-After": str(math.ceil(e.retry_after))},
+        )
+    except Exception as e:
+        logger.error("Error loading closes for %s: %s", ticker, e, extra={"ticker": ticker})
+        raise HTTPException(status_code=500, detail=f"Error fetching stock data: {str(e)}")
+    return {"ticker": ticker, "dates": dates.astype(str).tolist(), "closes": closes.tolist()}
+
+
+@app.get("/export")
+async def export_returns(
+    request: Request,
+    start_date: str = Query(..., description="First date in YYYY-MM-DD format"),
+    end_date: str = Query(..., description="Last date in YYYY-MM-DD format"),
+    tickers: Optional[str] = Query(None, description="Comma-separated tickers (default: MAG7)"),
+    format: str = Query("csv", description="csv or parquet"),
+):
+    """Stream daily returns for every ticker over [start_date, end_date]; honours single byte ranges"""
+    try:
+        start = datetime.strptime(start_date, "%Y-%m-%d").date()
+        end = datetime.strptime(end_date, "%Y-%m-%d").date()
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid date format. Use YYYY-MM-DD")
+    if start > end:
+        raise HTTPException(status_code=400, detail="start_date must not be after end_date")
+    if end > date_module.today():
+        raise HTTPException(status_code=400, detail="Date cannot be in the future")
+    if format not in EXPORT_FORMATS:
+        raise HTTPException(status_code=400, detail=f"format must be one of: {', '.join(EXPORT_FORMATS)}")
+    if format == "parquet" and not has_pyarrow():
+        raise HTTPException(status_code=400, detail="Parquet export needs pyarrow on the server")
+
+    symbols = list(dict.fromkeys(t.strip().upper() for t in tickers.split(",") if t.strip())) if tickers else MAG7_SYMBOLS
+    headers = {
+        "Accept-Ranges": "bytes",
+        "Content-Disposition": f'attachment; filename="returns_{start_date}_{end_date}.{format}"',
+    }
+
+    loop = asyncio.get_event_loop()
+    first, last, status_code = 0, None, 200
+    range_header = request.headers.get("range")
+    if_range = request.headers.get("if-range")
+    try:
+        # The validator, the size and the body all come from these closes, so a resumed
+        # download never joins bytes rendered from different data
+        export = await loop.run_in_executor(executor, exporter.open, symbols, start_date, end_date, format)
+        headers["ETag"] = export.etag
+        if range_header and (if_range is None or if_range == export.etag):
+            size = await loop.run_in_executor(executor, export.size)
+            try:
+                selected = parse_range(range_header, size)
+            except ValueError:
+                selected = ()  # Unsupported or malformed ranges get the whole export
+            if selected is None:
+                raise HTTPException(status_code=416, detail="Range not satisfiable",
+                                    headers={"Content-Range": f"bytes */{size}"})
+            if selected:
+                first, last = selected
+                status_code = 206
+                headers["Content-Range"] = f"bytes {first}-{last}/{size}"
+            headers["Content-Length"] = str(last - first + 1 if selected else size)
+        else:
+            size = export.known_size()
+            if size is not None:
+                headers["Content-Length"] = str(size)
+        pieces = export.stream(first, last)
+        head = await loop.run_in_executor(executor, next, pieces, b"")
+    except HTTPException:
+        raise
+    except UpstreamUnavailableError as e:
+        raise HTTPException(
+            status_code=503,
+            detail=f"Upstream data provider unavailable: {str(e)}",
+            headers={"Retry-After": str(math.ceil(e.retry_after))},
         )
-        
-        # Cache the result
-        cache_instance.set(ticker, date, return_data)
-        
-        return return_data
     except Exception as e:
-        logger.error(f"Error fetching return for {ticker} on {date}: {str(e)}")
+        logger.error("Error exporting %s: %s", symbols, e, extra={"tickers": symbols})
         raise HTTPException(status_code=500, detail=f"Error fetching stock data: {str(e)}")
 
+    return StreamingResponse(itertools.chain([head], pieces), status_code=status_code,
+                             media_type=EXPORT_FORMATS[format], headers=headers)
+
+
+class InvalidateRequest(BaseModel):
+    tickers: Optional[List[str]] = None
+    start_date: Optional[str] = None
+    end_date: Optional[str] = None
+
+
+def invalidate_cached(tickers: Optional[List[str]], start: Optional[str], end: Optional[str]) -> Dict[str, Optional[int]]:
+    """Drop returns for tickers/dates from every layer that holds them or results derived from them"""
+    counts = {
+        "returns": cache_instance.invalidate(tickers, start, end),
+        "queries": query_cache.invalidate(tickers, start, end),
+        "summaries": range_index_service.invalidate(tickers, start, end),
+        "intraday": intraday_service.invalidate(tickers, start, end),
+        "price_store": None,
+    }
+    store = get_price_store()
+    if store is not None and store.is_writer:
+        counts["price_store"] = sum(store.invalidate(t, start, end) for t in (tickers or store.tickers()))
+    elif store is not None:
+        logger.warning("Price store is owned by another worker; stored closes were not invalidated")
+    for layer, count in counts.items():
+        if count:
+            metrics.inc("cache_invalidated_entries_total", count, layer=layer)
+    return counts
+
+
+def require_admin(x_admin_token: Optional[str]) -> None:
+    admin_token = os.getenv("ADMIN_TOKEN")
+    if not admin_token:
+        raise HTTPException(status_code=403, detail="Admin endpoints are disabled (ADMIN_TOKEN is not set)")
+    if x_admin_token is None or not secrets.compare_digest(x_admin_token, admin_token):
+        raise HTTPException(status_code=401, detail="Invalid admin token")
+
+
+@app.post("/admin/invalidate")
+async def invalidate_cache(request: InvalidateRequest, x_admin_token: Optional[str] = Header(None)):
+    """Invalidate cached data by ticker, date range or both (requires the ADMIN_TOKEN header)"""
+    require_admin(x_admin_token)
+
+    tickers = sorted({t.strip().upper() for t in request.tickers if t.strip()}) if request.tickers else None
+    for value in (request.start_date, request.end_date):
+        if value is not None:
+            try:
+                datetime.strptime(value, "%Y-%m-%d")
+            except ValueError:
+                raise HTTPException(status_code=400, detail="Invalid date format. Use YYYY-MM-DD")
+    if tickers is None and request.start_date is None and request.end_date is None:
+        raise HTTPException(status_code=400, detail="Specify tickers, a date range or both")
+    if request.start_date and request.end_date and request.start_date > request.end_date:
+        raise HTTPException(status_code=400, detail="start_date must not be after end_date")
+
+    loop = asyncio.get_event_loop()
+    counts = await loop.run_in_executor(executor, invalidate_cached, tickers, request.start_date, request.end_date)
+    logger.info("Invalidated %s for tickers=%s range=%s..%s", counts, tickers, request.start_date, request.end_date,
+                extra={"tickers": tickers})
+    return {"tickers": tickers, "start_date": request.start_date, "end_date": request.end_date,
+            "invalidated": counts}
+
+
+MAX_PROFILE_SECONDS = 60
+
+
+@app.get("/debug/profile")
+async def profile_process(
+    seconds: float = Query(5.0, description="How long to sample, at most 60 seconds"),
+    format: str = Query("collapsed", description="collapsed (flamegraph input) or pstats"),
+    interval_ms: float = Query(5.0, ge=1, le=1000, description="Sampling interval in milliseconds"),
+    x_admin_token: Optional[str] = Header(None),
+):
+    """Sample the stacks of every thread (event loop, executors, background work) for the given time"""
+    require_admin(x_admin_token)
+    if not 0 < seconds <= MAX_PROFILE_SECONDS:
+        raise HTTPException(status_code=400, detail=f"seconds must be in (0, {MAX_PROFILE_SECONDS}]")
+    if format not in PROFILE_FORMATS:
+        raise HTTPException(status_code=400, detail=f"format must be one of: {', '.join(PROFILE_FORMATS)}")
+
+    # The default executor, so sampling never holds a slot that request fetches need
+    loop = asyncio.get_event_loop()
+    try:
+        profile = await loop.run_in_executor(None, profiler.run, seconds, interval_ms / 1000)
+    except ProfilerBusy as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    logger.info("Profiled for %.1fs (%d samples)", profile.seconds, profile.samples)
+    return PlainTextResponse(profile.render(format), headers={"X-Profile-Samples": str(profile.samples)})
+
+
+@app.get("/debug/tasks")
+async def dump_tasks(x_admin_token: Optional[str] = Header(None)):
+    """Current asyncio tasks with their suspended stacks, and the work queued on the executors"""
+    require_admin(x_admin_token)
+    return {
+        "tasks": describe_tasks(),
+        "executor": {**describe_executor(executor), "fetches": return_fetches.pending()},
+        "read_ahead": {"pending": read_ahead.pending} if read_ahead is not None else None,
+    }
+
+
+@app.websocket("/ws/returns")
+async def stream_returns(websocket: WebSocket, tickers: Optional[str] = None):
+    """Push live intraday returns (vs. previous close) for the requested tickers"""
+    symbols = sorted({t.strip().upper() for t in tickers.split(",") if t.strip()}) if tickers else MAG7_SYMBOLS
+    await websocket.accept()
+    queue: asyncio.Queue = asyncio.Queue(maxsize=max(16, 4 * len(symbols)))
+    for symbol in symbols:
+        quote_hub.subscribe(symbol, queue)
+
+    async def send_quotes():
+        while True:
+            await websocket.send_json(await queue.get())
+
+    async def wait_for_disconnect():
+        # Clients only listen; draining receive() is how a close is noticed
+        try:
+            while True:
+                await websocket.receive_text()
+        except WebSocketDisconnect:
+            pass
+
+    sender = asyncio.create_task(send_quotes())
+    receiver = asyncio.create_task(wait_for_disconnect())
+    try:
+        await asyncio.wait({sender, receiver}, return_when=asyncio.FIRST_COMPLETED)
+    finally:
+        for task in (sender, receiver):
+            task.cancel()
+            # Sends fail once the client is gone; consume that error instead of awaiting the task
+            task.add_done_callback(lambda t: t.cancelled() or t.exception())
+        for symbol in symbols:
+            quote_hub.unsubscribe(symbol, queue)
+
 
 if __name__ == "__main__":
     import uvicorn
@@ -0,0 +1,65 @@
+"""
+Throughput benchmark: analytics kernels inline vs. the process pool at 1, 2, 4 and 8 workers.
+
+Builds a synthetic (sessions x tickers) return panel, then times a full correlation
+matrix and 60-session rolling mean/std with each pool size. Workers are started
+and warmed before timing, so the numbers exclude process spawn. The panel reaches
+workers through shared memory, so per-job dispatch cost does not grow with its size.
+
+Run from the backend directory:
+    python -m benchmarks.bench_analytics_pool --tickers 2000 --years 10
+"""
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from services.analytics_pool import AnalyticsPool, correlation_matrix, rolling_stats
+
+
+def timed(job, repeat):
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        job()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--tickers", type=int, default=2000)
+    parser.add_argument("--years", type=int, default=10)
+    parser.add_argument("--window", type=int, default=60)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    returns = np.random.default_rng(7).normal(0, 0.02, size=(args.years * 252, args.tickers))
+    print(f"panel: {returns.shape[0]} sessions x {returns.shape[1]} tickers, "
+          f"{returns.nbytes / 2**20:.1f} MiB, {os.cpu_count()} CPUs")
+    print(f"{'workers':>8} {'corr s':>9} {'rolling s':>10} {'Mcells/s':>10} {'speedup':>8}")
+
+    baseline = None
+    for workers in (0, 1, 2, 4, 8):
+        pool = AnalyticsPool(workers, inline_elements=0)
+        try:
+            if workers:
+                # Spawn every worker before timing
+                correlation_matrix(pool, returns[:, :max(workers * 4, 8)])
+            corr = timed(lambda: correlation_matrix(pool, returns), args.repeat)
+            rolling = timed(lambda: rolling_stats(pool, returns, args.window), args.repeat)
+        finally:
+            pool.close()
+        total = corr + rolling
+        baseline = baseline or total
+        label = "inline" if workers == 0 else str(workers)
+        print(f"{label:>8} {corr:>9.3f} {rolling:>10.3f} {2 * returns.size / total / 1e6:>10.1f} "
+              f"{baseline / total:>7.2f}x")
+
+
+if __name__ == "__main__":
+    main()
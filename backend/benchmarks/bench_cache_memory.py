@@ -0,0 +1,74 @@
+"""
+Memory benchmark: dict-based InMemoryCache vs array-backed CompactReturnCache.
+
+Run from the backend directory:
+    python -m benchmarks.bench_cache_memory --years 5
+"""
+import argparse
+import gc
+import os
+import sys
+import tracemalloc
+from datetime import date, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from services.cache import InMemoryCache
+from services.compact_store import CompactReturnCache
+
+MAG7_SYMBOLS = ["MSFT", "AAPL", "GOOGL", "AMZN", "NVDA", "META", "TSLA"]
+
+
+def generate_payloads(tickers, years):
+    start = date(2020, 1, 1)
+    for ticker in tickers:
+        price = 100.0
+        for offset in range(int(years * 365)):
+            day = start + timedelta(days=offset)
+            if day.weekday() > 4:
+                continue
+            previous = price
+            price = round(price * (1 + ((offset * 7919) % 200 - 100) / 10000), 2)
+            yield ticker, day.isoformat(), {
+                "ticker": ticker,
+                "date": day.isoformat(),
+                "return": round((price - previous) / previous, 6),
+                "price": price,
+                "previous_price": previous,
+            }
+
+
+def measure(factory, years):
+    """Payloads are generated inside the traced region so retained dicts are counted"""
+    gc.collect()
+    tracemalloc.start()
+    baseline = tracemalloc.get_traced_memory()[0]
+    cache = factory()
+    for ticker, day, data in generate_payloads(MAG7_SYMBOLS, years):
+        cache.set(ticker, day, data)
+    gc.collect()
+    used = tracemalloc.get_traced_memory()[0] - baseline
+    tracemalloc.stop()
+    return cache, used
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--years", type=float, default=5.0)
+    args = parser.parse_args()
+
+    count = sum(1 for _ in generate_payloads(MAG7_SYMBOLS, args.years))
+
+    _, dict_bytes = measure(lambda: InMemoryCache(maxsize=count), args.years)
+    compact, compact_bytes = measure(CompactReturnCache, args.years)
+
+    print(f"ticker-days:           {count}")
+    print(f"InMemoryCache:         {dict_bytes / 1024:10.1f} KiB  ({dict_bytes / count:6.1f} B/ticker-day)")
+    print(f"CompactReturnCache:    {compact_bytes / 1024:10.1f} KiB  ({compact_bytes / count:6.1f} B/ticker-day)")
+    print(f"  array bytes:         {compact.memory_usage() / 1024:10.1f} KiB")
+    print(f"ticker-days per MB:    dict={count / (dict_bytes / 2**20):,.0f}  compact={count / (compact_bytes / 2**20):,.0f}")
+    print(f"density improvement:   {dict_bytes / compact_bytes:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
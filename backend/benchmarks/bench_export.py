@@ -0,0 +1,90 @@
+"""
+Throughput benchmark: /export rows per second for CSV and Parquet.
+
+Serves synthetic daily closes for --tickers tickers over --years years from memory,
+so the numbers measure rendering and streaming rather than upstream fetches.
+Three paths are timed:
+- the Exporter alone
+- the full HTTP response through the ASGI app (TestClient, which reads the stream)
+- a resumed download of the second half of the file (Range: bytes=N-)
+Peak traced memory comes from a separate, untimed Exporter pass; it stays at the
+loaded closes plus one block, well below the size of the file.
+
+Run from the backend directory:
+    python -m benchmarks.bench_export --tickers 50 --years 20
+"""
+import argparse
+import os
+import sys
+import time
+import tracemalloc
+import zlib
+from unittest.mock import patch
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from services.export import Exporter, has_pyarrow
+
+
+def synthetic_closes(years):
+    dates = np.arange(np.datetime64("2000-01-03"), np.datetime64("2000-01-03") + years * 365, dtype="datetime64[D]")
+    dates = dates[np.is_busday(dates)]
+
+    def daily_closes(ticker, start, end):
+        keep = (dates >= np.datetime64(start)) & (dates <= np.datetime64(end))
+        rng = np.random.default_rng(zlib.crc32(ticker.encode()))
+        closes = 100.0 * np.cumprod(1 + rng.normal(0.0003, 0.015, len(dates)))
+        return dates[keep], closes[keep]
+
+    return dates, daily_closes
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--tickers", type=int, default=50)
+    parser.add_argument("--years", type=int, default=20)
+    parser.add_argument("--block-rows", type=int, default=4096)
+    args = parser.parse_args()
+
+    dates, daily_closes = synthetic_closes(args.years)
+    tickers = [f"T{n:04d}" for n in range(args.tickers)]
+    start, end = str(dates[1]), str(dates[-1])
+    rows = (len(dates) - 1) * len(tickers)
+    exporter = Exporter(daily_closes, block_rows=args.block_rows)
+    formats = ["csv"] + (["parquet"] if has_pyarrow() else [])
+    print(f"{rows:,} rows ({len(tickers)} tickers x {len(dates) - 1} sessions)"
+          + ("" if has_pyarrow() else "; parquet skipped (no pyarrow)"))
+    print(f"{'format':>8} {'path':>14} {'rows/s':>12} {'MB':>8} {'peak MB':>8}")
+
+    from fastapi.testclient import TestClient
+    from app import app
+    client = TestClient(app)
+    for fmt in formats:
+        started = time.perf_counter()
+        size = sum(len(piece) for piece in exporter.stream(tickers, start, end, fmt))
+        elapsed = time.perf_counter() - started
+        tracemalloc.start()
+        for _ in exporter.stream(tickers, start, end, fmt):
+            pass
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+        print(f"{fmt:>8} {'exporter':>14} {rows / elapsed:>12,.0f} {size / 1e6:>8.1f} {peak / 1e6:>8.1f}")
+
+        url = f"/export?start_date={start}&end_date={end}&tickers={','.join(tickers)}&format={fmt}"
+        with patch("app.exporter", Exporter(daily_closes, block_rows=args.block_rows)):
+            started = time.perf_counter()
+            response = client.get(url)
+            elapsed = time.perf_counter() - started
+            print(f"{fmt:>8} {'http':>14} {rows / elapsed:>12,.0f} {len(response.content) / 1e6:>8.1f}")
+
+            started = time.perf_counter()
+            resumed = client.get(url, headers={"Range": f"bytes={size // 2}-"})
+            elapsed = time.perf_counter() - started
+            assert resumed.status_code == 206 and resumed.content == response.content[size // 2:]
+            print(f"{fmt:>8} {'http, 2nd half':>14} {rows / elapsed:>12,.0f} {len(resumed.content) / 1e6:>8.1f}")
+
+
+if __name__ == "__main__":
+    main()
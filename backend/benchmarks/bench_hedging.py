@@ -0,0 +1,108 @@
+"""
+Latency benchmark: hedged upstream calls and cancellation of abandoned fetches.
+
+Hedging: runs --calls sequential calls against a fake provider whose latency is
+mostly --latency with a --slow-every tail of --slow-latency, once directly and once
+through a Hedger, and prints p50/p95/p99/max plus the extra upstream calls spent.
+
+Cancellation: queues --requests ticker-day fetches behind a 4-thread executor
+(as a dashboard does when loading a range), then "disconnects" every client
+after --disconnect-after seconds. It prints how many fetches still reached the provider.
+
+Run from the backend directory:
+    python -m benchmarks.bench_hedging --calls 400 --requests 300
+"""
+import argparse
+import asyncio
+import os
+import random
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from services.hedging import Hedger, SharedCalls
+
+
+class SlowFake:
+    """Blocking call with a jittered base latency and a periodic slow tail"""
+
+    def __init__(self, latency, slow_every, slow_latency, seed=1):
+        self.latency = latency
+        self.slow_every = slow_every
+        self.slow_latency = slow_latency
+        self.calls = 0
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+
+    def __call__(self, *args):
+        with self._lock:
+            self.calls += 1
+            call = self.calls
+            jitter = self._rng.uniform(0.8, 1.2)
+        time.sleep(self.slow_latency if call % self.slow_every == 0 else self.latency * jitter)
+        return args
+
+
+def percentiles(samples):
+    samples = sorted(samples)
+    pick = lambda q: samples[min(len(samples) - 1, int(q * len(samples)))] * 1000
+    return pick(0.5), pick(0.95), pick(0.99), samples[-1] * 1000
+
+
+def run_calls(call, count):
+    latencies = []
+    for n in range(count):
+        started = time.perf_counter()
+        call(n)
+        latencies.append(time.perf_counter() - started)
+    return latencies
+
+
+async def abandon_requests(requests, disconnect_after, fake):
+    with ThreadPoolExecutor(4) as executor:
+        shared = SharedCalls(executor)
+        waiters = [asyncio.ensure_future(shared.run(n, fake, n)) for n in range(requests)]
+        await asyncio.sleep(disconnect_after)
+        for waiter in waiters:
+            waiter.cancel()
+        await asyncio.gather(*waiters, return_exceptions=True)
+    return fake.calls
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--calls", type=int, default=400)
+    parser.add_argument("--latency", type=float, default=0.02)
+    parser.add_argument("--slow-every", type=int, default=25)
+    parser.add_argument("--slow-latency", type=float, default=0.5)
+    parser.add_argument("--requests", type=int, default=300)
+    parser.add_argument("--disconnect-after", type=float, default=0.1)
+    args = parser.parse_args()
+
+    print(f"hedging: {args.calls} calls, {args.latency * 1000:.0f} ms typical, "
+          f"1 in {args.slow_every} takes {args.slow_latency * 1000:.0f} ms")
+    print(f"{'mode':>8} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'max ms':>8} {'upstream':>9}")
+    direct = SlowFake(args.latency, args.slow_every, args.slow_latency)
+    latencies = run_calls(direct, args.calls)
+    print(f"{'direct':>8} " + " ".join(f"{v:>8.1f}" for v in percentiles(latencies)) + f" {direct.calls:>9}")
+
+    hedged = SlowFake(args.latency, args.slow_every, args.slow_latency)
+    hedger = Hedger(min_samples=20, max_ratio=0.1, name="bench")
+    try:
+        latencies = run_calls(lambda n: hedger.call(hedged, n), args.calls)
+    finally:
+        hedger.close()
+    print(f"{'hedged':>8} " + " ".join(f"{v:>8.1f}" for v in percentiles(latencies)) + f" {hedged.calls:>9}")
+
+    fake = SlowFake(args.latency, args.slow_every, args.slow_latency)
+    reached = asyncio.run(abandon_requests(args.requests, args.disconnect_after, fake))
+    print(f"\ncancellation: {args.requests} fetches queued on 4 threads, clients gone after "
+          f"{args.disconnect_after * 1000:.0f} ms")
+    print(f"{reached} reached the provider, {args.requests - reached} cancelled while queued")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,102 @@
+"""
+Overhead benchmark: synchronous f-string logging vs. the queued, sampled JSON pipeline.
+
+Simulates the /ticker-return logging of --requests requests, of which --hit-ratio
+are cache hits (one log line) and the rest misses (two lines). The old setup is
+basicConfig-style: f-strings and a StreamHandler writing in the caller's thread.
+The new one gates cache-hit lines with a Sampler and passes lazy %-style calls
+through LazyQueueHandler, with JSON rendered on a listener thread. Both write to a temporary file.
+
+Reported: time spent on the request thread per request, and total time until
+every record has been written (including the listener draining its queue).
+
+Run from the backend directory:
+    python -m benchmarks.bench_logging --requests 200000
+"""
+import argparse
+import logging
+import logging.handlers
+import os
+import queue
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from services.log_pipeline import JsonFormatter, LazyQueueHandler, Sampler
+
+
+def isolated_logger(name, handler):
+    logger = logging.getLogger(name)
+    logger.handlers[:] = [handler]
+    logger.setLevel(logging.INFO)
+    logger.propagate = False
+    return logger
+
+
+def before(logger, requests, hit_every):
+    for n in range(requests):
+        ticker, date = "AAPL", f"2024-01-{n % 28 + 1:02d}"
+        if n % hit_every:
+            logger.info(f"Cache hit for {ticker}:{date}")
+        else:
+            logger.info(f"Cache miss for {ticker}:{date}, fetching data...")
+            logger.info(f"Fetching {ticker} for {date}")
+
+
+def after(logger, requests, hit_every, sampled):
+    for n in range(requests):
+        ticker, date = "AAPL", f"2024-01-{n % 28 + 1:02d}"
+        if n % hit_every:
+            if sampled("cache_hit"):
+                logger.info("Cache hit for %s:%s", ticker, date, extra={"ticker": ticker, "date": date})
+        else:
+            if sampled("cache_miss"):
+                logger.info("Cache miss for %s:%s, fetching data...", ticker, date,
+                            extra={"ticker": ticker, "date": date})
+            if sampled("fetch"):
+                logger.info("Fetching %s for %s", ticker, date, extra={"ticker": ticker, "date": date})
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=200000)
+    parser.add_argument("--hit-ratio", type=float, default=0.9)
+    parser.add_argument("--sample-rate", type=float, default=0.01, help="share of cache-hit lines kept")
+    args = parser.parse_args()
+    hit_every = max(2, round(1 / (1 - args.hit_ratio)))
+
+    with tempfile.TemporaryDirectory() as tmp:
+        with open(os.path.join(tmp, "before.log"), "w") as out:
+            handler = logging.StreamHandler(out)
+            handler.setFormatter(logging.Formatter("%(levelname)s:%(name)s:%(message)s"))
+            logger = isolated_logger("bench.before", handler)
+            started = time.perf_counter()
+            before(logger, args.requests, hit_every)
+            handler.flush()
+            caller = total = time.perf_counter() - started
+            lines = out.tell()
+        print(f"{'setup':>18} {'caller us/req':>14} {'total s':>9} {'bytes':>12}")
+        print(f"{'sync f-string':>18} {caller / args.requests * 1e6:>14.2f} {total:>9.2f} {lines:>12}")
+
+        for label, rate in (("queue, no sampling", 1.0), (f"queue, hits {args.sample_rate:g}", args.sample_rate)):
+            with open(os.path.join(tmp, "after.log"), "w") as out:
+                stream = logging.StreamHandler(out)
+                stream.setFormatter(JsonFormatter())
+                records = queue.SimpleQueue()
+                queue_handler = LazyQueueHandler(records, max_size=args.requests * 3)
+                logger = isolated_logger(f"bench.after.{rate}", queue_handler)
+                listener = logging.handlers.QueueListener(records, stream)
+                listener.start()
+                started = time.perf_counter()
+                after(logger, args.requests, hit_every, Sampler({"cache_hit": rate}))
+                caller = time.perf_counter() - started
+                listener.stop()
+                total = time.perf_counter() - started
+                written = out.tell()
+            print(f"{label:>18} {caller / args.requests * 1e6:>14.2f} {total:>9.2f} {written:>12}")
+
+
+if __name__ == "__main__":
+    main()
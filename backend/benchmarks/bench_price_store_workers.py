@@ -0,0 +1,98 @@
+"""
+Memory benchmark: per-worker cost of reading the shared price store.
+
+Builds a store with --tickers x --years of daily closes, then starts 1, 2, 4 and 8
+reader processes that touch every series through the mmap views. Private memory
+(USS) per worker should stay flat because the closes live in the shared page cache.
+
+Run from the backend directory (Linux only, reads /proc/<pid>/smaps_rollup):
+    python -m benchmarks.bench_price_store_workers --tickers 200 --years 10
+"""
+import argparse
+import multiprocessing
+import os
+import sys
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from services.price_store import SharedPriceStore
+
+
+def smaps_rollup():
+    values = {}
+    with open("/proc/self/smaps_rollup") as f:
+        for line in f:
+            parts = line.split()
+            if len(parts) >= 2 and parts[0].endswith(":") and parts[1].isdigit():
+                values[parts[0][:-1]] = int(parts[1])
+    return values
+
+
+def reader(path, tickers, ready, done, results):
+    before = smaps_rollup()
+    store = SharedPriceStore(path, writer=False)
+    total = 0.0
+    for ticker in tickers:
+        _, closes, flags = store.series(ticker)
+        total += float(closes[flags == 1].sum())
+    after = smaps_rollup()
+    results.put({
+        "private_kib": (after["Private_Clean"] + after["Private_Dirty"])
+        - (before["Private_Clean"] + before["Private_Dirty"]),
+        "shared_kib": after["Shared_Clean"] - before["Shared_Clean"],
+        "pss_kib": after["Pss"] - before["Pss"],
+    })
+    ready.set()
+    done.wait()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--tickers", type=int, default=200)
+    parser.add_argument("--years", type=int, default=10)
+    args = parser.parse_args()
+
+    tickers = [f"T{i:04d}" for i in range(args.tickers)]
+    days = pd.bdate_range("2015-01-01", periods=args.years * 252)
+    rng = np.random.default_rng(7)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "prices.bin")
+        writer = SharedPriceStore(path, max_tickers=len(tickers))
+        start = time.perf_counter()
+        labels = [d.strftime("%Y-%m-%d") for d in days]
+        for ticker in tickers:
+            closes = 100 * np.cumprod(1 + rng.normal(0, 0.02, len(days)))
+            writer.write_sessions(ticker, zip(labels, closes), labels[0], labels[-1])
+        elapsed = time.perf_counter() - start
+        print(f"store: {len(tickers)} tickers x {len(days)} sessions, "
+              f"{os.path.getsize(path) / 2**20:.1f} MiB, written in {elapsed:.2f}s")
+
+        ctx = multiprocessing.get_context("spawn")
+        print(f"{'workers':>8} {'private KiB/worker':>20} {'shared KiB/worker':>19} {'PSS KiB/worker':>16}")
+        for workers in (1, 2, 4, 8):
+            results, done = ctx.Queue(), ctx.Event()
+            procs = []
+            for _ in range(workers):
+                ready = ctx.Event()
+                proc = ctx.Process(target=reader, args=(path, tickers, ready, done, results))
+                proc.start()
+                procs.append((proc, ready))
+            for _, ready in procs:
+                ready.wait()
+            rows = [results.get() for _ in procs]
+            done.set()
+            for proc, _ in procs:
+                proc.join()
+            mean = {k: sum(r[k] for r in rows) / len(rows) for k in rows[0]}
+            print(f"{workers:>8} {mean['private_kib']:>20.0f} {mean['shared_kib']:>19.0f} {mean['pss_kib']:>16.0f}")
+        writer.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,88 @@
+"""
+Startup-time profile for the API process.
+
+Reports:
+  * import cost of `app` broken down by top-level package (python -X importtime)
+  * cost of the lazily loaded provider stack (yfinance + pandas)
+  * wall time from launching uvicorn to the first successful /health
+
+Run from the backend directory:
+    python -m benchmarks.bench_startup --top 15
+"""
+import argparse
+import os
+import socket
+import subprocess
+import sys
+import time
+import urllib.request
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def import_profile(statement):
+    """Return (total_us, {top_level_package: self_us}) for a python -c statement"""
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", statement],
+        cwd=BACKEND_DIR, capture_output=True, text=True, check=True,
+    )
+    packages = {}
+    for line in proc.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        self_us, _, name = [part.strip() for part in line[len("import time:"):].split("|")]
+        root = name.split(".")[0]
+        packages[root] = packages.get(root, 0) + int(self_us)
+    return sum(packages.values()), packages
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def time_to_health(env_overrides, timeout=60.0):
+    port = free_port()
+    env = dict(os.environ, **env_overrides)
+    start = time.perf_counter()
+    proc = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "app:app", "--port", str(port), "--log-level", "warning"],
+        cwd=BACKEND_DIR, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    try:
+        while time.perf_counter() - start < timeout:
+            try:
+                with urllib.request.urlopen(f"http://127.0.0.1:{port}/health", timeout=1) as response:
+                    if response.status == 200:
+                        return time.perf_counter() - start
+            except OSError:
+                time.sleep(0.01)
+        raise TimeoutError("server did not become healthy")
+    finally:
+        proc.terminate()
+        proc.wait()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--top", type=int, default=10)
+    args = parser.parse_args()
+
+    total, packages = import_profile("import app")
+    print(f"import app: {total / 1000:.1f} ms")
+    for name, us in sorted(packages.items(), key=lambda item: -item[1])[:args.top]:
+        print(f"  {name:<32} {us / 1000:8.1f} ms")
+    heavy = [name for name in ("yfinance", "pandas") if name in packages]
+    print(f"  heavy provider modules imported eagerly: {', '.join(heavy) or 'none'}")
+
+    provider_total, _ = import_profile("import app; app.load_provider()")
+    print(f"import app + load_provider(): {provider_total / 1000:.1f} ms "
+          f"(deferred: {(provider_total - total) / 1000:.1f} ms)")
+
+    for label, env in (("preload off", {"PRELOAD_PROVIDER": "0"}), ("preload on", {"PRELOAD_PROVIDER": "1"})):
+        print(f"uvicorn start -> first /health ({label}): {time_to_health(env) * 1000:.0f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,216 @@
+"""Process pool for CPU-bound analytics over return panels.
+
+Inputs and outputs travel through POSIX shared memory: the parent copies the
+panel into one segment and allocates another for the result, and each job only
+pickles the segment names plus the [lo, hi) slice of work it owns. Workers map
+both segments, compute their slice in place and return nothing, so a panel of
+thousands of tickers is never pickled.
+
+Kernels are module-level functions ``kernel(data, out, lo, hi, **params)`` that
+fill ``out`` for items lo..hi-1. Small inputs run inline, because process
+dispatch costs more than it saves on them.
+"""
+import asyncio
+import logging
+import multiprocessing
+import os
+import threading
+from concurrent.futures import Future, ProcessPoolExecutor, wait
+from multiprocessing import shared_memory
+from typing import Any, Callable, List, Optional, Tuple
+
+import numpy as np
+
+from .metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+# Panels with fewer elements than this are computed in the calling thread
+INLINE_ELEMENTS = 200_000
+
+_Descriptor = Tuple[str, Tuple[int, ...], str]
+
+
+class SharedArray:
+    """A NumPy array in a shared-memory segment owned by this process"""
+
+    def __init__(self, shape: Tuple[int, ...], dtype: Any = np.float64):
+        dtype = np.dtype(dtype)
+        size = max(int(np.prod(shape)) * dtype.itemsize, 1)
+        self._shm = shared_memory.SharedMemory(create=True, size=size)
+        self.array = np.ndarray(shape, dtype=dtype, buffer=self._shm.buf)
+
+    @classmethod
+    def copy_of(cls, array: np.ndarray) -> "SharedArray":
+        shared = cls(array.shape, array.dtype)
+        shared.array[...] = array
+        return shared
+
+    @property
+    def descriptor(self) -> _Descriptor:
+        return self._shm.name, self.array.shape, self.array.dtype.str
+
+    def close(self) -> None:
+        self.array = None
+        self._shm.close()
+        self._shm.unlink()
+
+
+def _run_chunk(kernel: Callable[..., None], data: _Descriptor, out: _Descriptor,
+               lo: int, hi: int, params: dict) -> None:
+    """Worker side: map both segments, fill out for [lo, hi), unmap"""
+    segments = [shared_memory.SharedMemory(name=name) for name, _, _ in (data, out)]
+    try:
+        data_view = np.ndarray(data[1], dtype=np.dtype(data[2]), buffer=segments[0].buf)
+        out_view = np.ndarray(out[1], dtype=np.dtype(out[2]), buffer=segments[1].buf)
+        kernel(data_view, out_view, lo, hi, **params)
+        del data_view, out_view
+    finally:
+        for segment in segments:
+            segment.close()
+
+
+def chunk_bounds(n_items: int, chunks: int) -> List[Tuple[int, int]]:
+    """Split range(n_items) into at most `chunks` contiguous, near-equal slices"""
+    chunks = max(1, min(chunks, n_items))
+    edges = np.linspace(0, n_items, chunks + 1).astype(int)
+    return [(int(lo), int(hi)) for lo, hi in zip(edges[:-1], edges[1:]) if hi > lo]
+
+
+class AnalyticsPool:
+    """Runs chunked kernels in worker processes; max_workers=0 runs everything inline"""
+
+    def __init__(self, max_workers: Optional[int] = None, inline_elements: int = INLINE_ELEMENTS):
+        self.max_workers = min(4, os.cpu_count() or 1) if max_workers is None else max_workers
+        self.inline_elements = inline_elements
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._lock = threading.Lock()
+
+    def _pool(self) -> ProcessPoolExecutor:
+        # Created on first use; spawn avoids forking a process that is running threads
+        with self._lock:
+            if self._executor is None:
+                self._executor = ProcessPoolExecutor(
+                    max_workers=self.max_workers, mp_context=multiprocessing.get_context("spawn"),
+                )
+                logger.info("Started analytics pool with %d workers", self.max_workers)
+            return self._executor
+
+    def _inline(self, data: np.ndarray) -> bool:
+        return self.max_workers <= 0 or data.size < self.inline_elements
+
+    def _submit(self, kernel: Callable[..., None], data: np.ndarray, out_shape: Tuple[int, ...],
+                n_items: int, params: dict) -> Tuple[List[Future], SharedArray, SharedArray]:
+        shared_in = SharedArray.copy_of(np.ascontiguousarray(data))
+        try:
+            shared_out = SharedArray(out_shape)
+        except Exception:
+            shared_in.close()
+            raise
+        pool = self._pool()
+        futures = [
+            pool.submit(_run_chunk, kernel, shared_in.descriptor, shared_out.descriptor, lo, hi, params)
+            for lo, hi in chunk_bounds(n_items, self.max_workers)
+        ]
+        metrics.inc("analytics_jobs_total", mode="pool")
+        metrics.inc("analytics_chunks_total", len(futures))
+        return futures, shared_in, shared_out
+
+    @staticmethod
+    def _collect(shared_in: SharedArray, shared_out: SharedArray) -> np.ndarray:
+        result = shared_out.array.copy()
+        shared_in.close()
+        shared_out.close()
+        return result
+
+    def map_chunks(self, kernel: Callable[..., None], data: np.ndarray, out_shape: Tuple[int, ...],
+                   n_items: int, **params: Any) -> np.ndarray:
+        """Blocking: fill a float64 array of out_shape by running kernel over n_items in chunks"""
+        if self._inline(data):
+            metrics.inc("analytics_jobs_total", mode="inline")
+            out = np.empty(out_shape, dtype=np.float64)
+            kernel(data, out, 0, n_items, **params)
+            return out
+        futures, shared_in, shared_out = self._submit(kernel, data, out_shape, n_items, params)
+        try:
+            for future in futures:
+                future.result()
+        except BaseException:
+            for future in futures:
+                future.cancel()
+            # Segments are released once the chunks already running have finished
+            wait([future for future in futures if not future.cancelled()])
+            shared_in.close()
+            shared_out.close()
+            raise
+        return self._collect(shared_in, shared_out)
+
+    async def map_chunks_async(self, kernel: Callable[..., None], data: np.ndarray, out_shape: Tuple[int, ...],
+                               n_items: int, **params: Any) -> np.ndarray:
+        """As map_chunks, awaiting the workers without holding an I/O executor thread"""
+        loop = asyncio.get_running_loop()
+        if self._inline(data):
+            # Small inputs still stay off the event loop
+            return await loop.run_in_executor(None, lambda: self.map_chunks(kernel, data, out_shape, n_items, **params))
+        futures, shared_in, shared_out = self._submit(kernel, data, out_shape, n_items, params)
+        try:
+            await asyncio.gather(*(asyncio.wrap_future(future) for future in futures))
+        except BaseException:
+            for future in futures:
+                future.cancel()
+            # Segments are released once the chunks already running have finished
+            await asyncio.gather(*(asyncio.wrap_future(f) for f in futures if not f.cancelled()),
+                                 return_exceptions=True)
+            shared_in.close()
+            shared_out.close()
+            raise
+        return self._collect(shared_in, shared_out)
+
+    def close(self) -> None:
+        with self._lock:
+            if self._executor is not None:
+                self._executor.shutdown(wait=True, cancel_futures=True)
+                self._executor = None
+
+
+# Kernels: module-level so spawned workers can import them by reference
+
+def correlation_kernel(returns: np.ndarray, out: np.ndarray, lo: int, hi: int) -> None:
+    """Rows lo..hi-1 of the Pearson correlation matrix of the columns of a (sessions, tickers) panel"""
+    if returns.shape[0] < 2:
+        out[lo:hi] = np.nan
+        return
+    centered = returns - returns.mean(axis=0)
+    norms = np.sqrt((centered * centered).sum(axis=0))
+    norms[norms == 0] = np.nan
+    out[lo:hi] = (centered[:, lo:hi].T @ centered) / np.outer(norms[lo:hi], norms)
+
+
+def rolling_stats_kernel(returns: np.ndarray, out: np.ndarray, lo: int, hi: int, window: int) -> None:
+    """Rolling mean and sample std over `window` sessions for columns lo..hi-1.
+
+    out has shape (2, sessions, tickers); rows before the first full window are NaN.
+    """
+    block = returns[:, lo:hi]
+    sessions = block.shape[0]
+    out[:, :, lo:hi] = np.nan
+    if window < 2 or sessions < window:
+        return
+    zero = np.zeros((1, block.shape[1]))
+    sums = np.concatenate([zero, np.cumsum(block, axis=0)])
+    squares = np.concatenate([zero, np.cumsum(block * block, axis=0)])
+    window_sum = sums[window:] - sums[:-window]
+    window_sq = squares[window:] - squares[:-window]
+    mean = window_sum / window
+    variance = np.maximum((window_sq - window_sum * mean) / (window - 1), 0.0)
+    out[0, window - 1:, lo:hi] = mean
+    out[1, window - 1:, lo:hi] = np.sqrt(variance)
+
+
+def correlation_matrix(pool: AnalyticsPool, returns: np.ndarray) -> np.ndarray:
+    n = returns.shape[1]
+    return pool.map_chunks(correlation_kernel, returns, (n, n), n)
+
+
+def rolling_stats(pool: AnalyticsPool, returns: np.ndarray, window: int) -> np.ndarray:
+    return pool.map_chunks(rolling_stats_kernel, returns, (2,) + returns.shape, returns.shape[1], window=window)
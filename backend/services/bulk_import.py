@@ -0,0 +1,138 @@
+"""Bulk-load daily history from local CSV/Parquet files.
+
+    python -m services.bulk_import data/ AAPL.csv closes.parquet [--store PATH] [--snapshot PATH]
+
+Files are parsed and validated by services.file_data, written to the shared price
+store in one vectorised call per ticker, and optionally merged into the cache
+snapshot the server restores at startup. Run it while the server is stopped:
+the price store accepts a single writer.
+"""
+import argparse
+import logging
+import os
+import sys
+import time
+from typing import Any, Dict, Iterator, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from .cache_snapshot import load_snapshot, write_snapshot
+from .file_data import TickerSeries, expand_paths, load_files
+from .price_store import SharedPriceStore
+
+logger = logging.getLogger(__name__)
+
+
+class SnapshotEntries:
+    """Just enough of the cache interface for reading and writing snapshots"""
+
+    def __init__(self):
+        self._entries: Dict[Tuple[str, str], Tuple[Any, float]] = {}
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def restore_entry(self, ticker: str, date: str, data: Any, age: float) -> bool:
+        self._entries[(ticker, date)] = (data, age)
+        return True
+
+    def export_entries(self) -> Iterator[Tuple[str, str, Any, float]]:
+        for (ticker, date), (data, age) in self._entries.items():
+            yield ticker, date, data, age
+
+
+def return_payloads(series: TickerSeries) -> List[Dict[str, Any]]:
+    """/ticker-return payloads for every session after the first"""
+    closes = series.closes
+    returns = np.round(np.diff(closes) / closes[:-1], 6)
+    dates = series.days[1:].astype(str)
+    prices = np.round(closes[1:], 2)
+    previous = np.round(closes[:-1], 2)
+    return [
+        {"ticker": series.ticker, "date": day, "return": float(r), "price": float(p), "previous_price": float(pp)}
+        for day, r, p, pp in zip(dates, returns, prices, previous)
+    ]
+
+
+def write_store(path: str, loaded: Sequence[TickerSeries]) -> int:
+    store = SharedPriceStore(path, writer=True)
+    try:
+        stored = 0
+        for series in loaded:
+            if len(series.days) == 0:
+                continue
+            covered_end = str(series.days[-1] + np.timedelta64(1, "D"))
+            stored += store.write_arrays(series.ticker, series.days, series.closes, str(series.days[0]), covered_end)
+        return stored
+    finally:
+        store.close()
+
+
+def write_cache_snapshot(path: str, loaded: Sequence[TickerSeries]) -> int:
+    """Merge imported returns into the snapshot at path (imported sessions win); returns entries added"""
+    entries = SnapshotEntries()
+    if os.path.exists(path):
+        load_snapshot(entries, path)
+    added = 0
+    for series in loaded:
+        for payload in return_payloads(series):
+            entries.restore_entry(series.ticker, payload["date"], payload, 0.0)
+            added += 1
+    write_snapshot(entries, path)
+    return added
+
+
+def _rate(rows: int, seconds: float) -> str:
+    return f"{rows / seconds:,.0f} rows/s" if seconds > 0 else "n/a rows/s"
+
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    parser = argparse.ArgumentParser(prog="python -m services.bulk_import", description=__doc__.splitlines()[0])
+    parser.add_argument("paths", nargs="+", help="CSV/Parquet files, or directories containing them")
+    parser.add_argument("--store", default=os.getenv("PRICE_STORE_PATH"),
+                        help="Price store file (default: $PRICE_STORE_PATH)")
+    parser.add_argument("--snapshot", default=None,
+                        help="Also merge the returns into this cache snapshot (e.g. $CACHE_SNAPSHOT_PATH)")
+    args = parser.parse_args(argv)
+
+    if not args.store and not args.snapshot:
+        parser.error("nothing to load into: set PRICE_STORE_PATH or pass --store and/or --snapshot")
+    files = expand_paths(args.paths)
+    if not files:
+        parser.error("no CSV/Parquet files found")
+
+    started = time.perf_counter()
+    try:
+        loaded = load_files(files)
+    except (OSError, ValueError, RuntimeError) as e:
+        print(f"error: {e}", file=sys.stderr)
+        return 1
+    parse_seconds = time.perf_counter() - started
+    rows = sum(series.rows for series in loaded)
+    sessions = sum(len(series.days) for series in loaded)
+    print(f"Parsed {rows:,} rows from {len(files)} file(s) in {parse_seconds:.2f}s ({_rate(rows, parse_seconds)})")
+    for series in sorted(loaded, key=lambda s: s.ticker):
+        span = f"{series.days[0]}..{series.days[-1]}" if len(series.days) else "-"
+        print(f"  {series.ticker:<8} {len(series.days):>7,} sessions {span}  "
+              f"invalid={series.invalid} duplicates={series.duplicates} non_sessions={series.non_sessions}")
+
+    if args.store:
+        started = time.perf_counter()
+        try:
+            stored = write_store(args.store, loaded)
+        except RuntimeError as e:
+            print(f"error: {e} (stop the server before importing)", file=sys.stderr)
+            return 1
+        seconds = time.perf_counter() - started
+        print(f"Stored {stored:,} sessions in {args.store} in {seconds:.2f}s ({_rate(sessions, seconds)})")
+
+    if args.snapshot:
+        started = time.perf_counter()
+        added = write_cache_snapshot(args.snapshot, loaded)
+        seconds = time.perf_counter() - started
+        print(f"Merged {added:,} returns into {args.snapshot} in {seconds:.2f}s ({_rate(added, seconds)})")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
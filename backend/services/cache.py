@@ -1,24 +1,202 @@
-from cachetools import TTLCache
-from typing import Any, Optional
+import os
+import threading
+import time
+from typing import Any, Callable, Dict, Iterable, Iterator, List, NamedTuple, Optional, Set, Tuple
+
+import numpy as np
+
+from .result_cache import MeteredTTLCache, payload_size
+
+
+class _Entry(NamedTuple):
+    data: Any
+    stored_at: float  # wall clock, so ages survive a restart via snapshots
+
+
+# Key string, entry tuple and timestamp on top of the payload
+_ENTRY_OVERHEAD = 160
+
+
+def _entry_size(entry: _Entry) -> int:
+    return payload_size(entry.data) + _ENTRY_OVERHEAD
+
+
+def in_range(date: str, start: Optional[str], end: Optional[str]) -> bool:
+    """Whether a YYYY-MM-DD date lies in [start, end]; a None bound is open"""
+    return (start is None or date >= start) and (end is None or date <= end)
+
+
+def is_session(date: str, data: Any) -> bool:
+    """Whether a cached return is for a trading session: a business day without an error (holidays have one)"""
+    return bool(np.is_busday(np.datetime64(date, "D"))) and not (isinstance(data, dict) and "error" in data)
 
 
 class InMemoryCache:
-    def __init__(self, ttl_seconds: int = 3600, maxsize: int = 1000):
-        self._cache = TTLCache(maxsize=maxsize, ttl=ttl_seconds)  # eviction strategy: LRU + TTL
-    
+    def __init__(self, ttl_seconds: int = 3600, maxsize: int = 1000, stale_seconds: int = 0,
+                 timer: Callable[[], float] = time.monotonic, max_bytes: Optional[int] = None):
+        """Bounded by maxsize entries, or by max_bytes of (approximate) payload size when given"""
+        self.ttl = ttl_seconds
+        self.stale_seconds = stale_seconds
+        self.max_bytes = max_bytes
+        self._timer = timer
+        self._skew = 0.0  # backdates restored entries so they keep their remaining TTL
+        self._lock = threading.RLock()
+        capacity, getsizeof = (max_bytes, _entry_size) if max_bytes else (maxsize, None)
+        # eviction strategy: LRU + TTL
+        self._cache = MeteredTTLCache("returns", maxsize=capacity, ttl=ttl_seconds, timer=self._clock,
+                                      getsizeof=getsizeof)
+        # Entries outlive their TTL here by stale_seconds so they can be served while revalidating
+        self._stale = (MeteredTTLCache("returns_stale", maxsize=capacity, ttl=ttl_seconds + stale_seconds,
+                                       timer=self._clock, getsizeof=getsizeof)
+                       if stale_seconds > 0 else None)
+        # ticker -> dates, so invalidation touches only that ticker's keys. Evictions do
+        # not report back, so dead dates linger until the index is rebuilt from live keys.
+        self._by_ticker: Dict[str, Set[str]] = {}
+        self._indexed = 0
+
+    def _clock(self) -> float:
+        return self._timer() + self._skew
+
     def _generate_key(self, ticker: str, date: str) -> str:
         return f"ticker:{ticker}:{date}"
-    
+
     def get(self, ticker: str, date: str) -> Optional[Any]:
         key = self._generate_key(ticker, date)
-        return self._cache.get(key)
-    
+        with self._lock:
+            entry = self._cache.get(key)
+        return entry.data if entry is not None else None
+
+    def get_stale(self, ticker: str, date: str) -> Optional[Any]:
+        """Value whose TTL has passed but which is still within the stale grace period"""
+        if self._stale is None:
+            return None
+        key = self._generate_key(ticker, date)
+        with self._lock:
+            if key in self._cache:
+                return None
+            entry = self._stale.get(key)
+        return entry.data if entry is not None else None
+
+    def _index(self, ticker: str, date: str) -> None:
+        dates = self._by_ticker.setdefault(ticker, set())
+        if date not in dates:
+            dates.add(date)
+            self._indexed += 1
+            source = self._stale if self._stale is not None else self._cache
+            if self._indexed > 2 * len(source) + 64:
+                self._rebuild_index()
+
+    def _rebuild_index(self) -> None:
+        self._by_ticker = {}
+        self._indexed = 0
+        for key in (self._stale if self._stale is not None else self._cache).keys():
+            ticker, date = key[len("ticker:"):].rsplit(":", 1)
+            self._by_ticker.setdefault(ticker, set()).add(date)
+            self._indexed += 1
+
     def set(self, ticker: str, date: str, data: Any) -> None:
         key = self._generate_key(ticker, date)
-        self._cache[key] = data
-    
+        entry = _Entry(data, time.time())
+        with self._lock:
+            self._cache[key] = entry
+            if self._stale is not None:
+                self._stale[key] = entry
+            self._index(ticker, date)
+
+    def invalidate(self, tickers: Optional[Iterable[str]] = None,
+                   start: Optional[str] = None, end: Optional[str] = None) -> int:
+        """Drop live and stale entries for the tickers (all when None) dated within [start, end]
+
+        Each ticker's first cached session after end goes too, its return being taken from end's
+        close, along with any weekend or holiday entries cached before it.
+        """
+        removed = 0
+        with self._lock:
+            for ticker in list(self._by_ticker) if tickers is None else tickers:
+                dates = self._by_ticker.get(ticker)
+                if not dates:
+                    continue
+                selected = [d for d in dates if in_range(d, start, end)]
+                if end is not None:
+                    selected += self._through_next_session(ticker, sorted(d for d in dates if d > end))
+                for date in selected:
+                    key = self._generate_key(ticker, date)
+                    live = self._cache.pop(key, None)
+                    stale = self._stale.pop(key, None) if self._stale is not None else None
+                    if live is not None or stale is not None:
+                        removed += 1
+                    dates.discard(date)
+                    self._indexed -= 1
+                if not dates:
+                    del self._by_ticker[ticker]
+        return removed
+
+    def _through_next_session(self, ticker: str, later: List[str]) -> List[str]:
+        """The prefix of the ascending dates later ending at the first cached trading session"""
+        source = self._stale if self._stale is not None else self._cache
+        for i, date in enumerate(later):
+            entry = source.get(self._generate_key(ticker, date))
+            if entry is not None and is_session(date, entry.data):
+                return later[:i + 1]
+        return []
+
+    def memory_usage(self) -> int:
+        """Bytes charged against max_bytes (entry count when bounded by maxsize)"""
+        with self._lock:
+            source = self._stale if self._stale is not None else self._cache
+            return int(source.currsize)
+
     def clear(self) -> None:
-        self._cache.clear()
+        with self._lock:
+            self._cache.clear()
+            if self._stale is not None:
+                self._stale.clear()
+            self._by_ticker.clear()
+            self._indexed = 0
+
+    def export_entries(self) -> Iterator[Tuple[str, str, Any, float]]:
+        """(ticker, date, data, age_seconds) for every live or stale entry"""
+        with self._lock:
+            source = self._stale if self._stale is not None else self._cache
+            source.expire()
+            items = list(source.items())
+        now = time.time()
+        for key, entry in items:
+            age = now - entry.stored_at
+            if age >= self.ttl + self.stale_seconds:
+                continue
+            ticker, date = key[len("ticker:"):].rsplit(":", 1)
+            yield ticker, date, entry.data, age
+
+    def restore_entry(self, ticker: str, date: str, data: Any, age: float) -> bool:
+        """Re-insert a snapshotted entry with its remaining TTL; never overrides newer data"""
+        if age >= self.ttl + self.stale_seconds:
+            return False
+        key = self._generate_key(ticker, date)
+        entry = _Entry(data, time.time() - age)
+        with self._lock:
+            if key in self._cache or (self._stale is not None and key in self._stale):
+                return False
+            self._skew = -max(age, 0.0)
+            try:
+                if age < self.ttl:
+                    self._cache[key] = entry
+                if self._stale is not None:
+                    self._stale[key] = entry
+                self._index(ticker, date)
+            finally:
+                self._skew = 0.0
+        return True
+
+
+def create_cache():
+    """Build the process-wide return cache; CACHE_BACKEND=compact selects the array-backed store"""
+    stale_seconds = int(os.getenv("CACHE_STALE_SECONDS", "86400"))
+    max_bytes = int(os.getenv("CACHE_MAX_BYTES", str(32 * 1024 * 1024)))
+    if os.getenv("CACHE_BACKEND", "dict") == "compact":
+        from .compact_store import CompactReturnCache
+        return CompactReturnCache(stale_seconds=stale_seconds, max_bytes=max_bytes)
+    return InMemoryCache(stale_seconds=stale_seconds, max_bytes=max_bytes)
 
 
-cache_instance = InMemoryCache()
\ No newline at end of file
+cache_instance = create_cache()
@@ -0,0 +1,73 @@
+"""Persist the return cache across restarts.
+
+A snapshot is a gzip'd JSON-lines file: a header line followed by one
+``[ticker, date, stored_at, data]`` row per entry, where ``stored_at`` is wall
+clock so the remaining TTL survives the restart. Files are written to a temp
+path and renamed, so a crash mid-write never leaves a truncated snapshot.
+"""
+import gzip
+import json
+import logging
+import os
+import time
+from typing import Any
+
+from .metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+SNAPSHOT_VERSION = 1
+
+
+def write_snapshot(cache: Any, path: str) -> int:
+    """Write every live or stale entry of cache to path; returns the entry count"""
+    started = time.perf_counter()
+    now = time.time()
+    tmp_path = f"{path}.tmp"
+    count = 0
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    with gzip.open(tmp_path, "wt", encoding="utf-8", compresslevel=3) as f:
+        f.write(json.dumps({"version": SNAPSHOT_VERSION, "written_at": now}) + "\n")
+        for ticker, date, data, age in cache.export_entries():
+            f.write(json.dumps([ticker, date, round(now - age, 3), data], separators=(",", ":"), default=float))
+            f.write("\n")
+            count += 1
+    os.replace(tmp_path, path)
+    metrics.inc("cache_snapshot_writes_total")
+    metrics.set_gauge("cache_snapshot_entries", count)
+    metrics.set_gauge("cache_snapshot_write_seconds", round(time.perf_counter() - started, 4))
+    logger.info("Wrote %d cache entries to %s", count, path)
+    return count
+
+
+def load_snapshot(cache: Any, path: str) -> int:
+    """Restore entries from path that have not yet passed TTL + grace; returns the count restored"""
+    started = time.perf_counter()
+    now = time.time()
+    restored = 0
+    with gzip.open(path, "rt", encoding="utf-8") as f:
+        header = json.loads(f.readline() or "{}")
+        if header.get("version") != SNAPSHOT_VERSION:
+            raise ValueError(f"Unsupported cache snapshot version: {header.get('version')}")
+        for line in f:
+            ticker, date, stored_at, data = json.loads(line)
+            if cache.restore_entry(ticker, date, data, now - stored_at):
+                restored += 1
+    metrics.set_gauge("cache_snapshot_restored_entries", restored)
+    metrics.set_gauge("cache_snapshot_load_seconds", round(time.perf_counter() - started, 4))
+    logger.info("Restored %d cache entries from %s", restored, path)
+    return restored
+
+
+def try_load_snapshot(cache: Any, path: str) -> int:
+    """load_snapshot that logs instead of raising, so a bad file never blocks startup"""
+    try:
+        return load_snapshot(cache, path)
+    except FileNotFoundError:
+        return 0
+    except Exception as e:
+        logger.warning("Ignoring unreadable cache snapshot %s: %s", path, e)
+        metrics.inc("cache_snapshot_load_errors_total")
+        return 0
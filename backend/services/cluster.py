@@ -0,0 +1,191 @@
+"""Optional cluster mode: consistent-hash ownership of tickers across backend nodes.
+
+With CLUSTER_NODES set (comma-separated base URLs of every node, this one
+included) and CLUSTER_SELF naming this node, each ticker belongs to exactly one
+node. A node answers cache hits for any ticker. A miss for a ticker owned
+elsewhere is forwarded to the owner, which fetches it (or answers from its own
+cache) and shares concurrent fetches as usual. Per-day returns and intraday bars
+are forwarded as requests. Range endpoints load closes through
+SeriesService.daily_closes, which asks the owner's /internal/closes for them.
+Each ticker-day is therefore fetched once cluster-wide, however many nodes are
+asked for it. Live quote polling (/ws/returns) stays per node.
+
+Ownership comes from a hash ring with virtual nodes, so adding or removing one
+node moves only about 1/N of the tickers. Forwarded requests carry the
+X-Cluster-Forwarded header and the shared CLUSTER_SECRET. Requests that carry
+both are always served locally, so nodes whose node lists briefly disagree
+cannot forward in a loop. /internal/closes answers only such requests. When the owner cannot be
+reached, the node fetches locally rather than failing the request.
+"""
+import asyncio
+import bisect
+import hashlib
+import hmac
+import logging
+import os
+import threading
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from .metrics import metrics
+from .resilience import UpstreamUnavailableError
+
+logger = logging.getLogger(__name__)
+
+FORWARDED_HEADER = "X-Cluster-Forwarded"
+SECRET_HEADER = "X-Cluster-Secret"
+VNODES = 160
+
+
+class ForwardError(Exception):
+    """The owner node could not be reached or gave no usable answer"""
+
+
+def _point(value: str) -> int:
+    return int.from_bytes(hashlib.md5(value.encode()).digest()[:8], "big")
+
+
+class HashRing:
+    def __init__(self, nodes: Sequence[str], vnodes: int = VNODES):
+        if not nodes:
+            raise ValueError("A hash ring needs at least one node")
+        self.nodes = list(dict.fromkeys(nodes))
+        points = sorted((_point(f"{node}#{i}"), node) for node in self.nodes for i in range(vnodes))
+        self._hashes = [point for point, _ in points]
+        self._owners = [node for _, node in points]
+
+    def owner(self, key: str) -> str:
+        """The node for key: the first virtual node clockwise of its hash"""
+        index = bisect.bisect(self._hashes, _point(key)) % len(self._hashes)
+        return self._owners[index]
+
+
+def _normalise(url: str) -> str:
+    return url.strip().rstrip("/")
+
+
+class Cluster:
+    def __init__(self, self_url: str, nodes: Sequence[str], secret: str, timeout: float = 30.0,
+                 vnodes: int = VNODES):
+        self.self_url = _normalise(self_url)
+        self.ring = HashRing([_normalise(node) for node in nodes], vnodes=vnodes)
+        if self.self_url not in self.ring.nodes:
+            raise ValueError(f"CLUSTER_SELF {self.self_url} is not one of CLUSTER_NODES")
+        if not secret:
+            raise ValueError("Cluster mode needs a shared CLUSTER_SECRET")
+        self._secret = secret
+        self._headers = {FORWARDED_HEADER: self.self_url, SECRET_HEADER: secret}
+        self.timeout = timeout
+        # One connection pool per event loop (the TestClient runs each client on its own),
+        # and one for worker threads
+        self._clients: Dict[asyncio.AbstractEventLoop, Any] = {}
+        self._sync_client: Any = None
+        self._lock = threading.Lock()
+
+    @property
+    def nodes(self) -> List[str]:
+        return self.ring.nodes
+
+    def owner(self, ticker: str) -> str:
+        return self.ring.owner(ticker.upper())
+
+    def is_owner(self, ticker: str) -> bool:
+        return self.owner(ticker) == self.self_url
+
+    def from_peer(self, headers: Any) -> bool:
+        """Whether a request was forwarded by another node: the forwarded header plus the shared secret"""
+        return FORWARDED_HEADER in headers and hmac.compare_digest(headers.get(SECRET_HEADER, ""), self._secret)
+
+    def _client(self):
+        import httpx
+
+        loop = asyncio.get_running_loop()
+        client = self._clients.get(loop)
+        if client is None:
+            client = httpx.AsyncClient(timeout=self.timeout, headers=self._headers)
+            self._clients[loop] = client
+        return client
+
+    async def _request(self, method: str, node: str, path: str, endpoint: str, **kwargs):
+        import httpx
+
+        try:
+            response = await self._client().request(method, node + path, **kwargs)
+        except httpx.HTTPError as e:
+            metrics.inc("cluster_forwards_total", endpoint=endpoint, outcome="unreachable")
+            raise ForwardError(f"{node}: {type(e).__name__}: {e}") from e
+        metrics.inc("cluster_forwards_total", endpoint=endpoint, outcome=str(response.status_code))
+        return response
+
+    async def get(self, node: str, path: str, params: Dict[str, str]) -> Tuple[int, bytes, Dict[str, str]]:
+        """The owner's answer to GET path as (status, body, relayed headers)"""
+        response = await self._request("GET", node, path, path.lstrip("/"), params=params)
+        headers = {name: response.headers[name] for name in ("content-type", "retry-after", "x-cache-status")
+                   if name in response.headers}
+        return response.status_code, response.content, headers
+
+    async def ticker_return(self, node: str, ticker: str, date: str) -> Tuple[int, bytes, Dict[str, str]]:
+        """The owner's /ticker-return answer as (status, body, relayed headers)"""
+        return await self.get(node, "/ticker-return", {"ticker": ticker, "date": date})
+
+    async def batch_returns(self, node: str, keys: List[Tuple[str, str]]) -> List[Dict]:
+        """The owner's /batch-returns results for keys, in order"""
+        response = await self._request("POST", node, "/batch-returns", "batch-returns",
+                                       json={"items": [{"ticker": ticker, "date": date} for ticker, date in keys]})
+        if response.status_code != 200:
+            raise ForwardError(f"{node}: HTTP {response.status_code}")
+        return response.json()["results"]
+
+    def closes(self, node: str, ticker: str, start: str, end: str) -> Tuple[np.ndarray, np.ndarray]:
+        """The owner's session dates and closes for [start, end]; blocking, for worker threads
+
+        The owner's 503 is raised as UpstreamUnavailableError, so callers answer as if they had fetched.
+        """
+        import httpx
+
+        with self._lock:
+            if self._sync_client is None:
+                self._sync_client = httpx.Client(timeout=self.timeout, headers=self._headers)
+            client = self._sync_client
+        try:
+            response = client.get(node + "/internal/closes", params={"ticker": ticker, "start_date": start,
+                                                                     "end_date": end})
+        except httpx.HTTPError as e:
+            metrics.inc("cluster_forwards_total", endpoint="closes", outcome="unreachable")
+            raise ForwardError(f"{node}: {type(e).__name__}: {e}") from e
+        metrics.inc("cluster_forwards_total", endpoint="closes", outcome=str(response.status_code))
+        if response.status_code == 503:
+            raise UpstreamUnavailableError(f"{node}: {response.json().get('detail')}",
+                                           retry_after=float(response.headers.get("retry-after", "1")))
+        if response.status_code != 200:
+            raise ForwardError(f"{node}: HTTP {response.status_code}")
+        body = response.json()
+        return np.array(body["dates"], dtype="datetime64[D]"), np.array(body["closes"], dtype=np.float64)
+
+    async def close(self) -> None:
+        loop = asyncio.get_running_loop()
+        client = self._clients.pop(loop, None)
+        if client is not None:
+            await client.aclose()
+        with self._lock:
+            sync_client, self._sync_client = self._sync_client, None
+        if sync_client is not None:
+            sync_client.close()
+
+    def describe(self) -> Dict:
+        return {"self": self.self_url, "nodes": self.nodes}
+
+
+def create_cluster() -> Optional[Cluster]:
+    """Cluster from $CLUSTER_NODES, $CLUSTER_SELF and $CLUSTER_SECRET, or None when cluster mode is off"""
+    nodes = [node for node in os.getenv("CLUSTER_NODES", "").split(",") if node.strip()]
+    if not nodes:
+        return None
+    self_url = os.getenv("CLUSTER_SELF")
+    if not self_url:
+        raise ValueError("CLUSTER_SELF must name this node when CLUSTER_NODES is set")
+    cluster = Cluster(self_url, nodes, os.getenv("CLUSTER_SECRET", ""),
+                      timeout=float(os.getenv("CLUSTER_TIMEOUT_SECONDS", "30")))
+    logger.info("Cluster mode: %s of %d nodes", cluster.self_url, len(cluster.nodes))
+    return cluster
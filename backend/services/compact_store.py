@@ -0,0 +1,384 @@
+"""Array-backed cache for per-ticker daily returns.
+
+Each ticker keeps its returns and closes in contiguous NumPy arrays indexed by
+session (business-day) ordinal, with a presence bitmap marking filled slots.
+Response dicts are only built on read.
+"""
+import math
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Iterable, Iterator, Optional, Tuple
+
+import numpy as np
+
+from .cache import in_range, is_session
+from .metrics import metrics
+from .result_cache import MeteredTTLCache
+
+SESSION_EPOCH = np.datetime64("1970-01-01", "D")
+
+# float32 keeps cent-rounded prices exact below 2**16; larger prices overflow to dicts
+MAX_FLOAT32_PRICE = 65536.0
+
+RETURN_FIELDS = ("ticker", "date", "return", "price", "previous_price")
+ERROR_FIELDS = ("ticker", "date", "return", "error")
+
+
+def session_ordinal(date: str) -> Optional[int]:
+    """Map a YYYY-MM-DD date to its business-day ordinal, or None for weekends"""
+    day = np.datetime64(date, "D")
+    if not np.is_busday(day):
+        return None
+    return int(np.busday_count(SESSION_EPOCH, day))
+
+
+def ordinal_bounds(start: Optional[str], end: Optional[str]) -> Tuple[Optional[int], Optional[int]]:
+    """Half-open ordinal range [lo, hi) of the sessions within [start, end]; None bounds are open"""
+    lo = int(np.busday_count(SESSION_EPOCH, np.busday_offset(start, 0, roll="forward"))) if start else None
+    hi = int(np.busday_count(SESSION_EPOCH, np.busday_offset(end, 0, roll="backward"))) + 1 if end else None
+    return lo, hi
+
+
+def ordinal_to_date(ordinal: int) -> str:
+    """Inverse of session_ordinal"""
+    return str(np.busday_offset(SESSION_EPOCH, ordinal, roll="forward"))
+
+
+class _TickerSeries:
+    """Dense arrays for one ticker covering ordinals [base, base + capacity)"""
+
+    __slots__ = ("base", "returns", "prices", "previous_prices", "expires", "present")
+
+    def __init__(self, base: int, capacity: int):
+        self.base = base
+        self.returns = np.full(capacity, np.nan, dtype=np.float64)
+        self.prices = np.full(capacity, np.nan, dtype=np.float32)
+        self.previous_prices = np.full(capacity, np.nan, dtype=np.float32)
+        self.expires = np.zeros(capacity, dtype=np.uint32)
+        self.present = np.zeros((capacity + 7) // 8, dtype=np.uint8)
+
+    @property
+    def capacity(self) -> int:
+        return self.returns.shape[0]
+
+    @property
+    def nbytes(self) -> int:
+        return (self.returns.nbytes + self.prices.nbytes + self.previous_prices.nbytes
+                + self.expires.nbytes + self.present.nbytes)
+
+    def ensure(self, ordinal: int) -> int:
+        """Grow the arrays (in either direction) so that ordinal fits; return its slot"""
+        if self.base <= ordinal < self.base + self.capacity:
+            return ordinal - self.base
+
+        lo = min(self.base, ordinal)
+        hi = max(self.base + self.capacity, ordinal + 1)
+        capacity = max(hi - lo, self.capacity * 2)
+        # Grow towards the side that overflowed so sequential appends stay amortised O(1)
+        base = lo if ordinal >= self.base else hi - capacity
+        grown = _TickerSeries(base, capacity)
+        shift = self.base - base
+        end = shift + self.capacity
+        grown.returns[shift:end] = self.returns
+        grown.prices[shift:end] = self.prices
+        grown.previous_prices[shift:end] = self.previous_prices
+        grown.expires[shift:end] = self.expires
+        old_bits = np.unpackbits(self.present, bitorder="little")[:self.capacity]
+        new_bits = np.zeros(capacity, dtype=np.uint8)
+        new_bits[shift:end] = old_bits
+        grown.present = np.packbits(new_bits, bitorder="little")
+
+        self.base = grown.base
+        self.returns = grown.returns
+        self.prices = grown.prices
+        self.previous_prices = grown.previous_prices
+        self.expires = grown.expires
+        self.present = grown.present
+        return ordinal - self.base
+
+    def has(self, slot: int) -> bool:
+        return bool(self.present[slot >> 3] & (1 << (slot & 7)))
+
+    def mark(self, slot: int, present: bool) -> None:
+        if present:
+            self.present[slot >> 3] |= np.uint8(1 << (slot & 7))
+        else:
+            self.present[slot >> 3] &= np.uint8(~(1 << (slot & 7)) & 0xFF)
+
+    def clear_range(self, lo: int, hi: int) -> int:
+        """Empty slots [lo, hi); returns how many were filled"""
+        lo, hi = max(lo, 0), min(hi, self.capacity)
+        if lo >= hi:
+            return 0
+        bits = np.unpackbits(self.present, bitorder="little")
+        removed = int(bits[lo:hi].sum())
+        bits[lo:hi] = 0
+        self.present[:] = np.packbits(bits, bitorder="little")
+        self.expires[lo:hi] = 0
+        return removed
+
+
+class CompactReturnCache:
+    """Drop-in alternative to InMemoryCache that stores return payloads in arrays"""
+
+    def __init__(self, ttl_seconds: int = 3600, max_tickers: int = 1000,
+                 initial_capacity: int = 64, overflow_maxsize: int = 1000, stale_seconds: int = 0,
+                 timer: Callable[[], float] = time.monotonic, max_bytes: Optional[int] = None):
+        self.ttl = ttl_seconds
+        self.stale_seconds = stale_seconds
+        self.max_tickers = max_tickers
+        # Optional budget for the column arrays; least recently used tickers are evicted past it
+        self.max_bytes = max_bytes
+        self._bytes = 0
+        self._initial_capacity = initial_capacity
+        self._series: "OrderedDict[str, _TickerSeries]" = OrderedDict()
+        self._errors: Dict[Tuple[str, int], str] = {}
+        # Weekend dates and payloads that do not fit the columnar layout
+        self._overflow = MeteredTTLCache("returns_overflow", maxsize=overflow_maxsize, ttl=ttl_seconds, timer=timer)
+        self._overflow_stale = (MeteredTTLCache("returns_overflow_stale", maxsize=overflow_maxsize,
+                                                ttl=ttl_seconds + stale_seconds, timer=timer)
+                                if stale_seconds > 0 else None)
+        self._timer = timer
+        # Start the relative clock past a full TTL + grace so restored entries can be
+        # backdated without underflowing the unsigned expiries
+        self._epoch = timer() - ttl_seconds - stale_seconds
+        self._lock = threading.Lock()
+
+    def _now(self) -> float:
+        return self._timer() - self._epoch
+
+    def _expiry(self, age: float = 0.0) -> int:
+        # Whole seconds rounded up; 0 marks an empty slot, so expiries are stored off by one
+        return max(1, math.ceil(self._now() - age + self.ttl) + 1)
+
+    @staticmethod
+    def _columnar(data: Any) -> Optional[str]:
+        """Classify a payload as 'return', 'error' or None (not storable in arrays)"""
+        if not isinstance(data, dict):
+            return None
+        keys = tuple(data.keys())
+        if keys == RETURN_FIELDS and isinstance(data["return"], float):
+            prices = (data["price"], data["previous_price"])
+            if all(isinstance(p, float) and abs(p) < MAX_FLOAT32_PRICE for p in prices):
+                return "return"
+        if keys == ERROR_FIELDS and data["return"] is None and isinstance(data["error"], str):
+            return "error"
+        return None
+
+    def get(self, ticker: str, date: str) -> Optional[Any]:
+        return self._lookup(ticker, date, stale=False)
+
+    def get_stale(self, ticker: str, date: str) -> Optional[Any]:
+        """Value whose TTL has passed but which is still within the stale grace period"""
+        if self.stale_seconds <= 0:
+            return None
+        return self._lookup(ticker, date, stale=True)
+
+    def _lookup(self, ticker: str, date: str, stale: bool) -> Optional[Any]:
+        try:
+            ordinal = session_ordinal(date)
+        except ValueError:
+            ordinal = None
+        with self._lock:
+            overflow = self._overflow.get((ticker, date))
+            if stale and overflow is None and self._overflow_stale is not None:
+                stale_overflow = self._overflow_stale.get((ticker, date))
+                if stale_overflow is not None or ordinal is None:
+                    return stale_overflow
+            if overflow is not None or ordinal is None:
+                return None if stale else overflow
+
+            series = self._series.get(ticker)
+            if series is None:
+                return None
+            slot = ordinal - series.base
+            if not 0 <= slot < series.capacity or not series.has(slot):
+                return None
+            age_past_ttl = self._now() - (int(series.expires[slot]) - 1)
+            if age_past_ttl >= self.stale_seconds:
+                series.mark(slot, False)
+                series.expires[slot] = 0
+                self._errors.pop((ticker, ordinal), None)
+                return None
+            if (age_past_ttl >= 0) != stale:
+                return None
+
+            self._series.move_to_end(ticker)
+            error = self._errors.get((ticker, ordinal))
+            if error is not None:
+                return {"ticker": ticker, "date": date, "return": None, "error": error}
+            return {
+                "ticker": ticker,
+                "date": date,
+                "return": round(float(series.returns[slot]), 6),
+                "price": round(float(series.prices[slot]), 2),
+                "previous_price": round(float(series.previous_prices[slot]), 2),
+            }
+
+    def set(self, ticker: str, date: str, data: Any) -> None:
+        self._store(ticker, date, data)
+
+    def _store(self, ticker: str, date: str, data: Any, age: float = 0.0, keep_existing: bool = False) -> bool:
+        try:
+            ordinal = session_ordinal(date)
+        except ValueError:
+            ordinal = None
+        kind = self._columnar(data)
+        with self._lock:
+            if ordinal is None or kind is None:
+                if keep_existing and (ticker, date) in self._overflow:
+                    return False
+                # TTLCache has no per-item expiry, so restored overflow entries only come back fresh
+                if age < self.ttl:
+                    self._overflow[(ticker, date)] = data
+                    if self._overflow_stale is not None:
+                        self._overflow_stale[(ticker, date)] = data
+                return True
+            self._overflow.pop((ticker, date), None)
+            if self._overflow_stale is not None:
+                self._overflow_stale.pop((ticker, date), None)
+
+            series = self._series.get(ticker)
+            if series is None:
+                if len(self._series) >= self.max_tickers:
+                    self._evict_ticker()
+                series = _TickerSeries(ordinal, self._initial_capacity)
+                self._series[ticker] = series
+                self._bytes += series.nbytes
+            self._series.move_to_end(ticker)
+
+            before = series.nbytes
+            slot = series.ensure(ordinal)
+            self._bytes += series.nbytes - before
+            while self.max_bytes is not None and self._bytes > self.max_bytes and len(self._series) > 1:
+                self._evict_ticker()
+            if (keep_existing and series.has(slot)
+                    and self._now() - (int(series.expires[slot]) - 1) < self.stale_seconds):
+                return False
+            if kind == "return":
+                series.returns[slot] = data["return"]
+                series.prices[slot] = data["price"]
+                series.previous_prices[slot] = data["previous_price"]
+                self._errors.pop((ticker, ordinal), None)
+            else:
+                series.returns[slot] = np.nan
+                series.prices[slot] = np.nan
+                series.previous_prices[slot] = np.nan
+                self._errors[(ticker, ordinal)] = data["error"]
+            series.expires[slot] = self._expiry(age)
+            series.mark(slot, True)
+            return True
+
+    def _evict_ticker(self) -> None:
+        """Drop the least recently used ticker's arrays (caller holds the lock)"""
+        evicted, series = self._series.popitem(last=False)
+        self._bytes -= series.nbytes
+        self._errors = {k: v for k, v in self._errors.items() if k[0] != evicted}
+        metrics.inc("cache_evictions_total", cache="returns", reason="size")
+
+    def export_entries(self) -> Iterator[Tuple[str, str, Any, float]]:
+        """(ticker, date, data, age_seconds) for every live or stale array slot.
+
+        Overflow entries (weekend dates, irregular payloads) are not exported.
+        """
+        rows = []
+        with self._lock:
+            now = self._now()
+            for ticker, series in self._series.items():
+                bits = np.unpackbits(series.present, bitorder="little")[:series.capacity]
+                for slot in np.flatnonzero(bits):
+                    stored = int(series.expires[slot]) - 1 - self.ttl
+                    if now - stored >= self.ttl + self.stale_seconds:
+                        continue
+                    ordinal = series.base + int(slot)
+                    error = self._errors.get((ticker, ordinal))
+                    rows.append((ticker, ordinal, error, float(series.returns[slot]), float(series.prices[slot]),
+                                 float(series.previous_prices[slot]), now - stored))
+        for ticker, ordinal, error, ret, price, previous_price, age in rows:
+            date = ordinal_to_date(ordinal)
+            if error is not None:
+                data = {"ticker": ticker, "date": date, "return": None, "error": error}
+            else:
+                data = {"ticker": ticker, "date": date, "return": round(ret, 6),
+                        "price": round(price, 2), "previous_price": round(previous_price, 2)}
+            yield ticker, date, data, age
+
+    def restore_entry(self, ticker: str, date: str, data: Any, age: float) -> bool:
+        """Re-insert a snapshotted entry with its remaining TTL; never overrides newer data"""
+        if age >= self.ttl + self.stale_seconds:
+            return False
+        return self._store(ticker, date, data, age=max(age, 0.0), keep_existing=True)
+
+    def invalidate(self, tickers: Optional[Iterable[str]] = None,
+                   start: Optional[str] = None, end: Optional[str] = None) -> int:
+        """Drop entries for the tickers (all when None) dated within [start, end]
+
+        Each ticker's first cached session after end goes too, its return being taken from end's
+        close, along with any weekend or holiday entries cached before it.
+        """
+        lo, hi = ordinal_bounds(start, end)
+        removed = 0
+        with self._lock:
+            selected = list(self._series) if tickers is None else list(tickers)
+            wanted = None if tickers is None else set(selected)
+            following = self._next_sessions(wanted, end, hi) if end is not None else {}
+            for ticker in selected:
+                series = self._series.get(ticker)
+                if series is None:
+                    continue
+                first = series.base if lo is None else lo
+                last = series.base + series.capacity if hi is None else hi
+                if ticker in following:
+                    last = max(last, ordinal_bounds(None, following[ticker])[1])
+                removed += series.clear_range(first - series.base, last - series.base)
+                self._errors = {k: v for k, v in self._errors.items()
+                                if not (k[0] == ticker and first <= k[1] < last)}
+            # The overflow caches are bounded small dicts keyed by (ticker, date)
+            for cache in (self._overflow, self._overflow_stale):
+                if cache is None:
+                    continue
+                for key in [k for k in list(cache.keys())
+                            if (wanted is None or k[0] in wanted)
+                            and (in_range(k[1], start, end)
+                                 or (k[0] in following and end < k[1] <= following[k[0]]))]:
+                    if cache.pop(key, None) is not None and cache is self._overflow:
+                        removed += 1
+        return removed
+
+    def _next_sessions(self, wanted: Optional[set], end: str, hi: int) -> Dict[str, str]:
+        """Each ticker's first cached trading session after end (caller holds the lock)"""
+        following: Dict[str, str] = {}
+        overflow = self._overflow_stale if self._overflow_stale is not None else self._overflow
+        for (ticker, date), data in list(overflow.items()):
+            if ((wanted is None or ticker in wanted) and date > end
+                    and date < following.get(ticker, "9999") and is_session(date, data)):
+                following[ticker] = date
+        for ticker in self._series if wanted is None else wanted:
+            series = self._series.get(ticker)
+            if series is None or hi - series.base >= series.capacity:
+                continue
+            offset = max(hi - series.base, 0)
+            bits = np.unpackbits(series.present, bitorder="little")[offset:series.capacity]
+            for slot in np.flatnonzero(bits) + offset:
+                ordinal = series.base + int(slot)
+                if (ticker, ordinal) not in self._errors:
+                    date = ordinal_to_date(ordinal)
+                    if date < following.get(ticker, "9999"):
+                        following[ticker] = date
+                    break
+        return following
+
+    def clear(self) -> None:
+        with self._lock:
+            self._series.clear()
+            self._bytes = 0
+            self._errors.clear()
+            self._overflow.clear()
+            if self._overflow_stale is not None:
+                self._overflow_stale.clear()
+
+    def memory_usage(self) -> int:
+        """Bytes held by the column arrays (excludes the overflow dict cache)"""
+        with self._lock:
+            return self._bytes
@@ -0,0 +1,74 @@
+"""Shape-preserving downsampling for chart series.
+
+Both methods return the indices of the points to keep (always including the
+first and last), so callers can take any number of aligned columns at once.
+"""
+import numpy as np
+
+METHODS = ("lttb", "minmax")
+
+
+def _bucket_edges(n: int, buckets: int) -> np.ndarray:
+    """Edges splitting the interior points 1 .. n-2 into evenly sized buckets"""
+    return np.linspace(1, n - 1, buckets + 1).astype(np.int64)
+
+
+def lttb_indices(y: np.ndarray, max_points: int) -> np.ndarray:
+    """Largest-Triangle-Three-Buckets over an evenly spaced x axis.
+
+    Each bucket keeps the point forming the largest triangle with the point kept
+    from the previous bucket and the mean of the next one. The choice depends on
+    the previous pick, so buckets are walked in order, but each bucket's areas
+    are computed in one vectorised step.
+    """
+    n = len(y)
+    if max_points >= n:
+        return np.arange(n)
+    y = np.asarray(y, dtype=np.float64)
+    x = np.arange(n, dtype=np.float64)
+    edges = _bucket_edges(n, max_points - 2)
+    sums = np.add.reduceat(y[1:n - 1], edges[:-1] - 1)
+    counts = np.diff(edges)
+    # Mean of each "next" bucket; the final bucket looks ahead to the last point
+    next_y = np.append((sums / counts)[1:], y[-1])
+    next_x = np.append(((edges[1:-1] + edges[2:] - 1) / 2.0), x[-1])
+
+    keep = np.empty(max_points, dtype=np.int64)
+    keep[0], keep[-1] = 0, n - 1
+    previous = 0
+    for b in range(max_points - 2):
+        lo, hi = edges[b], edges[b + 1]
+        xs, ys = x[lo:hi], y[lo:hi]
+        areas = np.abs((x[previous] - next_x[b]) * (ys - y[previous]) - (x[previous] - xs) * (next_y[b] - y[previous]))
+        previous = lo + int(np.argmax(areas))
+        keep[b + 1] = previous
+    return keep
+
+
+def minmax_indices(y: np.ndarray, max_points: int) -> np.ndarray:
+    """Keep the minimum and maximum of each bucket (fully vectorised)"""
+    n = len(y)
+    if max_points >= n:
+        return np.arange(n)
+    y = np.asarray(y, dtype=np.float64)
+    buckets = max(1, (max_points - 2) // 2)
+    edges = _bucket_edges(n, buckets)
+    interior = np.arange(1, n - 1)
+    bucket = np.searchsorted(edges, interior, side="right") - 1
+    # Sort by (bucket, value): the first entry of a bucket is its min, the last its max
+    order = np.lexsort((y[interior], bucket))
+    sorted_bucket = bucket[order]
+    starts = np.flatnonzero(np.r_[True, sorted_bucket[1:] != sorted_bucket[:-1]])
+    ends = np.r_[starts[1:], len(order)] - 1
+    picks = interior[np.concatenate([order[starts], order[ends]])]
+    return np.unique(np.concatenate([[0, n - 1], picks]))
+
+
+def downsample_indices(y: np.ndarray, max_points: int, method: str = "lttb") -> np.ndarray:
+    if max_points < 3:
+        raise ValueError("max_points must be at least 3")
+    if method == "lttb":
+        return lttb_indices(y, max_points)
+    if method == "minmax":
+        return minmax_indices(y, max_points)
+    raise ValueError(f"Unknown downsampling method: {method}")
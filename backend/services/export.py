@@ -0,0 +1,212 @@
+"""Streaming export of daily returns as CSV or Parquet.
+
+Exporter.open loads each ticker's closes once (from the price store when it
+covers the range, otherwise one range fetch). The resulting Export renders them
+in blocks of rows, yielded as soon as each block is ready. Memory holds the
+closes and one block, never the whole file. Parquet writes one row group per
+block and needs pyarrow.
+
+The ETag is a digest of the loaded closes, so it changes whenever the data
+does: after an invalidation, a price-store refresh or a revised upstream close.
+Output for the same data is byte-for-byte identical, which makes byte ranges
+resumable. A range is served by rendering from the start and dropping the bytes
+before it. The total size is computed once per ETag and kept in the
+query-result cache. The size, the validator and the body of a response all come
+from the same loaded closes.
+"""
+import hashlib
+import io
+from datetime import datetime, timedelta
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+
+import numpy as np
+
+from .metrics import metrics
+from .result_cache import ResultCache, query_key
+from .series import LOOKBACK_DAYS
+
+FORMATS = {"csv": "text/csv", "parquet": "application/vnd.apache.parquet"}
+COLUMNS = ("ticker", "date", "return", "price", "previous_price")
+
+
+def has_pyarrow() -> bool:
+    try:
+        import pyarrow  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+def _csv_block(ticker: str, days: List[str], returns: np.ndarray, prices: np.ndarray,
+               previous: np.ndarray) -> bytes:
+    return "".join([
+        f"{ticker},{day},{r:.6f},{p:.2f},{q:.2f}\n"
+        for day, r, p, q in zip(days, returns.tolist(), prices.tolist(), previous.tolist())
+    ]).encode()
+
+
+class _Sink(io.RawIOBase):
+    """Write-only file that hands back whatever was written since the last drain"""
+
+    def __init__(self):
+        super().__init__()
+        self._parts: List[bytes] = []
+        self._position = 0
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, data: Any) -> int:
+        chunk = bytes(data)
+        self._parts.append(chunk)
+        self._position += len(chunk)
+        return len(chunk)
+
+    def tell(self) -> int:
+        return self._position
+
+    def drain(self) -> bytes:
+        data, self._parts = b"".join(self._parts), []
+        return data
+
+
+def parse_range(header: str, size: int) -> Optional[Tuple[int, int]]:
+    """(first, last) byte of a single "bytes=" range; None when it cannot be satisfied
+
+    Multiple ranges raise ValueError, and callers answer with the whole file.
+    """
+    unit, _, spec = header.partition("=")
+    if unit.strip() != "bytes" or "," in spec:
+        raise ValueError(f"Unsupported range: {header}")
+    first, _, last = spec.strip().partition("-")
+    if not first:
+        # Suffix range: the final N bytes
+        length = int(last)
+        return (max(size - length, 0), size - 1) if length > 0 and size else None
+    start = int(first)
+    end = min(int(last), size - 1) if last else size - 1
+    return (start, end) if start <= end else None
+
+
+def _lookback(start: str) -> str:
+    return (datetime.strptime(start, "%Y-%m-%d") - timedelta(days=LOOKBACK_DAYS)).strftime("%Y-%m-%d")
+
+
+Closes = Tuple[np.ndarray, np.ndarray]
+
+
+class Export:
+    """One export over closes loaded once; its ETag, size and bytes all describe that data"""
+
+    def __init__(self, series: Dict[str, Closes], start: str, end: str, fmt: str, cache: ResultCache,
+                 block_rows: int):
+        self.series = series
+        self.start = start
+        self.end = end
+        self.fmt = fmt
+        self.block_rows = block_rows
+        self._cache = cache
+        digest = hashlib.sha1(f"{fmt}|{start}|{end}".encode())
+        for ticker, (dates, closes) in series.items():
+            digest.update(f"|{ticker}|{len(closes)}|".encode())
+            digest.update(np.ascontiguousarray(dates).tobytes())
+            digest.update(np.ascontiguousarray(closes).tobytes())
+        self.etag = f'"{digest.hexdigest()[:20]}"'
+
+    def _blocks(self, ticker: str) -> Iterator[Tuple[List[str], np.ndarray, np.ndarray, np.ndarray]]:
+        dates, closes = self.series[ticker]
+        if len(closes) < 2:
+            return
+        first = int(np.searchsorted(dates[1:], np.datetime64(self.start)))
+        for lo in range(first, len(closes) - 1, self.block_rows):
+            hi = min(lo + self.block_rows, len(closes) - 1)
+            previous, prices = closes[lo:hi], closes[lo + 1:hi + 1]
+            yield dates[lo + 1:hi + 1].astype(str).tolist(), prices / previous - 1, prices, previous
+
+    def _csv(self) -> Iterator[bytes]:
+        # Sent with the first block, so an empty export is just the header
+        header = (",".join(COLUMNS) + "\n").encode()
+        for ticker in self.series:
+            for block in self._blocks(ticker):
+                metrics.inc("export_rows_total", len(block[0]), format="csv")
+                yield header + _csv_block(ticker, *block)
+                header = b""
+        yield header
+
+    def _parquet(self) -> Iterator[bytes]:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        schema = pa.schema([("ticker", pa.string()), ("date", pa.date32()), ("return", pa.float64()),
+                            ("price", pa.float64()), ("previous_price", pa.float64())])
+        sink = _Sink()
+        with pq.ParquetWriter(sink, schema, compression="snappy") as writer:
+            for ticker in self.series:
+                for days, returns, prices, previous in self._blocks(ticker):
+                    writer.write_table(pa.table({
+                        "ticker": pa.array([ticker] * len(days), pa.string()),
+                        "date": pa.array(np.array(days, dtype="datetime64[D]"), pa.date32()),
+                        "return": np.round(returns, 6), "price": np.round(prices, 2),
+                        "previous_price": np.round(previous, 2),
+                    }, schema=schema))
+                    metrics.inc("export_rows_total", len(days), format="parquet")
+                    yield sink.drain()
+        yield sink.drain()
+
+    def render(self) -> Iterator[bytes]:
+        """The export as a sequence of byte blocks"""
+        pieces = self._csv() if self.fmt == "csv" else self._parquet()
+        return (piece for piece in pieces if piece)
+
+    def _size_key(self) -> Tuple:
+        return query_key("export_size", etag=self.etag)
+
+    def known_size(self) -> Optional[int]:
+        return self._cache.get(self._size_key())
+
+    def size(self) -> int:
+        """Total bytes of the export, rendering it once (without keeping it) if not known for this ETag yet"""
+        size = self.known_size()
+        if size is None:
+            size = sum(len(piece) for piece in self.render())
+            self._remember_size(size)
+        return size
+
+    def _remember_size(self, size: int) -> None:
+        self._cache.set(self._size_key(), size, list(self.series), _lookback(self.start), self.end)
+
+    def stream(self, first: int = 0, last: Optional[int] = None) -> Iterator[bytes]:
+        """Bytes first..last (inclusive) of the export; the whole export by default"""
+        position = 0
+        for piece in self.render():
+            lo, hi = position, position + len(piece)
+            position = hi
+            if hi <= first:
+                continue
+            if last is not None and lo > last:
+                return
+            yield piece[max(first - lo, 0):(len(piece) if last is None else min(last + 1 - lo, len(piece)))]
+        if first == 0 and last is None:
+            # A complete pass: later range requests for the same data need no sizing pass
+            self._remember_size(position)
+
+
+class Exporter:
+    def __init__(self, daily_closes: Callable[[str, str, str], Closes],
+                 cache: Optional[ResultCache] = None, block_rows: int = 4096):
+        self._daily_closes = daily_closes
+        self._cache = cache if cache is not None else ResultCache(name="export")
+        self.block_rows = block_rows
+
+    def open(self, tickers: List[str], start: str, end: str, fmt: str) -> Export:
+        """Load every ticker's closes for the export; upstream failures surface here, before any byte is sent"""
+        if fmt not in FORMATS:
+            raise ValueError(f"Unknown export format: {fmt}")
+        lookback = _lookback(start)
+        return Export({ticker: self._daily_closes(ticker, lookback, end) for ticker in tickers},
+                      start, end, fmt, self._cache, self.block_rows)
+
+    def stream(self, tickers: List[str], start: str, end: str, fmt: str,
+               first: int = 0, last: Optional[int] = None) -> Iterator[bytes]:
+        """Bytes first..last (inclusive) of a freshly loaded export"""
+        return self.open(tickers, start, end, fmt).stream(first, last)
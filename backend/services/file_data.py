@@ -0,0 +1,186 @@
+"""Daily price files (CSV or Parquet) as a data source.
+
+Accepted layouts, detected from the columns (case-insensitive):
+  * per-ticker OHLC:   Date, Open, High, Low, Close[, Volume]  (ticker from the file name)
+  * multi-ticker long: Date, Ticker (or Symbol), Close[, Open, High, Low, ...]
+  * wide:              Date, then one close column per ticker
+
+Parsing and validation are vectorised; Parquet is read through pyarrow.
+"""
+import logging
+import os
+import threading
+from typing import Dict, Iterable, List, NamedTuple, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+DATE_COLUMNS = ("date", "datetime", "timestamp")
+TICKER_COLUMNS = ("ticker", "symbol")
+CSV_SUFFIXES = (".csv", ".csv.gz")
+PARQUET_SUFFIXES = (".parquet", ".pq")
+
+
+class TickerSeries(NamedTuple):
+    ticker: str
+    days: np.ndarray    # datetime64[D], strictly increasing business days
+    closes: np.ndarray  # float64
+    rows: int
+    invalid: int
+    duplicates: int
+    non_sessions: int
+
+
+def _has_pyarrow() -> bool:
+    try:
+        import pyarrow  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+def is_data_file(path: str) -> bool:
+    return path.lower().endswith(CSV_SUFFIXES + PARQUET_SUFFIXES)
+
+
+def expand_paths(paths: Iterable[str]) -> List[str]:
+    """Files as given, plus every data file directly inside given directories"""
+    files = []
+    for path in paths:
+        if os.path.isdir(path):
+            files.extend(sorted(os.path.join(path, name) for name in os.listdir(path) if is_data_file(name)))
+        else:
+            files.append(path)
+    return files
+
+
+def read_frame(path: str) -> pd.DataFrame:
+    if path.lower().endswith(PARQUET_SUFFIXES):
+        if not _has_pyarrow():
+            raise RuntimeError(f"Reading {path} needs pyarrow (pip install pyarrow)")
+        return pd.read_parquet(path)
+    # The pyarrow CSV engine is multi-threaded; the C engine is the fallback
+    return pd.read_csv(path, engine="pyarrow" if _has_pyarrow() else "c")
+
+
+def _clean(ticker: str, days: np.ndarray, closes: np.ndarray, invalid: np.ndarray) -> TickerSeries:
+    """Drop unparseable/non-positive/inconsistent rows and weekends, then dedupe by day (last row wins)"""
+    rows = len(days)
+    valid = ~np.isnat(days) & np.isfinite(closes) & (closes > 0) & ~invalid
+    invalid_count = int(rows - valid.sum())
+    days, closes = days[valid], closes[valid]
+
+    sessions = np.is_busday(days)
+    non_sessions = int(len(days) - sessions.sum())
+    days, closes = days[sessions], closes[sessions]
+
+    order = np.argsort(days, kind="stable")
+    days, closes = days[order], closes[order]
+    last = np.r_[days[1:] != days[:-1], True] if len(days) else np.array([], dtype=bool)
+    duplicates = int(len(days) - last.sum())
+    return TickerSeries(ticker, days[last], closes[last], rows, invalid_count, duplicates, non_sessions)
+
+
+def parse_frame(frame: pd.DataFrame, default_ticker: Optional[str] = None) -> List[TickerSeries]:
+    columns = {str(name).strip().lower(): name for name in frame.columns}
+    date_column = next((columns[name] for name in DATE_COLUMNS if name in columns), None)
+    if date_column is None:
+        raise ValueError(f"No date column (expected one of: {', '.join(DATE_COLUMNS)})")
+    stamps = pd.to_datetime(frame[date_column], errors="coerce", utc=True)
+    days = stamps.dt.tz_localize(None).to_numpy().astype("datetime64[D]")
+
+    def numeric(name) -> np.ndarray:
+        return pd.to_numeric(frame[name], errors="coerce").to_numpy(dtype=np.float64)
+
+    if "close" in columns:
+        closes = numeric(columns["close"])
+        invalid = np.zeros(len(frame), dtype=bool)
+        if "high" in columns and "low" in columns:
+            high, low = numeric(columns["high"]), numeric(columns["low"])
+            with np.errstate(invalid="ignore"):
+                invalid = (low > high) | (closes > high) | (closes < low)
+        ticker_column = next((columns[name] for name in TICKER_COLUMNS if name in columns), None)
+        if ticker_column is None:
+            if not default_ticker:
+                raise ValueError("Single-ticker file without a ticker column; name the file after the ticker")
+            return [_clean(default_ticker.upper(), days, closes, invalid)]
+        tickers = frame[ticker_column].astype(str).str.strip().str.upper().to_numpy()
+        return [
+            _clean(ticker, days[tickers == ticker], closes[tickers == ticker], invalid[tickers == ticker])
+            for ticker in sorted(set(tickers))
+        ]
+
+    # Wide layout: every other column is one ticker's closes
+    no_flags = np.zeros(len(frame), dtype=bool)
+    return [
+        _clean(str(name).strip().upper(), days, numeric(name), no_flags)
+        for name in frame.columns if name != date_column
+    ]
+
+
+def ticker_from_path(path: str) -> str:
+    name = os.path.basename(path)
+    for suffix in CSV_SUFFIXES + PARQUET_SUFFIXES:
+        if name.lower().endswith(suffix):
+            return name[:-len(suffix)]
+    return os.path.splitext(name)[0]
+
+
+def load_files(paths: Iterable[str]) -> List[TickerSeries]:
+    """Parse every file; series for the same ticker from several files are merged"""
+    merged: Dict[str, TickerSeries] = {}
+    for path in expand_paths(paths):
+        for series in parse_frame(read_frame(path), default_ticker=ticker_from_path(path)):
+            previous = merged.get(series.ticker)
+            if previous is not None:
+                combined = _clean(
+                    series.ticker,
+                    np.concatenate([previous.days, series.days]),
+                    np.concatenate([previous.closes, series.closes]),
+                    np.zeros(len(previous.days) + len(series.days), dtype=bool),
+                )
+                series = series._replace(
+                    days=combined.days, closes=combined.closes,
+                    rows=previous.rows + series.rows,
+                    invalid=previous.invalid + series.invalid,
+                    duplicates=previous.duplicates + series.duplicates + combined.duplicates,
+                    non_sessions=previous.non_sessions + series.non_sessions,
+                )
+            merged[series.ticker] = series
+    return list(merged.values())
+
+
+class FileProvider:
+    """Offline provider serving daily bars from a directory of CSV/Parquet files"""
+
+    # Local reads skip the upstream rate limiter and circuit breaker
+    remote = False
+
+    def __init__(self, data_dir: str):
+        self.data_dir = data_dir
+        self._series: Optional[Dict[str, TickerSeries]] = None
+        self._lock = threading.Lock()
+
+    def _load(self) -> Dict[str, TickerSeries]:
+        with self._lock:
+            if self._series is None:
+                self._series = {series.ticker: series for series in load_files([self.data_dir])}
+                logger.info("Loaded %d tickers from %s", len(self._series), self.data_dir)
+            return self._series
+
+    def history(self, ticker: str, start: str, end: str, interval: str = '1d') -> pd.DataFrame:
+        if interval != '1d':
+            raise ValueError(f"File data only has daily bars, not {interval}")
+        series = self._load().get(ticker.upper())
+        if series is None:
+            return pd.DataFrame({"Close": []}, index=pd.DatetimeIndex([]))
+        window = (series.days >= np.datetime64(start)) & (series.days < np.datetime64(end))
+        return pd.DataFrame({"Close": series.closes[window]}, index=pd.DatetimeIndex(series.days[window]))
+
+    def quote(self, ticker: str) -> Tuple[float, float]:
+        series = self._load().get(ticker.upper())
+        if series is None or len(series.closes) < 2:
+            raise ValueError(f"No file data for {ticker}")
+        return float(series.closes[-1]), float(series.closes[-2])
@@ -0,0 +1,174 @@
+"""Hedged upstream calls and request coalescing with cancellation.
+
+Hedger sends a second copy of a slow call once the first has run longer than the
+recent p95 latency. The first copy to succeed wins. A budget caps hedges at a
+small fraction of calls, so a slow provider does not get twice the traffic.
+
+SharedCalls coalesces concurrent identical jobs onto one executor job. When every
+waiter has gone, for example because the clients disconnected, the job is
+cancelled if it is still queued, so it never takes an executor slot or
+upstream quota.
+"""
+import asyncio
+import logging
+import os
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, Executor, Future, ThreadPoolExecutor, wait
+from typing import Any, Callable, Dict, Hashable, List, Optional
+
+from .metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+
+class LatencyTracker:
+    """Percentiles over the most recent successful call latencies"""
+
+    def __init__(self, window: int = 256):
+        self._samples = deque(maxlen=window)
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._samples)
+
+    def add(self, seconds: float) -> None:
+        with self._lock:
+            self._samples.append(seconds)
+
+    def percentile(self, q: float) -> Optional[float]:
+        with self._lock:
+            samples = sorted(self._samples)
+        if not samples:
+            return None
+        return samples[min(len(samples) - 1, int(q * len(samples)))]
+
+
+class Hedger:
+    """Runs a blocking call, sending one duplicate when it outlives the latency percentile"""
+
+    def __init__(self, percentile: float = 0.95, min_samples: int = 20, min_delay: float = 0.05,
+                 max_ratio: float = 0.1, max_workers: int = 8, name: str = "upstream",
+                 clock: Callable[[], float] = time.monotonic):
+        self.percentile = percentile
+        self.min_samples = min_samples
+        self.min_delay = min_delay
+        self.max_ratio = max_ratio
+        self.name = name
+        self.latency = LatencyTracker()
+        self._clock = clock
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix=f"hedge-{name}")
+        self._calls = 0
+        self._hedges = 0
+        self._lock = threading.Lock()
+
+    def delay(self) -> Optional[float]:
+        """Seconds to wait before hedging, or None until enough latencies have been seen"""
+        if len(self.latency) < self.min_samples:
+            return None
+        return max(self.min_delay, self.latency.percentile(self.percentile))
+
+    def _take_hedge(self) -> bool:
+        with self._lock:
+            if self._hedges + 1 > self.max_ratio * self._calls:
+                return False
+            self._hedges += 1
+            return True
+
+    def _timed(self, fn: Callable[..., Any], args: tuple, kwargs: dict) -> Any:
+        started = self._clock()
+        result = fn(*args, **kwargs)
+        self.latency.add(self._clock() - started)
+        return result
+
+    def call(self, fn: Callable[..., Any], *args: Any, **kwargs: Any) -> Any:
+        with self._lock:
+            self._calls += 1
+        delay = self.delay()
+        if delay is None:
+            return self._timed(fn, args, kwargs)
+
+        primary = self._executor.submit(self._timed, fn, args, kwargs)
+        done, _ = wait([primary], timeout=delay)
+        if done or not self._take_hedge():
+            return primary.result()
+
+        metrics.inc("upstream_hedges_total", provider=self.name)
+        logger.info("Hedging %s call still running after %.3fs", self.name, delay)
+        hedge = self._executor.submit(self._timed, fn, args, kwargs)
+        pending = {primary, hedge}
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                if future.exception() is None:
+                    metrics.inc("upstream_hedge_wins_total", provider=self.name,
+                                winner="hedge" if future is hedge else "primary")
+                    for other in pending:
+                        other.cancel()
+                    return future.result()
+        # Both copies failed: report the original call's error
+        return primary.result()
+
+    def close(self) -> None:
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+
+def create_hedger(name: str = "upstream") -> Optional[Hedger]:
+    """Hedger configured from UPSTREAM_HEDGE_* environment variables; None unless UPSTREAM_HEDGE=1"""
+    if os.getenv("UPSTREAM_HEDGE", "0") != "1":
+        return None
+    return Hedger(
+        percentile=float(os.getenv("UPSTREAM_HEDGE_PERCENTILE", "0.95")),
+        min_samples=int(os.getenv("UPSTREAM_HEDGE_MIN_SAMPLES", "20")),
+        max_ratio=float(os.getenv("UPSTREAM_HEDGE_MAX_RATIO", "0.1")),
+        name=name,
+    )
+
+
+class _Job:
+    def __init__(self, future: Future):
+        self.future = future
+        self.result = asyncio.wrap_future(future)
+        self.waiters = 0
+
+
+class SharedCalls:
+    """One executor job per key, shared by every concurrent waiter for that key"""
+
+    def __init__(self, executor: Executor, name: str = "jobs"):
+        self.executor = executor
+        self.name = name
+        self._jobs: Dict[Hashable, _Job] = {}
+
+    def __len__(self) -> int:
+        return len(self._jobs)
+
+    def pending(self) -> List[Dict[str, Any]]:
+        """Jobs in flight: key, whether a worker has picked it up, and how many requests wait on it"""
+        return [{"key": key, "state": "running" if job.future.running() else "queued", "waiters": job.waiters}
+                for key, job in list(self._jobs.items())]
+
+    def _forget(self, key: Hashable, job: _Job) -> None:
+        if self._jobs.get(key) is job:
+            del self._jobs[key]
+
+    async def run(self, key: Hashable, fn: Callable[..., Any], *args: Any) -> Any:
+        """Await fn(*args) on the executor, joining an identical job already in flight"""
+        job = self._jobs.get(key)
+        if job is None or job.result.get_loop() is not asyncio.get_running_loop():
+            job = _Job(self.executor.submit(fn, *args))
+            self._jobs[key] = job
+            job.result.add_done_callback(lambda _, key=key, job=job: self._forget(key, job))
+        else:
+            metrics.inc("shared_calls_joined_total", calls=self.name)
+        job.waiters += 1
+        try:
+            return await asyncio.shield(job.result)
+        finally:
+            job.waiters -= 1
+            # Succeeds only while the job is still queued; a running job finishes for the next caller
+            if job.waiters == 0 and not job.result.done() and job.future.cancel():
+                metrics.inc("shared_calls_cancelled_total", calls=self.name)
+                self._forget(key, job)
@@ -0,0 +1,161 @@
+"""Intraday bars (1m .. 1h) kept apart from the daily return cache.
+
+Bars are paged by trading day: each (ticker, date, interval) page holds two
+NumPy arrays, epoch seconds and closes, so a full 1m session costs ~6 KB instead
+of a DataFrame. Completed sessions never change and live in an LRU bounded by
+bytes; the current session is re-fetched after a short TTL. Coarser resolutions
+are derived from a finer page already in memory rather than fetched again.
+"""
+import threading
+from datetime import date as date_module, datetime, timedelta
+from typing import Any, Callable, Dict, Iterable, NamedTuple, Optional, Tuple
+
+import numpy as np
+from cachetools import LRUCache, TTLCache
+
+from .cache import in_range
+from .metrics import metrics
+from .result_cache import TickerIndex
+
+# Seconds per bar for each supported interval, finest first
+INTERVAL_SECONDS = {"1m": 60, "5m": 300, "15m": 900, "30m": 1800, "1h": 3600}
+
+# How far back Yahoo serves each interval
+MAX_LOOKBACK_DAYS = {"1m": 29, "5m": 59, "15m": 59, "30m": 59, "1h": 729}
+
+
+class IntradayBars(NamedTuple):
+    times: np.ndarray   # int64 epoch seconds (bar start)
+    closes: np.ndarray  # float64
+
+    @property
+    def nbytes(self) -> int:
+        return self.times.nbytes + self.closes.nbytes
+
+
+def bars_from_history(hist: Any) -> IntradayBars:
+    """Convert a provider DataFrame (DatetimeIndex, Close column) into arrays"""
+    if hist.empty:
+        # yfinance's empty frame has a plain Index, not a DatetimeIndex
+        return IntradayBars(np.array([], dtype=np.int64), np.array([], dtype=np.float64))
+    index = hist.index
+    if getattr(index, "tz", None) is not None:
+        index = index.tz_convert("UTC").tz_localize(None)
+    times = index.values.astype("datetime64[s]").astype(np.int64)
+    closes = hist["Close"].to_numpy(dtype=np.float64)
+    order = np.argsort(times, kind="stable")
+    return IntradayBars(np.ascontiguousarray(times[order]), np.ascontiguousarray(closes[order]))
+
+
+def resample(bars: IntradayBars, interval: str) -> IntradayBars:
+    """Aggregate to a coarser interval: each bucket keeps its last close.
+
+    Buckets are aligned to the first bar of the session, matching how Yahoo
+    labels hourly bars from the 09:30 open.
+    """
+    step = INTERVAL_SECONDS[interval]
+    if bars.times.size == 0:
+        return bars
+    buckets = (bars.times - bars.times[0]) // step
+    last = np.flatnonzero(np.r_[buckets[1:] != buckets[:-1], True])
+    return IntradayBars(bars.times[0] + buckets[last] * step, bars.closes[last])
+
+
+class IntradayService:
+    """Serves intraday bars for one trading day at a time"""
+
+    def __init__(self, fetch_history: Callable[..., Any], max_bytes: int = 64 * 1024 * 1024,
+                 live_ttl_seconds: int = 60, today: Callable[[], date_module] = date_module.today):
+        self._fetch_history = fetch_history
+        self._today = today
+        # Sessions that are over never change; the current one is refreshed after live_ttl_seconds
+        self._completed = LRUCache(maxsize=max_bytes, getsizeof=lambda bars: max(bars.nbytes, 1))
+        self._live = TTLCache(maxsize=256, ttl=live_ttl_seconds)
+        self._by_ticker = TickerIndex()
+        self._lock = threading.Lock()
+
+    def memory_usage(self) -> int:
+        with self._lock:
+            return self._completed.currsize + sum(bars.nbytes for bars in self._live.values())
+
+    def invalidate(self, tickers: Optional[Iterable[str]] = None,
+                   start: Optional[str] = None, end: Optional[str] = None) -> int:
+        """Drop pages for the tickers (all when None) whose session lies within [start, end]"""
+        removed = 0
+        with self._lock:
+            if tickers is None:
+                keys = set(self._completed.keys()) | set(self._live.keys())
+            else:
+                keys = self._by_ticker.keys(tickers)
+            for key in keys:
+                if not in_range(key[1], start, end):
+                    continue
+                for cache in (self._completed, self._live):
+                    if cache.pop(key, None) is not None:
+                        removed += 1
+                self._by_ticker.discard(key[0], key)
+        return removed
+
+    def _cached(self, key: Tuple[str, str, str]) -> Optional[IntradayBars]:
+        with self._lock:
+            bars = self._completed.get(key)
+            return bars if bars is not None else self._live.get(key)
+
+    def _store(self, key: Tuple[str, str, str], bars: IntradayBars, completed: bool) -> None:
+        with self._lock:
+            if completed:
+                self._completed[key] = bars
+            else:
+                self._live[key] = bars
+            if self._by_ticker.add(key[0], key):
+                live = set(self._completed.keys()) | set(self._live.keys())
+                self._by_ticker.rebuild(([k[0]], k) for k in live)
+
+    def bars(self, ticker: str, date: str, interval: str) -> IntradayBars:
+        """Bars for ticker on date at interval, from memory when possible"""
+        if interval not in INTERVAL_SECONDS:
+            raise ValueError(f"Unsupported interval: {interval}")
+        cached = self._cached((ticker, date, interval))
+        if cached is not None:
+            metrics.inc("intraday_cache_total", outcome="hit")
+            return cached
+
+        # A finer page of the same session can be aggregated without going upstream
+        for finer in INTERVAL_SECONDS:
+            if INTERVAL_SECONDS[finer] >= INTERVAL_SECONDS[interval]:
+                break
+            source = self._cached((ticker, date, finer))
+            if source is not None and INTERVAL_SECONDS[interval] % INTERVAL_SECONDS[finer] == 0:
+                metrics.inc("intraday_cache_total", outcome="resampled")
+                return resample(source, interval)
+
+        metrics.inc("intraday_cache_total", outcome="miss")
+        day = datetime.strptime(date, "%Y-%m-%d").date()
+        hist = self._fetch_history(ticker, date, (day + timedelta(days=1)).isoformat(), interval=interval)
+        bars = bars_from_history(hist)
+        self._store((ticker, date, interval), bars, completed=day < self._today())
+        return bars
+
+    def intraday_returns(self, ticker: str, date: str, interval: str, previous_close: float) -> Dict[str, Any]:
+        """Return of every bar relative to the previous session close"""
+        bars = self.bars(ticker, date, interval)
+        returns = (bars.closes - previous_close) / previous_close
+        return {
+            "ticker": ticker,
+            "date": date,
+            "interval": interval,
+            "previous_close": round(float(previous_close), 2),
+            "times": bars.times.tolist(),
+            "prices": np.round(bars.closes, 2).tolist(),
+            "returns": np.round(returns, 6).tolist(),
+        }
+
+
+def check_interval(interval: str, date: str, today: Optional[date_module] = None) -> Optional[str]:
+    """Validation error message for an interval/date pair, or None if it can be served"""
+    if interval not in INTERVAL_SECONDS:
+        return f"Unsupported interval. Use one of: {', '.join(INTERVAL_SECONDS)}"
+    day = datetime.strptime(date, "%Y-%m-%d").date()
+    if ((today or date_module.today()) - day).days > MAX_LOOKBACK_DAYS[interval]:
+        return f"{interval} bars are only available for the last {MAX_LOOKBACK_DAYS[interval]} days"
+    return None
@@ -0,0 +1,113 @@
+"""Live intraday returns pushed to WebSocket subscribers.
+
+One poller task per subscribed ticker fetches the latest price on a fixed
+cadence and fans the computed return out to every subscriber queue, so upstream
+load depends on the number of tickers watched, not on the number of clients.
+"""
+import asyncio
+import logging
+import time
+from concurrent.futures import Executor
+from typing import Any, Callable, Dict, Optional, Set, Tuple
+
+from .metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+# feed(ticker) -> (last_price, previous_close)
+QuoteFeed = Callable[[str], Tuple[float, float]]
+
+
+def quote_message(ticker: str, price: float, previous_close: float) -> Dict[str, Any]:
+    return {
+        "ticker": ticker,
+        "price": round(float(price), 2),
+        "previous_close": round(float(previous_close), 2),
+        "return": round((float(price) - float(previous_close)) / float(previous_close), 6),
+        "as_of": time.time(),
+    }
+
+
+class LiveQuoteHub:
+    """Runs one poller per ticker and broadcasts each quote to all subscribed queues"""
+
+    def __init__(self, feed: QuoteFeed, interval: float = 5.0, executor: Optional[Executor] = None):
+        self.feed = feed
+        self.interval = interval
+        self._executor = executor
+        self._subscribers: Dict[str, Set[asyncio.Queue]] = {}
+        self._pollers: Dict[str, asyncio.Task] = {}
+        self._latest: Dict[str, Dict[str, Any]] = {}
+
+    def subscribe(self, ticker: str, queue: asyncio.Queue) -> None:
+        """Deliver quotes for ticker into queue, starting its poller if needed"""
+        subscribers = self._subscribers.setdefault(ticker, set())
+        subscribers.add(queue)
+        metrics.set_gauge("live_quote_subscribers", len(subscribers), ticker=ticker)
+        if ticker in self._latest:
+            self._offer(queue, self._latest[ticker])
+        if ticker not in self._pollers:
+            self._pollers[ticker] = asyncio.create_task(self._poll(ticker))
+
+    def unsubscribe(self, ticker: str, queue: asyncio.Queue) -> None:
+        """Stop delivering to queue; the poller stops with the last subscriber"""
+        subscribers = self._subscribers.get(ticker)
+        if subscribers is None:
+            return
+        subscribers.discard(queue)
+        metrics.set_gauge("live_quote_subscribers", len(subscribers), ticker=ticker)
+        if not subscribers:
+            del self._subscribers[ticker]
+            self._latest.pop(ticker, None)
+            poller = self._pollers.pop(ticker, None)
+            if poller is not None:
+                poller.cancel()
+
+    def subscriber_count(self, ticker: str) -> int:
+        return len(self._subscribers.get(ticker, ()))
+
+    @property
+    def polling(self) -> Set[str]:
+        return set(self._pollers)
+
+    async def close(self) -> None:
+        pollers = list(self._pollers.values())
+        for poller in pollers:
+            poller.cancel()
+        await asyncio.gather(*pollers, return_exceptions=True)
+        self._pollers.clear()
+        self._subscribers.clear()
+        self._latest.clear()
+
+    @staticmethod
+    def _offer(queue: asyncio.Queue, message: Dict[str, Any]) -> None:
+        # A slow client loses its oldest quote rather than holding up the broadcast
+        if queue.full():
+            try:
+                queue.get_nowait()
+                metrics.inc("live_quote_dropped_total")
+            except asyncio.QueueEmpty:
+                pass
+        queue.put_nowait(message)
+
+    def _broadcast(self, ticker: str, message: Dict[str, Any]) -> None:
+        for queue in list(self._subscribers.get(ticker, ())):
+            self._offer(queue, message)
+
+    async def _poll(self, ticker: str) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            started = loop.time()
+            try:
+                price, previous_close = await loop.run_in_executor(self._executor, self.feed, ticker)
+                message = quote_message(ticker, price, previous_close)
+                self._latest[ticker] = message
+                metrics.inc("live_quote_polls_total", ticker=ticker, outcome="success")
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.warning("Live quote poll failed for %s: %s", ticker, e)
+                metrics.inc("live_quote_polls_total", ticker=ticker, outcome="error")
+                message = {"ticker": ticker, "error": str(e), "as_of": time.time()}
+            self._broadcast(ticker, message)
+            await asyncio.sleep(max(0.0, self.interval - (loop.time() - started)))
@@ -0,0 +1,164 @@
+"""Off-hot-path logging: request threads enqueue records, one listener thread formats and writes them.
+
+Records reach the queue unformatted (msg and args stay separate). The JSON or text
+rendering and the stream write happen on the listener thread. A full queue drops
+records instead of blocking a request, and drops are counted in
+log_records_dropped_total.
+
+High-volume call sites are gated with ``sampled(category)`` (e.g. "cache_hit"),
+which keeps the configured fraction of each category before any record is built.
+Warnings, errors and slow requests are never gated.
+"""
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import random
+import sys
+import time
+from typing import Any, Callable, Dict, Optional
+
+from .metrics import metrics
+
+# Attributes every LogRecord has; anything else came from `extra`
+_RECORD_FIELDS = set(vars(logging.LogRecord("", 0, "", 0, "", (), None))) | {"message", "asctime"}
+
+_listener: Optional[logging.handlers.QueueListener] = None
+
+
+def sample_rates_from_env() -> Dict[str, float]:
+    """LOG_SAMPLE_<CATEGORY>=rate, e.g. LOG_SAMPLE_CACHE_HIT=0.01; unlisted categories are always kept"""
+    rates = {"cache_hit": 0.01, "request": 0.0}
+    for name, value in os.environ.items():
+        if name.startswith("LOG_SAMPLE_"):
+            rates[name[len("LOG_SAMPLE_"):].lower()] = float(value)
+    return rates
+
+
+class Sampler:
+    """Keeps rates[category] of calls; categories without a rate are always kept"""
+
+    def __init__(self, rates: Dict[str, float], rng: Callable[[], float] = random.random):
+        self.rates = rates
+        self._rng = rng
+
+    def __call__(self, category: str) -> bool:
+        rate = self.rates.get(category, 1.0)
+        return rate >= 1.0 or (rate > 0.0 and self._rng() < rate)
+
+
+_sampler = Sampler(sample_rates_from_env())
+
+
+def sampled(category: str) -> bool:
+    """Whether to log this occurrence of a high-volume category; check before building the record"""
+    return _sampler(category)
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per line: time, level, logger, message and any `extra` fields"""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry: Dict[str, Any] = {
+            "ts": "%s.%03dZ" % (time.strftime("%Y-%m-%dT%H:%M:%S", time.gmtime(record.created)), record.msecs),
+            "level": record.levelname,
+            "logger": record.name,
+            "msg": record.getMessage(),
+        }
+        for name in record.__dict__.keys() - _RECORD_FIELDS:
+            entry[name] = record.__dict__[name]
+        if record.exc_info:
+            entry["exc"] = self.formatException(record.exc_info)
+        return json.dumps(entry, default=str)
+
+
+class LazyQueueHandler(logging.handlers.QueueHandler):
+    """QueueHandler that neither formats on the caller's thread nor blocks once max_size records wait"""
+
+    def __init__(self, records: "queue.SimpleQueue", max_size: int = 10000):
+        super().__init__(records)
+        self.max_size = max_size
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # The stock handler renders msg % args here; the listener does it instead
+        return record
+
+    def enqueue(self, record: logging.LogRecord) -> None:
+        if self.queue.qsize() >= self.max_size:
+            metrics.inc("log_records_dropped_total")
+            return
+        self.queue.put_nowait(record)
+
+
+def configure_logging(level: Optional[str] = None, fmt: Optional[str] = None, queue_size: int = 10000,
+                      rates: Optional[Dict[str, float]] = None,
+                      stream: Any = None) -> logging.handlers.QueueListener:
+    """Route the root logger through a bounded queue to a listener thread; safe to call again"""
+    global _listener, _sampler
+    if _listener is not None:
+        return _listener
+    _sampler = Sampler(rates if rates is not None else sample_rates_from_env())
+    handler = logging.StreamHandler(stream or sys.stderr)
+    if (fmt or os.getenv("LOG_FORMAT", "json")) == "json":
+        handler.setFormatter(JsonFormatter())
+    else:
+        handler.setFormatter(logging.Formatter("%(asctime)s %(levelname)s %(name)s: %(message)s"))
+    records: queue.SimpleQueue = queue.SimpleQueue()
+    queue_handler = LazyQueueHandler(records, max_size=queue_size)
+    root = logging.getLogger()
+    root.setLevel(level or os.getenv("LOG_LEVEL", "INFO"))
+    root.addHandler(queue_handler)
+    _listener = logging.handlers.QueueListener(records, handler, respect_handler_level=True)
+    _listener.start()
+    return _listener
+
+
+def stop_logging() -> None:
+    """Flush queued records and stop the listener thread"""
+    global _listener
+    if _listener is None:
+        return
+    listener, _listener = _listener, None
+    listener.stop()
+    root = logging.getLogger()
+    for handler in list(root.handlers):
+        if isinstance(handler, LazyQueueHandler) and handler.queue is listener.queue:
+            root.removeHandler(handler)
+
+
+class AccessLogMiddleware:
+    """ASGI middleware logging each HTTP request's status and duration.
+
+    Requests at least slow_ms long are logged as warnings and server errors as
+    errors, always. Other requests are logged at the "request" sample rate.
+    """
+
+    def __init__(self, app: Any, slow_ms: Optional[float] = None, logger: Optional[logging.Logger] = None):
+        self.app = app
+        self.slow_ms = float(os.getenv("LOG_SLOW_REQUEST_MS", "500")) if slow_ms is None else slow_ms
+        self.logger = logger or logging.getLogger("access")
+
+    async def __call__(self, scope: Dict[str, Any], receive: Callable, send: Callable) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        started = time.perf_counter()
+        status = 500
+
+        async def send_status(message: Dict[str, Any]) -> None:
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_status)
+        finally:
+            duration_ms = (time.perf_counter() - started) * 1000
+            slow = duration_ms >= self.slow_ms
+            level = logging.ERROR if status >= 500 else logging.WARNING if slow else logging.INFO
+            if level > logging.INFO or sampled("request"):
+                self.logger.log(level, "%s %s %d %.1fms", scope["method"], scope["path"], status, duration_ms,
+                                extra={"method": scope["method"], "path": scope["path"], "status": status,
+                                       "duration_ms": round(duration_ms, 1), "slow": slow})
@@ -0,0 +1,52 @@
+"""Weighted basket returns over an aligned (sessions, tickers) return panel.
+
+Between rebalances the basket is bought and held, so each holding drifts with its
+own returns. On the first session of each rebalancing period the holdings are
+reset to the target weights. Every period is computed at once: cumulative growth
+of the panel, rebased to each period's start, times the weight vector.
+"""
+from typing import Tuple
+
+import numpy as np
+
+REBALANCE_SCHEDULES = ("none", "monthly", "quarterly")
+
+
+def period_starts(dates: np.ndarray, schedule: str) -> np.ndarray:
+    """Row indices where a rebalancing period begins (always including 0)"""
+    if schedule not in REBALANCE_SCHEDULES:
+        raise ValueError(f"Unknown rebalancing schedule: {schedule}")
+    if len(dates) == 0:
+        return np.array([], dtype=np.intp)
+    if schedule == "none":
+        return np.array([0], dtype=np.intp)
+    periods = dates.astype("datetime64[M]").astype(np.int64)
+    if schedule == "quarterly":
+        periods //= 3
+    return np.flatnonzero(np.r_[True, np.diff(periods) != 0])
+
+
+def normalise_weights(weights: np.ndarray) -> np.ndarray:
+    weights = np.asarray(weights, dtype=np.float64)
+    if np.any(~np.isfinite(weights)) or np.any(weights < 0) or weights.sum() <= 0:
+        raise ValueError("Weights must be non-negative with a positive sum")
+    return weights / weights.sum()
+
+
+def portfolio_returns(dates: np.ndarray, returns: np.ndarray, weights: np.ndarray,
+                      schedule: str = "none") -> Tuple[np.ndarray, np.ndarray]:
+    """Daily and cumulative basket returns for a (sessions, tickers) panel"""
+    weights = normalise_weights(weights)
+    if returns.shape[0] == 0:
+        return np.empty(0), np.empty(0)
+    starts = period_starts(dates, schedule)
+    growth = np.cumprod(1.0 + returns, axis=0)
+    # Growth at the close before each period, so every period is rebased to 1
+    bases = np.vstack([np.ones((1, returns.shape[1])), growth[starts[1:] - 1]])
+    period = np.cumsum(np.isin(np.arange(len(returns)), starts)) - 1
+    value = (growth / bases[period]) @ weights
+    previous = np.r_[1.0, value[:-1]]
+    previous[starts] = 1.0
+    daily = value / previous - 1.0
+    cumulative = np.cumprod(1.0 + daily) - 1.0
+    return daily, cumulative
@@ -0,0 +1,249 @@
+"""Adaptive read-ahead for per-day return lookups.
+
+The dashboard asks for contiguous runs of dates: a visible range, then the range
+shifted by a day or a page. ReadAhead tracks each ticker's recent requested
+dates. Once a run of nearby dates shows a direction, it fills the next window
+of sessions with one range fetch on a low-priority background thread. Without
+read-ahead, each date costs its own upstream call.
+
+The window starts near a month of sessions, or the visible range when a batch
+shows one. It adapts to how many of the last prefetched days were then requested:
+it doubles when most were used and halves when few were.
+"""
+import logging
+import math
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date as date_module, timedelta
+from typing import Any, Callable, Iterable, List, Optional, Tuple
+
+import numpy as np
+from cachetools import LRUCache
+
+from .metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+# Calendar days fetched before a window so its first session has a previous close
+LOOKBACK_DAYS = 10
+
+
+def _day(value: str) -> int:
+    return date_module.fromisoformat(value).toordinal()
+
+
+def _iso(ordinal: int) -> str:
+    return date_module.fromordinal(ordinal).isoformat()
+
+
+def _calendar_days(sessions: int) -> int:
+    return math.ceil(sessions * 7 / 5) + 2
+
+
+class _Stream:
+    """Recent access pattern and read-ahead state for one ticker"""
+
+    def __init__(self, window: int):
+        self.low: Optional[int] = None   # bounds of the current run of nearby requested days
+        self.high: Optional[int] = None
+        self.run = 0
+        self.direction = 0
+        self.window = window
+        self.ahead: Optional[int] = None   # furthest day already prefetched forward
+        self.behind: Optional[int] = None  # earliest day already prefetched backward
+        self.prefetched: set = set()  # cached by read-ahead and not requested yet
+        self.used = 0
+        self.wasted = 0
+        self.busy = False
+
+
+def return_payloads(ticker: str, dates: np.ndarray, closes: np.ndarray, start: str) -> List[dict]:
+    """/ticker-return payloads for the sessions on or after start"""
+    if len(closes) < 2:
+        return []
+    returns = np.diff(closes) / closes[:-1]
+    keep = np.flatnonzero(dates[1:] >= np.datetime64(start))
+    days = dates[1:].astype(str)
+    return [
+        {"ticker": ticker, "date": days[i], "return": round(float(returns[i]), 6),
+         "price": round(float(closes[i + 1]), 2), "previous_price": round(float(closes[i]), 2)}
+        for i in keep
+    ]
+
+
+def dense_runs(dates: Iterable[str], max_gap_days: int, min_days: int) -> List[Tuple[str, str]]:
+    """(first, last) of each run of dates at most max_gap_days apart that holds at least min_days of them"""
+    runs: List[Tuple[str, str]] = []
+    ordered = sorted(set(dates))
+    first = 0
+    for i in range(1, len(ordered) + 1):
+        if i == len(ordered) or _day(ordered[i]) - _day(ordered[i - 1]) > max_gap_days:
+            if i - first >= min_days:
+                runs.append((ordered[first], ordered[i - 1]))
+            first = i
+    return runs
+
+
+def fill_returns(daily_closes: Callable[[str, str, str], Tuple[np.ndarray, np.ndarray]], cache: Any,
+                 ticker: str, start: str, end: str, today: Optional[date_module] = None) -> List[str]:
+    """Cache returns for every finished session in [start, end] from one range fetch; existing entries are kept
+
+    Returns the dates that were added.
+    """
+    end = min(end, ((today or date_module.today()) - timedelta(days=1)).isoformat())  # today's close is still moving
+    if start > end:
+        return []
+    lookback = _iso(_day(start) - LOOKBACK_DAYS)
+    dates, closes = daily_closes(ticker, lookback, end)
+    return [payload["date"] for payload in return_payloads(ticker, dates, closes, start)
+            if cache.restore_entry(ticker, payload["date"], payload, 0.0)]
+
+
+class ReadAhead:
+    def __init__(self, daily_closes: Callable[[str, str, str], Tuple[np.ndarray, np.ndarray]], cache: Any,
+                 initial_window: int = 21, min_window: int = 5, max_window: int = 126, min_run: int = 3,
+                 max_gap_days: int = 4, max_pending: int = 16, max_tickers: int = 1024,
+                 today: Callable[[], date_module] = date_module.today):
+        self._daily_closes = daily_closes
+        self._cache = cache
+        self.initial_window = initial_window
+        self.min_window = min_window
+        self.max_window = max_window
+        self.min_run = min_run
+        self.max_gap_days = max_gap_days
+        self.max_pending = max_pending
+        self._today = today
+        self._streams: LRUCache = LRUCache(maxsize=max_tickers)
+        self._pending = 0
+        self._lock = threading.Lock()
+        self._executor: Optional[ThreadPoolExecutor] = None
+
+    def window(self, ticker: str) -> Optional[int]:
+        with self._lock:
+            stream = self._streams.get(ticker)
+            return stream.window if stream is not None else None
+
+    @property
+    def pending(self) -> int:
+        """Read-ahead fills scheduled and not finished yet"""
+        return self._pending
+
+    def _fill(self, ticker: str, start: str, end: str) -> List[str]:
+        return fill_returns(self._daily_closes, self._cache, ticker, start, end, today=self._today())
+
+    def fill(self, ticker: str, start: str, end: str) -> int:
+        """Cache returns for every session in [start, end] from one range fetch; existing entries are kept"""
+        return len(self._fill(ticker, start, end))
+
+    def _adapt(self, stream: _Stream) -> None:
+        """Resize the window from the share of prefetched days requested before the run moved past them"""
+        passed = {day for day in stream.prefetched
+                  if (day < stream.high if stream.direction > 0 else day > stream.low)}
+        stream.prefetched -= passed
+        stream.wasted += len(passed)
+        decided = stream.used + stream.wasted
+        if decided < self.min_window:
+            return
+        used = stream.used / decided
+        if used >= 0.75:
+            stream.window = min(self.max_window, stream.window * 2)
+        elif used < 0.25:
+            stream.window = max(self.min_window, stream.window // 2)
+        stream.used = stream.wasted = 0
+
+    def observe(self, ticker: str, dates: Iterable[str]) -> Optional[Tuple[str, str]]:
+        """Record requested dates for ticker; returns the [start, end] read-ahead scheduled, if any"""
+        days = sorted({_day(value) for value in dates})
+        if not days:
+            return None
+        with self._lock:
+            stream = self._streams.get(ticker)
+            if stream is None:
+                stream = self._streams[ticker] = _Stream(self.initial_window)
+            # Walk a batch from the end nearest the current run, so paging backwards extends it
+            for day in days if stream.low is None or days[0] >= stream.low else reversed(days):
+                if day in stream.prefetched:
+                    stream.prefetched.discard(day)
+                    stream.used += 1
+                    metrics.inc("read_ahead_hits_total")
+                if stream.low is not None and 0 < day - stream.high <= self.max_gap_days:
+                    stream.high, stream.direction = day, 1
+                    stream.run += 1
+                elif stream.low is not None and 0 < stream.low - day <= self.max_gap_days:
+                    stream.low, stream.direction = day, -1
+                    stream.run += 1
+                elif stream.low is None or not stream.low <= day <= stream.high:
+                    # A jump elsewhere starts a new run; what was read ahead for the old one went unused
+                    stream.wasted += len(stream.prefetched)
+                    stream.prefetched.clear()
+                    stream.low = stream.high = day
+                    stream.run, stream.direction = 1, 0
+                    stream.ahead = stream.behind = None
+            if len(days) >= self.min_run and days[-1] - days[0] <= _calendar_days(len(days)) + self.max_gap_days:
+                # A contiguous batch is the visible range: read ahead by at least that much
+                stream.window = max(stream.window, min(self.max_window, len(days)))
+            if stream.run < self.min_run or stream.busy:
+                return None
+            span = _calendar_days(stream.window)
+            if stream.direction > 0:
+                frontier = max(stream.high, stream.ahead or stream.high)
+                if frontier - stream.high >= span // 2:
+                    return None
+                lo, hi = frontier + 1, frontier + span
+                if lo > self._today().toordinal() - 1:
+                    return None
+            else:
+                frontier = min(stream.low, stream.behind or stream.low)
+                if stream.low - frontier >= span // 2:
+                    return None
+                lo, hi = frontier - span, frontier - 1
+            if self._pending >= self.max_pending:
+                metrics.inc("read_ahead_total", outcome="dropped")
+                return None
+            self._adapt(stream)
+            if stream.direction > 0:
+                stream.ahead = hi
+            else:
+                stream.behind = lo
+            stream.busy = True
+            self._pending += 1
+            if self._executor is None:
+                # One thread: read-ahead never takes the slots foreground fetches run in
+                self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="read-ahead")
+            executor = self._executor
+        start, end = _iso(lo), _iso(hi)
+        try:
+            executor.submit(self._prefetch, ticker, start, end)
+        except RuntimeError:
+            # Closed while scheduling (shutdown)
+            with self._lock:
+                self._pending -= 1
+                stream.busy = False
+            return None
+        metrics.inc("read_ahead_total", outcome="scheduled")
+        return start, end
+
+    def _prefetch(self, ticker: str, start: str, end: str) -> None:
+        filled = []
+        try:
+            filled = self._fill(ticker, start, end)
+            metrics.inc("read_ahead_entries_total", len(filled))
+            logger.info("Read ahead %d sessions of %s over %s..%s", len(filled), ticker, start, end)
+        except Exception as e:
+            metrics.inc("read_ahead_total", outcome="failed")
+            logger.warning("Read-ahead for %s %s..%s failed: %s", ticker, start, end, e)
+        finally:
+            with self._lock:
+                self._pending -= 1
+                stream = self._streams.get(ticker)
+                if stream is not None:
+                    stream.busy = False
+                    # Only days this fill actually cached count towards the hit rate
+                    stream.prefetched.update(_day(day) for day in filled)
+
+    def close(self, wait: bool = False) -> None:
+        """Stop the read-ahead thread; queued fills are dropped, wait=True lets a running one finish"""
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=wait, cancel_futures=True)
@@ -0,0 +1,374 @@
+"""Memory-mapped, append-only store of daily closes shared by all worker processes.
+
+File layout (little endian):
+    header   64 bytes   magic, version, max_tickers, ticker_count
+    index    max_tickers x 64-byte entries
+             ticker[16], seq u32, base i32, length i32, capacity i32, data_offset i64
+    blocks   per ticker: closes f64[capacity] followed by flags u8[capacity]
+
+Closes are indexed by session ordinal (see compact_store.session_ordinal) relative
+to the block's base. Blocks are never rewritten in place when they need to grow:
+a larger block is appended at the end of the file and the index entry is switched
+over under a sequence lock, so readers holding views of the old block stay valid.
+
+One process holds an exclusive flock on "<path>.lock" and is the writer; every
+other process maps the file read-only and reads closes through NumPy views.
+"""
+import fcntl
+import logging
+import mmap
+import os
+import struct
+import threading
+from datetime import date as date_module
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+from .compact_store import SESSION_EPOCH, ordinal_bounds
+
+logger = logging.getLogger(__name__)
+
+MAGIC = b"MAG7PRC1"
+VERSION = 1
+HEADER = struct.Struct("<8sIII44x")
+ENTRY = struct.Struct("<16sIiiiq20x")
+HEADER_SIZE = HEADER.size
+ENTRY_SIZE = ENTRY.size
+MIN_CAPACITY = 256
+
+# Per-session flags
+UNKNOWN = 0
+SESSION = 1
+NO_SESSION = 2
+
+# How far back lookup_return walks over non-session days
+MAX_SESSION_GAP = 10
+
+
+def _block_size(capacity: int) -> int:
+    return capacity * 8 + (capacity + 7) // 8 * 8
+
+
+class SharedPriceStore:
+    def __init__(self, path: str, max_tickers: int = 512, writer: Optional[bool] = None):
+        """Open (creating if needed) the store; writer=None takes the writer role if it is free"""
+        self.path = path
+        self._lock = threading.Lock()
+        self._lock_file = None
+        self._slots: Dict[str, int] = {}
+        self._known_count = 0
+
+        self.is_writer = False
+        if writer is not False:
+            self.is_writer = self._acquire_writer_lock()
+            if writer and not self.is_writer:
+                raise RuntimeError(f"Price store {path} already has a writer")
+
+        self._file = None
+        self._mm = None
+        if self.is_writer and not os.path.exists(path):
+            self._initialise(max_tickers)
+        self._open()
+
+    def _acquire_writer_lock(self) -> bool:
+        self._lock_file = open(self.path + ".lock", "a+b")
+        try:
+            fcntl.flock(self._lock_file.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+            return True
+        except OSError:
+            self._lock_file.close()
+            self._lock_file = None
+            return False
+
+    def _initialise(self, max_tickers: int) -> None:
+        """Create an empty store atomically so readers never see a partial header"""
+        tmp_path = f"{self.path}.{os.getpid()}.tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(HEADER.pack(MAGIC, VERSION, max_tickers, 0))
+            f.truncate(HEADER_SIZE + max_tickers * ENTRY_SIZE)
+        os.replace(tmp_path, self.path)
+
+    def _open(self) -> bool:
+        """Open and map the file; readers retry on each access until the writer has created it"""
+        if self._file is None:
+            try:
+                self._file = open(self.path, "r+b" if self.is_writer else "rb")
+            except FileNotFoundError:
+                return False
+            self._remap()
+        return True
+
+    def _remap(self) -> None:
+        """Map the whole file; previous maps stay alive while views reference them"""
+        size = os.fstat(self._file.fileno()).st_size
+        access = mmap.ACCESS_WRITE if self.is_writer else mmap.ACCESS_READ
+        self._mm = mmap.mmap(self._file.fileno(), size, access=access)
+        magic, version, self.max_tickers, _ = HEADER.unpack_from(self._mm, 0)
+        if magic != MAGIC or version != VERSION:
+            raise ValueError(f"{self.path} is not a version {VERSION} price store")
+
+    def _ensure_mapped(self, end: int) -> None:
+        if end > len(self._mm):
+            self._remap()
+
+    def _ticker_count(self) -> int:
+        return HEADER.unpack_from(self._mm, 0)[3]
+
+    def _refresh_slots(self) -> None:
+        count = self._ticker_count()
+        if count == self._known_count:
+            return
+        self._ensure_mapped(HEADER_SIZE + count * ENTRY_SIZE)
+        for i in range(self._known_count, count):
+            name = ENTRY.unpack_from(self._mm, HEADER_SIZE + i * ENTRY_SIZE)[0]
+            self._slots[name.rstrip(b"\0").decode()] = i
+        self._known_count = count
+
+    def _slot(self, ticker: str) -> Optional[int]:
+        slot = self._slots.get(ticker)
+        if slot is None:
+            self._refresh_slots()
+            slot = self._slots.get(ticker)
+        return slot
+
+    def tickers(self) -> List[str]:
+        with self._lock:
+            if not self._open():
+                return []
+            self._refresh_slots()
+            return list(self._slots)
+
+    def _read_entry(self, slot: int) -> Tuple[int, int, int, int]:
+        """Consistent (base, length, capacity, data_offset) snapshot of an index entry"""
+        offset = HEADER_SIZE + slot * ENTRY_SIZE
+        while True:
+            _, seq, base, length, capacity, data_offset = ENTRY.unpack_from(self._mm, offset)
+            if seq % 2 == 0 and ENTRY.unpack_from(self._mm, offset)[1] == seq:
+                return base, length, capacity, data_offset
+
+    def _views(self, data_offset: int, capacity: int) -> Tuple[np.ndarray, np.ndarray]:
+        self._ensure_mapped(data_offset + _block_size(capacity))
+        closes = np.frombuffer(self._mm, dtype="<f8", count=capacity, offset=data_offset)
+        flags = np.frombuffer(self._mm, dtype=np.uint8, count=capacity, offset=data_offset + capacity * 8)
+        return closes, flags
+
+    def series(self, ticker: str) -> Optional[Tuple[int, np.ndarray, np.ndarray]]:
+        """Zero-copy (base_ordinal, closes, flags) views for a ticker, or None"""
+        with self._lock:
+            if not self._open():
+                return None
+            slot = self._slot(ticker)
+            if slot is None:
+                return None
+            base, length, capacity, data_offset = self._read_entry(slot)
+            closes, flags = self._views(data_offset, capacity)
+            return base, closes[:length], flags[:length]
+
+    def lookup_return(self, ticker: str, target_date: str) -> Optional[Dict[str, Any]]:
+        """Daily return payload (same shape as StockDataService) if both sessions are stored"""
+        series = self.series(ticker)
+        if series is None:
+            return None
+        base, closes, flags = series
+
+        # Weekends resolve to the previous business day, like the upstream path
+        ordinal = int(np.busday_count(SESSION_EPOCH, np.busday_offset(target_date, 0, roll="backward")))
+
+        def previous_session(start: int) -> Optional[int]:
+            for candidate in range(start, start - MAX_SESSION_GAP, -1):
+                slot = candidate - base
+                if not 0 <= slot < len(flags) or flags[slot] == UNKNOWN:
+                    return None
+                if flags[slot] == SESSION:
+                    return slot
+            return None
+
+        current = previous_session(ordinal)
+        if current is None:
+            return None
+        previous = previous_session(base + current - 1)
+        if previous is None:
+            return None
+
+        current_price = float(closes[current])
+        previous_price = float(closes[previous])
+        if previous_price == 0:
+            return None
+        return {
+            "ticker": ticker,
+            "date": target_date,
+            "return": round((current_price - previous_price) / previous_price, 6),
+            "price": round(current_price, 2),
+            "previous_price": round(previous_price, 2),
+        }
+
+    def _entry_offset(self, slot: int) -> int:
+        return HEADER_SIZE + slot * ENTRY_SIZE
+
+    def _allocate(self, capacity: int) -> int:
+        data_offset = len(self._mm)
+        os.ftruncate(self._file.fileno(), data_offset + _block_size(capacity))
+        self._remap()
+        return data_offset
+
+    def _publish(self, slot: int, base: int, length: int, capacity: int, data_offset: int) -> None:
+        offset = self._entry_offset(slot)
+        name, seq = ENTRY.unpack_from(self._mm, offset)[:2]
+        struct.pack_into("<I", self._mm, offset + 16, seq + 1)
+        ENTRY.pack_into(self._mm, offset, name, seq + 1, base, length, capacity, data_offset)
+        struct.pack_into("<I", self._mm, offset + 16, seq + 2)
+
+    def _writable_slot(self, ticker: str, lo: int, hi: int) -> Optional[Tuple[int, int, int]]:
+        """Slot, base and capacity of a block covering ordinals [lo, hi), growing it if needed"""
+        slot = self._slot(ticker)
+        if slot is None:
+            count = self._ticker_count()
+            if count >= self.max_tickers:
+                logger.warning("Price store %s is full, not storing %s", self.path, ticker)
+                return None
+            capacity = max(MIN_CAPACITY, hi - lo)
+            data_offset = self._allocate(capacity)
+            offset = self._entry_offset(count)
+            ENTRY.pack_into(self._mm, offset, ticker.encode()[:16], 0, lo, 0, capacity, data_offset)
+            HEADER.pack_into(self._mm, 0, MAGIC, VERSION, self.max_tickers, count + 1)
+            self._slot(ticker)
+            return count, lo, capacity
+
+        base, length, capacity, data_offset = self._read_entry(slot)
+        if base <= lo and hi <= base + capacity:
+            return slot, base, capacity
+
+        # Relocate into a larger block appended at the end of the file
+        new_base = min(base, lo)
+        new_capacity = max(capacity * 2, max(hi, base + length) - new_base)
+        if lo < base:
+            new_base = max(hi, base + length) - new_capacity
+        old_closes, old_flags = self._views(data_offset, capacity)
+        old_closes, old_flags = old_closes[:length].copy(), old_flags[:length].copy()
+        new_offset = self._allocate(new_capacity)
+        closes, flags = self._views(new_offset, new_capacity)
+        shift = base - new_base
+        closes[shift:shift + length] = old_closes
+        flags[shift:shift + length] = old_flags
+        self._publish(slot, new_base, length + shift, new_capacity, new_offset)
+        return slot, new_base, new_capacity
+
+    def write_sessions(self, ticker: str, sessions: Iterable[Tuple[str, float]],
+                       covered_start: str, covered_end: str) -> int:
+        """Record (YYYY-MM-DD, close) pairs; see write_arrays"""
+        pairs = list(sessions)
+        days = np.array([day for day, _ in pairs], dtype="datetime64[D]")
+        closes = np.array([close for _, close in pairs], dtype=np.float64)
+        return self.write_arrays(ticker, days, closes, covered_start, covered_end)
+
+    def write_arrays(self, ticker: str, days: np.ndarray, closes: np.ndarray,
+                     covered_start: str, covered_end: str) -> int:
+        """Record closes for the window [covered_start, covered_end); missing business days become non-sessions.
+
+        Only the writer process may call this. Returns the number of sessions stored.
+        """
+        if not self.is_writer:
+            raise RuntimeError("Price store is read-only in this process")
+
+        days = np.asarray(days, dtype="datetime64[D]")
+        closes = np.asarray(closes, dtype=np.float64)
+        keep = np.is_busday(days) & np.isfinite(closes)
+        ordinals = np.busday_count(SESSION_EPOCH, days[keep]).astype(np.int64)
+        values = closes[keep]
+
+        lo = int(np.busday_count(SESSION_EPOCH, np.busday_offset(covered_start, 0, roll="forward")))
+        hi = int(np.busday_count(SESSION_EPOCH, np.datetime64(covered_end, "D")))
+        if ordinals.size:
+            lo = min(lo, int(ordinals.min()))
+            hi = max(hi, int(ordinals.max()) + 1)
+        if hi <= lo:
+            return 0
+
+        with self._lock:
+            placed = self._writable_slot(ticker, lo, hi)
+            if placed is None:
+                return 0
+            slot, base, capacity = placed
+            _, length, _, data_offset = self._read_entry(slot)
+            closes_view, flags_view = self._views(data_offset, capacity)
+
+            window = slice(lo - base, hi - base)
+            new_flags = flags_view[window].copy()
+            new_flags[new_flags != SESSION] = NO_SESSION
+            new_flags[ordinals - lo] = SESSION
+            # Closes land before their flags so readers never see a flagged but unwritten slot
+            closes_view[ordinals - base] = values
+            flags_view[window] = new_flags
+            if hi - base > length:
+                self._publish(slot, base, hi - base, capacity, data_offset)
+            return int(np.unique(ordinals).size)
+
+    def invalidate(self, ticker: str, start: Optional[str] = None, end: Optional[str] = None) -> int:
+        """Mark days within [start, end] unknown so they are fetched again; returns the sessions dropped.
+
+        Only the writer process may call this.
+        """
+        if not self.is_writer:
+            raise RuntimeError("Price store is read-only in this process")
+        lo, hi = ordinal_bounds(start, end)
+        with self._lock:
+            if not self._open():
+                return 0
+            slot = self._slot(ticker)
+            if slot is None:
+                return 0
+            base, length, capacity, data_offset = self._read_entry(slot)
+            _, flags = self._views(data_offset, capacity)
+            first = 0 if lo is None else max(lo - base, 0)
+            last = length if hi is None else min(hi - base, length)
+            if first >= last:
+                return 0
+            window = flags[first:last]
+            removed = int(np.count_nonzero(window == SESSION))
+            window[:] = UNKNOWN
+            return removed
+
+    def close(self) -> None:
+        self._mm = None
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+        if self._lock_file is not None:
+            self._lock_file.close()
+            self._lock_file = None
+
+
+_store: Optional[SharedPriceStore] = None
+_store_lock = threading.Lock()
+
+
+def get_price_store() -> Optional[SharedPriceStore]:
+    """Process-wide store at $PRICE_STORE_PATH, or None when persistence is disabled"""
+    global _store
+    path = os.getenv("PRICE_STORE_PATH")
+    if not path:
+        return None
+    with _store_lock:
+        if _store is None or _store.path != path:
+            _store = SharedPriceStore(path)
+            logger.info("Opened price store %s (%s)", path, "writer" if _store.is_writer else "reader")
+        return _store
+
+
+def record_history(ticker: str, hist, start_date: str, end_date: str) -> None:
+    """Persist finalised sessions from a tz-naive daily history frame covering [start_date, end_date)"""
+    store = get_price_store()
+    if store is None or not store.is_writer:
+        return
+    # Today's bar is still moving, so only sessions before today are stored
+    cutoff = min(end_date, date_module.today().isoformat())
+    sessions = [
+        (ts.strftime("%Y-%m-%d"), close)
+        for ts, close in zip(hist.index, hist["Close"])
+        if ts.strftime("%Y-%m-%d") < cutoff
+    ]
+    try:
+        store.write_sessions(ticker, sessions, start_date, cutoff)
+    except Exception as e:
+        logger.warning("Could not persist %s sessions to price store: %s", ticker, e)
@@ -0,0 +1,163 @@
+"""On-demand profiling of a live process.
+
+SamplingProfiler records every thread's Python stack at a fixed interval. That
+covers the event loop, the executor workers and background threads alike, and
+nothing has to be instrumented in advance. A profile renders as collapsed stacks
+(one "thread;outer;...;inner count" line per distinct stack, the input of
+flamegraph.pl and speedscope) or as a pstats report, where call counts are
+sample counts and times are estimated from them.
+
+describe_tasks and describe_executor report what is running or waiting right now.
+"""
+import asyncio
+import io
+import pstats
+import re
+import sys
+import threading
+import time
+from collections import Counter, defaultdict
+from concurrent.futures import Executor
+from typing import Any, Dict, List, Optional, Tuple
+
+FORMATS = ("collapsed", "pstats")
+
+# (filename, first line, function name): the key pstats uses for a function
+Function = Tuple[str, int, str]
+
+
+class ProfilerBusy(Exception):
+    """Raised when a profile is requested while another is running"""
+
+
+def _label(function: Function) -> str:
+    filename, line, name = function
+    return f"{name} ({'/'.join(filename.replace(chr(92), '/').split('/')[-2:])}:{line})"
+
+
+def _thread_group(name: str) -> str:
+    # Workers of one pool ("ThreadPoolExecutor-0_3") share a root so their stacks merge
+    return re.sub(r"_\d+$", "", name)
+
+
+class Profile:
+    def __init__(self, stacks: Counter, samples: int, seconds: float):
+        self.stacks = stacks
+        self.samples = samples
+        self.seconds = seconds
+
+    def collapsed(self) -> str:
+        return "".join(f"{';'.join([thread] + [_label(f) for f in stack])} {count}\n"
+                       for (thread, stack), count in sorted(self.stacks.items()))
+
+    def create_stats(self) -> None:
+        """Fill self.stats in the layout pstats.Stats loads (times summed over threads)"""
+        per_sample = self.seconds / self.samples if self.samples else 0.0
+        hits: Counter = Counter()
+        own: Counter = Counter()
+        callers: Dict[Function, Counter] = defaultdict(Counter)
+        for (_, stack), count in self.stacks.items():
+            for depth, function in enumerate(stack):
+                if function not in stack[:depth]:  # recursion counts once per sample
+                    hits[function] += count
+                if depth:
+                    callers[function][stack[depth - 1]] += count
+            if stack:
+                own[stack[-1]] += count
+        self.stats = {
+            function: (count, count, own[function] * per_sample, count * per_sample, dict(callers[function]))
+            for function, count in hits.items()
+        }
+
+    def pstats(self, sort: str = "cumulative", limit: int = 60) -> str:
+        out = io.StringIO()
+        out.write(f"{self.samples} samples over {self.seconds:.2f}s; calls are samples, times are estimates\n")
+        if self.stacks:
+            pstats.Stats(self, stream=out).sort_stats(sort).print_stats(limit)
+        return out.getvalue()
+
+    def render(self, fmt: str) -> str:
+        return self.collapsed() if fmt == "collapsed" else self.pstats()
+
+
+class SamplingProfiler:
+    """Samples the stacks of every thread; one profile runs at a time"""
+
+    def __init__(self, interval: float = 0.005, max_depth: int = 128):
+        self.interval = interval
+        self.max_depth = max_depth
+        self._lock = threading.Lock()
+
+    def run(self, seconds: float, interval: Optional[float] = None) -> Profile:
+        """Sample for the given time on the calling thread (which is left out of the profile)"""
+        if not self._lock.acquire(blocking=False):
+            raise ProfilerBusy("A profile is already running")
+        try:
+            return self._sample(seconds, interval or self.interval)
+        finally:
+            self._lock.release()
+
+    def _sample(self, seconds: float, interval: float) -> Profile:
+        me = threading.get_ident()
+        stacks: Counter = Counter()
+        samples = 0
+        started = time.perf_counter()
+        deadline = started + seconds
+        while True:
+            names = {thread.ident: thread.name for thread in threading.enumerate()}
+            for ident, frame in sys._current_frames().items():
+                if ident == me:
+                    continue
+                stack: List[Function] = []
+                while frame is not None and len(stack) < self.max_depth:
+                    code = frame.f_code
+                    stack.append((code.co_filename, code.co_firstlineno, code.co_name))
+                    frame = frame.f_back
+                stack.reverse()
+                stacks[(_thread_group(names.get(ident, str(ident))), tuple(stack))] += 1
+            samples += 1
+            if time.perf_counter() >= deadline:
+                break
+            time.sleep(interval)
+        return Profile(stacks, samples, time.perf_counter() - started)
+
+
+profiler = SamplingProfiler()
+
+
+def _await_chain(coro: Any, limit: int) -> List[str]:
+    """Frames from the task's coroutine down the chain of awaits it is suspended in"""
+    frames = []
+    while coro is not None and len(frames) < limit:
+        frame = getattr(coro, "cr_frame", None) or getattr(coro, "gi_frame", None)
+        if frame is None:
+            break
+        frames.append(_label((frame.f_code.co_filename, frame.f_lineno, frame.f_code.co_name)))
+        coro = getattr(coro, "cr_await", None) or getattr(coro, "gi_yieldfrom", None)
+    return frames
+
+
+def describe_tasks(limit: int = 32) -> List[Dict[str, Any]]:
+    """Every task of the running loop with the awaits it is suspended in (innermost last)"""
+    tasks = []
+    for task in asyncio.all_tasks():
+        coro = task.get_coro()
+        tasks.append({
+            "name": task.get_name(),
+            "coro": getattr(coro, "__qualname__", repr(coro)),
+            "done": task.done(),
+            "stack": _await_chain(coro, limit),
+        })
+    return sorted(tasks, key=lambda task: task["name"])
+
+
+def describe_executor(executor: Optional[Executor]) -> Optional[Dict[str, Any]]:
+    """Worker count and queued work items of a ThreadPoolExecutor (None if it has not started)"""
+    if executor is None:
+        return None
+    work_queue = getattr(executor, "_work_queue", None)
+    return {
+        "max_workers": getattr(executor, "_max_workers", None),
+        "threads": len(getattr(executor, "_threads", ())),
+        "queued": work_queue.qsize() if work_queue is not None else None,
+    }
@@ -0,0 +1,222 @@
+"""Per-ticker range-aggregate index over daily returns.
+
+Each ticker keeps its returns in session order with prefix sums, prefix sums of
+squares and a sparse table of minima and maxima. Count, mean and standard
+deviation over any [start, end] come from two prefix lookups and min/max from
+two sparse-table lookups, after a binary search for the endpoints: O(log n)
+per query regardless of the span. New sessions are appended in O(log n).
+"""
+import math
+import threading
+import time
+from datetime import date as date_module, datetime, timedelta
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+from .metrics import metrics
+
+# Calendar days fetched before a block so its first session has a previous close
+LOOKBACK_DAYS = 7
+
+
+class _Column:
+    """Growable float64/datetime64 array with amortised O(1) appends"""
+
+    __slots__ = ("data", "size")
+
+    def __init__(self, values: np.ndarray):
+        self.data = np.array(values, copy=True)
+        self.size = len(values)
+
+    def append(self, value: Any) -> None:
+        if self.size == len(self.data):
+            grown = np.empty(max(16, 2 * len(self.data)), dtype=self.data.dtype)
+            grown[:self.size] = self.data[:self.size]
+            self.data = grown
+        self.data[self.size] = value
+        self.size += 1
+
+    def pop(self) -> None:
+        self.size -= 1
+
+    def view(self) -> np.ndarray:
+        return self.data[:self.size]
+
+
+class RangeIndex:
+    """Aggregates over one ticker's (date, return) sessions in ascending date order"""
+
+    def __init__(self, dates: np.ndarray, returns: np.ndarray):
+        dates = np.asarray(dates, dtype="datetime64[D]")
+        returns = np.asarray(returns, dtype=np.float64)
+        if len(dates) > 1 and np.any(np.diff(dates) <= np.timedelta64(0, "D")):
+            raise ValueError("Sessions must be strictly increasing")
+        self._dates = _Column(dates)
+        self._returns = _Column(returns)
+        self._prefix = _Column(np.concatenate([[0.0], np.cumsum(returns)]))
+        self._prefix_sq = _Column(np.concatenate([[0.0], np.cumsum(returns * returns)]))
+        # Level k holds min/max over windows [i, i + 2**k)
+        self._mins: List[_Column] = []
+        self._maxs: List[_Column] = []
+        level_min, level_max, width = returns, returns, 1
+        while width <= len(returns):
+            self._mins.append(_Column(level_min))
+            self._maxs.append(_Column(level_max))
+            level_min = np.minimum(level_min[:-width], level_min[width:])
+            level_max = np.maximum(level_max[:-width], level_max[width:])
+            width *= 2
+
+    def __len__(self) -> int:
+        return self._returns.size
+
+    @property
+    def last_date(self) -> Optional[np.datetime64]:
+        return self._dates.view()[-1] if len(self) else None
+
+    def append(self, day: Any, value: float) -> None:
+        """Add the next session (strictly after the last one)"""
+        day = np.datetime64(day, "D")
+        if len(self) and day <= self.last_date:
+            raise ValueError(f"Session {day} is not after {self.last_date}")
+        self._dates.append(day)
+        self._returns.append(value)
+        self._prefix.append(self._prefix.view()[-1] + value)
+        self._prefix_sq.append(self._prefix_sq.view()[-1] + value * value)
+        n = len(self)
+        if (1 << len(self._mins)) <= n:
+            self._mins.append(_Column(np.empty(0)))
+            self._maxs.append(_Column(np.empty(0)))
+        # Only the window ending at the new session is new on each level
+        self._mins[0].append(value)
+        self._maxs[0].append(value)
+        for k in range(1, len(self._mins)):
+            half = 1 << (k - 1)
+            i = n - (1 << k)
+            self._mins[k].append(min(self._mins[k - 1].data[i], self._mins[k - 1].data[i + half]))
+            self._maxs[k].append(max(self._maxs[k - 1].data[i], self._maxs[k - 1].data[i + half]))
+
+    def replace_last(self, value: float) -> None:
+        """Update the most recent session (e.g. today's return while the market is open)"""
+        day = self.last_date
+        n = len(self)
+        for columns in (self._dates, self._returns, self._prefix, self._prefix_sq):
+            columns.pop()
+        for k in range(len(self._mins)):
+            if n - (1 << k) >= 0:
+                self._mins[k].pop()
+                self._maxs[k].pop()
+        if n == 1 << (len(self._mins) - 1):
+            self._mins.pop()
+            self._maxs.pop()
+        self.append(day, value)
+
+    def query(self, start: Any, end: Any) -> Optional[Dict[str, float]]:
+        """count/min/max/mean/std of returns dated within [start, end], or None if there are none"""
+        dates = self._dates.view()
+        i = int(np.searchsorted(dates, np.datetime64(start, "D"), side="left"))
+        j = int(np.searchsorted(dates, np.datetime64(end, "D"), side="right"))
+        count = j - i
+        if count <= 0:
+            return None
+        total = self._prefix.data[j] - self._prefix.data[i]
+        total_sq = self._prefix_sq.data[j] - self._prefix_sq.data[i]
+        k = count.bit_length() - 1
+        lo = self._mins[k].data
+        hi = self._maxs[k].data
+        mean = total / count
+        variance = max(0.0, (total_sq - total * mean) / (count - 1)) if count > 1 else 0.0
+        return {
+            "count": count,
+            "min": float(min(lo[i], lo[j - (1 << k)])),
+            "max": float(max(hi[i], hi[j - (1 << k)])),
+            "mean": float(mean),
+            "std": math.sqrt(variance),
+        }
+
+
+class RangeIndexService:
+    """Keeps one RangeIndex per ticker, filling and extending it from daily closes"""
+
+    def __init__(self, daily_closes: Callable[[str, str, str], Tuple[np.ndarray, np.ndarray]],
+                 live_ttl_seconds: float = 60.0, today: Callable[[], date_module] = date_module.today,
+                 clock: Callable[[], float] = time.monotonic):
+        self._daily_closes = daily_closes
+        self._live_ttl = live_ttl_seconds
+        self._today = today
+        self._clock = clock
+        self._indexes: Dict[str, RangeIndex] = {}
+        # Calendar span [start, end] each index is known to cover, and when it was last extended
+        self._coverage: Dict[str, Tuple[str, str, float]] = {}
+        self._lock = threading.Lock()
+        self._ticker_locks: Dict[str, threading.Lock] = {}
+
+    def _ticker_lock(self, ticker: str) -> threading.Lock:
+        with self._lock:
+            return self._ticker_locks.setdefault(ticker, threading.Lock())
+
+    def _load(self, ticker: str, start: str, end: str) -> Tuple[np.ndarray, np.ndarray]:
+        """Sessions and returns dated within [start, end]"""
+        lookback = (datetime.strptime(start, "%Y-%m-%d") - timedelta(days=LOOKBACK_DAYS)).strftime("%Y-%m-%d")
+        dates, closes = self._daily_closes(ticker, lookback, end)
+        if len(closes) < 2:
+            return np.array([], dtype="datetime64[D]"), np.array([], dtype=np.float64)
+        returns = np.diff(closes) / closes[:-1]
+        dates = np.asarray(dates[1:], dtype="datetime64[D]")
+        keep = (dates >= np.datetime64(start)) & (dates <= np.datetime64(end))
+        return dates[keep], returns[keep]
+
+    def _ensure(self, ticker: str, start: str, end: str) -> RangeIndex:
+        today = self._today().isoformat()
+        index = self._indexes.get(ticker)
+        coverage = self._coverage.get(ticker)
+        if index is not None and coverage is not None:
+            covered_start, covered_end, refreshed = coverage
+            live_expired = end >= today and covered_end >= today and self._clock() - refreshed >= self._live_ttl
+            if start >= covered_start and end <= covered_end and not live_expired:
+                return index
+            if start >= covered_start:
+                # Extend to the right; the last covered day is re-read in case it was still live
+                dates, returns = self._load(ticker, covered_end, max(end, covered_end))
+                for day, value in zip(dates, returns):
+                    if index.last_date is not None and day == index.last_date:
+                        index.replace_last(float(value))
+                    elif index.last_date is None or day > index.last_date:
+                        index.append(day, float(value))
+                self._coverage[ticker] = (covered_start, max(end, covered_end), self._clock())
+                metrics.inc("range_index_updates_total", kind="extend")
+                return index
+            end = max(end, covered_end)
+
+        dates, returns = self._load(ticker, start, end)
+        index = RangeIndex(dates, returns)
+        self._indexes[ticker] = index
+        self._coverage[ticker] = (start, end, self._clock())
+        metrics.inc("range_index_updates_total", kind="build")
+        return index
+
+    def summary(self, ticker: str, start: str, end: str) -> Optional[Dict[str, float]]:
+        # Per-ticker lock: one ticker's upstream fill does not hold up queries for others
+        with self._ticker_lock(ticker):
+            return self._ensure(ticker, start, end).query(start, end)
+
+    def invalidate(self, tickers: Optional[Iterable[str]] = None,
+                   start: Optional[str] = None, end: Optional[str] = None) -> int:
+        """Drop the indexes of tickers (all when None) covering closes within [start, end]; rebuilt on next query"""
+        with self._lock:
+            selected = list(self._indexes) if tickers is None else list(tickers)
+        removed = 0
+        for ticker in selected:
+            # Waits out an in-flight fill so it cannot reinstate the dropped index
+            with self._ticker_lock(ticker):
+                coverage = self._coverage.get(ticker)
+                if coverage is None:
+                    continue
+                covered_start, covered_end, _ = coverage
+                lookback = (datetime.strptime(covered_start, "%Y-%m-%d")
+                            - timedelta(days=LOOKBACK_DAYS)).strftime("%Y-%m-%d")
+                if (start is None or covered_end >= start) and (end is None or lookback <= end):
+                    self._indexes.pop(ticker, None)
+                    self._coverage.pop(ticker, None)
+                    removed += 1
+        return removed
@@ -0,0 +1,35 @@
+"""Cross-sectional ranking of a ticker universe, session by session.
+
+Each row of the aligned (sessions, tickers) returns panel is one cross-section.
+A stable argsort of every row at once orders the tickers best to worst, and
+scattering the positions back gives each ticker's rank. Percentiles, the mean
+and the dispersion (cross-sectional standard deviation) are all column-wise
+reductions over the same panel, so ten years of sessions cost a few sorts.
+"""
+from typing import Dict
+
+import numpy as np
+
+
+def cross_section(returns: np.ndarray) -> Dict[str, np.ndarray]:
+    """Per-session ranks and statistics of a (sessions, tickers) return panel
+
+    - order: column indices from best to worst return (ties keep column order)
+    - rank: 1 for the best return of the session, n for the worst
+    - percentile: share of the other tickers beaten, 1.0 for the best and 0.0 for the worst
+    - mean / dispersion: cross-sectional mean and sample standard deviation
+    """
+    sessions, tickers = returns.shape
+    order = np.argsort(-returns, axis=1, kind="stable")
+    rank = np.empty((sessions, tickers), dtype=np.int64)
+    np.put_along_axis(rank, order, np.arange(1, tickers + 1)[None, :], axis=1)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        percentile = (tickers - rank) / (tickers - 1) if tickers > 1 else np.full((sessions, tickers), np.nan)
+        dispersion = returns.std(axis=1, ddof=1) if tickers > 1 else np.full(sessions, np.nan)
+    return {
+        "order": order,
+        "rank": rank,
+        "percentile": percentile,
+        "mean": returns.mean(axis=1) if tickers else np.full(sessions, np.nan),
+        "dispersion": dispersion,
+    }
@@ -0,0 +1,55 @@
+"""Returns relative to a benchmark index (QQQ, SPY, ...): excess return, beta and alpha.
+
+Every ticker is regressed on the benchmark's daily returns over the same aligned
+sessions, all tickers at once. Full-period beta is the covariance over the variance
+of the centred panel. Rolling beta and alpha come from windowed sums of x, y, xy and
+x² taken as differences of cumulative sums, so every window costs O(1) whatever
+its length.
+"""
+import os
+from typing import Dict
+
+import numpy as np
+
+DEFAULT_BENCHMARK = os.getenv("BENCHMARK_TICKER", "QQQ")
+SESSIONS_PER_YEAR = 252
+
+
+def relative_metrics(returns: np.ndarray, benchmark: np.ndarray, window: int) -> Dict[str, np.ndarray]:
+    """Regression of each column of a (sessions, tickers) panel on the benchmark's returns
+
+    Rolling arrays have one row per session; rows before the first full window are NaN.
+    """
+    sessions, tickers = returns.shape
+    with np.errstate(divide="ignore", invalid="ignore"):
+        x = benchmark - benchmark.mean() if sessions else benchmark
+        y = returns - returns.mean(axis=0) if sessions else returns
+        variance = x @ x
+        beta = (x @ y) / variance
+        alpha = (returns.mean(axis=0) - beta * benchmark.mean()) if sessions else np.full(tickers, np.nan)
+        correlation = (x @ y) / np.sqrt(variance * np.einsum("ij,ij->j", y, y))
+
+        rolling_beta = np.full((sessions, tickers), np.nan)
+        rolling_alpha = np.full((sessions, tickers), np.nan)
+        if sessions >= window:
+            def windowed(values: np.ndarray) -> np.ndarray:
+                total = np.concatenate([np.zeros((1,) + values.shape[1:]), np.cumsum(values, axis=0)])
+                return total[window:] - total[:-window]
+
+            sx = windowed(benchmark)[:, None]
+            sxx = windowed(benchmark ** 2)[:, None]
+            sy = windowed(returns)
+            sxy = windowed(returns * benchmark[:, None])
+            rolling_beta[window - 1:] = (window * sxy - sx * sy) / (window * sxx - sx ** 2)
+            rolling_alpha[window - 1:] = (sy - rolling_beta[window - 1:] * sx) / window
+
+    return {
+        "beta": beta,
+        "alpha": alpha,
+        "correlation": correlation,
+        "excess": returns - benchmark[:, None],
+        "total_return": np.prod(1.0 + returns, axis=0) - 1.0,
+        "benchmark_total_return": np.prod(1.0 + benchmark) - 1.0,
+        "rolling_beta": rolling_beta,
+        "rolling_alpha": rolling_alpha,
+    }
@@ -0,0 +1,236 @@
+"""Protection for upstream provider calls: token-bucket rate limiting,
+bounded retries with exponential backoff and full jitter, and a circuit breaker.
+"""
+import logging
+import os
+import random
+import threading
+import time
+from typing import Any, Callable, Optional
+
+from .metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+CLOSED = "closed"
+HALF_OPEN = "half_open"
+OPEN = "open"
+_STATE_VALUES = {CLOSED: 0, HALF_OPEN: 1, OPEN: 2}
+
+# Exception class names (anywhere in the MRO) that indicate a transient upstream problem
+RETRYABLE_NAMES = {"YFRateLimitError", "ConnectionError", "Timeout", "ReadTimeout", "ConnectTimeout"}
+
+
+class RateLimitedError(Exception):
+    """Upstream answered with HTTP 429"""
+
+
+class UpstreamUnavailableError(Exception):
+    """Upstream could not be reached after retries, or the breaker is open"""
+
+    def __init__(self, message: str, retry_after: float = 1.0):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+class CircuitOpenError(UpstreamUnavailableError):
+    pass
+
+
+def is_retryable(exc: BaseException) -> bool:
+    if isinstance(exc, (RateLimitedError, ConnectionError, TimeoutError)):
+        return True
+    return any(cls.__name__ in RETRYABLE_NAMES for cls in type(exc).__mro__)
+
+
+class TokenBucket:
+    def __init__(self, rate: float, capacity: float, name: str = "upstream",
+                 clock: Callable[[], float] = time.monotonic, sleep: Callable[[float], None] = time.sleep):
+        self.rate = rate
+        self.capacity = capacity
+        self.name = name
+        self._tokens = capacity
+        self._updated = clock()
+        self._clock = clock
+        self._sleep = sleep
+        self._lock = threading.Lock()
+
+    def _refill(self) -> None:
+        now = self._clock()
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def try_acquire(self) -> float:
+        """Take a token if available; otherwise return the seconds until one will be"""
+        with self._lock:
+            self._refill()
+            metrics.set_gauge("upstream_tokens_available", round(self._tokens, 3), provider=self.name)
+            if self._tokens >= 1:
+                self._tokens -= 1
+                return 0.0
+            return (1 - self._tokens) / self.rate
+
+    def acquire(self, timeout: Optional[float] = None) -> bool:
+        """Block until a token is available or timeout elapses"""
+        deadline = None if timeout is None else self._clock() + timeout
+        waited = False
+        while True:
+            wait = self.try_acquire()
+            if wait == 0:
+                return True
+            if not waited:
+                metrics.inc("upstream_rate_limited_waits_total", provider=self.name)
+                waited = True
+            if deadline is not None and self._clock() + wait > deadline:
+                return False
+            self._sleep(wait)
+
+
+class CircuitBreaker:
+    def __init__(self, failure_threshold: int = 5, reset_timeout: float = 30.0, name: str = "upstream",
+                 clock: Callable[[], float] = time.monotonic):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.name = name
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._failures = 0
+        self._opened_at = 0.0
+        self._trial_in_flight = False
+        self._set_state(CLOSED)
+
+    def _set_state(self, state: str) -> None:
+        self._state = state
+        metrics.set_gauge("upstream_circuit_state", _STATE_VALUES[state], provider=self.name)
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            if self._state == OPEN and self._clock() - self._opened_at >= self.reset_timeout:
+                return HALF_OPEN
+            return self._state
+
+    def retry_after(self) -> float:
+        with self._lock:
+            return max(0.0, self.reset_timeout - (self._clock() - self._opened_at))
+
+    def allow(self) -> bool:
+        """Whether a call may go upstream; in half-open state only one trial call is let through"""
+        with self._lock:
+            if self._state == OPEN:
+                if self._clock() - self._opened_at < self.reset_timeout:
+                    return False
+                self._set_state(HALF_OPEN)
+            if self._state == HALF_OPEN:
+                if self._trial_in_flight:
+                    return False
+                self._trial_in_flight = True
+            return True
+
+    def release(self) -> None:
+        """Finish a call without judging upstream health (frees a half-open trial slot)"""
+        with self._lock:
+            self._trial_in_flight = False
+
+    def record_success(self) -> None:
+        with self._lock:
+            self._failures = 0
+            self._trial_in_flight = False
+            if self._state != CLOSED:
+                logger.info("Circuit %s closed", self.name)
+                self._set_state(CLOSED)
+
+    def record_failure(self) -> None:
+        with self._lock:
+            self._failures += 1
+            self._trial_in_flight = False
+            if self._state == HALF_OPEN or self._failures >= self.failure_threshold:
+                if self._state != OPEN:
+                    logger.warning("Circuit %s opened after %d failures", self.name, self._failures)
+                    metrics.inc("upstream_circuit_opened_total", provider=self.name)
+                self._opened_at = self._clock()
+                self._set_state(OPEN)
+
+
+class UpstreamGuard:
+    """Runs provider calls through the rate limiter, retry policy and circuit breaker"""
+
+    def __init__(self, bucket: TokenBucket, breaker: CircuitBreaker, max_attempts: int = 3,
+                 backoff_base: float = 0.25, backoff_max: float = 4.0, acquire_timeout: float = 10.0,
+                 name: str = "upstream", sleep: Callable[[float], None] = time.sleep,
+                 rng: Optional[random.Random] = None):
+        self.bucket = bucket
+        self.breaker = breaker
+        self.max_attempts = max_attempts
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.acquire_timeout = acquire_timeout
+        self.name = name
+        self._sleep = sleep
+        self._rng = rng or random.Random()
+
+    def backoff(self, attempt: int) -> float:
+        """Full-jitter exponential backoff for the given (0-based) retry"""
+        return self._rng.uniform(0, min(self.backoff_max, self.backoff_base * 2 ** attempt))
+
+    def _reject(self) -> None:
+        metrics.inc("upstream_calls_total", provider=self.name, outcome="rejected")
+        raise CircuitOpenError("Upstream circuit is open", retry_after=max(1.0, self.breaker.retry_after()))
+
+    def call(self, fn: Callable[..., Any], *args: Any, **kwargs: Any) -> Any:
+        for attempt in range(self.max_attempts):
+            # Fail fast without queueing for a token while the breaker is open
+            if self.breaker.state == OPEN:
+                self._reject()
+            if not self.bucket.acquire(timeout=self.acquire_timeout):
+                metrics.inc("upstream_calls_total", provider=self.name, outcome="throttled")
+                raise UpstreamUnavailableError("Upstream rate limit budget exhausted", retry_after=1.0)
+            if not self.breaker.allow():
+                self._reject()
+            try:
+                result = fn(*args, **kwargs)
+            except Exception as e:
+                if not is_retryable(e):
+                    # A bad ticker or malformed response says nothing about upstream health
+                    self.breaker.release()
+                    metrics.inc("upstream_calls_total", provider=self.name, outcome="error")
+                    raise
+                self.breaker.record_failure()
+                metrics.inc("upstream_calls_total", provider=self.name, outcome="failure")
+                if attempt + 1 >= self.max_attempts or self.breaker.state == OPEN:
+                    raise UpstreamUnavailableError(
+                        f"Upstream unavailable after {attempt + 1} attempts: {e}",
+                        retry_after=max(1.0, self.breaker.retry_after()),
+                    ) from e
+                delay = self.backoff(attempt)
+                metrics.inc("upstream_retries_total", provider=self.name)
+                logger.info("Retrying %s call in %.2fs after %s", self.name, delay, e)
+                self._sleep(delay)
+                continue
+            self.breaker.record_success()
+            metrics.inc("upstream_calls_total", provider=self.name, outcome="success")
+            return result
+        raise AssertionError("unreachable")
+
+
+def create_guard(name: str = "upstream") -> UpstreamGuard:
+    """Guard configured from UPSTREAM_* environment variables"""
+    bucket = TokenBucket(
+        rate=float(os.getenv("UPSTREAM_RATE_PER_SEC", "8")),
+        capacity=float(os.getenv("UPSTREAM_BURST", "16")),
+        name=name,
+    )
+    breaker = CircuitBreaker(
+        failure_threshold=int(os.getenv("UPSTREAM_BREAKER_THRESHOLD", "5")),
+        reset_timeout=float(os.getenv("UPSTREAM_BREAKER_RESET_SECONDS", "30")),
+        name=name,
+    )
+    return UpstreamGuard(
+        bucket,
+        breaker,
+        max_attempts=int(os.getenv("UPSTREAM_MAX_ATTEMPTS", "3")),
+        backoff_base=float(os.getenv("UPSTREAM_BACKOFF_BASE_SECONDS", "0.25")),
+        backoff_max=float(os.getenv("UPSTREAM_BACKOFF_MAX_SECONDS", "4")),
+        acquire_timeout=float(os.getenv("UPSTREAM_ACQUIRE_TIMEOUT_SECONDS", "10")),
+        name=name,
+    )
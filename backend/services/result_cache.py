@@ -0,0 +1,203 @@
+"""Byte-budgeted caches with eviction metrics, and the query-result tier.
+
+Entries are charged their approximate deep size (payload_size), so a budget
+holds many small point returns or a few large range results without either
+evicting the other early. Evictions are counted per cache as
+cache_evictions_total{cache, reason=size|expired}.
+
+ResultCache holds whole query results (return series, summaries, correlation
+matrices) keyed by normalised parameters. Each result records the tickers and
+date span it was computed from, so targeted invalidation can find it. Results
+whose range reaches today expire after a short live TTL.
+"""
+import os
+import sys
+import threading
+import time
+from datetime import date as date_module
+from typing import Any, Callable, Dict, Hashable, Iterable, NamedTuple, Optional, Set, Tuple
+
+from cachetools import Cache, TLRUCache, TTLCache
+
+from .metrics import metrics
+
+
+def payload_size(obj: Any) -> int:
+    """Approximate deep size in bytes of a JSON-like payload (dicts, lists, tuples, scalars, arrays)"""
+    nbytes = getattr(obj, "nbytes", None)
+    if nbytes is not None:  # NumPy arrays
+        return int(nbytes) + 112
+    size = sys.getsizeof(obj)
+    if isinstance(obj, dict):
+        size += sum(payload_size(k) + payload_size(v) for k, v in obj.items())
+    elif isinstance(obj, (list, tuple)):
+        size += sum(payload_size(v) for v in obj)
+    return size
+
+
+class _Metered:
+    """Counts size evictions (popitem) and TTL expiries on a cachetools cache"""
+
+    def __init__(self, cache_name: str, *args: Any, **kwargs: Any):
+        super().__init__(*args, **kwargs)
+        self.cache_name = cache_name
+
+    def popitem(self):
+        item = super().popitem()
+        metrics.inc("cache_evictions_total", cache=self.cache_name, reason="size")
+        return item
+
+    def expire(self, time=None):
+        # Raw counts: len() on TTL caches would call expire() again
+        before = Cache.__len__(self)
+        super().expire(time)
+        expired = before - Cache.__len__(self)
+        if expired:
+            metrics.inc("cache_evictions_total", expired, cache=self.cache_name, reason="expired")
+
+
+class MeteredTTLCache(_Metered, TTLCache):
+    pass
+
+
+class MeteredTLRUCache(_Metered, TLRUCache):
+    pass
+
+
+class TickerIndex:
+    """ticker -> cache keys, so invalidation looks keys up instead of scanning the cache
+
+    Evictions do not report back, so dead keys linger until the owner rebuilds the
+    index from its live keys, which add() asks for once it has doubled since.
+    """
+
+    def __init__(self):
+        self._keys: Dict[str, Set[Hashable]] = {}
+        self._size = 0
+        self._limit = 64
+
+    def add(self, ticker: str, key: Hashable) -> bool:
+        """Index key under ticker; True when the index is due a rebuild"""
+        keys = self._keys.setdefault(ticker, set())
+        if key not in keys:
+            keys.add(key)
+            self._size += 1
+        return self._size > self._limit
+
+    def discard(self, ticker: str, key: Hashable) -> None:
+        keys = self._keys.get(ticker)
+        if keys is not None and key in keys:
+            keys.discard(key)
+            self._size -= 1
+            if not keys:
+                del self._keys[ticker]
+
+    def keys(self, tickers: Iterable[str]) -> Set[Hashable]:
+        return set().union(*(self._keys.get(ticker, ()) for ticker in tickers))
+
+    def rebuild(self, entries: Iterable[Tuple[Iterable[str], Hashable]]) -> None:
+        """Replace the index with (tickers, key) for every live key"""
+        self.clear()
+        for tickers, key in entries:
+            for ticker in tickers:
+                self.add(ticker, key)
+        self._limit = 2 * self._size + 64
+
+    def clear(self) -> None:
+        self._keys = {}
+        self._size = 0
+        self._limit = 64
+
+
+def query_key(kind: str, **params: Any) -> Tuple:
+    """Hashable key from normalised parameters; list values become tuples"""
+    return (kind,) + tuple(sorted((name, tuple(value) if isinstance(value, list) else value)
+                                  for name, value in params.items()))
+
+
+class _Result(NamedTuple):
+    value: Any
+    tickers: frozenset
+    start: Optional[str]  # first date whose close the result depends on
+    end: Optional[str]
+    size: int
+    ttl: float
+
+
+class ResultCache:
+    def __init__(self, max_bytes: int = 32 * 1024 * 1024, ttl_seconds: float = 3600, live_ttl_seconds: float = 60,
+                 name: str = "queries", timer: Callable[[], float] = time.monotonic,
+                 today: Callable[[], date_module] = date_module.today):
+        self.name = name
+        self.max_bytes = max_bytes
+        self._ttl = ttl_seconds
+        self._live_ttl = live_ttl_seconds
+        self._today = today
+        self._cache = MeteredTLRUCache(name, maxsize=max_bytes, ttu=lambda key, result, now: now + result.ttl,
+                                       timer=timer, getsizeof=lambda result: result.size)
+        self._by_ticker = TickerIndex()
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._cache)
+
+    def memory_usage(self) -> int:
+        with self._lock:
+            return int(self._cache.currsize)
+
+    def get(self, key: Tuple) -> Optional[Any]:
+        with self._lock:
+            result = self._cache.get(key)
+        metrics.inc("query_cache_total", kind=key[0], outcome="hit" if result is not None else "miss")
+        return result.value if result is not None else None
+
+    def set(self, key: Tuple, value: Any, tickers: Iterable[str],
+            start: Optional[str] = None, end: Optional[str] = None) -> bool:
+        """Store a result computed from closes of tickers over [start, end]; False if it exceeds the budget"""
+        size = payload_size(value) + payload_size(key)
+        if size > self.max_bytes:
+            metrics.inc("cache_rejections_total", cache=self.name)
+            return False
+        live = end is None or end >= self._today().isoformat()
+        result = _Result(value, frozenset(tickers), start, end, size, self._live_ttl if live else self._ttl)
+        with self._lock:
+            self._cache[key] = result
+            due = False
+            for ticker in result.tickers:
+                due |= self._by_ticker.add(ticker, key)
+            if due:
+                self._by_ticker.rebuild((result.tickers, key) for key, result in self._cache.items())
+        return True
+
+    def invalidate(self, tickers: Optional[Iterable[str]] = None,
+                   start: Optional[str] = None, end: Optional[str] = None) -> int:
+        """Drop results that depend on any of the tickers (all when None) over dates in [start, end]"""
+        wanted = None if tickers is None else set(tickers)
+        removed = 0
+        with self._lock:
+            keys = list(self._cache.keys()) if wanted is None else self._by_ticker.keys(wanted)
+            for key in keys:
+                result = self._cache.get(key)
+                if result is None:
+                    for ticker in wanted or ():
+                        self._by_ticker.discard(ticker, key)
+                    continue
+                if start is not None and result.end is not None and result.end < start:
+                    continue
+                if end is not None and result.start is not None and result.start > end:
+                    continue
+                del self._cache[key]
+                for ticker in result.tickers:
+                    self._by_ticker.discard(ticker, key)
+                removed += 1
+        return removed
+
+    def clear(self) -> None:
+        with self._lock:
+            self._cache.clear()
+            self._by_ticker.clear()
+
+
+# Process-wide query-result tier; QUERY_CACHE_BYTES sets its budget
+query_cache = ResultCache(max_bytes=int(os.getenv("QUERY_CACHE_BYTES", str(32 * 1024 * 1024))))
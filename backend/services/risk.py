@@ -0,0 +1,65 @@
+"""Drawdown and tail-risk metrics of daily return series.
+
+Every metric comes from one vectorized pass over the (sessions, series) returns:
+wealth is their cumulative product, the running peak comes from
+np.maximum.accumulate, and drawdowns, underwater spells, downside deviation and
+historical VaR/CVaR are all read off those arrays. A whole panel of tickers
+costs about the same as a single one.
+"""
+from typing import Any, Dict, List
+
+import numpy as np
+
+VAR_LEVEL = 0.95
+
+
+def risk_metrics(dates: np.ndarray, returns: np.ndarray, var_level: float = VAR_LEVEL,
+                 target: float = 0.0) -> List[Dict[str, Any]]:
+    """Risk metrics for each column of a (sessions, series) return panel (a 1-D series is one column)
+
+    - max_drawdown: largest peak-to-trough fall in wealth, as a negative fraction
+    - drawdown_peak / drawdown_trough: the sessions that fall ran between
+    - max_drawdown_duration: longest run of sessions spent below a previous peak
+    - downside_deviation: root mean square of daily shortfalls below target
+    - var / cvar: historical one-day loss not exceeded at var_level, and the mean loss beyond it
+    """
+    panel = returns if returns.ndim == 2 else returns[:, None]
+    sessions, columns = panel.shape
+    if sessions == 0:
+        return [{"sessions": 0, "max_drawdown": None, "drawdown_peak": None, "drawdown_trough": None,
+                 "max_drawdown_duration": None, "downside_deviation": None, "var": None, "cvar": None,
+                 "var_level": var_level} for _ in range(columns)]
+
+    # Row 0 is the wealth at the close before the first session
+    wealth = np.vstack([np.ones((1, columns)), np.cumprod(1.0 + panel, axis=0)])
+    peak = np.maximum.accumulate(wealth, axis=0)
+    drawdown = wealth / peak - 1.0
+    trough = np.argmin(drawdown, axis=0)
+    steps = np.arange(sessions + 1)[:, None]
+    # Index of the latest peak at every row; the distance to it is the time spent underwater
+    last_peak = np.maximum.accumulate(np.where(drawdown >= 0.0, steps, 0), axis=0)
+    underwater = steps - last_peak
+    peak_at_trough = last_peak[trough, np.arange(columns)]
+
+    shortfall = np.minimum(panel - target, 0.0)
+    downside = np.sqrt(np.mean(shortfall ** 2, axis=0))
+    cutoff = np.quantile(panel, 1.0 - var_level, axis=0)
+    tail = panel <= cutoff
+    cvar = -np.sum(np.where(tail, panel, 0.0), axis=0) / tail.sum(axis=0)
+
+    days = dates.astype(str)
+    # A peak at row 0 is the close before the range; report the first session instead
+    return [
+        {
+            "sessions": sessions,
+            "max_drawdown": round(float(drawdown[trough[c], c]), 6),
+            "drawdown_peak": days[max(peak_at_trough[c] - 1, 0)] if trough[c] else None,
+            "drawdown_trough": days[trough[c] - 1] if trough[c] else None,
+            "max_drawdown_duration": int(underwater[:, c].max()),
+            "downside_deviation": round(float(downside[c]), 6),
+            "var": round(float(-cutoff[c]), 6),
+            "cvar": round(float(cvar[c]), 6),
+            "var_level": var_level,
+        }
+        for c in range(columns)
+    ]
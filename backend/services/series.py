@@ -0,0 +1,155 @@
+"""Daily return series over a date range, optionally downsampled for charts.
+
+Closes come from the shared price store when it covers the whole range, otherwise
+from a single upstream range fetch (which is then persisted to the store).
+Results are cached in the query-result tier per (ticker, range, max_points, method),
+aligned multi-ticker return panels per (tickers, range), and the closes they are
+built from per (ticker, range), so one ticker (e.g. a benchmark index) fetched for
+a range is shared by every panel that includes it.
+"""
+from datetime import date as date_module, datetime, timedelta
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from .compact_store import SESSION_EPOCH
+from .downsample import downsample_indices
+from .metrics import metrics
+from .price_store import UNKNOWN, SESSION, get_price_store, record_history
+from .result_cache import ResultCache, query_key
+
+# Calendar days fetched before start_date so the first session has a previous close
+LOOKBACK_DAYS = 7
+
+
+def _ordinal(day: np.datetime64, roll: str) -> int:
+    return int(np.busday_count(SESSION_EPOCH, np.busday_offset(day, 0, roll=roll)))
+
+
+class SeriesService:
+    def __init__(self, fetch_history: Callable[..., Any], cache: Optional[ResultCache] = None,
+                 owner_closes: Optional[Callable[[str, str, str], Optional[Tuple[np.ndarray, np.ndarray]]]] = None):
+        """owner_closes, in cluster mode, loads closes from the node that owns a ticker (None: load here)"""
+        self._fetch_history = fetch_history
+        self._cache = cache if cache is not None else ResultCache(name="series")
+        self._owner_closes = owner_closes
+
+    def _stored_closes(self, ticker: str, start: str, end: str) -> Optional[Tuple[np.ndarray, np.ndarray]]:
+        """(dates, closes) from the price store if every session in [start, end] is known"""
+        store = get_price_store()
+        if store is None or end >= date_module.today().isoformat():
+            return None
+        series = store.series(ticker)
+        if series is None:
+            return None
+        base, closes, flags = series
+        lo = _ordinal(np.datetime64(start), "forward") - base
+        hi = _ordinal(np.datetime64(end), "backward") - base
+        if lo < 0 or hi >= len(flags) or lo > hi:
+            return None
+        window = flags[lo:hi + 1]
+        if np.any(window == UNKNOWN):
+            return None
+        sessions = np.flatnonzero(window == SESSION)
+        dates = np.busday_offset(SESSION_EPOCH, base + lo + sessions, roll="forward")
+        return dates, np.array(closes[lo:hi + 1][sessions], dtype=np.float64)
+
+    def daily_closes(self, ticker: str, start: str, end: str) -> Tuple[np.ndarray, np.ndarray]:
+        """Session dates (datetime64[D]) and closes for [start, end]"""
+        return self._closes(ticker, start, end, route=True)
+
+    def local_closes(self, ticker: str, start: str, end: str) -> Tuple[np.ndarray, np.ndarray]:
+        """daily_closes from this node's store or upstream, never from another cluster node"""
+        return self._closes(ticker, start, end, route=False)
+
+    def _closes(self, ticker: str, start: str, end: str, route: bool) -> Tuple[np.ndarray, np.ndarray]:
+        stored = self._stored_closes(ticker, start, end)
+        if stored is not None:
+            metrics.inc("series_source_total", source="price_store")
+            return stored
+
+        if route and self._owner_closes is not None:
+            owned = self._owner_closes(ticker, start, end)
+            if owned is not None:
+                metrics.inc("series_source_total", source="cluster")
+                return owned
+
+        metrics.inc("series_source_total", source="upstream")
+        fetch_end = (datetime.strptime(end, "%Y-%m-%d") + timedelta(days=1)).strftime("%Y-%m-%d")
+        hist = self._fetch_history(ticker, start, fetch_end)
+        if hist.empty:
+            return np.array([], dtype="datetime64[D]"), np.array([], dtype=np.float64)
+        hist.index = hist.index.tz_localize(None)
+        record_history(ticker, hist, start, fetch_end)
+        dates = hist.index.values.astype("datetime64[D]")
+        return dates, hist["Close"].to_numpy(dtype=np.float64)
+
+    def cached_closes(self, ticker: str, start: str, end: str, local: bool = False) -> Tuple[np.ndarray, np.ndarray]:
+        """daily_closes (local_closes if local) through the query-result cache; the arrays are read-only"""
+        key = query_key("closes", ticker=ticker, start=start, end=end)
+        cached = self._cache.get(key)
+        if cached is not None:
+            return cached
+        closes = self.local_closes(ticker, start, end) if local else self.daily_closes(ticker, start, end)
+        for array in closes:
+            array.setflags(write=False)
+        self._cache.set(key, closes, [ticker], start, end)
+        return closes
+
+    def returns_panel(self, tickers: List[str], start_date: str, end_date: str) -> Tuple[np.ndarray, np.ndarray]:
+        """Sessions in [start_date, end_date] traded by every ticker, and their returns as (sessions, tickers)
+
+        Cached panels are shared between callers, so the arrays are read-only.
+        """
+        key = query_key("panel", tickers=tickers, start=start_date, end=end_date)
+        cached = self._cache.get(key)
+        if cached is not None:
+            return cached
+
+        lookback = (datetime.strptime(start_date, "%Y-%m-%d") - timedelta(days=LOOKBACK_DAYS)).strftime("%Y-%m-%d")
+        series = [self.cached_closes(ticker, lookback, end_date) for ticker in tickers]
+        common = series[0][0] if series else np.array([], dtype="datetime64[D]")
+        for dates, _ in series[1:]:
+            common = np.intersect1d(common, dates)
+        if len(common) < 2:
+            return np.array([], dtype="datetime64[D]"), np.empty((0, len(tickers)))
+        closes = np.column_stack([closes[np.searchsorted(dates, common)] for dates, closes in series])
+        returns = np.diff(closes, axis=0) / closes[:-1]
+        keep = common[1:] >= np.datetime64(start_date)
+        panel = common[1:][keep], returns[keep]
+        for array in panel:
+            array.setflags(write=False)
+        self._cache.set(key, panel, tickers, lookback, end_date)
+        return panel
+
+    def returns_series(self, ticker: str, start_date: str, end_date: str,
+                       max_points: Optional[int] = None, method: str = "lttb") -> Dict[str, Any]:
+        key = query_key("series", ticker=ticker, start=start_date, end=end_date, max_points=max_points, method=method)
+        cached = self._cache.get(key)
+        if cached is not None:
+            return cached
+
+        lookback = (datetime.strptime(start_date, "%Y-%m-%d") - timedelta(days=LOOKBACK_DAYS)).strftime("%Y-%m-%d")
+        dates, closes = self.cached_closes(ticker, lookback, end_date)
+        returns = np.diff(closes) / closes[:-1] if len(closes) > 1 else np.array([], dtype=np.float64)
+        dates, prices = dates[1:], closes[1:]
+        in_range = dates >= np.datetime64(start_date)
+        dates, prices, returns = dates[in_range], prices[in_range], returns[in_range]
+
+        total = len(dates)
+        if max_points is not None and total > max_points:
+            keep = downsample_indices(returns, max_points, method)
+            dates, prices, returns = dates[keep], prices[keep], returns[keep]
+
+        result = {
+            "ticker": ticker,
+            "start_date": start_date,
+            "end_date": end_date,
+            "total_points": total,
+            "method": method if max_points is not None and total > max_points else None,
+            "dates": dates.astype(str).tolist(),
+            "prices": np.round(prices, 2).tolist(),
+            "returns": np.round(returns, 6).tolist(),
+        }
+        self._cache.set(key, result, [ticker], lookback, end_date)
+        return result
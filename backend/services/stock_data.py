@@ -1,40 +1,126 @@
-import yfinance as yf
 from datetime import datetime, timedelta
 from typing import Dict, List, Any, Set, Tuple
 import logging
 import os
+import tempfile
+import threading
 from .cache import cache_instance
-
-yf.set_tz_cache_location(os.path.dirname(__file__))
+from .hedging import create_hedger
+from .log_pipeline import sampled
+from .price_store import get_price_store, record_history
+from .resilience import UpstreamUnavailableError, create_guard
 
 logger = logging.getLogger(__name__)
 
 MAG7_SYMBOLS = ["MSFT", "AAPL", "GOOGL", "AMZN", "NVDA", "META", "TSLA"]
 
+_yf = None
+_yf_lock = threading.Lock()
+
+
+def load_provider():
+    """Import yfinance (and with it pandas) on first use instead of at app import"""
+    global _yf
+    if _yf is None:
+        with _yf_lock:
+            if _yf is None:
+                import yfinance
+                # yfinance keeps its timezone and cookie caches as sqlite files; keep them out of the package
+                cache_dir = os.getenv("YFINANCE_CACHE_DIR", os.path.join(tempfile.gettempdir(), "yfinance"))
+                yfinance.set_tz_cache_location(cache_dir)
+                _yf = yfinance
+                logger.info("Loaded yfinance provider")
+    return _yf
+
+
+def __getattr__(name: str):
+    # `services.stock_data.yf` stays addressable (e.g. for patching) without an eager import
+    if name == "yf":
+        return load_provider()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+class YahooProvider:
+    """Daily/intraday bars from Yahoo Finance via yfinance"""
+
+    def history(self, ticker: str, start: str, end: str, interval: str = '1d'):
+        return load_provider().Ticker(ticker).history(interval=interval, start=start, end=end)
+
+    def quote(self, ticker: str) -> Tuple[float, float]:
+        """(last price, previous session close)"""
+        info = load_provider().Ticker(ticker).fast_info
+        return float(info["lastPrice"]), float(info["previousClose"])
+
+
+def create_provider():
+    """Yahoo by default; STOCK_PROVIDER=file serves daily bars from the files in STOCK_DATA_DIR"""
+    if os.getenv("STOCK_PROVIDER", "yahoo").lower() == "file":
+        from .file_data import FileProvider
+        return FileProvider(os.getenv("STOCK_DATA_DIR", "data"))
+    return YahooProvider()
+
+
+upstream_guard = create_guard("yahoo")
+# Optional (UPSTREAM_HEDGE=1): duplicate calls that outlive the recent p95 latency
+upstream_hedger = create_hedger("yahoo")
+
+
+def _upstream(fn, *args, **kwargs):
+    if upstream_hedger is not None:
+        # Each copy goes through the guard, so hedges spend rate-limit tokens like any call
+        return upstream_hedger.call(upstream_guard.call, fn, *args, **kwargs)
+    return upstream_guard.call(fn, *args, **kwargs)
+
 
 class StockDataService:
+    # Swappable for tests and offline providers; any object with a compatible history()
+    provider = create_provider()
+
+    @staticmethod
+    def fetch_history(ticker: str, start: str, end: str, interval: str = '1d'):
+        """Provider history call guarded by the rate limiter, retries and circuit breaker"""
+        if not getattr(StockDataService.provider, "remote", True):
+            return StockDataService.provider.history(ticker, start, end, interval=interval)
+        return _upstream(StockDataService.provider.history, ticker, start, end, interval=interval)
+
+    @staticmethod
+    def fetch_quote(ticker: str) -> Tuple[float, float]:
+        """Latest (price, previous close) through the same upstream guard as history calls"""
+        if not getattr(StockDataService.provider, "remote", True):
+            return StockDataService.provider.quote(ticker)
+        return _upstream(StockDataService.provider.quote, ticker)
+
     @staticmethod
     def fetch_single_day_return(ticker: str, target_date: str) -> Dict[str, Any]:
         """Fetch return for a single ticker on a specific date"""
         try:
-            logger.info(f"Fetching {ticker} for {target_date}")
+            if sampled("fetch"):
+                logger.info("Fetching %s for %s", ticker, target_date, extra={"ticker": ticker, "date": target_date})
             
             # Parse target date
             date_obj = datetime.strptime(target_date, "%Y-%m-%d")
             
+            # Sessions already in the shared price store need no upstream call
+            store = get_price_store()
+            if store is not None:
+                stored = store.lookup_return(ticker, target_date)
+                if stored is not None:
+                    return stored
+            
             # Get a few days of data to calculate return (need previous day)
             start_date = (date_obj - timedelta(days=5)).strftime("%Y-%m-%d")
             end_date = (date_obj + timedelta(days=1)).strftime("%Y-%m-%d")
             
-            yf_ticker = yf.Ticker(ticker)
-            hist = yf_ticker.history(interval='1d', start=start_date, end=end_date)
+            hist = StockDataService.fetch_history(ticker, start_date, end_date)
             
             if hist.empty:
-                logger.warning(f"No data for {ticker} around {target_date}")
+                logger.warning("No data for %s around %s", ticker, target_date,
+                               extra={"ticker": ticker, "date": target_date})
                 return {"ticker": ticker, "date": target_date, "return": None, "error": "No data available"}
             
             # Find the target date and previous trading day
             hist.index = hist.index.tz_localize(None)  # Remove timezone
+            record_history(ticker, hist, start_date, end_date)
             target_datetime = datetime.strptime(target_date, "%Y-%m-%d")
             
             # Get all available dates and find closest ones
@@ -53,7 +139,8 @@ class StockDataService:
                     break
             
             if target_idx is None or target_idx == 0:
-                logger.warning(f"Cannot calculate return for {ticker} on {target_date} - no previous trading day")
+                logger.warning("Cannot calculate return for %s on %s - no previous trading day", ticker, target_date,
+                               extra={"ticker": ticker, "date": target_date})
                 return {"ticker": ticker, "date": target_date, "return": None, "error": "No previous trading day available"}
             
             # Calculate return
@@ -72,6 +159,10 @@ class StockDataService:
             else:
                 return {"ticker": ticker, "date": target_date, "return": None, "error": "Previous price is zero"}
                 
+        except UpstreamUnavailableError:
+            # Transient: let the caller serve cached data or a 503 instead of caching an error payload
+            raise
         except Exception as e:
-            logger.error(f"Error fetching {ticker} on {target_date}: {e}")
+            logger.error("Error fetching %s on %s: %s", ticker, target_date, e,
+                         extra={"ticker": ticker, "date": target_date})
             return {"ticker": ticker, "date": target_date, "return": None, "error": str(e)}
\ No newline at end of file
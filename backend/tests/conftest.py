@@ -10,6 +10,10 @@ import os
 # Add parent directory to path for imports
 sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
+# Background read-ahead would reach the real provider after a test's mocks are gone;
+# read-ahead tests install their own instance
+os.environ.setdefault("READ_AHEAD", "0")
+
 
 @pytest.fixture(scope="session")
 def event_loop():
@@ -32,9 +36,12 @@ def mock_yfinance_ticker():
 def clean_cache():
     """Ensure cache is clean before each test"""
     from services.cache import cache_instance
+    from services.result_cache import query_cache
     cache_instance.clear()
+    query_cache.clear()
     yield cache_instance
     cache_instance.clear()
+    query_cache.clear()
 
 
 @pytest.fixture
@@ -55,6 +62,23 @@ def mag7_symbols():
     return ["MSFT", "AAPL", "GOOGL", "AMZN", "NVDA", "META", "TSLA"]
 
 
+@pytest.fixture
+def panel_provider():
+    """Synthetic daily closes for any ticker and range, counting upstream calls"""
+    from tests.fakes import PanelProvider
+    return PanelProvider()
+
+
+@pytest.fixture
+def panel_client(panel_provider, clean_cache):
+    """TestClient whose series service reads from panel_provider through the query-result cache"""
+    from fastapi.testclient import TestClient
+    from app import app, query_cache
+    from services.series import SeriesService
+    with patch("app.series_service", SeriesService(panel_provider.history, cache=query_cache)):
+        yield TestClient(app)
+
+
 # Pytest markers
 def pytest_configure(config):
     """Configure custom pytest markers"""
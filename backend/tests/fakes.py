@@ -0,0 +1,126 @@
+"""
+Local fakes shared by the test suite
+"""
+import threading
+import time
+import zlib
+
+import numpy as np
+import pandas as pd
+
+from services.resilience import RateLimitedError
+
+
+class FakeProvider:
+    """Local stand-in for Yahoo that injects 429s and latency"""
+
+    def __init__(self, fail_first=0, fail_every=0, latency=0.0):
+        self.fail_first = fail_first
+        self.fail_every = fail_every
+        self.latency = latency
+        self.calls = 0
+        self._lock = threading.Lock()
+
+    def history(self, ticker, start, end, interval='1d'):
+        with self._lock:
+            self.calls += 1
+            call = self.calls
+        if self.latency:
+            time.sleep(self.latency)
+        if call <= self.fail_first or (self.fail_every and call % self.fail_every == 0):
+            raise RateLimitedError("429 Too Many Requests")
+        if interval != '1d':
+            return self.intraday(start, interval)
+        dates = pd.bdate_range('2024-01-01', '2024-01-05')
+        return pd.DataFrame({'Close': [100.0, 105.0, 103.0, 108.0, 110.0]}, index=dates)
+
+    @staticmethod
+    def intraday(day, interval):
+        """One regular session of bars; closes climb 0.01 per minute from 100"""
+        step = pd.Timedelta(interval.replace('m', 'min'))
+        index = pd.date_range(f"{day} 09:30", f"{day} 15:59", freq=step, tz='America/New_York')
+        minutes = (index - index[0]).total_seconds() / 60
+        # A bar's close is the price at the end of the bar
+        closes = 100.0 + 0.01 * (minutes + step.total_seconds() / 60 - 1)
+        return pd.DataFrame({'Close': closes}, index=index)
+
+    def quote(self, ticker):
+        with self._lock:
+            self.calls += 1
+        return 110.0, 108.0
+
+
+class SlowProvider:
+    """Daily bars with a latency tail: every slow_every-th call takes slow_latency seconds"""
+
+    def __init__(self, latency=0.005, slow_every=10, slow_latency=1.0):
+        self.latency = latency
+        self.slow_every = slow_every
+        self.slow_latency = slow_latency
+        self.calls = 0
+        self._lock = threading.Lock()
+
+    def history(self, ticker, start, end, interval='1d'):
+        with self._lock:
+            self.calls += 1
+            call = self.calls
+        time.sleep(self.slow_latency if self.slow_every and call % self.slow_every == 0 else self.latency)
+        dates = pd.bdate_range('2024-01-01', '2024-01-05')
+        return pd.DataFrame({'Close': [100.0, 105.0, 103.0, 108.0, 110.0]}, index=dates)
+
+
+class FakeQuoteFeed:
+    """Scripted live prices; each call returns the next price for the ticker"""
+
+    def __init__(self, prices, previous_close=100.0):
+        self.prices = {ticker: list(series) for ticker, series in prices.items()}
+        self.previous_close = previous_close
+        self.calls = {}
+        self._lock = threading.Lock()
+
+    def __call__(self, ticker):
+        with self._lock:
+            count = self.calls.get(ticker, 0)
+            self.calls[ticker] = count + 1
+        series = self.prices[ticker]
+        return series[min(count, len(series) - 1)], self.previous_close
+
+
+class PanelProvider:
+    """Daily closes for any business-day range: per-ticker random walks sharing a market factor"""
+
+    FIRST_SESSION = '2000-01-03'
+    SESSIONS = 8000
+
+    def __init__(self, market_weight=0.7):
+        self.market_weight = market_weight
+        self.calls = 0
+        self._dates = pd.bdate_range(self.FIRST_SESSION, periods=self.SESSIONS)
+        self._market = np.random.default_rng(0).normal(0.0003, 0.012, self.SESSIONS)
+        self._closes = {}
+        self._lock = threading.Lock()
+
+    def closes(self, ticker):
+        with self._lock:
+            if ticker not in self._closes:
+                own = np.random.default_rng(zlib.crc32(ticker.encode())).normal(0.0002, 0.015, self.SESSIONS)
+                returns = self.market_weight * self._market + (1 - self.market_weight) * own
+                self._closes[ticker] = pd.Series(100.0 * np.cumprod(1 + returns), index=self._dates)
+            return self._closes[ticker]
+
+    def history(self, ticker, start, end, interval='1d'):
+        with self._lock:
+            self.calls += 1
+        closes = self.closes(ticker)
+        window = closes[(closes.index >= pd.Timestamp(start)) & (closes.index < pd.Timestamp(end))]
+        return pd.DataFrame({'Close': window.to_numpy()}, index=window.index.tz_localize('America/New_York'))
+
+
+def sessions(count, start='2024-01-02'):
+    """count consecutive business days from start, as datetime64[D]"""
+    return pd.bdate_range(start, periods=count).values.astype('datetime64[D]')
+
+
+def random_panel(sessions, tickers, seed, mean=0.0, std=0.02):
+    """(sessions, tickers) daily returns drawn independently from a normal distribution"""
+    return np.random.default_rng(seed).normal(mean, std, (sessions, tickers))
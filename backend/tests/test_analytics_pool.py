@@ -0,0 +1,116 @@
+import os
+import pytest
+
+import numpy as np
+import pandas as pd
+
+from services.analytics_pool import (
+    AnalyticsPool, chunk_bounds, correlation_kernel, correlation_matrix, rolling_stats,
+)
+from tests.fakes import random_panel
+
+
+def panel(tickers=12):
+    return random_panel(300, tickers, seed=4)
+
+
+def failing_kernel(data, out, lo, hi):
+    raise ValueError("kernel failed")
+
+
+def shm_segments():
+    """Shared-memory blocks (not the pool's semaphores) currently allocated"""
+    if not os.path.isdir("/dev/shm"):
+        return set()
+    return {name for name in os.listdir("/dev/shm") if name.startswith("psm_")}
+
+
+class TestKernels:
+
+    @pytest.mark.unit
+    def test_correlation_matches_numpy(self):
+        returns = panel()
+
+        result = correlation_matrix(AnalyticsPool(0), returns)
+
+        np.testing.assert_allclose(result, np.corrcoef(returns.T), atol=1e-12)
+
+    @pytest.mark.unit
+    def test_rolling_stats_match_pandas(self):
+        returns = panel()
+
+        result = rolling_stats(AnalyticsPool(0), returns, window=20)
+
+        rolling = pd.DataFrame(returns).rolling(20)
+        assert np.isnan(result[:, :19]).all()
+        np.testing.assert_allclose(result[0, 19:], rolling.mean().to_numpy()[19:], atol=1e-12)
+        np.testing.assert_allclose(result[1, 19:], rolling.std().to_numpy()[19:], atol=1e-12)
+
+    @pytest.mark.unit
+    def test_chunk_bounds_cover_every_item_once(self):
+        assert chunk_bounds(10, 4) == [(0, 2), (2, 5), (5, 7), (7, 10)]
+        assert chunk_bounds(3, 8) == [(0, 1), (1, 2), (2, 3)]
+
+
+class TestAnalyticsPool:
+
+    @pytest.fixture(scope="class")
+    def pool(self):
+        pool = AnalyticsPool(2, inline_elements=0)
+        yield pool
+        pool.close()
+
+    @pytest.mark.unit
+    def test_workers_match_inline(self, pool):
+        """Chunked results assembled from shared memory equal the single-process result"""
+        returns = panel(tickers=9)
+        before = shm_segments()
+
+        np.testing.assert_allclose(correlation_matrix(pool, returns), correlation_matrix(AnalyticsPool(0), returns))
+        np.testing.assert_allclose(rolling_stats(pool, returns, 30), rolling_stats(AnalyticsPool(0), returns, 30),
+                                   equal_nan=True)
+        assert shm_segments() == before
+
+    @pytest.mark.unit
+    def test_worker_errors_propagate_and_release_memory(self, pool):
+        before = shm_segments()
+
+        with pytest.raises(ValueError, match="kernel failed"):
+            pool.map_chunks(failing_kernel, panel(), (12, 12), 12)
+
+        assert shm_segments() == before
+
+    @pytest.mark.unit
+    @pytest.mark.asyncio
+    async def test_async_matches_blocking(self, pool):
+        returns = panel(tickers=6)
+
+        result = await pool.map_chunks_async(correlation_kernel, returns, (6, 6), 6)
+
+        np.testing.assert_allclose(result, np.corrcoef(returns.T), atol=1e-12)
+
+    @pytest.mark.unit
+    def test_small_inputs_run_inline(self):
+        pool = AnalyticsPool(2)
+
+        correlation_matrix(pool, panel())
+
+        assert pool._executor is None
+
+
+class TestCorrelationEndpoint:
+
+    @pytest.mark.unit
+    def test_correlation(self, panel_client):
+        response = panel_client.get("/correlation?start_date=2020-01-02&end_date=2020-12-31&tickers=aapl,msft,nvda")
+        reversed_range = panel_client.get("/correlation?start_date=2020-12-31&end_date=2020-01-02")
+
+        assert response.status_code == 200
+        body = response.json()
+        assert body["tickers"] == ["AAPL", "MSFT", "NVDA"]
+        assert body["sessions"] == 261
+        matrix = np.array(body["matrix"])
+        np.testing.assert_allclose(np.diag(matrix), 1.0)
+        np.testing.assert_allclose(matrix, matrix.T)
+        assert (matrix > 0.5).all()
+        assert reversed_range.status_code == 400
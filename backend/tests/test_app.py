@@ -86,6 +86,126 @@ class TestFastAPIEndpoints:
             mock_cache_get.assert_called_once_with("AAPL", "2024-01-02")
             mock_fetch.assert_not_called()
 
+    @pytest.mark.unit
+    def test_stale_entry_served_and_revalidated_once(self, sample_stock_data):
+        """Expired-but-graced entries are returned immediately with a single background refresh"""
+        import time
+        from services.cache import InMemoryCache
+        now = [0.0]
+        stale_cache = InMemoryCache(ttl_seconds=10, stale_seconds=600, timer=lambda: now[0])
+        stale_cache.set("AAPL", "2024-01-02", sample_stock_data)
+        now[0] = 100.0
+        refreshed = dict(sample_stock_data, price=151.0)
+
+        def slow_fetch(ticker, date):
+            time.sleep(0.2)
+            return refreshed
+
+        with patch('app.cache_instance', stale_cache), \
+             patch('app.StockDataService.fetch_single_day_return', side_effect=slow_fetch) as mock_fetch:
+            with TestClient(app) as live_client:
+                first = live_client.get("/ticker-return?ticker=AAPL&date=2024-01-02")
+                second = live_client.get("/ticker-return?ticker=AAPL&date=2024-01-02")
+
+                for _ in range(100):
+                    if stale_cache.get("AAPL", "2024-01-02") is not None:
+                        break
+                    time.sleep(0.01)
+                third = live_client.get("/ticker-return?ticker=AAPL&date=2024-01-02")
+
+        assert first.status_code == 200
+        assert first.json() == sample_stock_data
+        assert first.headers["X-Cache-Status"] == "stale"
+        # The refresh is still running, so the second request is stale too and triggers nothing new
+        assert second.headers["X-Cache-Status"] == "stale"
+        assert mock_fetch.call_count == 1
+        assert third.json() == refreshed
+        assert "X-Cache-Status" not in third.headers
+
+    @pytest.mark.unit
+    def test_failed_revalidation_keeps_stale_value(self, sample_stock_data, error_stock_data):
+        """A refresh that comes back as an error payload leaves the good stale entry in place"""
+        import time
+        from app import _refreshing
+        from services.cache import InMemoryCache
+        now = [0.0]
+        stale_cache = InMemoryCache(ttl_seconds=10, stale_seconds=600, timer=lambda: now[0])
+        stale_cache.set("AAPL", "2024-01-02", sample_stock_data)
+        now[0] = 100.0
+
+        with patch('app.cache_instance', stale_cache), \
+             patch('app.StockDataService.fetch_single_day_return', return_value=error_stock_data) as mock_fetch:
+            with TestClient(app) as live_client:
+                first = live_client.get("/ticker-return?ticker=AAPL&date=2024-01-02")
+                for _ in range(100):
+                    if mock_fetch.called and not _refreshing:
+                        break
+                    time.sleep(0.01)
+                second = live_client.get("/ticker-return?ticker=AAPL&date=2024-01-02")
+
+        assert first.json() == second.json() == sample_stock_data
+        assert second.headers["X-Cache-Status"] == "stale"
+        assert stale_cache.get("AAPL", "2024-01-02") is None
+        mock_fetch.assert_called()
+
+    @pytest.mark.unit
+    def test_batch_returns_mixes_cache_hits_and_fetches(self, client, sample_stock_data):
+        """Cached keys are answered from the cache, misses fetched once each, duplicates collapsed"""
+        from services.cache import InMemoryCache
+        batch_cache = InMemoryCache()
+        batch_cache.set("AAPL", "2024-01-02", sample_stock_data)
+        fetched = dict(sample_stock_data, ticker="MSFT")
+
+        with patch('app.cache_instance', batch_cache), \
+             patch('app.StockDataService.fetch_single_day_return', return_value=fetched) as mock_fetch:
+            response = client.post("/batch-returns", json={"items": [
+                {"ticker": "AAPL", "date": "2024-01-02"},
+                {"ticker": "msft", "date": "2024-01-02"},
+                {"ticker": "MSFT", "date": "2024-01-02"},
+            ]})
+
+        assert response.status_code == 200
+        assert response.json() == {"results": [sample_stock_data, fetched]}
+        mock_fetch.assert_called_once_with("MSFT", "2024-01-02")
+        assert batch_cache.get("MSFT", "2024-01-02") == fetched
+
+    @pytest.mark.unit
+    def test_batch_returns_reports_failures_per_item(self, client, sample_stock_data):
+        """One failing key does not fail the batch, and its error is not cached"""
+        from services.cache import InMemoryCache
+        from services.resilience import UpstreamUnavailableError
+        batch_cache = InMemoryCache()
+
+        def fetch(ticker, date):
+            if ticker == "TSLA":
+                raise UpstreamUnavailableError("breaker open", retry_after=5)
+            return dict(sample_stock_data, ticker=ticker)
+
+        with patch('app.cache_instance', batch_cache), \
+             patch('app.StockDataService.fetch_single_day_return', side_effect=fetch):
+            response = client.post("/batch-returns", json={"items": [
+                {"ticker": "AAPL", "date": "2024-01-02"},
+                {"ticker": "TSLA", "date": "2024-01-02"},
+            ]})
+
+        results = response.json()["results"]
+        assert results[0]["ticker"] == "AAPL"
+        assert results[1]["return"] is None
+        assert results[1]["transient"] is True
+        assert batch_cache.get("TSLA", "2024-01-02") is None
+
+    @pytest.mark.unit
+    def test_batch_returns_validation(self, client):
+        """Bad dates and oversized batches are rejected"""
+        from app import MAX_BATCH_ITEMS
+        bad_date = client.post("/batch-returns", json={"items": [{"ticker": "AAPL", "date": "2024/01/02"}]})
+        assert bad_date.status_code == 400
+
+        too_many = client.post("/batch-returns", json={
+            "items": [{"ticker": "AAPL", "date": "2024-01-02"}] * (MAX_BATCH_ITEMS + 1)
+        })
+        assert too_many.status_code == 422
+
     @pytest.mark.unit
     def test_get_ticker_return_missing_ticker(self, client):
         """Test ticker return endpoint with missing ticker parameter"""
@@ -256,6 +376,40 @@ class TestFastAPIEndpoints:
             response = client.get("/health")
             assert response.status_code == 200
 
+    @pytest.mark.unit
+    def test_lifespan_preloads_provider_in_background(self):
+        """Startup schedules the provider import without waiting for it"""
+        with patch('app.load_provider') as mock_load:
+            with TestClient(app) as client:
+                assert client.get("/health").status_code == 200
+            mock_load.assert_called_once()
+
+    @pytest.mark.unit
+    def test_lifespan_restores_and_saves_cache_snapshot(self, tmp_path, monkeypatch, sample_stock_data):
+        """The snapshot is loaded before serving and rewritten on shutdown"""
+        from services.cache import InMemoryCache
+        from services.cache_snapshot import write_snapshot
+        path = str(tmp_path / "cache.json.gz")
+        previous = InMemoryCache()
+        previous.set("AAPL", "2024-01-02", sample_stock_data)
+        write_snapshot(previous, path)
+        monkeypatch.setenv("CACHE_SNAPSHOT_PATH", path)
+        monkeypatch.setenv("PRELOAD_PROVIDER", "0")
+        fresh_cache = InMemoryCache()
+
+        with patch('app.cache_instance', fresh_cache), \
+             patch('app.StockDataService.fetch_single_day_return', return_value=dict(sample_stock_data, ticker="MSFT")) as mock_fetch:
+            with TestClient(app) as live_client:
+                assert live_client.get("/ticker-return?ticker=AAPL&date=2024-01-02").json() == sample_stock_data
+                mock_fetch.assert_not_called()
+                live_client.get("/ticker-return?ticker=MSFT&date=2024-01-02")
+
+        # Shutdown persisted the entry fetched during this run as well
+        reloaded = InMemoryCache()
+        from services.cache_snapshot import load_snapshot
+        assert load_snapshot(reloaded, path) == 2
+        assert reloaded.get("MSFT", "2024-01-02")["ticker"] == "MSFT"
+
     @pytest.mark.unit
     def test_endpoint_documentation(self, client):
         """Test that OpenAPI documentation is available"""
@@ -296,4 +450,105 @@ class TestFastAPIEndpoints:
             if "ticker=&" in case["url"]:
                 data = response.json()
                 assert data["return"] is None
-                assert "error" in data
\ No newline at end of file
+                assert "error" in data
+
+class TestAdminInvalidate:
+
+    @pytest.fixture
+    def client(self, monkeypatch):
+        monkeypatch.setenv("ADMIN_TOKEN", "s3cret")
+        return TestClient(app)
+
+    @pytest.mark.unit
+    def test_requires_configured_token(self, monkeypatch):
+        """Disabled without ADMIN_TOKEN, and a wrong token is rejected"""
+        monkeypatch.delenv("ADMIN_TOKEN", raising=False)
+        client = TestClient(app)
+        assert client.post("/admin/invalidate", json={"tickers": ["AAPL"]}).status_code == 403
+
+        monkeypatch.setenv("ADMIN_TOKEN", "s3cret")
+        wrong = client.post("/admin/invalidate", json={"tickers": ["AAPL"]}, headers={"X-Admin-Token": "nope"})
+        missing = client.post("/admin/invalidate", json={"tickers": ["AAPL"]})
+        assert wrong.status_code == 401
+        assert missing.status_code == 401
+
+    @pytest.mark.unit
+    def test_validation(self, client):
+        headers = {"X-Admin-Token": "s3cret"}
+        assert client.post("/admin/invalidate", json={}, headers=headers).status_code == 400
+        assert client.post("/admin/invalidate", json={"start_date": "2024/01/02"}, headers=headers).status_code == 400
+        reversed_range = {"start_date": "2024-02-01", "end_date": "2024-01-01"}
+        assert client.post("/admin/invalidate", json=reversed_range, headers=headers).status_code == 400
+
+    @pytest.mark.unit
+    def test_cascades_to_derived_results(self, client):
+        """Returns are dropped and the same scope is passed to query results, range indexes and intraday pages"""
+        from app import cache_instance
+        cache_instance.clear()
+        for ticker in ("AAPL", "MSFT"):
+            cache_instance.set(ticker, "2024-01-03", {"ticker": ticker, "date": "2024-01-03", "return": 0.01})
+        derived = {name: Mock(**{"invalidate.return_value": 1})
+                   for name in ("query_cache", "range_index_service", "intraday_service")}
+
+        with patch.multiple("app", **derived):
+            response = client.post("/admin/invalidate", headers={"X-Admin-Token": "s3cret"},
+                                   json={"tickers": ["aapl"], "start_date": "2024-01-01"})
+
+        assert response.status_code == 200
+        body = response.json()
+        assert body["tickers"] == ["AAPL"]
+        assert body["invalidated"] == {"returns": 1, "queries": 1, "summaries": 1, "intraday": 1, "price_store": None}
+        for service in derived.values():
+            service.invalidate.assert_called_once_with(["AAPL"], "2024-01-01", None)
+        assert cache_instance.get("AAPL", "2024-01-03") is None
+        assert cache_instance.get("MSFT", "2024-01-03") is not None
+        cache_instance.clear()
+
+    @pytest.mark.unit
+    def test_corrected_close_refetches_next_session(self, client, clean_cache):
+        """Correcting the close on end_date also drops the next session's return, which was computed from it"""
+        old = {"AAPL": {"2024-01-02": 100.0, "2024-01-03": 101.0, "2024-01-04": 102.0}}
+        for day, previous in (("2024-01-03", "2024-01-02"), ("2024-01-04", "2024-01-03")):
+            price, previous_price = old["AAPL"][day], old["AAPL"][previous]
+            clean_cache.set("AAPL", day, {"ticker": "AAPL", "date": day, "return": price / previous_price - 1,
+                                          "price": price, "previous_price": previous_price})
+        corrected = {"ticker": "AAPL", "date": "2024-01-04", "return": 102.0 / 99.0 - 1,
+                     "price": 102.0, "previous_price": 99.0}
+
+        derived = {name: Mock(**{"invalidate.return_value": 0}) for name in ("range_index_service", "intraday_service")}
+        with patch.multiple("app", **derived):
+            client.post("/admin/invalidate", headers={"X-Admin-Token": "s3cret"},
+                        json={"tickers": ["AAPL"], "start_date": "2024-01-03", "end_date": "2024-01-03"})
+        with patch("app.StockDataService.fetch_single_day_return", return_value=corrected) as fetch:
+            response = client.get("/ticker-return?ticker=AAPL&date=2024-01-04")
+
+        assert response.json()["previous_price"] == 99.0
+        fetch.assert_called_once_with("AAPL", "2024-01-04")
+
+
+class TestQueryCache:
+
+    @pytest.mark.unit
+    def test_summary_is_served_from_query_cache(self, clean_cache):
+        summary = Mock(return_value={"count": 2, "min": 0.0, "max": 0.01, "mean": 0.005, "std": 0.007})
+        with patch("app.range_index_service", Mock(summary=summary)):
+            client = TestClient(app)
+            first = client.get("/summary?start_date=2024-01-02&end_date=2024-01-05&tickers=aapl")
+            second = client.get("/summary?start_date=2024-01-02&end_date=2024-01-05&tickers=AAPL")
+            gauges = client.get("/metrics").json()["gauges"]
+
+        assert first.json() == second.json()
+        assert summary.call_count == 1
+        assert gauges['cache_bytes{cache="queries"}'] > 0
+
+    @pytest.mark.unit
+    def test_summary_tickers_deduplicated(self, clean_cache):
+        summary = Mock(return_value={"count": 2, "min": 0.0, "max": 0.01, "mean": 0.005, "std": 0.007})
+        with patch("app.range_index_service", Mock(summary=summary)):
+            client = TestClient(app)
+            repeated = client.get("/summary?start_date=2024-01-02&end_date=2024-01-05&tickers=aapl,MSFT,AAPL")
+            single = client.get("/summary?start_date=2024-01-02&end_date=2024-01-05&tickers=aapl,msft")
+
+        assert repeated.json() == single.json()
+        assert list(repeated.json()["summary"]) == ["AAPL", "MSFT"]
+        assert [call.args[0] for call in summary.call_args_list] == ["AAPL", "MSFT"]
@@ -0,0 +1,118 @@
+import gzip
+import json
+import pytest
+from unittest.mock import patch
+
+import numpy as np
+import pandas as pd
+
+from services.bulk_import import main
+from services.file_data import FileProvider, load_files, parse_frame
+from services.price_store import SharedPriceStore
+from services.stock_data import StockDataService
+
+
+def ohlc_frame(start="2024-01-02", n=30):
+    dates = pd.bdate_range(start, periods=n)
+    closes = 100.0 + np.arange(n)
+    return pd.DataFrame({
+        "Date": dates.strftime("%Y-%m-%d"),
+        "Open": closes - 0.5, "High": closes + 1.0, "Low": closes - 1.0, "Close": closes,
+        "Volume": 1000,
+    })
+
+
+class TestParsing:
+
+    @pytest.mark.unit
+    def test_validates_and_dedupes(self):
+        """Bad rows and weekends are dropped and the last duplicate of a day wins"""
+        frame = ohlc_frame(n=5)
+        extra = pd.DataFrame({
+            "Date": ["2024-01-03", "2024-01-06", "not a date", "2024-01-08", "2024-01-09"],
+            "Open": [1, 1, 1, 1, 1], "High": [250, 250, 250, 90, 250], "Low": [1, 1, 1, 95, 1],
+            "Close": [200.0, 150.0, 120.0, 93.0, -5.0],
+        })
+
+        [series] = parse_frame(pd.concat([frame, extra]), default_ticker="aapl")
+
+        assert series.ticker == "AAPL"
+        assert series.rows == 10
+        assert series.invalid == 3
+        assert series.non_sessions == 1
+        assert series.duplicates == 1
+        assert series.days.astype(str).tolist() == ["2024-01-02", "2024-01-03", "2024-01-04", "2024-01-05", "2024-01-08"]
+        assert series.closes[1] == 200.0
+
+    @pytest.mark.unit
+    def test_long_and_wide_layouts(self, tmp_path):
+        frame = ohlc_frame(n=10)
+        doubled = frame.assign(**{column: frame[column] * 2 for column in ("Open", "High", "Low", "Close")})
+        long = pd.concat([frame.assign(Ticker="MSFT"), doubled.assign(Ticker="nvda")])
+        long.to_csv(tmp_path / "long.csv", index=False)
+        wide = pd.DataFrame({"date": frame.Date, "TSLA": frame.Close, "META": frame.Close + 1})
+        wide.to_csv(tmp_path / "wide.csv", index=False)
+
+        loaded = {series.ticker: series for series in load_files([str(tmp_path)])}
+
+        assert set(loaded) == {"MSFT", "NVDA", "TSLA", "META"}
+        assert loaded["NVDA"].closes[0] == 200.0
+        assert loaded["META"].closes[-1] == 110.0
+
+    @pytest.mark.unit
+    def test_parquet(self, tmp_path):
+        ohlc_frame().to_parquet(tmp_path / "AMZN.parquet")
+
+        [series] = load_files([str(tmp_path / "AMZN.parquet")])
+
+        assert series.ticker == "AMZN" and len(series.days) == 30
+
+
+class TestBulkImport:
+
+    @pytest.mark.unit
+    def test_loads_store_and_snapshot(self, tmp_path, capsys):
+        ohlc_frame(n=30).to_csv(tmp_path / "AAPL.csv", index=False)
+        store_path, snapshot_path = tmp_path / "prices.bin", tmp_path / "snapshot.json.gz"
+
+        code = main([str(tmp_path / "AAPL.csv"), "--store", str(store_path), "--snapshot", str(snapshot_path)])
+
+        assert code == 0
+        assert "rows/s" in capsys.readouterr().out
+        store = SharedPriceStore(str(store_path), writer=False)
+        try:
+            stored = store.lookup_return("AAPL", "2024-01-03")
+        finally:
+            store.close()
+        assert stored["price"] == 101.0 and stored["previous_price"] == 100.0
+        with gzip.open(snapshot_path, "rt") as f:
+            rows = [json.loads(line) for line in f][1:]
+        assert len(rows) == 29
+        assert rows[0][:2] == ["AAPL", "2024-01-03"]
+        assert rows[0][3]["return"] == 0.01
+
+    @pytest.mark.unit
+    def test_requires_a_destination(self, tmp_path, monkeypatch):
+        monkeypatch.delenv("PRICE_STORE_PATH", raising=False)
+        ohlc_frame().to_csv(tmp_path / "AAPL.csv", index=False)
+
+        with pytest.raises(SystemExit):
+            main([str(tmp_path / "AAPL.csv")])
+
+
+class TestFileProvider:
+
+    @pytest.mark.unit
+    def test_serves_single_day_returns_offline(self, tmp_path):
+        """The same files answer /ticker-return lookups without the upstream guard"""
+        ohlc_frame().to_csv(tmp_path / "GOOGL.csv", index=False)
+        provider = FileProvider(str(tmp_path))
+
+        with patch.object(StockDataService, "provider", provider):
+            result = StockDataService.fetch_single_day_return("GOOGL", "2024-01-08")
+            quote = StockDataService.fetch_quote("GOOGL")
+
+        assert result["price"] == 104.0
+        assert result["previous_price"] == 103.0
+        assert quote == (129.0, 128.0)
+        assert provider.history("MSFT", "2024-01-01", "2024-02-01").empty
@@ -252,6 +252,161 @@ class TestInMemoryCache:
         
         assert found_data > 0  # At least some operations succeeded
 
+    @pytest.mark.unit
+    def test_get_stale_within_grace_period(self):
+        """Expired entries are served by get_stale until the grace period ends"""
+        now = [0.0]
+        cache = InMemoryCache(ttl_seconds=10, maxsize=10, stale_seconds=60, timer=lambda: now[0])
+        cache.set("AAPL", "2024-01-01", {"data": "1"})
+
+        # Fresh: get hits, get_stale does not
+        assert cache.get("AAPL", "2024-01-01") == {"data": "1"}
+        assert cache.get_stale("AAPL", "2024-01-01") is None
+
+        now[0] = 30.0
+        assert cache.get("AAPL", "2024-01-01") is None
+        assert cache.get_stale("AAPL", "2024-01-01") == {"data": "1"}
+
+        now[0] = 71.0
+        assert cache.get_stale("AAPL", "2024-01-01") is None
+
+    @pytest.mark.unit
+    def test_set_refreshes_stale_entry(self):
+        """A refresh makes the entry fresh again"""
+        now = [0.0]
+        cache = InMemoryCache(ttl_seconds=10, maxsize=10, stale_seconds=60, timer=lambda: now[0])
+        cache.set("AAPL", "2024-01-01", {"data": "old"})
+        now[0] = 30.0
+
+        cache.set("AAPL", "2024-01-01", {"data": "new"})
+
+        assert cache.get("AAPL", "2024-01-01") == {"data": "new"}
+        assert cache.get_stale("AAPL", "2024-01-01") is None
+
+    @pytest.mark.unit
+    def test_invalidate_by_ticker_and_range(self):
+        """Only the matching ticker-days are dropped, from both the live and stale tiers"""
+        cache = InMemoryCache(ttl_seconds=10, maxsize=100, stale_seconds=60)
+        for ticker in ("AAPL", "MSFT"):
+            for day in ("2024-01-02", "2024-01-03", "2024-01-04"):
+                cache.set(ticker, day, {"data": day})
+
+        assert cache.invalidate(["AAPL"], "2024-01-03", None) == 2
+        assert cache.get("AAPL", "2024-01-02") is not None
+        assert cache.get("AAPL", "2024-01-03") is None
+        assert cache.get_stale("AAPL", "2024-01-04") is None
+        assert cache.get("MSFT", "2024-01-04") is not None
+
+        # MSFT's 01-03 return was computed from the 01-02 close, so it goes too
+        assert cache.invalidate(None, "2024-01-02", "2024-01-02") == 3
+        assert cache.get("MSFT", "2024-01-03") is None
+        assert cache.invalidate(["MSFT"]) == 1
+        assert list(cache.export_entries()) == []
+
+    @pytest.mark.unit
+    def test_invalidate_skips_weekends_and_holidays_to_the_next_session(self):
+        """Closed days cached after end do not shield the first real session from invalidation"""
+        cache = InMemoryCache(ttl_seconds=60, maxsize=100)
+        closed = {"return": None, "error": "No data available"}
+        cache.set("AAPL", "2024-01-12", {"return": 0.01})
+        cache.set("AAPL", "2024-01-13", closed)  # Saturday
+        cache.set("AAPL", "2024-01-15", closed)  # Martin Luther King Jr. Day
+        cache.set("AAPL", "2024-01-16", {"return": 0.02})
+        cache.set("AAPL", "2024-01-17", {"return": 0.03})
+
+        assert cache.invalidate(["AAPL"], "2024-01-12", "2024-01-12") == 4
+        assert cache.get("AAPL", "2024-01-16") is None
+        assert cache.get("AAPL", "2024-01-17") == {"return": 0.03}
+
+    @pytest.mark.unit
+    def test_invalidation_index_stays_bounded(self):
+        """Evicted keys are pruned from the ticker index instead of accumulating"""
+        cache = InMemoryCache(ttl_seconds=60, maxsize=10)
+        for day in range(500):
+            cache.set("AAPL", f"day-{day:03d}", {"data": day})
+
+        assert cache._indexed <= 2 * 10 + 64
+        assert cache.invalidate(["AAPL"]) == 10
+
+    @pytest.mark.unit
+    def test_byte_budget_evicts_by_payload_size(self):
+        """With max_bytes, one large payload displaces several small ones and evictions are counted"""
+        from services.metrics import metrics
+        evictions = metrics.counter("cache_evictions_total", cache="returns", reason="size")
+        cache = InMemoryCache(ttl_seconds=3600, max_bytes=6 * 1024)
+        for day in range(1, 6):
+            cache.set("AAPL", f"2024-01-{day:02d}", {"return": 0.01 * day})
+        assert cache.get("AAPL", "2024-01-01") is not None
+
+        cache.set("MSFT", "2024-01-02", {"prices": [float(i) for i in range(150)]})
+
+        assert cache.get("MSFT", "2024-01-02") is not None
+        assert cache.get("AAPL", "2024-01-02") is None
+        assert 0 < cache.memory_usage() <= 6 * 1024
+        assert metrics.counter("cache_evictions_total", cache="returns", reason="size") > evictions
+
+    @pytest.mark.unit
+    def test_get_stale_disabled_by_default(self, cache):
+        """Without a grace period nothing is served stale"""
+        cache.set("AAPL", "2024-01-01", {"data": "1"})
+        time.sleep(1.1)
+
+        assert cache.get_stale("AAPL", "2024-01-01") is None
+
+    @pytest.mark.unit
+    def test_snapshot_round_trip_keeps_remaining_ttl(self, tmp_path):
+        """Restored entries keep their age: fresh stays fresh, expired comes back stale, dead is dropped"""
+        from services.cache_snapshot import write_snapshot, load_snapshot
+        path = str(tmp_path / "cache.json.gz")
+        source = InMemoryCache(ttl_seconds=10, maxsize=10, stale_seconds=60)
+        source.set("AAPL", "2024-01-01", {"data": "fresh"})
+        with patch("services.cache.time.time", return_value=time.time() - 30):
+            source.set("MSFT", "2024-01-01", {"data": "stale"})
+        with patch("services.cache.time.time", return_value=time.time() - 100):
+            source.set("NVDA", "2024-01-01", {"data": "dead"})
+
+        assert write_snapshot(source, path) == 2
+
+        now = [1000.0]
+        restored = InMemoryCache(ttl_seconds=10, maxsize=10, stale_seconds=60, timer=lambda: now[0])
+        assert load_snapshot(restored, path) == 2
+        assert restored.get("AAPL", "2024-01-01") == {"data": "fresh"}
+        assert restored.get("MSFT", "2024-01-01") is None
+        assert restored.get_stale("MSFT", "2024-01-01") == {"data": "stale"}
+        assert restored.get_stale("NVDA", "2024-01-01") is None
+
+        # Ages carry over: the fresh entry expires on its original schedule
+        now[0] = 1011.0
+        assert restored.get("AAPL", "2024-01-01") is None
+        now[0] = 1041.0
+        assert restored.get_stale("MSFT", "2024-01-01") is None
+
+    @pytest.mark.unit
+    def test_snapshot_restore_does_not_override_newer_entries(self, tmp_path):
+        """Entries written while a snapshot loads in the background win over the snapshot"""
+        from services.cache_snapshot import write_snapshot, load_snapshot
+        path = str(tmp_path / "cache.json.gz")
+        source = InMemoryCache(ttl_seconds=3600, maxsize=10)
+        source.set("AAPL", "2024-01-01", {"data": "old"})
+        write_snapshot(source, path)
+
+        target = InMemoryCache(ttl_seconds=3600, maxsize=10)
+        target.set("AAPL", "2024-01-01", {"data": "new"})
+
+        assert load_snapshot(target, path) == 0
+        assert target.get("AAPL", "2024-01-01") == {"data": "new"}
+
+    @pytest.mark.unit
+    def test_try_load_snapshot_tolerates_missing_and_corrupt_files(self, tmp_path):
+        """A missing or unreadable snapshot never blocks startup"""
+        from services.cache_snapshot import try_load_snapshot
+        cache = InMemoryCache()
+        corrupt = tmp_path / "corrupt.json.gz"
+        corrupt.write_bytes(b"not gzip")
+
+        assert try_load_snapshot(cache, str(tmp_path / "missing.json.gz")) == 0
+        assert try_load_snapshot(cache, str(corrupt)) == 0
+
     @pytest.mark.unit
     def test_cache_instance_singleton(self):
         """Test that the cache_instance is properly imported"""
@@ -260,6 +415,7 @@ class TestInMemoryCache:
         # Should be an InMemoryCache instance
         assert isinstance(cache_instance, InMemoryCache)
         
-        # Should have default configuration
+        # Should have default configuration: bounded by bytes rather than entries
         assert cache_instance._cache.ttl == 3600
-        assert cache_instance._cache.maxsize == 1000
\ No newline at end of file
+        assert cache_instance.max_bytes == 32 * 1024 * 1024
+        assert cache_instance._cache.maxsize == cache_instance.max_bytes
\ No newline at end of file
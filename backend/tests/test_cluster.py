@@ -0,0 +1,308 @@
+import os
+import socket
+import subprocess
+import sys
+import threading
+import time
+from collections import Counter
+from datetime import date, timedelta
+from unittest.mock import AsyncMock, patch
+
+import httpx
+import numpy as np
+import pandas as pd
+import pytest
+from fastapi.testclient import TestClient
+
+from services.cluster import FORWARDED_HEADER, SECRET_HEADER, Cluster, ForwardError, HashRing, create_cluster
+from services.series import SeriesService
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+TICKERS = [f"T{n:03d}" for n in range(3000)]
+SECRET = "s3cret"
+PEER = {FORWARDED_HEADER: "http://b", SECRET_HEADER: SECRET}
+
+
+class TestHashRing:
+
+    @pytest.mark.unit
+    def test_balanced(self):
+        ring = HashRing(["http://a", "http://b", "http://c"])
+
+        shares = Counter(ring.owner(ticker) for ticker in TICKERS)
+
+        assert set(shares) == {"http://a", "http://b", "http://c"}
+        assert all(700 < count < 1300 for count in shares.values())
+
+    @pytest.mark.unit
+    def test_adding_a_node_moves_only_its_share(self):
+        before = HashRing(["http://a", "http://b", "http://c"])
+        after = HashRing(["http://a", "http://b", "http://c", "http://d"])
+
+        moved = [ticker for ticker in TICKERS if before.owner(ticker) != after.owner(ticker)]
+
+        assert all(after.owner(ticker) == "http://d" for ticker in moved)
+        assert 0.15 < len(moved) / len(TICKERS) < 0.35
+
+    @pytest.mark.unit
+    def test_create_cluster(self, monkeypatch):
+        monkeypatch.delenv("CLUSTER_NODES", raising=False)
+        assert create_cluster() is None
+
+        monkeypatch.setenv("CLUSTER_NODES", "http://a:8000/, http://b:8000")
+        with pytest.raises(ValueError):
+            create_cluster()
+        monkeypatch.setenv("CLUSTER_SELF", "http://c:8000")
+        with pytest.raises(ValueError):
+            create_cluster()
+        monkeypatch.setenv("CLUSTER_SELF", "http://a:8000")
+        monkeypatch.delenv("CLUSTER_SECRET", raising=False)
+        with pytest.raises(ValueError):
+            create_cluster()
+        monkeypatch.setenv("CLUSTER_SECRET", SECRET)
+        assert create_cluster().nodes == ["http://a:8000", "http://b:8000"]
+
+    @pytest.mark.unit
+    def test_from_peer_needs_the_secret(self):
+        cluster = Cluster("http://a", ["http://a", "http://b"], SECRET)
+
+        assert cluster.from_peer(PEER)
+        assert not cluster.from_peer({FORWARDED_HEADER: "http://b"})
+        assert not cluster.from_peer({FORWARDED_HEADER: "http://b", SECRET_HEADER: "guess"})
+        assert not cluster.from_peer({SECRET_HEADER: SECRET})
+
+
+def owned_by(cluster, node):
+    return next(ticker for ticker in TICKERS if cluster.owner(ticker) == node)
+
+
+class TestForwarding:
+
+    @pytest.fixture
+    def cluster(self):
+        return Cluster("http://a", ["http://a", "http://b"], SECRET)
+
+    @pytest.fixture
+    def client(self, cluster, clean_cache):
+        from app import app
+        with patch("app.cluster", cluster):
+            yield TestClient(app)
+
+    @pytest.mark.unit
+    def test_miss_forwarded_to_owner_and_cached(self, client, cluster):
+        ticker = owned_by(cluster, "http://b")
+        body = b'{"ticker": "%s", "date": "2024-01-03", "return": 0.01}' % ticker.encode()
+        with patch.object(cluster, "ticker_return", AsyncMock(return_value=(200, body, {}))) as forward, \
+             patch("app.StockDataService.fetch_single_day_return") as fetch:
+            first = client.get(f"/ticker-return?ticker={ticker}&date=2024-01-03")
+            second = client.get(f"/ticker-return?ticker={ticker}&date=2024-01-03")
+
+        assert first.json()["return"] == second.json()["return"] == 0.01
+        forward.assert_awaited_once_with("http://b", ticker, "2024-01-03")
+        fetch.assert_not_called()
+
+    @pytest.mark.unit
+    def test_owner_errors_relayed(self, client, cluster):
+        ticker = owned_by(cluster, "http://b")
+        unavailable = (503, b'{"detail": "Upstream data provider unavailable"}', {"retry-after": "7"})
+        with patch.object(cluster, "ticker_return", AsyncMock(return_value=unavailable)):
+            response = client.get(f"/ticker-return?ticker={ticker}&date=2024-01-03")
+
+        assert response.status_code == 503
+        assert response.headers["retry-after"] == "7"
+
+    @pytest.mark.unit
+    def test_unreachable_owner_falls_back_to_local_fetch(self, client, cluster):
+        ticker = owned_by(cluster, "http://b")
+        fetched = {"ticker": ticker, "date": "2024-01-03", "return": 0.02}
+        with patch.object(cluster, "ticker_return", AsyncMock(side_effect=ForwardError("refused"))), \
+             patch("app.StockDataService.fetch_single_day_return", return_value=fetched) as fetch:
+            response = client.get(f"/ticker-return?ticker={ticker}&date=2024-01-03")
+
+        assert response.json() == fetched
+        fetch.assert_called_once()
+
+    @pytest.mark.unit
+    def test_forwarded_and_owned_requests_served_locally(self, client, cluster):
+        remote, local = owned_by(cluster, "http://b"), owned_by(cluster, "http://a")
+        with patch.object(cluster, "ticker_return", AsyncMock()) as forward, \
+             patch("app.StockDataService.fetch_single_day_return",
+                   side_effect=lambda ticker, date: {"ticker": ticker, "date": date, "return": 0.0}) as fetch:
+            client.get(f"/ticker-return?ticker={remote}&date=2024-01-03", headers=PEER)
+            client.get(f"/ticker-return?ticker={local}&date=2024-01-03")
+
+        forward.assert_not_awaited()
+        assert fetch.call_count == 2
+
+    @pytest.mark.unit
+    def test_forwarded_header_without_secret_is_not_trusted(self, client, cluster):
+        ticker = owned_by(cluster, "http://b")
+        body = b'{"ticker": "%s", "date": "2024-01-03", "return": 0.01}' % ticker.encode()
+        with patch.object(cluster, "ticker_return", AsyncMock(return_value=(200, body, {}))) as forward, \
+             patch("app.StockDataService.fetch_single_day_return") as fetch:
+            client.get(f"/ticker-return?ticker={ticker}&date=2024-01-03", headers={FORWARDED_HEADER: "http://b"})
+
+        forward.assert_awaited_once()
+        fetch.assert_not_called()
+
+    @pytest.mark.unit
+    def test_batch_groups_misses_by_owner(self, client, cluster):
+        remote, local = owned_by(cluster, "http://b"), owned_by(cluster, "http://a")
+        items = [{"ticker": ticker, "date": day} for ticker in (remote, local) for day in ("2024-01-03", "2024-01-04")]
+
+        async def batch_returns(node, keys):
+            return [{"ticker": ticker, "date": day, "return": 0.5} for ticker, day in keys]
+
+        with patch.object(cluster, "batch_returns", AsyncMock(side_effect=batch_returns)) as forward, \
+             patch("app.StockDataService.fetch_single_day_return",
+                   side_effect=lambda ticker, date: {"ticker": ticker, "date": date, "return": 0.0}) as fetch:
+            results = client.post("/batch-returns", json={"items": items}).json()["results"]
+
+        assert [result["return"] for result in results] == [0.5, 0.5, 0.0, 0.0]
+        forward.assert_awaited_once_with("http://b", [(remote, "2024-01-03"), (remote, "2024-01-04")])
+        assert fetch.call_count == 2
+
+    @pytest.mark.unit
+    def test_intraday_relayed_from_owner(self, client, cluster):
+        ticker, day = owned_by(cluster, "http://b"), (date.today() - timedelta(days=3)).isoformat()
+        body = b'{"ticker": "%s", "times": ["09:30"]}' % ticker.encode()
+        with patch.object(cluster, "get", AsyncMock(return_value=(200, body, {"content-type": "application/json"}))) \
+                as forward, patch("app.StockDataService.fetch_single_day_return") as fetch:
+            response = client.get(f"/intraday-return?ticker={ticker}&date={day}&interval=5m")
+
+        assert response.json()["times"] == ["09:30"]
+        forward.assert_awaited_once_with("http://b", "/intraday-return",
+                                         {"ticker": ticker, "date": day, "interval": "5m"})
+        fetch.assert_not_called()
+
+
+class TestOwnedCloses:
+
+    @pytest.mark.unit
+    def test_range_loads_routed_to_owner(self, panel_provider):
+        dates, closes = np.array(["2024-01-03"], dtype="datetime64[D]"), np.array([101.0])
+        owned = {"T1": (dates, closes)}
+        service = SeriesService(panel_provider.history, owner_closes=lambda ticker, start, end: owned.get(ticker))
+
+        assert service.daily_closes("T1", "2024-01-02", "2024-01-05") is owned["T1"]
+        assert panel_provider.calls == 0
+        assert len(service.local_closes("T1", "2024-01-02", "2024-01-05")[0]) == 4
+        assert len(service.daily_closes("T2", "2024-01-02", "2024-01-05")[0]) == 4
+        assert panel_provider.calls == 2
+
+    @pytest.mark.unit
+    def test_served_to_peers_from_the_closes_cache(self, panel_client, panel_provider):
+        url = "/internal/closes?ticker=aapl&start_date=2024-01-02&end_date=2024-01-31"
+        assert panel_client.get(url, headers=PEER).status_code == 404
+
+        with patch("app.cluster", Cluster("http://a", ["http://a", "http://b"], SECRET)):
+            first = panel_client.get(url, headers=PEER).json()
+            series = panel_client.get("/ticker-series?ticker=AAPL&start_date=2024-01-09&end_date=2024-01-31")
+            second = panel_client.get(url, headers=PEER).json()
+            invalid = panel_client.get("/internal/closes?ticker=AAPL&start_date=2024-13-01&end_date=2024-01-31",
+                                       headers=PEER)
+            outsider = panel_client.get(url, headers={FORWARDED_HEADER: "http://b"})
+
+        assert outsider.status_code == 403
+        assert first == second and first["ticker"] == "AAPL"
+        assert first["dates"][0] == "2024-01-02" and first["dates"][-1] == "2024-01-31"
+        assert series.json()["prices"][-1] == pytest.approx(first["closes"][-1], abs=0.01)
+        assert panel_provider.calls == 1
+        assert invalid.status_code == 400
+
+    @pytest.mark.unit
+    def test_served_while_request_workers_are_busy(self, panel_client):
+        """Workers blocked on forwards to a peer must not starve the peer's own requests to this node"""
+        import app
+        release = threading.Event()
+        blocked = [app.executor.submit(release.wait, 10) for _ in range(app.executor._max_workers)]
+        try:
+            with patch("app.cluster", Cluster("http://a", ["http://a", "http://b"], SECRET)):
+                started = time.monotonic()
+                response = panel_client.get("/internal/closes?ticker=AAPL&start_date=2024-01-02&end_date=2024-01-31",
+                                            headers=PEER)
+                elapsed = time.monotonic() - started
+        finally:
+            release.set()
+            for job in blocked:
+                job.result()
+
+        assert response.status_code == 200 and elapsed < 5
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+@pytest.fixture
+def nodes(tmp_path):
+    """Three backend processes on local ports serving the same price file"""
+    days = pd.bdate_range("2024-01-02", periods=30)
+    rng = np.random.default_rng(3)
+    frame = pd.DataFrame({"Date": days.strftime("%Y-%m-%d")})
+    for ticker in ("AAPL", "MSFT", "NVDA", "AMZN", "META", "GOOGL"):
+        frame[ticker] = 100 * np.cumprod(1 + rng.normal(0, 0.01, len(days)))
+    frame.to_csv(tmp_path / "closes.csv", index=False)
+
+    urls = [f"http://127.0.0.1:{free_port()}" for _ in range(3)]
+    processes = []
+    for url in urls:
+        env = {**os.environ, "CLUSTER_NODES": ",".join(urls), "CLUSTER_SELF": url, "CLUSTER_SECRET": SECRET,
+               "STOCK_PROVIDER": "file", "STOCK_DATA_DIR": str(tmp_path), "READ_AHEAD": "0", "PRELOAD_PROVIDER": "0"}
+        for name in ("PRICE_STORE_PATH", "CACHE_SNAPSHOT_PATH"):
+            env.pop(name, None)
+        processes.append(subprocess.Popen(
+            [sys.executable, "-m", "uvicorn", "app:app", "--port", url.rsplit(":", 1)[1], "--log-level", "warning"],
+            cwd=BACKEND_DIR, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+        ))
+    try:
+        deadline = time.monotonic() + 60
+        for url in urls:
+            while True:
+                try:
+                    if httpx.get(url + "/health").status_code == 200:
+                        break
+                except httpx.HTTPError:
+                    pass
+                assert time.monotonic() < deadline, "cluster nodes did not start"
+                time.sleep(0.2)
+        yield urls
+    finally:
+        for process in processes:
+            process.terminate()
+        for process in processes:
+            process.wait(timeout=10)
+
+
+class TestLocalCluster:
+
+    @pytest.mark.integration
+    def test_each_ticker_day_fetched_once_cluster_wide(self, nodes):
+        tickers = ["AAPL", "MSFT", "NVDA", "AMZN", "META", "GOOGL"]
+        days = ["2024-01-03", "2024-01-04", "2024-01-05"]
+        owners = {httpx.get(url + "/health").json()["cluster"]["self"] for url in nodes}
+        assert len(owners) == 3
+
+        answers = {}
+        for url in nodes:
+            for ticker in tickers:
+                for day in days:
+                    response = httpx.get(url + "/ticker-return", params={"ticker": ticker, "date": day}, timeout=30)
+                    assert response.status_code == 200
+                    answers.setdefault((ticker, day), set()).add(response.json()["return"])
+            items = [{"ticker": ticker, "date": "2024-01-08"} for ticker in tickers]
+            results = httpx.post(url + "/batch-returns", json={"items": items}, timeout=30).json()["results"]
+            assert all(result["return"] is not None for result in results)
+
+            for ticker in tickers:
+                response = httpx.get(url + "/ticker-series", timeout=30,
+                                     params={"ticker": ticker, "start_date": "2024-01-10", "end_date": "2024-02-09"})
+                answers.setdefault((ticker, "series"), set()).add(tuple(response.json()["returns"]))
+
+        # Every node gave the same answer, and only the owner fetched it
+        assert all(len(values) == 1 for values in answers.values())
+        counters = [httpx.get(url + "/metrics").json()["counters"] for url in nodes]
+        assert sum(c.get("return_fetches_total", 0) for c in counters) == len(tickers) * (len(days) + 1)
+        assert sum(c.get('series_source_total{source="upstream"}', 0) for c in counters) == len(tickers)
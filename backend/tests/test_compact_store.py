@@ -0,0 +1,243 @@
+import pytest
+import time
+import tracemalloc
+
+from services.cache import InMemoryCache
+from services.compact_store import CompactReturnCache, session_ordinal, ordinal_to_date
+
+
+def make_payload(ticker, date, ret=0.05, price=150.0, previous_price=142.86):
+    return {"ticker": ticker, "date": date, "return": ret, "price": price, "previous_price": previous_price}
+
+
+class TestSessionOrdinal:
+
+    @pytest.mark.unit
+    def test_consecutive_sessions_are_adjacent(self):
+        """Friday and the following Monday map to consecutive ordinals"""
+        assert session_ordinal("2024-01-08") == session_ordinal("2024-01-05") + 1
+
+    @pytest.mark.unit
+    def test_weekend_has_no_ordinal(self):
+        """Weekend dates are not sessions"""
+        assert session_ordinal("2024-01-06") is None
+        assert session_ordinal("2024-01-07") is None
+
+    @pytest.mark.unit
+    def test_round_trip(self):
+        """ordinal_to_date inverts session_ordinal"""
+        for day in ["1970-01-01", "2001-09-10", "2024-02-29"]:
+            assert ordinal_to_date(session_ordinal(day)) == day
+
+
+class TestCompactReturnCache:
+
+    @pytest.fixture
+    def cache(self):
+        return CompactReturnCache(ttl_seconds=3600, initial_capacity=4)
+
+    @pytest.mark.unit
+    def test_set_and_get_round_trip(self, cache):
+        """Payloads are rebuilt exactly from the arrays"""
+        payload = make_payload("AAPL", "2024-01-02", ret=-0.012345, price=185.64, previous_price=187.9)
+        cache.set("AAPL", "2024-01-02", payload)
+
+        assert cache.get("AAPL", "2024-01-02") == payload
+
+    @pytest.mark.unit
+    def test_missing_entries(self, cache):
+        """Unknown tickers and unfilled slots are cache misses"""
+        cache.set("AAPL", "2024-01-02", make_payload("AAPL", "2024-01-02"))
+
+        assert cache.get("MSFT", "2024-01-02") is None
+        assert cache.get("AAPL", "2024-01-03") is None
+
+    @pytest.mark.unit
+    def test_grows_in_both_directions(self, cache):
+        """Arrays regrow when sessions fall before the base or beyond capacity"""
+        days = ["2024-03-01", "2024-01-02", "2024-06-03", "2023-12-29"]
+        for i, day in enumerate(days):
+            cache.set("NVDA", day, make_payload("NVDA", day, ret=i / 100, price=100.0 + i))
+
+        for i, day in enumerate(days):
+            assert cache.get("NVDA", day) == make_payload("NVDA", day, ret=i / 100, price=100.0 + i)
+
+    @pytest.mark.unit
+    def test_error_payloads(self, cache):
+        """Error payloads are kept with their message"""
+        error = {"ticker": "AAPL", "date": "2024-01-02", "return": None, "error": "No data available"}
+        cache.set("AAPL", "2024-01-02", error)
+
+        assert cache.get("AAPL", "2024-01-02") == error
+
+        # Overwriting with a real return drops the error
+        cache.set("AAPL", "2024-01-02", make_payload("AAPL", "2024-01-02"))
+        assert cache.get("AAPL", "2024-01-02") == make_payload("AAPL", "2024-01-02")
+
+    @pytest.mark.unit
+    def test_weekend_and_irregular_payloads_use_overflow(self, cache):
+        """Weekend dates and non-standard payloads are still cached"""
+        weekend = make_payload("AAPL", "2024-01-06")
+        irregular = {"ticker": "AAPL", "date": "2024-01-02", "note": "custom"}
+        huge_price = make_payload("BRK-A", "2024-01-02", price=540000.12, previous_price=539000.5)
+
+        cache.set("AAPL", "2024-01-06", weekend)
+        cache.set("AAPL", "2024-01-03", irregular)
+        cache.set("BRK-A", "2024-01-02", huge_price)
+
+        assert cache.get("AAPL", "2024-01-06") == weekend
+        assert cache.get("AAPL", "2024-01-03") == irregular
+        assert cache.get("BRK-A", "2024-01-02") == huge_price
+        assert cache.memory_usage() == 0
+
+    @pytest.mark.unit
+    def test_ttl_expiration(self):
+        """Entries expire after the TTL"""
+        cache = CompactReturnCache(ttl_seconds=1)
+        cache.set("AAPL", "2024-01-02", make_payload("AAPL", "2024-01-02"))
+        assert cache.get("AAPL", "2024-01-02") is not None
+
+        time.sleep(2.1)
+
+        assert cache.get("AAPL", "2024-01-02") is None
+
+    @pytest.mark.unit
+    def test_stale_within_grace_period(self):
+        """Expired slots stay readable through get_stale during the grace period"""
+        now = [0.0]
+        cache = CompactReturnCache(ttl_seconds=10, stale_seconds=60, timer=lambda: now[0])
+        payload = make_payload("AAPL", "2024-01-02")
+        weekend = make_payload("AAPL", "2024-01-06")
+        cache.set("AAPL", "2024-01-02", payload)
+        cache.set("AAPL", "2024-01-06", weekend)
+        assert cache.get_stale("AAPL", "2024-01-02") is None
+
+        now[0] = 30.0
+        assert cache.get("AAPL", "2024-01-02") is None
+        assert cache.get_stale("AAPL", "2024-01-02") == payload
+        assert cache.get("AAPL", "2024-01-06") is None
+        assert cache.get_stale("AAPL", "2024-01-06") == weekend
+
+        now[0] = 100.0
+        assert cache.get_stale("AAPL", "2024-01-02") is None
+        assert cache.get_stale("AAPL", "2024-01-06") is None
+
+    @pytest.mark.unit
+    def test_snapshot_round_trip(self, tmp_path):
+        """Array slots are snapshotted with their age and restored fresh or stale"""
+        from services.cache_snapshot import write_snapshot, load_snapshot
+        now = [0.0]
+        cache = CompactReturnCache(ttl_seconds=10, stale_seconds=60, timer=lambda: now[0])
+        error = {"ticker": "AAPL", "date": "2024-01-03", "return": None, "error": "No data available"}
+        cache.set("AAPL", "2024-01-02", make_payload("AAPL", "2024-01-02"))
+        cache.set("AAPL", "2024-01-03", error)
+        now[0] = 5.0
+        cache.set("MSFT", "2024-01-02", make_payload("MSFT", "2024-01-02"))
+        now[0] = 12.0
+
+        path = str(tmp_path / "cache.json.gz")
+        assert write_snapshot(cache, path) == 3
+
+        later = [500.0]
+        restored = CompactReturnCache(ttl_seconds=10, stale_seconds=60, timer=lambda: later[0])
+        assert load_snapshot(restored, path) == 3
+        assert restored.get("AAPL", "2024-01-02") is None
+        assert restored.get_stale("AAPL", "2024-01-02") == make_payload("AAPL", "2024-01-02")
+        assert restored.get_stale("AAPL", "2024-01-03") == error
+        assert restored.get("MSFT", "2024-01-02") == make_payload("MSFT", "2024-01-02")
+
+    @pytest.mark.unit
+    def test_ticker_eviction(self):
+        """The least recently used ticker is dropped beyond max_tickers"""
+        cache = CompactReturnCache(max_tickers=2)
+        for ticker in ["AAPL", "MSFT"]:
+            cache.set(ticker, "2024-01-02", make_payload(ticker, "2024-01-02"))
+        cache.get("AAPL", "2024-01-02")
+
+        cache.set("GOOGL", "2024-01-02", make_payload("GOOGL", "2024-01-02"))
+
+        assert cache.get("AAPL", "2024-01-02") is not None
+        assert cache.get("MSFT", "2024-01-02") is None
+        assert cache.get("GOOGL", "2024-01-02") is not None
+
+    @pytest.mark.unit
+    def test_invalidate_range(self, cache):
+        """Slots in the range, their errors and matching overflow entries are dropped"""
+        for day in ("2024-01-02", "2024-01-03", "2024-01-04", "2024-01-05"):
+            cache.set("AAPL", day, make_payload("AAPL", day))
+        cache.set("AAPL", "2024-01-06", make_payload("AAPL", "2024-01-06"))
+        cache.set("MSFT", "2024-01-03", {"ticker": "MSFT", "date": "2024-01-03", "return": None, "error": "x"})
+
+        assert cache.invalidate(["AAPL"], "2024-01-03", "2024-01-06") == 4
+        assert cache.get("AAPL", "2024-01-02") is not None
+        assert cache.get("AAPL", "2024-01-04") is None
+        assert cache.get("AAPL", "2024-01-06") is None
+
+        assert cache.invalidate(None, "2024-01-03", "2024-01-03") == 1
+        assert cache.get("MSFT", "2024-01-03") is None
+        assert cache.invalidate(["NVDA"]) == 0
+
+    @pytest.mark.unit
+    def test_invalidate_drops_the_following_session(self, cache):
+        """The first cached session after end is dropped, its return being computed from end's close"""
+        for day in ("2024-01-02", "2024-01-03", "2024-01-08", "2024-01-09"):
+            cache.set("AAPL", day, make_payload("AAPL", day))
+
+        assert cache.invalidate(["AAPL"], "2024-01-03", "2024-01-05") == 2
+        assert cache.get("AAPL", "2024-01-02") is not None
+        assert cache.get("AAPL", "2024-01-08") is None
+        assert cache.get("AAPL", "2024-01-09") is not None
+
+    @pytest.mark.unit
+    def test_invalidate_skips_weekends_and_holidays_to_the_next_session(self, cache):
+        """A weekend overflow entry or holiday error after end does not shield the next session"""
+        closed = {"ticker": "AAPL", "return": None, "error": "No data available"}
+        cache.set("AAPL", "2024-01-12", make_payload("AAPL", "2024-01-12"))
+        cache.set("AAPL", "2024-01-13", {**closed, "date": "2024-01-13"})  # Saturday
+        cache.set("AAPL", "2024-01-15", {**closed, "date": "2024-01-15"})  # Martin Luther King Jr. Day
+        for day in ("2024-01-16", "2024-01-17"):
+            cache.set("AAPL", day, make_payload("AAPL", day))
+
+        assert cache.invalidate(["AAPL"], "2024-01-12", "2024-01-12") == 4
+        assert cache.get("AAPL", "2024-01-13") is None
+        assert cache.get("AAPL", "2024-01-16") is None
+        assert cache.get("AAPL", "2024-01-17") is not None
+
+    @pytest.mark.unit
+    def test_clear(self, cache):
+        """clear empties arrays and overflow"""
+        cache.set("AAPL", "2024-01-02", make_payload("AAPL", "2024-01-02"))
+        cache.set("AAPL", "2024-01-06", make_payload("AAPL", "2024-01-06"))
+
+        cache.clear()
+
+        assert cache.get("AAPL", "2024-01-02") is None
+        assert cache.get("AAPL", "2024-01-06") is None
+        assert cache.memory_usage() == 0
+
+    @pytest.mark.unit
+    def test_ten_times_denser_than_dict_cache(self):
+        """A year of MAG7 returns takes at least 10x less memory than the dict cache"""
+        import datetime
+
+        def fill(cache):
+            start = datetime.date(2023, 1, 2)
+            for ticker in ["MSFT", "AAPL", "GOOGL", "AMZN", "NVDA", "META", "TSLA"]:
+                for offset in range(365):
+                    day = start + datetime.timedelta(days=offset)
+                    if day.weekday() < 5:
+                        iso = day.isoformat()
+                        cache.set(ticker, iso, make_payload(ticker, iso, ret=offset / 1e5, price=100.0 + offset / 100))
+
+        def traced(factory):
+            tracemalloc.start()
+            cache = factory()
+            fill(cache)
+            used = tracemalloc.get_traced_memory()[0]
+            tracemalloc.stop()
+            return used
+
+        dict_bytes = traced(lambda: InMemoryCache(maxsize=10000))
+        compact_bytes = traced(CompactReturnCache)
+
+        assert dict_bytes / compact_bytes >= 10
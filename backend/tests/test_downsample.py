@@ -0,0 +1,164 @@
+import pytest
+from unittest.mock import patch
+
+import numpy as np
+import pandas as pd
+from fastapi.testclient import TestClient
+
+from services.downsample import lttb_indices, minmax_indices, downsample_indices
+from services.series import SeriesService
+
+
+def random_walk(n, seed=7):
+    return np.cumsum(np.random.default_rng(seed).normal(size=n))
+
+
+class RangeProvider:
+    """Daily closes for any business-day range, deterministic per date"""
+
+    def __init__(self):
+        self.calls = 0
+
+    def history(self, ticker, start, end, interval='1d'):
+        self.calls += 1
+        dates = pd.bdate_range(start, pd.Timestamp(end) - pd.Timedelta(days=1))
+        ordinals = (dates - pd.Timestamp('2000-01-03')).days.to_numpy()
+        closes = 100.0 + 10.0 * np.sin(ordinals / 50.0) + ordinals / 100.0
+        return pd.DataFrame({'Close': closes}, index=dates.tz_localize('America/New_York'))
+
+
+class TestDownsample:
+
+    @pytest.mark.unit
+    @pytest.mark.parametrize("method", ["lttb", "minmax"])
+    def test_respects_budget_and_keeps_endpoints(self, method):
+        """At most max_points sorted indices, always including first and last"""
+        y = random_walk(2520)
+
+        keep = downsample_indices(y, 300, method)
+
+        assert len(keep) <= 300
+        assert keep[0] == 0 and keep[-1] == len(y) - 1
+        assert np.all(np.diff(keep) > 0)
+
+    @pytest.mark.unit
+    def test_short_series_untouched(self):
+        """Series already within budget are returned whole"""
+        y = random_walk(50)
+
+        np.testing.assert_array_equal(lttb_indices(y, 100), np.arange(50))
+        np.testing.assert_array_equal(minmax_indices(y, 100), np.arange(50))
+
+    @pytest.mark.unit
+    def test_minmax_keeps_global_extremes(self):
+        """Every bucket's min and max survive, so the overall range is preserved"""
+        y = random_walk(5000)
+
+        keep = minmax_indices(y, 100)
+
+        assert y[keep].min() == y.min()
+        assert y[keep].max() == y.max()
+
+    @pytest.mark.unit
+    def test_lttb_keeps_spikes(self):
+        """An isolated spike is the largest triangle in its bucket"""
+        y = np.zeros(1000)
+        y[437] = 25.0
+
+        keep = lttb_indices(y, 50)
+
+        assert 437 in keep
+
+    @pytest.mark.unit
+    def test_validation(self):
+        with pytest.raises(ValueError):
+            downsample_indices(random_walk(10), 2)
+        with pytest.raises(ValueError):
+            downsample_indices(random_walk(10), 5, "average")
+
+
+class TestSeriesService:
+
+    @pytest.mark.unit
+    def test_returns_series_from_single_range_fetch(self):
+        """Ten years of returns come from one upstream call and are downsampled"""
+        provider = RangeProvider()
+        service = SeriesService(provider.history)
+
+        result = service.returns_series("AAPL", "2014-01-02", "2023-12-29", max_points=500)
+
+        assert provider.calls == 1
+        assert result["total_points"] > 2500
+        assert len(result["dates"]) <= 500
+        assert result["dates"][0] == "2014-01-02"
+        assert result["dates"][-1] == "2023-12-29"
+        assert result["method"] == "lttb"
+        assert len(result["returns"]) == len(result["prices"]) == len(result["dates"])
+
+    @pytest.mark.unit
+    def test_first_return_uses_previous_session(self):
+        """The lookback supplies the close before start_date"""
+        service = SeriesService(RangeProvider().history)
+
+        full = service.returns_series("AAPL", "2024-01-02", "2024-01-05")
+        wider = service.returns_series("AAPL", "2023-12-20", "2024-01-05")
+
+        assert full["dates"] == ["2024-01-02", "2024-01-03", "2024-01-04", "2024-01-05"]
+        assert full["method"] is None
+        assert full["returns"] == wider["returns"][-4:]
+
+    @pytest.mark.unit
+    def test_results_cached_per_range_and_resolution(self):
+        """The same (ticker, range, max_points, method) is computed once, from closes loaded once per range"""
+        provider = RangeProvider()
+        service = SeriesService(provider.history)
+
+        lttb = service.returns_series("AAPL", "2020-01-02", "2023-12-29", max_points=200)
+        assert service.returns_series("AAPL", "2020-01-02", "2023-12-29", max_points=200) is lttb
+        minmax = service.returns_series("AAPL", "2020-01-02", "2023-12-29", max_points=200, method="minmax")
+
+        assert minmax["method"] == "minmax" and minmax["dates"] != lttb["dates"]
+        assert provider.calls == 1
+
+    @pytest.mark.unit
+    def test_served_from_price_store(self, tmp_path, monkeypatch):
+        """Once a range is in the price store, other ranges inside it need no upstream call"""
+        from services import price_store
+        monkeypatch.setenv("PRICE_STORE_PATH", str(tmp_path / "prices.bin"))
+        monkeypatch.setattr(price_store, "_store", None)
+        provider = RangeProvider()
+        service = SeriesService(provider.history)
+        try:
+            first = service.returns_series("AAPL", "2023-01-03", "2023-12-29")
+            inner = service.returns_series("AAPL", "2023-03-01", "2023-06-30")
+        finally:
+            price_store._store.close()
+            price_store._store = None
+
+        assert provider.calls == 1
+        start = first["dates"].index("2023-03-01")
+        end = first["dates"].index("2023-06-30")
+        assert inner["dates"] == first["dates"][start:end + 1]
+        assert inner["returns"] == first["returns"][start:end + 1]
+
+
+class TestSeriesEndpoint:
+
+    @pytest.mark.unit
+    def test_ticker_series(self):
+        from app import app
+        service = SeriesService(RangeProvider().history)
+        with patch('app.series_service', service):
+            client = TestClient(app)
+            response = client.get("/ticker-series?ticker=nvda&start_date=2015-01-02&end_date=2024-12-31"
+                                  "&max_points=400&method=minmax")
+            bad_method = client.get("/ticker-series?ticker=NVDA&start_date=2015-01-02&end_date=2024-12-31"
+                                    "&max_points=400&method=mean")
+            too_few = client.get("/ticker-series?ticker=NVDA&start_date=2015-01-02&end_date=2024-12-31&max_points=2")
+
+        assert response.status_code == 200
+        body = response.json()
+        assert body["ticker"] == "NVDA"
+        assert len(body["dates"]) <= 400
+        assert bad_method.status_code == 400
+        assert too_few.status_code == 422
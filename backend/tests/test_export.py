@@ -0,0 +1,162 @@
+import io
+import pytest
+from unittest.mock import patch
+
+import pandas as pd
+from fastapi.testclient import TestClient
+
+from services.export import Exporter, parse_range
+from services.result_cache import ResultCache
+from services.series import SeriesService
+from tests.fakes import PanelProvider
+
+URL = "/export?start_date=2020-01-02&end_date=2021-12-31&tickers=aapl,msft"
+
+
+@pytest.fixture
+def provider():
+    return PanelProvider()
+
+
+@pytest.fixture
+def exporter(provider):
+    return Exporter(SeriesService(provider.history).daily_closes, cache=ResultCache(name="test_export"),
+                    block_rows=100)
+
+
+def export(exporter, fmt="csv", **kwargs):
+    return b"".join(exporter.stream(["AAPL", "MSFT"], "2020-01-02", "2021-12-31", fmt, **kwargs))
+
+
+class TestParseRange:
+
+    @pytest.mark.unit
+    def test_forms(self):
+        assert parse_range("bytes=0-99", 1000) == (0, 99)
+        assert parse_range("bytes=900-", 1000) == (900, 999)
+        assert parse_range("bytes=900-5000", 1000) == (900, 999)
+        assert parse_range("bytes=-100", 1000) == (900, 999)
+        assert parse_range("bytes=1000-", 1000) is None
+        with pytest.raises(ValueError):
+            parse_range("bytes=0-1,5-6", 1000)
+        with pytest.raises(ValueError):
+            parse_range("items=0-1", 1000)
+
+
+class TestExporter:
+
+    @pytest.mark.unit
+    def test_csv_rows(self, exporter, provider):
+        frame = pd.read_csv(io.BytesIO(export(exporter)))
+
+        assert list(frame.columns) == ["ticker", "date", "return", "price", "previous_price"]
+        assert frame["ticker"].value_counts().to_dict() == {"AAPL": 522, "MSFT": 522}
+        closes = provider.closes("AAPL")
+        expected = closes.pct_change()[closes.index >= "2020-01-02"].iloc[0]
+        assert frame.iloc[0]["date"] == "2020-01-02"
+        assert frame.iloc[0]["return"] == pytest.approx(expected, abs=1e-6)
+        # One fetch per ticker, whatever the number of blocks
+        assert provider.calls == 2
+
+    @pytest.mark.unit
+    def test_streams_in_blocks(self, exporter):
+        pieces = list(exporter.stream(["AAPL", "MSFT"], "2020-01-02", "2021-12-31", "csv"))
+
+        assert len(pieces) == 12
+        assert max(len(piece) for piece in pieces) < 100 * 50
+
+    @pytest.mark.unit
+    def test_ranges_slice_the_same_bytes(self, exporter):
+        whole = export(exporter)
+
+        for first, last in ((0, 0), (10, 4499), (4490, 4510), (len(whole) - 7, len(whole) - 1)):
+            assert export(exporter, first=first, last=last) == whole[first:last + 1]
+        assert export(exporter, first=30000) == whole[30000:]
+
+    @pytest.mark.unit
+    def test_size_is_remembered_per_etag(self, exporter, provider):
+        opened = exporter.open(["AAPL", "MSFT"], "2020-01-02", "2021-12-31", "csv")
+        assert opened.known_size() is None
+        whole = b"".join(opened.stream())
+
+        reopened = exporter.open(["AAPL", "MSFT"], "2020-01-02", "2021-12-31", "csv")
+        assert reopened.etag == opened.etag
+        assert reopened.known_size() == reopened.size() == len(whole)
+
+        provider.closes("AAPL").loc["2021-06-01"] *= 1.5
+        revised = exporter.open(["AAPL", "MSFT"], "2020-01-02", "2021-12-31", "csv")
+        assert revised.etag != opened.etag
+        assert revised.known_size() is None
+
+    @pytest.mark.unit
+    def test_parquet(self, exporter):
+        frame = pd.read_parquet(io.BytesIO(export(exporter, "parquet")))
+
+        assert len(frame) == 1044
+        assert frame["return"].iloc[0] == pytest.approx(pd.read_csv(io.BytesIO(export(exporter)))["return"].iloc[0])
+
+
+class TestExportEndpoint:
+
+    @pytest.fixture
+    def client(self, exporter):
+        from app import app
+        with patch("app.exporter", exporter):
+            yield TestClient(app)
+
+    @pytest.mark.unit
+    def test_download_and_resume(self, client):
+        whole = client.get(URL)
+        assert whole.status_code == 200
+        assert whole.headers["content-type"].startswith("text/csv")
+        assert whole.headers["accept-ranges"] == "bytes"
+        etag = whole.headers["etag"]
+
+        resumed = client.get(URL, headers={"Range": "bytes=5000-", "If-Range": etag})
+
+        assert resumed.status_code == 206
+        assert resumed.headers["content-range"] == f"bytes 5000-{len(whole.content) - 1}/{len(whole.content)}"
+        assert resumed.content == whole.content[5000:]
+        # Size is known after a full download
+        assert client.get(URL).headers["content-length"] == str(len(whole.content))
+
+    @pytest.mark.unit
+    def test_changed_data_changes_the_etag(self, client, provider):
+        whole = client.get(URL)
+
+        # A revised close inside the range, as after an invalidation or upstream adjustment
+        provider.closes("AAPL").loc["2021-06-01"] *= 1.5
+        resumed = client.get(URL, headers={"Range": "bytes=5000-", "If-Range": whole.headers["etag"]})
+
+        assert resumed.status_code == 200
+        assert resumed.headers["etag"] != whole.headers["etag"]
+        assert resumed.content != whole.content
+        assert resumed.content == client.get(URL).content
+
+    @pytest.mark.unit
+    def test_parquet_download_and_resume(self, client):
+        url = URL + "&format=parquet"
+        whole = client.get(url)
+        resumed = client.get(url, headers={"Range": "bytes=1000-", "If-Range": whole.headers["etag"]})
+
+        assert whole.headers["content-type"] == "application/vnd.apache.parquet"
+        assert resumed.status_code == 206
+        assert whole.content[:1000] + resumed.content == whole.content
+        assert len(pd.read_parquet(io.BytesIO(whole.content))) == 1044
+
+    @pytest.mark.unit
+    def test_range_edge_cases(self, client):
+        size = len(client.get(URL).content)
+
+        assert client.get(URL, headers={"Range": "bytes=-10"}).status_code == 206
+        unsatisfiable = client.get(URL, headers={"Range": f"bytes={size}-"})
+        assert unsatisfiable.status_code == 416
+        assert unsatisfiable.headers["content-range"] == f"bytes */{size}"
+        # A stale validator or several ranges get the whole export
+        assert client.get(URL, headers={"Range": "bytes=0-9", "If-Range": '"old"'}).status_code == 200
+        assert len(client.get(URL, headers={"Range": "bytes=0-9,20-29"}).content) == size
+
+    @pytest.mark.unit
+    def test_validation(self, client):
+        assert client.get(URL + "&format=xlsx").status_code == 400
+        assert client.get("/export?start_date=2021-12-31&end_date=2020-01-02").status_code == 400
@@ -0,0 +1,177 @@
+import asyncio
+import pytest
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from unittest.mock import patch
+
+from services.hedging import Hedger, LatencyTracker, SharedCalls
+from services.metrics import metrics
+from tests.fakes import SlowProvider
+
+
+def history(provider):
+    return provider.history("AAPL", "2024-01-01", "2024-01-06")
+
+
+class TestLatencyTracker:
+
+    @pytest.mark.unit
+    def test_percentile_of_recent_samples(self):
+        tracker = LatencyTracker(window=100)
+        for n in range(200):
+            tracker.add(float(n))
+
+        assert len(tracker) == 100
+        assert tracker.percentile(0.95) == 195.0
+        assert LatencyTracker().percentile(0.95) is None
+
+
+class TestHedger:
+
+    @pytest.mark.unit
+    def test_hedge_cuts_the_latency_tail(self):
+        """The slow 30th call is duplicated after ~p95 and the fast copy answers"""
+        provider = SlowProvider(latency=0.005, slow_every=30, slow_latency=1.0)
+        hedger = Hedger(min_samples=20, min_delay=0.02, max_ratio=0.1)
+        hedges = metrics.counter("upstream_hedges_total", provider="upstream")
+        try:
+            for _ in range(29):
+                hedger.call(history, provider)
+
+            started = time.monotonic()
+            result = hedger.call(history, provider)
+            elapsed = time.monotonic() - started
+        finally:
+            hedger.close()
+
+        assert not result.empty
+        assert elapsed < 0.5
+        assert provider.calls == 31
+        assert metrics.counter("upstream_hedges_total", provider="upstream") == hedges + 1
+        assert metrics.counter("upstream_hedge_wins_total", provider="upstream", winner="hedge") >= 1
+
+    @pytest.mark.unit
+    def test_budget_limits_hedges(self):
+        provider = SlowProvider(latency=0.002, slow_every=25, slow_latency=0.2)
+        hedger = Hedger(min_samples=20, min_delay=0.01, max_ratio=0.0)
+        try:
+            for _ in range(25):
+                hedger.call(history, provider)
+        finally:
+            hedger.close()
+
+        assert provider.calls == 25
+
+    @pytest.mark.unit
+    def test_error_when_both_copies_fail(self):
+        hedger = Hedger(min_samples=1, min_delay=0.01, max_ratio=1.0)
+        hedger.latency.add(0.001)
+
+        def failing():
+            time.sleep(0.05)
+            raise ValueError("upstream broke")
+
+        try:
+            with pytest.raises(ValueError, match="upstream broke"):
+                hedger.call(failing)
+        finally:
+            hedger.close()
+
+
+class TestSharedCalls:
+
+    @pytest.mark.unit
+    @pytest.mark.asyncio
+    async def test_concurrent_waiters_share_one_job(self):
+        calls = []
+
+        def fetch(key):
+            calls.append(key)
+            time.sleep(0.05)
+            return key.upper()
+
+        with ThreadPoolExecutor(2) as executor:
+            shared = SharedCalls(executor)
+            results = await asyncio.gather(*(shared.run("aapl", fetch, "aapl") for _ in range(5)))
+
+        assert results == ["AAPL"] * 5
+        assert calls == ["aapl"]
+        assert len(shared) == 0
+
+    @pytest.mark.unit
+    @pytest.mark.asyncio
+    async def test_queued_job_is_cancelled_when_every_waiter_leaves(self):
+        release = threading.Event()
+        calls = []
+        with ThreadPoolExecutor(1) as executor:
+            shared = SharedCalls(executor)
+            busy = executor.submit(release.wait)
+            waiters = [asyncio.ensure_future(shared.run("msft", calls.append, "msft")) for _ in range(3)]
+            await asyncio.sleep(0.01)
+
+            waiters[0].cancel()
+            await asyncio.sleep(0.01)
+            assert len(shared) == 1
+            for waiter in waiters[1:]:
+                waiter.cancel()
+            await asyncio.gather(*waiters, return_exceptions=True)
+            release.set()
+            busy.result()
+
+        assert calls == []
+        assert len(shared) == 0
+
+
+class TestClientDisconnect:
+
+    @staticmethod
+    async def call(app, path, disconnect_after):
+        """Drive the ASGI app directly; the client disconnects after disconnect_after seconds"""
+        messages = [{"type": "http.request", "body": b"", "more_body": False}]
+        sent = []
+
+        async def receive():
+            if messages:
+                return messages.pop(0)
+            await asyncio.sleep(disconnect_after)
+            return {"type": "http.disconnect"}
+
+        async def send(message):
+            sent.append(message)
+
+        path, _, query = path.partition("?")
+        scope = {"type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1", "method": "GET",
+                 "scheme": "http", "path": path, "raw_path": path.encode(), "query_string": query.encode(),
+                 "root_path": "", "headers": [(b"host", b"testserver")], "client": ("test", 1),
+                 "server": ("testserver", 80)}
+        await app(scope, receive, send)
+        return next(message["status"] for message in sent if message["type"] == "http.response.start")
+
+    @pytest.mark.unit
+    @pytest.mark.asyncio
+    async def test_queued_fetches_are_cancelled_on_disconnect(self, clean_cache):
+        """Requests abandoned while queued behind a busy executor never reach the provider"""
+        from app import app
+        release = threading.Event()
+        fetched = []
+
+        def fetch(ticker, date):
+            fetched.append((ticker, date))
+            return {"ticker": ticker, "date": date, "return": 0.01}
+
+        with ThreadPoolExecutor(1) as executor, \
+                patch("app.return_fetches", SharedCalls(executor, name="test")), \
+                patch("app.read_ahead", None), \
+                patch("app.StockDataService.fetch_single_day_return", side_effect=fetch):
+            busy = executor.submit(release.wait)
+            statuses = await asyncio.gather(*(
+                self.call(app, f"/ticker-return?ticker=AAPL&date=2024-01-{day:02d}", disconnect_after=0.05)
+                for day in range(2, 6)
+            ))
+            release.set()
+            busy.result()
+
+        assert statuses == [499] * 4
+        assert fetched == []
+        assert metrics.counter("shared_calls_cancelled_total", calls="test") >= 4
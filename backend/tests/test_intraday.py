@@ -0,0 +1,208 @@
+import pytest
+from datetime import date
+from unittest.mock import patch
+
+import numpy as np
+from fastapi.testclient import TestClient
+
+from services.intraday import IntradayService, bars_from_history, resample, check_interval
+from tests.fakes import FakeProvider
+
+
+def make_service(provider=None, today=date(2024, 1, 10), **kwargs):
+    provider = provider or FakeProvider()
+    return IntradayService(provider.history, today=lambda: today, **kwargs), provider
+
+
+class TestIntradayArrays:
+
+    @pytest.mark.unit
+    def test_bars_from_history(self):
+        """Timezone-aware bars become UTC epoch seconds and float closes"""
+        bars = bars_from_history(FakeProvider.intraday("2024-01-02", "1m"))
+
+        assert bars.times.dtype == np.int64
+        assert bars.closes.dtype == np.float64
+        assert len(bars.times) == 390
+        # 09:30 New York is 14:30 UTC
+        assert bars.times[0] == 1704205800
+        assert np.all(np.diff(bars.times) == 60)
+
+    @pytest.mark.unit
+    def test_bars_from_empty_history(self):
+        """yfinance's empty frame (plain Index, no tz) gives empty bars"""
+        from yfinance.utils import empty_df
+
+        bars = bars_from_history(empty_df())
+
+        assert bars.times.dtype == np.int64 and bars.times.size == 0
+        assert bars.closes.dtype == np.float64 and bars.closes.size == 0
+
+    @pytest.mark.unit
+    def test_resample_matches_native_bars(self):
+        """5m bars aggregated from 1m match 5m bars from the provider"""
+        minute = bars_from_history(FakeProvider.intraday("2024-01-02", "1m"))
+        native = bars_from_history(FakeProvider.intraday("2024-01-02", "5m"))
+
+        derived = resample(minute, "5m")
+
+        np.testing.assert_array_equal(derived.times, native.times)
+        np.testing.assert_allclose(derived.closes, native.closes)
+
+    @pytest.mark.unit
+    def test_resample_hourly_aligned_to_open(self):
+        """Hourly buckets start at the session open and the last one is partial"""
+        minute = bars_from_history(FakeProvider.intraday("2024-01-02", "1m"))
+
+        hourly = resample(minute, "1h")
+
+        assert len(hourly.times) == 7
+        assert hourly.times[0] == minute.times[0]
+        assert hourly.closes[-1] == minute.closes[-1]
+
+    @pytest.mark.unit
+    def test_check_interval(self):
+        """Unsupported intervals and dates past the provider's lookback are rejected"""
+        today = date(2024, 6, 3)
+        assert check_interval("5m", "2024-05-31", today) is None
+        assert "Unsupported interval" in check_interval("2h", "2024-05-31", today)
+        assert "last 29 days" in check_interval("1m", "2024-01-02", today)
+        assert check_interval("1h", "2024-01-02", today) is None
+
+
+class TestIntradayService:
+
+    @pytest.mark.unit
+    def test_completed_session_is_cached(self):
+        """A finished session is fetched once per interval"""
+        service, provider = make_service()
+
+        first = service.bars("AAPL", "2024-01-02", "5m")
+        second = service.bars("AAPL", "2024-01-02", "5m")
+
+        assert provider.calls == 1
+        assert second is first
+        assert service.memory_usage() == first.nbytes
+
+    @pytest.mark.unit
+    def test_coarser_interval_derived_from_finer_page(self):
+        """With 1m bars in memory, 15m and 1h need no upstream call"""
+        service, provider = make_service()
+        service.bars("AAPL", "2024-01-02", "1m")
+
+        quarter = service.bars("AAPL", "2024-01-02", "15m")
+        hourly = service.bars("AAPL", "2024-01-02", "1h")
+
+        assert provider.calls == 1
+        assert len(quarter.times) == 26
+        assert len(hourly.times) == 7
+
+    @pytest.mark.unit
+    def test_current_session_expires(self):
+        """Today's bars are re-fetched once the live TTL has passed"""
+        service, provider = make_service(today=date(2024, 1, 2), live_ttl_seconds=0)
+
+        service.bars("AAPL", "2024-01-02", "5m")
+        service.bars("AAPL", "2024-01-02", "5m")
+
+        assert provider.calls == 2
+
+    @pytest.mark.unit
+    def test_byte_budget_evicts_oldest_pages(self):
+        """Completed pages are evicted LRU once the byte budget is exceeded"""
+        page_bytes = 390 * 16
+        service, provider = make_service(max_bytes=2 * page_bytes)
+
+        for day in ["2024-01-02", "2024-01-03", "2024-01-04"]:
+            service.bars("AAPL", day, "1m")
+        service.bars("AAPL", "2024-01-02", "1m")
+
+        assert service.memory_usage() <= 2 * page_bytes
+        assert provider.calls == 4
+
+    @pytest.mark.unit
+    def test_invalidate_by_ticker_and_range(self):
+        """Pages are found through the ticker index, in both the completed and live tiers"""
+        service, provider = make_service(today=date(2024, 1, 3))
+        for day in ("2024-01-02", "2024-01-03"):
+            service.bars("AAPL", day, "5m")
+            service.bars("MSFT", day, "5m")
+
+        with patch.object(service._completed, "keys", side_effect=AssertionError("scanned")):
+            assert service.invalidate(["AAPL"], "2024-01-02", "2024-01-03") == 2
+        assert service.invalidate(None, "2024-01-03") == 1
+
+        service.bars("AAPL", "2024-01-02", "5m")
+        service.bars("MSFT", "2024-01-02", "5m")
+        assert provider.calls == 5
+
+    @pytest.mark.unit
+    def test_intraday_returns(self):
+        """Returns are measured against the previous session close"""
+        service, _ = make_service()
+
+        result = service.intraday_returns("AAPL", "2024-01-02", "1h", previous_close=100.0)
+
+        assert result["interval"] == "1h"
+        assert len(result["times"]) == len(result["returns"]) == 7
+        assert result["returns"][0] == pytest.approx((result["prices"][0] - 100.0) / 100.0, abs=1e-6)
+
+
+class TestIntradayEndpoint:
+
+    @pytest.fixture
+    def client(self):
+        from app import app
+        return TestClient(app)
+
+    @pytest.mark.unit
+    def test_intraday_return(self, client):
+        """Bars come back with returns against the daily previous close"""
+        service, _ = make_service()
+        daily = {"ticker": "AAPL", "date": "2024-01-02", "return": 0.01, "price": 101.0, "previous_price": 100.0}
+
+        with patch('app.intraday_service', service), \
+             patch('app.check_interval', return_value=None), \
+             patch('app.cache_instance.get', return_value=daily):
+            response = client.get("/intraday-return?ticker=aapl&date=2024-01-02&interval=30m")
+
+        assert response.status_code == 200
+        body = response.json()
+        assert body["ticker"] == "AAPL"
+        assert body["previous_close"] == 100.0
+        assert len(body["times"]) == 13
+
+    @pytest.mark.unit
+    def test_intraday_return_without_bars(self, client):
+        """A day the provider has no bars for (weekend, holiday) is a 404, not a 500"""
+        from yfinance.utils import empty_df
+        service = IntradayService(lambda *args, **kwargs: empty_df(), today=lambda: date(2024, 1, 10))
+        daily = {"ticker": "AAPL", "date": "2024-01-06", "return": 0.0, "price": 101.0, "previous_price": 101.0}
+
+        with patch('app.intraday_service', service), \
+             patch('app.check_interval', return_value=None), \
+             patch('app.cache_instance.get', return_value=daily):
+            response = client.get("/intraday-return?ticker=AAPL&date=2024-01-06&interval=5m")
+
+        assert response.status_code == 404
+        assert response.json()["detail"] == "No intraday data available"
+
+    @pytest.mark.unit
+    def test_intraday_return_validation(self, client):
+        """Bad intervals are rejected before any fetch"""
+        with patch('app.StockDataService.fetch_single_day_return') as mock_fetch:
+            response = client.get("/intraday-return?ticker=AAPL&date=2024-01-02&interval=2h")
+
+        assert response.status_code == 400
+        mock_fetch.assert_not_called()
+
+    @pytest.mark.unit
+    def test_intraday_return_without_previous_close(self, client):
+        """Days without a daily return have nothing to measure against"""
+        error = {"ticker": "AAPL", "date": "2024-01-01", "return": None, "error": "No data available"}
+        with patch('app.check_interval', return_value=None), \
+             patch('app.cache_instance.get', return_value=error):
+            response = client.get("/intraday-return?ticker=AAPL&date=2024-01-01&interval=5m")
+
+        assert response.status_code == 404
+        assert response.json()["detail"] == "No data available"
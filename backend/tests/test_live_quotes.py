@@ -0,0 +1,129 @@
+import asyncio
+import pytest
+from unittest.mock import patch
+
+from fastapi.testclient import TestClient
+
+from services.live_quotes import LiveQuoteHub, quote_message
+from tests.fakes import FakeQuoteFeed
+
+
+class TestLiveQuoteHub:
+
+    @pytest.mark.unit
+    def test_quote_message(self):
+        """Return is computed against the previous close"""
+        message = quote_message("AAPL", 105.0, 100.0)
+
+        assert message["return"] == 0.05
+        assert message["price"] == 105.0
+        assert message["previous_close"] == 100.0
+
+    @pytest.mark.unit
+    @pytest.mark.asyncio
+    async def test_one_poller_fans_out_to_all_subscribers(self):
+        """Upstream polls depend on tickers watched, not on subscriber count"""
+        feed = FakeQuoteFeed({"AAPL": [101.0, 102.0, 103.0]})
+        hub = LiveQuoteHub(feed, interval=0.01)
+        queues = [asyncio.Queue() for _ in range(50)]
+        for queue in queues:
+            hub.subscribe("AAPL", queue)
+
+        messages = [await asyncio.wait_for(queue.get(), 1) for queue in queues]
+        await hub.close()
+
+        assert all(m["ticker"] == "AAPL" and m["return"] == 0.01 for m in messages)
+        assert feed.calls["AAPL"] <= 3
+        assert hub.polling == set()
+
+    @pytest.mark.unit
+    @pytest.mark.asyncio
+    async def test_poller_stops_with_last_subscriber(self):
+        """Unsubscribing everyone cancels the ticker's poller"""
+        feed = FakeQuoteFeed({"AAPL": [101.0], "MSFT": [99.0]})
+        hub = LiveQuoteHub(feed, interval=0.01)
+        first, second = asyncio.Queue(), asyncio.Queue()
+        hub.subscribe("AAPL", first)
+        hub.subscribe("AAPL", second)
+        hub.subscribe("MSFT", second)
+        await asyncio.wait_for(first.get(), 1)
+
+        hub.unsubscribe("AAPL", first)
+        assert hub.polling == {"AAPL", "MSFT"}
+        hub.unsubscribe("AAPL", second)
+        assert hub.polling == {"MSFT"}
+        assert hub.subscriber_count("AAPL") == 0
+        await hub.close()
+
+    @pytest.mark.unit
+    @pytest.mark.asyncio
+    async def test_late_subscriber_gets_latest_quote_immediately(self):
+        """New subscribers do not wait a full interval for their first quote"""
+        feed = FakeQuoteFeed({"AAPL": [101.0]})
+        hub = LiveQuoteHub(feed, interval=60)
+        early = asyncio.Queue()
+        hub.subscribe("AAPL", early)
+        await asyncio.wait_for(early.get(), 1)
+
+        late = asyncio.Queue()
+        hub.subscribe("AAPL", late)
+
+        assert late.get_nowait()["price"] == 101.0
+        assert feed.calls["AAPL"] == 1
+        await hub.close()
+
+    @pytest.mark.unit
+    @pytest.mark.asyncio
+    async def test_slow_subscriber_keeps_newest_quotes(self):
+        """A full queue drops its oldest quote instead of blocking the broadcast"""
+        feed = FakeQuoteFeed({"AAPL": [101.0, 102.0, 103.0, 104.0]})
+        hub = LiveQuoteHub(feed, interval=0.01)
+        slow = asyncio.Queue(maxsize=1)
+        hub.subscribe("AAPL", slow)
+        while feed.calls.get("AAPL", 0) < 4:
+            await asyncio.sleep(0.01)
+        await asyncio.sleep(0.02)
+        await hub.close()
+
+        assert slow.qsize() == 1
+        assert slow.get_nowait()["price"] == 104.0
+
+    @pytest.mark.unit
+    @pytest.mark.asyncio
+    async def test_feed_errors_are_broadcast(self):
+        """Poll failures reach subscribers as error messages and polling continues"""
+        def failing_feed(ticker):
+            raise RuntimeError("feed down")
+
+        hub = LiveQuoteHub(failing_feed, interval=0.01)
+        queue = asyncio.Queue()
+        hub.subscribe("AAPL", queue)
+
+        first = await asyncio.wait_for(queue.get(), 1)
+        second = await asyncio.wait_for(queue.get(), 1)
+        await hub.close()
+
+        assert first["error"] == "feed down"
+        assert second["ticker"] == "AAPL"
+
+
+class TestReturnsWebSocket:
+
+    @pytest.mark.unit
+    def test_clients_share_one_upstream_poller(self):
+        """Several WebSocket clients watching the same ticker cost one feed call per interval"""
+        import app as app_module
+        feed = FakeQuoteFeed({"AAPL": [101.0, 102.0], "MSFT": [99.0, 98.0]})
+        hub = LiveQuoteHub(feed, interval=60)
+
+        with patch('app.quote_hub', hub):
+            with TestClient(app_module.app) as client:
+                with client.websocket_connect("/ws/returns?tickers=aapl,MSFT") as first, \
+                        client.websocket_connect("/ws/returns?tickers=AAPL") as second:
+                    first_messages = {first.receive_json()["ticker"] for _ in range(2)}
+                    second_message = second.receive_json()
+
+        assert first_messages == {"AAPL", "MSFT"}
+        assert second_message["ticker"] == "AAPL"
+        assert second_message["return"] == 0.01
+        assert feed.calls == {"AAPL": 1, "MSFT": 1}
@@ -0,0 +1,172 @@
+import io
+import json
+import logging
+import logging.handlers
+import pytest
+import queue
+import sys
+import time
+
+from fastapi import FastAPI, HTTPException
+from fastapi.testclient import TestClient
+
+from services.log_pipeline import AccessLogMiddleware, JsonFormatter, LazyQueueHandler, Sampler
+from services.metrics import metrics
+
+
+class Captured(logging.Handler):
+    def __init__(self):
+        super().__init__()
+        self.records = []
+
+    def emit(self, record):
+        self.records.append(record)
+
+
+def isolated_logger(name, handler):
+    logger = logging.getLogger(name)
+    logger.handlers[:] = [handler]
+    logger.setLevel(logging.INFO)
+    logger.propagate = False
+    return logger
+
+
+class TestJsonFormatter:
+
+    @pytest.mark.unit
+    def test_message_and_extra_fields(self):
+        record = logging.LogRecord("app", logging.INFO, __file__, 1, "Cache hit for %s:%s", ("AAPL", "2024-01-02"),
+                                   None)
+        record.ticker = "AAPL"
+        record.created = 1704196800.25
+        record.msecs = 250.0
+
+        entry = json.loads(JsonFormatter().format(record))
+
+        assert entry == {"ts": "2024-01-02T12:00:00.250Z", "level": "INFO", "logger": "app",
+                         "msg": "Cache hit for AAPL:2024-01-02", "ticker": "AAPL"}
+
+    @pytest.mark.unit
+    def test_exception_is_included(self):
+        try:
+            raise ValueError("upstream broke")
+        except ValueError:
+            record = logging.makeLogRecord({"msg": "failed", "levelno": logging.ERROR, "levelname": "ERROR"})
+            record.exc_info = sys.exc_info()
+
+        entry = json.loads(JsonFormatter().format(record))
+
+        assert "ValueError: upstream broke" in entry["exc"]
+
+
+class TestSampler:
+
+    @pytest.mark.unit
+    def test_rates(self):
+        sampler = Sampler({"cache_hit": 0.0, "request": 0.5}, rng=iter([0.4, 0.6]).__next__)
+
+        assert not sampler("cache_hit")
+        assert sampler("request")
+        assert not sampler("request")
+        # Categories without a rate are always kept
+        assert sampler("cache_miss")
+
+
+class TestLazyQueueHandler:
+
+    @pytest.mark.unit
+    def test_caller_does_not_format(self):
+        class Expensive:
+            renders = 0
+
+            def __str__(self):
+                Expensive.renders += 1
+                return "expensive"
+
+        records = queue.SimpleQueue()
+        logger = isolated_logger("tests.lazy", LazyQueueHandler(records))
+
+        logger.info("value %s", Expensive())
+
+        assert Expensive.renders == 0
+        record = records.get_nowait()
+        assert record.getMessage() == "value expensive"
+
+    @pytest.mark.unit
+    def test_full_queue_drops_instead_of_blocking(self):
+        records = queue.SimpleQueue()
+        logger = isolated_logger("tests.full", LazyQueueHandler(records, max_size=2))
+        dropped = metrics.counter("log_records_dropped_total")
+
+        for n in range(5):
+            logger.info("record %d", n)
+
+        assert records.qsize() == 2
+        assert metrics.counter("log_records_dropped_total") == dropped + 3
+
+    @pytest.mark.unit
+    def test_listener_writes_json_lines(self):
+        out = io.StringIO()
+        stream = logging.StreamHandler(out)
+        stream.setFormatter(JsonFormatter())
+        records = queue.SimpleQueue()
+        logger = isolated_logger("tests.listener", LazyQueueHandler(records))
+        listener = logging.handlers.QueueListener(records, stream)
+        listener.start()
+        try:
+            logger.info("Fetching %s for %s", "MSFT", "2024-03-01", extra={"ticker": "MSFT"})
+        finally:
+            listener.stop()
+
+        entry = json.loads(out.getvalue())
+        assert entry["msg"] == "Fetching MSFT for 2024-03-01"
+        assert entry["ticker"] == "MSFT"
+
+
+class TestAccessLogMiddleware:
+
+    @pytest.fixture
+    def captured(self):
+        return Captured()
+
+    @pytest.fixture
+    def client(self, captured):
+        app = FastAPI()
+        app.add_middleware(AccessLogMiddleware, slow_ms=50,
+                           logger=isolated_logger("tests.access", captured))
+
+        @app.get("/fast")
+        def fast():
+            return {}
+
+        @app.get("/slow")
+        def slow():
+            time.sleep(0.06)
+            return {}
+
+        @app.get("/broken")
+        def broken():
+            raise HTTPException(status_code=503, detail="down")
+
+        return TestClient(app)
+
+    @pytest.mark.unit
+    def test_slow_and_failed_requests_are_always_logged(self, client, captured, monkeypatch):
+        monkeypatch.setattr("services.log_pipeline._sampler", Sampler({"request": 0.0}))
+
+        client.get("/fast")
+        client.get("/slow")
+        client.get("/broken")
+
+        assert [(record.levelname, record.path, record.status) for record in captured.records] == [
+            ("WARNING", "/slow", 200), ("ERROR", "/broken", 503)]
+        assert captured.records[0].slow and captured.records[0].duration_ms >= 50
+
+    @pytest.mark.unit
+    def test_sampled_requests_log_at_info(self, client, captured, monkeypatch):
+        monkeypatch.setattr("services.log_pipeline._sampler", Sampler({"request": 1.0}))
+
+        client.get("/fast")
+
+        assert [(record.levelname, record.getMessage()[:13]) for record in captured.records] == [
+            ("INFO", "GET /fast 200")]
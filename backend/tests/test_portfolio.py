@@ -0,0 +1,110 @@
+import numpy as np
+import pytest
+
+from services.portfolio import period_starts, portfolio_returns
+from tests.fakes import random_panel, sessions
+
+
+def panel(tickers=4):
+    return sessions(300, "2023-01-02"), random_panel(300, tickers, seed=3, mean=0.0005)
+
+
+def reference(dates, returns, weights, schedule):
+    """Day-by-day holdings walk"""
+    weights = np.asarray(weights) / np.sum(weights)
+    starts = set(period_starts(dates, schedule).tolist())
+    holdings = weights.copy()
+    daily = []
+    for day, row in enumerate(returns):
+        if day in starts:
+            holdings = weights * holdings.sum() if day else weights.copy()
+        before = holdings.sum()
+        holdings = holdings * (1 + row)
+        daily.append(holdings.sum() / before - 1)
+    return np.array(daily)
+
+
+class TestPortfolioReturns:
+
+    @pytest.mark.unit
+    def test_period_starts(self):
+        dates = np.array(["2024-01-30", "2024-01-31", "2024-02-01", "2024-03-28", "2024-04-01"], dtype="datetime64[D]")
+
+        assert period_starts(dates, "none").tolist() == [0]
+        assert period_starts(dates, "monthly").tolist() == [0, 2, 3, 4]
+        assert period_starts(dates, "quarterly").tolist() == [0, 4]
+        with pytest.raises(ValueError):
+            period_starts(dates, "weekly")
+
+    @pytest.mark.unit
+    @pytest.mark.parametrize("schedule", ["none", "monthly", "quarterly"])
+    def test_matches_holdings_walk(self, schedule):
+        dates, returns = panel()
+        weights = [0.4, 0.3, 0.2, 0.1]
+
+        daily, cumulative = portfolio_returns(dates, returns, np.array(weights), schedule)
+
+        np.testing.assert_allclose(daily, reference(dates, returns, weights, schedule), atol=1e-12)
+        np.testing.assert_allclose(cumulative[-1], np.prod(1 + daily) - 1)
+
+    @pytest.mark.unit
+    def test_rebalancing_matters(self):
+        dates, returns = panel()
+        weights = np.array([1.0, 1.0, 1.0, 1.0])
+
+        held, _ = portfolio_returns(dates, returns, weights, "none")
+        monthly, _ = portfolio_returns(dates, returns, weights, "monthly")
+
+        # Identical until the first rebalance, then the drifted weights diverge
+        first_rebalance = period_starts(dates, "monthly")[1]
+        np.testing.assert_allclose(held[:first_rebalance], monthly[:first_rebalance])
+        assert not np.allclose(held[first_rebalance:], monthly[first_rebalance:])
+        # On a rebalancing day the basket holds equal weights, so it earns the mean return
+        np.testing.assert_allclose(monthly[period_starts(dates, "monthly")],
+                                   returns[period_starts(dates, "monthly")].mean(axis=1))
+
+    @pytest.mark.unit
+    def test_rejects_invalid_weights(self):
+        dates, returns = panel(tickers=2)
+        for weights in ([1.0, -0.5], [0.0, 0.0], [np.nan, 1.0]):
+            with pytest.raises(ValueError):
+                portfolio_returns(dates, returns, np.array(weights))
+
+
+class TestPortfolioEndpoint:
+
+    @pytest.mark.unit
+    def test_portfolio(self, panel_client, panel_provider):
+        url = "/portfolio?start_date=2021-01-04&end_date=2021-12-31&tickers=aapl,msft&weights=3,1&rebalance=monthly"
+
+        response = panel_client.get(url)
+
+        assert response.status_code == 200
+        body = response.json()
+        assert body["tickers"] == ["AAPL", "MSFT"]
+        assert body["weights"] == [0.75, 0.25]
+        assert body["sessions"] == len(body["dates"]) == len(body["returns"]) == 260
+        assert body["total_return"] == body["cumulative_returns"][-1]
+        assert body["total_return"] == pytest.approx(np.prod(1 + np.array(body["returns"])) - 1, abs=1e-4)
+        calls = panel_provider.calls
+
+        # Same basket with another schedule reuses the cached panel
+        assert panel_client.get(url.replace("monthly", "quarterly")).status_code == 200
+        assert panel_client.get(url).json() == body
+        assert panel_provider.calls == calls
+
+    @pytest.mark.unit
+    def test_equal_weight_by_default(self, panel_client):
+        body = panel_client.get("/portfolio?start_date=2021-01-04&end_date=2021-03-31&tickers=aapl,msft,nvda,tsla").json()
+
+        assert body["weights"] == [0.25] * 4
+        assert body["rebalance"] == "none"
+
+    @pytest.mark.unit
+    def test_validation(self, panel_client):
+        base = "/portfolio?start_date=2021-01-04&end_date=2021-03-31&tickers=aapl,msft"
+        assert panel_client.get(base + "&weights=1").status_code == 400
+        assert panel_client.get(base + "&weights=1,-1").status_code == 400
+        assert panel_client.get(base + "&weights=a,b").status_code == 400
+        assert panel_client.get(base + "&rebalance=weekly").status_code == 400
+        assert panel_client.get("/portfolio?start_date=2021-03-31&end_date=2021-01-04").status_code == 400
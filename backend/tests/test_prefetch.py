@@ -0,0 +1,178 @@
+import pytest
+from datetime import date
+from unittest.mock import patch
+
+import pandas as pd
+from fastapi.testclient import TestClient
+
+from services.cache import InMemoryCache
+from services.prefetch import ReadAhead, dense_runs
+from services.series import SeriesService
+from tests.fakes import PanelProvider
+
+
+def sessions(start, count):
+    return [day.strftime("%Y-%m-%d") for day in pd.bdate_range(start, periods=count)]
+
+
+@pytest.fixture
+def provider():
+    return PanelProvider()
+
+
+@pytest.fixture
+def cache():
+    return InMemoryCache(ttl_seconds=3600, maxsize=10000)
+
+
+@pytest.fixture
+def read_ahead(provider, cache):
+    read_ahead = ReadAhead(SeriesService(provider.history).daily_closes, cache, today=lambda: date(2024, 12, 31))
+    yield read_ahead
+    read_ahead.close()
+
+
+class TestReadAhead:
+
+    @pytest.mark.unit
+    def test_fill_caches_a_range_from_one_fetch(self, provider, cache, read_ahead):
+        days = sessions("2024-03-04", 20)
+
+        assert read_ahead.fill("AAPL", days[0], days[-1]) == 20
+
+        assert provider.calls == 1
+        closes = provider.closes("AAPL")
+        first = cache.get("AAPL", days[0])
+        expected = closes[pd.Timestamp(days[0])] / closes[closes.index < pd.Timestamp(days[0])].iloc[-1] - 1
+        assert first["return"] == round(expected, 6)
+        assert first["price"] == round(closes[pd.Timestamp(days[0])], 2)
+
+    @pytest.mark.unit
+    def test_sequential_requests_read_ahead(self, provider, cache, read_ahead):
+        """Three consecutive days start a forward read-ahead of about a month"""
+        days = sessions("2024-03-04", 40)
+
+        assert read_ahead.observe("AAPL", [days[0]]) is None
+        assert read_ahead.observe("AAPL", [days[1]]) is None
+        scheduled = read_ahead.observe("AAPL", [days[2]])
+        read_ahead.close(wait=True)
+
+        assert scheduled[0] == "2024-03-07"
+        assert provider.calls == 1
+        assert all(cache.get("AAPL", day) is not None for day in days[3:24])
+
+    @pytest.mark.unit
+    def test_paging_backwards_reads_behind(self, read_ahead):
+        visible = sessions("2024-06-03", 20)
+        read_ahead.observe("MSFT", visible)
+        read_ahead.close(wait=True)
+
+        scheduled = read_ahead.observe("MSFT", ["2024-05-31"])
+
+        assert scheduled is not None and scheduled[1] == "2024-05-30"
+
+    @pytest.mark.unit
+    def test_scattered_requests_do_not_read_ahead(self, provider, read_ahead):
+        for day in ("2024-01-10", "2024-03-05", "2024-07-18", "2024-02-01", "2024-09-09"):
+            assert read_ahead.observe("NVDA", [day]) is None
+        read_ahead.close(wait=True)
+
+        assert provider.calls == 0
+
+    @pytest.mark.unit
+    def test_window_adapts_to_hit_rate(self, read_ahead):
+        """A fully used read-ahead doubles the window; an unused one halves it"""
+        days = sessions("2024-01-02", 200)
+        for day in days[:3]:
+            read_ahead.observe("AAPL", [day])
+        read_ahead.close(wait=True)
+        assert read_ahead.window("AAPL") == 21
+
+        # Walk through everything prefetched, which triggers the next read-ahead
+        for day in days[3:20]:
+            read_ahead.observe("AAPL", [day])
+        read_ahead.close(wait=True)
+        assert read_ahead.window("AAPL") == 42
+
+        # Jump away: the 42-session read-ahead goes unused
+        for day in sessions("2024-10-01", 3):
+            read_ahead.observe("AAPL", [day])
+        read_ahead.close(wait=True)
+        assert read_ahead.window("AAPL") == 21
+
+    @pytest.mark.unit
+    def test_visible_range_sets_the_window(self, read_ahead):
+        read_ahead.observe("TSLA", sessions("2024-02-01", 60))
+
+        assert read_ahead.window("TSLA") == 60
+
+
+class TestBatchRangeFill:
+
+    @pytest.mark.unit
+    def test_dense_runs(self):
+        # Friday to Tuesday spans a long weekend; a week apart is sparse
+        days = ["2024-01-05", "2024-01-09", "2024-01-10", "2024-01-17", "2024-01-24", "2024-01-25", "2024-01-24"]
+
+        assert dense_runs(days, 4, 2) == [("2024-01-05", "2024-01-10"), ("2024-01-24", "2024-01-25")]
+        assert dense_runs(days, 4, 4) == []
+        assert dense_runs([], 4, 2) == []
+
+    @pytest.mark.unit
+    def test_runs_of_missing_days_take_one_fetch(self, provider, cache, read_ahead):
+        from app import app
+        days = sessions("2024-04-01", 15)
+
+        with patch("app.read_ahead", read_ahead), patch("app.cache_instance", cache), \
+                patch("app.series_service", SeriesService(provider.history)), \
+                patch("app.StockDataService.fetch_single_day_return", return_value={"return": 0.0}) as per_day:
+            response = TestClient(app).post("/batch-returns", json={
+                "items": [{"ticker": "AAPL", "date": day} for day in days] + [{"ticker": "MSFT", "date": days[0]}],
+            })
+        read_ahead.close(wait=True)
+
+        assert response.status_code == 200
+        results = response.json()["results"]
+        assert [result["date"] for result in results[:15]] == days
+        assert all(result["return"] is not None for result in results[:15])
+        # The lone MSFT day is fetched on its own
+        per_day.assert_called_once_with("MSFT", days[0])
+
+    @pytest.mark.unit
+    def test_grouped_without_read_ahead(self, provider, cache):
+        from app import app
+        days = sessions("2024-04-01", 40)
+
+        with patch("app.read_ahead", None), patch("app.cache_instance", cache), \
+                patch("app.series_service", SeriesService(provider.history)), \
+                patch("app.StockDataService.fetch_single_day_return") as per_day:
+            response = TestClient(app).post("/batch-returns", json={
+                "items": [{"ticker": ticker, "date": day} for ticker in ("AAPL", "MSFT", "NVDA") for day in days],
+            })
+
+        assert response.status_code == 200
+        assert all(result["return"] is not None for result in response.json()["results"])
+        # One range fetch per ticker, no per-day calls
+        assert provider.calls == 3
+        per_day.assert_not_called()
+
+    @pytest.mark.unit
+    def test_sparse_days_fetched_one_by_one(self, provider, cache):
+        from app import app
+        run = sessions("2024-04-01", 5)
+        sparse = ["2015-01-02", "2020-06-01", "2025-01-02"]
+
+        with patch("app.read_ahead", None), patch("app.cache_instance", cache), \
+                patch("app.series_service", SeriesService(provider.history)), \
+                patch("app.StockDataService.fetch_single_day_return",
+                      side_effect=lambda ticker, day: {"ticker": ticker, "date": day, "return": 0.0}) as per_day:
+            response = TestClient(app).post("/batch-returns", json={
+                "items": [{"ticker": "AAPL", "date": day} for day in sparse + run],
+            })
+
+        assert response.status_code == 200
+        assert all(result["return"] is not None for result in response.json()["results"])
+        # Only the dense run takes a range fetch; nothing between the sparse days is cached
+        assert provider.calls == 1
+        assert sorted(call.args[1] for call in per_day.call_args_list) == sparse
+        assert cache.get("AAPL", "2019-06-03") is None and cache.get("AAPL", "2024-04-05") is not None
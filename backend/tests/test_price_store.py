@@ -0,0 +1,192 @@
+import multiprocessing
+import pytest
+import numpy as np
+import pandas as pd
+from unittest.mock import patch
+
+from services.price_store import SharedPriceStore, SESSION, NO_SESSION, UNKNOWN, get_price_store
+from services.compact_store import session_ordinal
+
+
+def read_return_in_subprocess(path, ticker, date, queue):
+    store = SharedPriceStore(path, writer=False)
+    queue.put(store.lookup_return(ticker, date))
+
+
+class TestSharedPriceStore:
+
+    @pytest.fixture
+    def path(self, tmp_path):
+        return str(tmp_path / "prices.bin")
+
+    @pytest.fixture
+    def writer(self, path):
+        store = SharedPriceStore(path, max_tickers=8)
+        yield store
+        store.close()
+
+    @pytest.fixture
+    def week(self):
+        """Mon-Fri 2024-01-08..12 with a fake holiday on Wednesday"""
+        return [("2024-01-08", 100.0), ("2024-01-09", 105.0), ("2024-01-11", 103.0), ("2024-01-12", 108.0)]
+
+    @pytest.mark.unit
+    def test_first_opener_becomes_writer(self, path, writer):
+        """Only one process/handle holds the writer lock"""
+        assert writer.is_writer
+        reader = SharedPriceStore(path)
+        assert not reader.is_writer
+        with pytest.raises(RuntimeError):
+            SharedPriceStore(path, writer=True)
+        reader.close()
+
+    @pytest.mark.unit
+    def test_write_and_read_series(self, writer, week):
+        """Sessions and non-session days are recorded with flags"""
+        stored = writer.write_sessions("AAPL", week, "2024-01-08", "2024-01-13")
+
+        assert stored == 4
+        base, closes, flags = writer.series("AAPL")
+        assert base == session_ordinal("2024-01-08")
+        assert list(flags) == [SESSION, SESSION, NO_SESSION, SESSION, SESSION]
+        assert closes[1] == 105.0
+
+    @pytest.mark.unit
+    def test_reader_views_are_zero_copy(self, path, writer, week):
+        """Readers get read-only NumPy views over the mapped file"""
+        writer.write_sessions("AAPL", week, "2024-01-08", "2024-01-13")
+        reader = SharedPriceStore(path, writer=False)
+
+        _, closes, _ = reader.series("AAPL")
+
+        assert not closes.flags.owndata
+        assert not closes.flags.writeable
+        assert closes[0] == 100.0
+        reader.close()
+
+    @pytest.mark.unit
+    def test_reader_sees_later_appends(self, path, writer, week):
+        """A reader opened before the writer appends sees new tickers and sessions"""
+        reader = SharedPriceStore(path, writer=False)
+        assert reader.series("AAPL") is None
+
+        writer.write_sessions("AAPL", week, "2024-01-08", "2024-01-13")
+        assert reader.lookup_return("AAPL", "2024-01-12")["price"] == 108.0
+
+        writer.write_sessions("AAPL", [("2024-01-16", 110.0)], "2024-01-15", "2024-01-17")
+        result = reader.lookup_return("AAPL", "2024-01-16")
+        assert result["previous_price"] == 108.0
+        reader.close()
+
+    @pytest.mark.unit
+    def test_lookup_return_matches_upstream_semantics(self, writer, week):
+        """Holidays and weekends fall back to the previous session"""
+        writer.write_sessions("AAPL", week, "2024-01-08", "2024-01-13")
+
+        assert writer.lookup_return("AAPL", "2024-01-09") == {
+            "ticker": "AAPL", "date": "2024-01-09", "return": 0.05, "price": 105.0, "previous_price": 100.0,
+        }
+        # Holiday Wednesday uses Tuesday's return
+        assert writer.lookup_return("AAPL", "2024-01-10")["return"] == 0.05
+        # Thursday's previous session skips the holiday
+        assert writer.lookup_return("AAPL", "2024-01-11")["previous_price"] == 105.0
+        # Saturday resolves to Friday
+        assert writer.lookup_return("AAPL", "2024-01-13")["price"] == 108.0
+
+    @pytest.mark.unit
+    def test_lookup_return_unknown_sessions(self, writer, week):
+        """Missing coverage is a miss, not a wrong answer"""
+        writer.write_sessions("AAPL", week, "2024-01-08", "2024-01-13")
+
+        assert writer.lookup_return("AAPL", "2024-01-08") is None  # previous session not stored
+        assert writer.lookup_return("AAPL", "2024-01-16") is None
+        assert writer.lookup_return("MSFT", "2024-01-09") is None
+
+    @pytest.mark.unit
+    def test_block_relocation_keeps_data(self, path, writer):
+        """Growing past capacity (either side) relocates the block without losing sessions"""
+        days = pd.bdate_range("2020-01-01", "2021-12-31")
+        early = [(d.strftime("%Y-%m-%d"), float(i)) for i, d in enumerate(days[300:])]
+        late_start = days[300].strftime("%Y-%m-%d")
+        writer.write_sessions("MSFT", early, late_start, "2022-01-01")
+        backfill = [(d.strftime("%Y-%m-%d"), -float(i)) for i, d in enumerate(days[:300])]
+        writer.write_sessions("MSFT", backfill, "2020-01-01", late_start)
+
+        reader = SharedPriceStore(path, writer=False)
+        base, closes, flags = reader.series("MSFT")
+        assert base <= session_ordinal("2020-01-01")
+        start = session_ordinal("2020-01-01") - base
+        assert np.all(flags[start:start + len(days)] == SESSION)
+        assert closes[start + 299] == -299.0
+        assert closes[start + 300] == 0.0
+        assert closes[start + len(days) - 1] == float(len(days) - 301)
+        reader.close()
+
+    @pytest.mark.unit
+    def test_reader_in_another_process(self, path, writer, week):
+        """A separate worker process reads the writer's sessions immediately"""
+        writer.write_sessions("NVDA", week, "2024-01-08", "2024-01-13")
+        queue = multiprocessing.get_context("spawn").Queue()
+        process = multiprocessing.get_context("spawn").Process(
+            target=read_return_in_subprocess, args=(path, "NVDA", "2024-01-12", queue)
+        )
+        process.start()
+        result = queue.get(timeout=30)
+        process.join(timeout=30)
+
+        assert result["price"] == 108.0
+        assert result["previous_price"] == 103.0
+
+    @pytest.mark.unit
+    def test_invalidate_marks_days_unknown(self, path, writer, week):
+        """Invalidated days are fetched again instead of being served from the store"""
+        writer.write_sessions("AAPL", week, "2024-01-08", "2024-01-13")
+
+        assert writer.invalidate("AAPL", "2024-01-10", "2024-01-11") == 1
+        assert writer.invalidate("MSFT") == 0
+        assert writer.tickers() == ["AAPL"]
+        _, _, flags = writer.series("AAPL")
+        assert list(flags) == [SESSION, SESSION, UNKNOWN, UNKNOWN, SESSION]
+        assert writer.lookup_return("AAPL", "2024-01-12") is None
+        reader = SharedPriceStore(path, writer=False)
+        with pytest.raises(RuntimeError):
+            reader.invalidate("AAPL")
+        reader.close()
+
+    @pytest.mark.unit
+    def test_store_disabled_without_path(self, monkeypatch):
+        """No PRICE_STORE_PATH means no store"""
+        monkeypatch.delenv("PRICE_STORE_PATH", raising=False)
+        assert get_price_store() is None
+
+
+class TestStockDataServiceWithPriceStore:
+
+    @pytest.fixture
+    def store_path(self, tmp_path, monkeypatch):
+        path = str(tmp_path / "prices.bin")
+        monkeypatch.setenv("PRICE_STORE_PATH", path)
+        yield path
+        import services.price_store as price_store
+        if price_store._store is not None:
+            price_store._store.close()
+            price_store._store = None
+
+    @pytest.mark.unit
+    @patch('services.stock_data.yf.Ticker')
+    def test_second_fetch_served_from_store(self, mock_yf_ticker, store_path):
+        """Fetched history is persisted and reused without an upstream call"""
+        from services.stock_data import StockDataService
+        dates = pd.bdate_range('2024-01-08', '2024-01-12')
+        mock_yf_ticker.return_value.history.return_value = pd.DataFrame(
+            {'Close': [100.0, 105.0, 103.0, 108.0, 110.0]}, index=dates
+        )
+
+        first = StockDataService.fetch_single_day_return("AAPL", "2024-01-11")
+        mock_yf_ticker.return_value.history.reset_mock()
+        second = StockDataService.fetch_single_day_return("AAPL", "2024-01-10")
+
+        assert first["return"] == round((108.0 - 103.0) / 103.0, 6)
+        assert second == {"ticker": "AAPL", "date": "2024-01-10", "return": round(-2 / 105, 6),
+                          "price": 103.0, "previous_price": 105.0}
+        mock_yf_ticker.return_value.history.assert_not_called()
@@ -0,0 +1,123 @@
+import asyncio
+import pytest
+import threading
+import time
+
+from fastapi.testclient import TestClient
+
+from services.profiler import ProfilerBusy, SamplingProfiler, describe_tasks
+
+
+def spin_until(stop):
+    while not stop.is_set():
+        sum(range(1000))
+
+
+@pytest.fixture
+def busy_thread():
+    stop = threading.Event()
+    thread = threading.Thread(target=spin_until, args=(stop,), name="worker_1")
+    thread.start()
+    yield thread
+    stop.set()
+    thread.join()
+
+
+class TestSamplingProfiler:
+
+    @pytest.mark.unit
+    def test_collapsed_stacks_cover_other_threads(self, busy_thread):
+        profile = SamplingProfiler(interval=0.002).run(0.1)
+
+        assert profile.samples >= 10
+        lines = profile.collapsed().splitlines()
+        spinning = [line for line in lines if line.startswith("worker;") and "spin_until (tests/test_profiler.py" in line]
+        assert spinning
+        stack, count = spinning[0].rsplit(" ", 1)
+        assert int(count) > 0
+        assert stack.split(";")[1].startswith("_bootstrap ")
+
+    @pytest.mark.unit
+    def test_pstats_report(self, busy_thread):
+        profile = SamplingProfiler(interval=0.002).run(0.1)
+
+        report = profile.pstats()
+
+        assert report.startswith(f"{profile.samples} samples")
+        assert "(spin_until)" in report
+
+    @pytest.mark.unit
+    def test_one_profile_at_a_time(self):
+        profiler = SamplingProfiler(interval=0.002)
+        running = threading.Thread(target=profiler.run, args=(0.2,))
+        running.start()
+        time.sleep(0.05)
+        try:
+            with pytest.raises(ProfilerBusy):
+                profiler.run(0.01)
+        finally:
+            running.join()
+
+
+class TestDescribeTasks:
+
+    @pytest.mark.unit
+    @pytest.mark.asyncio
+    async def test_lists_suspended_tasks(self):
+        async def waiting_for_upstream(event):
+            await event.wait()
+
+        async def handler(event):
+            await waiting_for_upstream(event)
+
+        event = asyncio.Event()
+        task = asyncio.create_task(handler(event), name="fetch-AAPL")
+        await asyncio.sleep(0)
+
+        tasks = {task["name"]: task for task in describe_tasks()}
+        event.set()
+        await task
+
+        assert "handler" in tasks["fetch-AAPL"]["coro"]
+        stack = [frame.split(" ")[0] for frame in tasks["fetch-AAPL"]["stack"]]
+        assert stack == ["handler", "waiting_for_upstream", "wait"]
+
+
+class TestDebugEndpoints:
+
+    @pytest.fixture
+    def client(self, monkeypatch):
+        from app import app
+        monkeypatch.setenv("ADMIN_TOKEN", "s3cret")
+        return TestClient(app)
+
+    @pytest.mark.unit
+    def test_require_admin_token(self, client):
+        assert client.get("/debug/profile?seconds=0.05").status_code == 401
+        assert client.get("/debug/tasks", headers={"X-Admin-Token": "nope"}).status_code == 401
+
+    @pytest.mark.unit
+    def test_profile(self, client):
+        headers = {"X-Admin-Token": "s3cret"}
+        assert client.get("/debug/profile?seconds=120", headers=headers).status_code == 400
+        assert client.get("/debug/profile?seconds=1&format=svg", headers=headers).status_code == 400
+
+        response = client.get("/debug/profile?seconds=0.1&interval_ms=2", headers=headers)
+
+        assert response.status_code == 200
+        assert response.headers["content-type"].startswith("text/plain")
+        assert int(response.headers["X-Profile-Samples"]) >= 10
+        assert all(line.rsplit(" ", 1)[1].isdigit() for line in response.text.splitlines())
+
+        pstats = client.get("/debug/profile?seconds=0.05&format=pstats", headers=headers)
+        assert "samples over" in pstats.text
+
+    @pytest.mark.unit
+    def test_tasks(self, client):
+        response = client.get("/debug/tasks", headers={"X-Admin-Token": "s3cret"})
+
+        assert response.status_code == 200
+        body = response.json()
+        assert body["tasks"] and all(task["stack"] and not task["done"] for task in body["tasks"])
+        assert body["executor"]["max_workers"] == 4
+        assert body["executor"]["fetches"] == []
@@ -0,0 +1,203 @@
+import pytest
+from datetime import date
+from unittest.mock import patch
+
+import numpy as np
+from fastapi.testclient import TestClient
+
+from services.range_index import RangeIndex, RangeIndexService
+
+
+def sessions(n, start="2020-01-01", seed=3):
+    dates = np.busday_offset(np.datetime64(start), np.arange(n), roll="forward")
+    returns = np.random.default_rng(seed).normal(0, 0.02, size=n)
+    return dates, returns
+
+
+def brute_force(dates, returns, start, end):
+    mask = (dates >= np.datetime64(start)) & (dates <= np.datetime64(end))
+    window = returns[mask]
+    if window.size == 0:
+        return None
+    return {
+        "count": int(window.size),
+        "min": float(window.min()),
+        "max": float(window.max()),
+        "mean": float(window.mean()),
+        "std": float(window.std(ddof=1)) if window.size > 1 else 0.0,
+    }
+
+
+def assert_matches(actual, expected):
+    assert (actual is None) == (expected is None)
+    if expected is not None:
+        assert actual["count"] == expected["count"]
+        for field in ("min", "max", "mean", "std"):
+            assert actual[field] == pytest.approx(expected[field], abs=1e-12)
+
+
+class TestRangeIndex:
+
+    @pytest.mark.unit
+    def test_matches_brute_force_on_random_ranges(self):
+        """Every aggregate matches a direct scan of the window"""
+        dates, returns = sessions(1000)
+        index = RangeIndex(dates, returns)
+        rng = np.random.default_rng(11)
+
+        for _ in range(300):
+            a, b = sorted(rng.integers(0, 1400, size=2))
+            start = str(np.datetime64("2019-12-01") + a)
+            end = str(np.datetime64("2019-12-01") + b)
+            assert_matches(index.query(start, end), brute_force(dates, returns, start, end))
+
+    @pytest.mark.unit
+    def test_incremental_append_matches_bulk_build(self):
+        """Appending sessions one by one gives the same answers as building at once"""
+        dates, returns = sessions(300)
+        incremental = RangeIndex(dates[:0], returns[:0])
+        for day, value in zip(dates, returns):
+            incremental.append(day, value)
+        bulk = RangeIndex(dates, returns)
+
+        for start, end in [("2020-01-01", "2021-03-01"), ("2020-05-05", "2020-05-05"), ("2020-02-03", "2020-12-31")]:
+            assert_matches(incremental.query(start, end), bulk.query(start, end))
+
+    @pytest.mark.unit
+    def test_replace_last(self):
+        """The latest session can be revised in place"""
+        dates, returns = sessions(64)
+        index = RangeIndex(dates, returns)
+        revised = returns.copy()
+        revised[-1] = 0.5
+
+        index.replace_last(0.5)
+
+        start, end = str(dates[0]), str(dates[-1])
+        assert_matches(index.query(start, end), brute_force(dates, revised, start, end))
+        assert len(index) == 64
+
+    @pytest.mark.unit
+    def test_rejects_out_of_order_sessions(self):
+        dates, returns = sessions(5)
+        index = RangeIndex(dates, returns)
+
+        with pytest.raises(ValueError):
+            index.append(dates[2], 0.01)
+
+    @pytest.mark.unit
+    def test_empty_range(self):
+        """Ranges without sessions (e.g. a weekend) have no aggregate"""
+        dates, returns = sessions(10, start="2024-01-01")
+        index = RangeIndex(dates, returns)
+
+        assert index.query("2024-01-06", "2024-01-07") is None
+
+
+class FakeCloses:
+    """daily_closes(ticker, start, end) over a fixed close series"""
+
+    def __init__(self, n=2000):
+        self.dates = np.busday_offset(np.datetime64("2015-01-01"), np.arange(n), roll="forward")
+        self.closes = 100 * np.cumprod(1 + np.random.default_rng(5).normal(0, 0.01, size=n))
+        self.calls = []
+
+    def __call__(self, ticker, start, end):
+        self.calls.append((start, end))
+        mask = (self.dates >= np.datetime64(start)) & (self.dates <= np.datetime64(end))
+        return self.dates[mask], self.closes[mask]
+
+    def returns(self):
+        return self.dates[1:], np.diff(self.closes) / self.closes[:-1]
+
+
+class TestRangeIndexService:
+
+    @pytest.mark.unit
+    def test_queries_inside_coverage_need_no_fetch(self):
+        feed = FakeCloses()
+        service = RangeIndexService(feed, today=lambda: date(2024, 6, 3))
+
+        service.summary("AAPL", "2016-01-04", "2020-12-31")
+        inner = service.summary("AAPL", "2018-03-01", "2018-09-28")
+
+        assert len(feed.calls) == 1
+        assert_matches(inner, brute_force(*feed.returns(), "2018-03-01", "2018-09-28"))
+
+    @pytest.mark.unit
+    def test_extends_incrementally_to_the_right(self):
+        """Later ranges fetch only the new sessions and append them"""
+        feed = FakeCloses()
+        service = RangeIndexService(feed, today=lambda: date(2024, 6, 3))
+        service.summary("AAPL", "2016-01-04", "2020-12-31")
+
+        extended = service.summary("AAPL", "2019-01-02", "2021-06-30")
+
+        assert feed.calls[1][1] == "2021-06-30"
+        assert feed.calls[1][0] > "2020-12-01"
+        assert_matches(extended, brute_force(*feed.returns(), "2019-01-02", "2021-06-30"))
+
+    @pytest.mark.unit
+    def test_extends_to_the_left_by_rebuilding(self):
+        feed = FakeCloses()
+        service = RangeIndexService(feed, today=lambda: date(2024, 6, 3))
+        service.summary("AAPL", "2018-01-02", "2020-12-31")
+
+        earlier = service.summary("AAPL", "2016-01-04", "2017-06-30")
+        again = service.summary("AAPL", "2016-06-01", "2020-06-30")
+
+        assert len(feed.calls) == 2
+        assert_matches(earlier, brute_force(*feed.returns(), "2016-01-04", "2017-06-30"))
+        assert_matches(again, brute_force(*feed.returns(), "2016-06-01", "2020-06-30"))
+
+    @pytest.mark.unit
+    def test_live_session_refreshed_after_ttl(self):
+        """Ranges ending today re-read the live session once the TTL passes"""
+        feed = FakeCloses()
+        now = [0.0]
+        service = RangeIndexService(feed, live_ttl_seconds=60, today=lambda: date(2020, 6, 1), clock=lambda: now[0])
+
+        service.summary("AAPL", "2020-01-02", "2020-06-01")
+        service.summary("AAPL", "2020-01-02", "2020-06-01")
+        assert len(feed.calls) == 1
+
+        feed.closes[feed.dates == np.datetime64("2020-06-01")] *= 1.05
+        now[0] = 61.0
+        refreshed = service.summary("AAPL", "2020-01-02", "2020-06-01")
+
+        assert len(feed.calls) == 2
+        assert_matches(refreshed, brute_force(*feed.returns(), "2020-01-02", "2020-06-01"))
+
+    @pytest.mark.unit
+    def test_invalidate_drops_overlapping_indexes(self):
+        """Indexes are rebuilt after invalidation only when their coverage overlaps the range"""
+        feed = FakeCloses()
+        service = RangeIndexService(feed, today=lambda: date(2024, 6, 3))
+        service.summary("AAPL", "2016-01-04", "2016-12-30")
+        service.summary("MSFT", "2016-01-04", "2016-12-30")
+
+        assert service.invalidate(None, "2018-01-01", "2018-12-31") == 0
+        assert service.invalidate(["AAPL"], "2016-06-01") == 1
+        service.summary("AAPL", "2016-01-04", "2016-12-30")
+        service.summary("MSFT", "2016-01-04", "2016-12-30")
+
+        assert len(feed.calls) == 3
+
+
+class TestSummaryEndpoint:
+
+    @pytest.mark.unit
+    def test_summary(self):
+        from app import app
+        feed = FakeCloses()
+        service = RangeIndexService(feed)
+        with patch('app.range_index_service', service):
+            client = TestClient(app)
+            response = client.get("/summary?start_date=2016-01-04&end_date=2016-12-30&tickers=aapl,msft")
+            reversed_range = client.get("/summary?start_date=2016-12-30&end_date=2016-01-04")
+
+        assert response.status_code == 200
+        body = response.json()["summary"]
+        assert set(body) == {"AAPL", "MSFT"}
+        assert body["AAPL"]["count"] == 260
+        assert reversed_range.status_code == 400
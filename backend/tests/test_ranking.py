@@ -0,0 +1,72 @@
+import numpy as np
+import pytest
+
+from services.ranking import cross_section
+from tests.fakes import random_panel
+
+
+class TestCrossSection:
+
+    @pytest.mark.unit
+    def test_matches_row_by_row(self):
+        returns = random_panel(250, 7, seed=5)
+
+        result = cross_section(returns)
+
+        for row in (0, 99, 249):
+            order = sorted(range(7), key=lambda column: -returns[row, column])
+            assert result["order"][row].tolist() == order
+            assert [result["rank"][row, column] for column in order] == list(range(1, 8))
+            assert result["dispersion"][row] == pytest.approx(np.std(returns[row], ddof=1))
+        np.testing.assert_allclose(result["percentile"][result["rank"] == 1], 1.0)
+        np.testing.assert_allclose(result["percentile"][result["rank"] == 7], 0.0)
+
+    @pytest.mark.unit
+    def test_ties_keep_column_order(self):
+        result = cross_section(np.array([[0.01, 0.02, 0.01]]))
+
+        assert result["rank"].tolist() == [[2, 1, 3]]
+        assert result["percentile"].tolist() == [[0.5, 1.0, 0.0]]
+
+    @pytest.mark.unit
+    def test_single_ticker(self):
+        result = cross_section(np.array([[0.01], [0.02]]))
+
+        assert result["rank"].tolist() == [[1], [1]]
+        assert np.isnan(result["percentile"]).all() and np.isnan(result["dispersion"]).all()
+
+
+class TestRankingEndpoint:
+
+    @pytest.mark.unit
+    def test_ranking(self, panel_client, panel_provider):
+        response = panel_client.get("/ranking?start_date=2020-01-02&end_date=2020-12-31&tickers=aapl,msft,nvda")
+
+        assert response.status_code == 200
+        body = response.json()
+        assert body["tickers"] == ["AAPL", "MSFT", "NVDA"]
+        assert body["sessions"] == len(body["dates"]) == len(body["ranking"]) == 261
+        day_one = {ticker: panel_provider.closes(ticker).pct_change()[panel_provider.closes(ticker).index >= "2020-01-02"].iloc[0]
+                   for ticker in body["tickers"]}
+        assert body["ranking"][0] == sorted(day_one, key=lambda ticker: -day_one[ticker])
+        leader = body["ranking"][0][0]
+        assert body["ranks"][leader][0] == 1 and body["percentiles"][leader][0] == 1.0
+        assert body["ranks"]["MSFT"][0] == body["ranking"][0].index("MSFT") + 1
+        assert body["mean_return"][0] is not None and body["dispersion"][0] > 0
+        assert sum(s["sessions_first"] for s in body["summary"].values()) == 261
+        assert body["summary"]["MSFT"]["mean_rank"] == pytest.approx(np.mean(body["ranks"]["MSFT"]), abs=1e-6)
+
+    @pytest.mark.unit
+    def test_cached_per_range(self, panel_client, panel_provider):
+        url = "/ranking?start_date=2020-01-02&end_date=2020-12-31"
+        first = panel_client.get(url).json()
+        calls = panel_provider.calls
+
+        assert panel_client.get(url).json() == first
+        assert panel_provider.calls == calls == 7
+        assert len(first["ranks"]) == 7
+
+    @pytest.mark.unit
+    def test_validation(self, panel_client):
+        assert panel_client.get("/ranking?start_date=2020-12-31&end_date=2020-01-02").status_code == 400
+        assert panel_client.get("/ranking?start_date=2020-01-02&end_date=2020-12-31&tickers=%20,").status_code == 400
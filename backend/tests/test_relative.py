@@ -0,0 +1,94 @@
+import numpy as np
+import pytest
+
+from services.relative import relative_metrics
+from tests.fakes import random_panel
+
+
+def panel(sessions=500, seed=11):
+    benchmark = random_panel(sessions, 1, seed, mean=0.0004, std=0.012)[:, 0]
+    betas = np.array([0.5, 1.0, 1.8])
+    returns = 0.0002 + benchmark[:, None] * betas + random_panel(sessions, 3, seed + 1, std=0.004)
+    return returns, benchmark, betas
+
+
+class TestRelativeMetrics:
+
+    @pytest.mark.unit
+    def test_full_period_matches_polyfit(self):
+        returns, benchmark, betas = panel()
+
+        result = relative_metrics(returns, benchmark, window=60)
+
+        for column in range(3):
+            slope, intercept = np.polyfit(benchmark, returns[:, column], 1)
+            assert result["beta"][column] == pytest.approx(slope)
+            assert result["alpha"][column] == pytest.approx(intercept)
+        np.testing.assert_allclose(result["beta"], betas, atol=0.05)
+        np.testing.assert_allclose(result["excess"], returns - benchmark[:, None])
+
+    @pytest.mark.unit
+    def test_rolling_matches_windowed_fits(self):
+        returns, benchmark, _ = panel(sessions=200)
+
+        result = relative_metrics(returns, benchmark, window=30)
+
+        assert np.isnan(result["rolling_beta"][:29]).all()
+        for end in (29, 100, 199):
+            window = slice(end - 29, end + 1)
+            slope, intercept = np.polyfit(benchmark[window], returns[window, 2], 1)
+            assert result["rolling_beta"][end, 2] == pytest.approx(slope)
+            assert result["rolling_alpha"][end, 2] == pytest.approx(intercept, abs=1e-10)
+
+    @pytest.mark.unit
+    def test_short_range(self):
+        returns, benchmark, _ = panel(sessions=10)
+
+        result = relative_metrics(returns, benchmark, window=60)
+
+        assert np.isnan(result["rolling_beta"]).all()
+        assert np.isfinite(result["beta"]).all()
+
+
+class TestRelativeEndpoint:
+
+    @pytest.mark.unit
+    def test_relative(self, panel_client, panel_provider):
+        response = panel_client.get("/relative?start_date=2020-01-02&end_date=2020-12-31&tickers=aapl,msft"
+                              "&benchmark=qqq&window=20")
+
+        assert response.status_code == 200
+        body = response.json()
+        assert body["benchmark"] == "QQQ"
+        assert body["sessions"] == len(body["dates"]) == 261
+        aapl = body["tickers"]["AAPL"]
+        # Tickers in the fake panel share a market factor with the benchmark
+        assert 0.5 < aapl["beta"] < 1.5 and aapl["correlation"] > 0.5
+        assert aapl["rolling_beta"][:19] == [None] * 19 and aapl["rolling_beta"][19] is not None
+        assert aapl["excess_return"] == pytest.approx(aapl["total_return"] - body["benchmark_return"], abs=1e-6)
+        assert len(aapl["excess_returns"]) == 261
+        assert panel_provider.calls == 3
+
+    @pytest.mark.unit
+    def test_benchmark_fetched_once_per_range(self, panel_client, panel_provider):
+        base = "/relative?start_date=2020-01-02&end_date=2020-12-31&benchmark=SPY"
+        panel_client.get(base + "&tickers=aapl")
+        panel_client.get(base + "&tickers=msft")
+        panel_client.get(base + "&tickers=aapl,msft&window=30")
+
+        # AAPL, MSFT and SPY once each
+        assert panel_provider.calls == 3
+
+    @pytest.mark.unit
+    def test_benchmark_left_out_of_default_universe(self, panel_client):
+        body = panel_client.get("/relative?start_date=2020-01-02&end_date=2020-12-31&benchmark=aapl").json()
+
+        assert body["benchmark"] == "AAPL"
+        assert "AAPL" not in body["tickers"] and len(body["tickers"]) == 6
+
+    @pytest.mark.unit
+    def test_validation(self, panel_client):
+        base = "/relative?start_date=2020-01-02&end_date=2020-12-31"
+        assert panel_client.get(base + "&window=2").status_code == 422
+        assert panel_client.get(base + "&benchmark=%20").status_code == 400
+        assert panel_client.get("/relative?start_date=2020-12-31&end_date=2020-01-02").status_code == 400
@@ -0,0 +1,271 @@
+import pytest
+import random
+import threading
+
+from fastapi.testclient import TestClient
+
+from services import stock_data
+from services.metrics import metrics
+from services.resilience import (
+    TokenBucket, CircuitBreaker, UpstreamGuard, RateLimitedError, UpstreamUnavailableError,
+    CircuitOpenError, CLOSED, OPEN, HALF_OPEN, is_retryable,
+)
+from services.stock_data import StockDataService
+from tests.fakes import FakeProvider
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.now += seconds
+
+
+def make_guard(clock, max_attempts=3, threshold=5, reset=30.0, rate=100.0, burst=100.0):
+    bucket = TokenBucket(rate=rate, capacity=burst, name="test", clock=clock, sleep=clock.sleep)
+    breaker = CircuitBreaker(failure_threshold=threshold, reset_timeout=reset, name="test", clock=clock)
+    return UpstreamGuard(bucket, breaker, max_attempts=max_attempts, backoff_base=0.5, backoff_max=2.0,
+                         name="test", sleep=clock.sleep, rng=random.Random(1))
+
+
+class TestTokenBucket:
+
+    @pytest.mark.unit
+    def test_burst_then_rate(self):
+        """Burst capacity is available immediately, then tokens refill at the rate"""
+        clock = FakeClock()
+        bucket = TokenBucket(rate=2, capacity=3, clock=clock, sleep=clock.sleep)
+
+        for _ in range(3):
+            assert bucket.try_acquire() == 0
+        assert bucket.try_acquire() == pytest.approx(0.5)
+
+        assert bucket.acquire()
+        assert clock.now == pytest.approx(0.5)
+
+    @pytest.mark.unit
+    def test_acquire_timeout(self):
+        """acquire gives up when the wait would exceed the timeout"""
+        clock = FakeClock()
+        bucket = TokenBucket(rate=1, capacity=1, clock=clock, sleep=clock.sleep)
+        bucket.acquire()
+
+        assert bucket.acquire(timeout=0.5) is False
+        assert bucket.acquire(timeout=1.0) is True
+
+
+class TestCircuitBreaker:
+
+    @pytest.mark.unit
+    def test_opens_after_threshold_and_half_opens(self):
+        """closed -> open after N failures -> half-open after the reset timeout -> closed on success"""
+        clock = FakeClock()
+        breaker = CircuitBreaker(failure_threshold=2, reset_timeout=10, name="cb", clock=clock)
+
+        breaker.record_failure()
+        assert breaker.state == CLOSED
+        breaker.record_failure()
+        assert breaker.state == OPEN
+        assert not breaker.allow()
+        assert metrics.gauge("upstream_circuit_state", provider="cb") == 2
+
+        clock.now += 10
+        assert breaker.state == HALF_OPEN
+        assert breaker.allow()
+        assert not breaker.allow()  # only one trial call
+
+        breaker.record_success()
+        assert breaker.state == CLOSED
+        assert metrics.gauge("upstream_circuit_state", provider="cb") == 0
+
+    @pytest.mark.unit
+    def test_failed_trial_reopens(self):
+        """A failure in half-open state reopens immediately"""
+        clock = FakeClock()
+        breaker = CircuitBreaker(failure_threshold=1, reset_timeout=5, clock=clock)
+        breaker.record_failure()
+        clock.now += 5
+        assert breaker.allow()
+
+        breaker.record_failure()
+
+        assert breaker.state == OPEN
+        assert breaker.retry_after() == pytest.approx(5)
+
+
+class TestUpstreamGuard:
+
+    @pytest.mark.unit
+    def test_retries_429_with_backoff(self):
+        """Transient 429s are retried with jittered exponential backoff"""
+        clock = FakeClock()
+        guard = make_guard(clock)
+        provider = FakeProvider(fail_first=2)
+        retries = metrics.counter("upstream_retries_total", provider="test")
+
+        result = guard.call(provider.history, "AAPL", "2024-01-01", "2024-01-06")
+
+        assert not result.empty
+        assert provider.calls == 3
+        assert metrics.counter("upstream_retries_total", provider="test") == retries + 2
+        # Two sleeps bounded by base * 2**attempt
+        assert 0 < clock.now <= 0.5 + 1.0
+
+    @pytest.mark.unit
+    def test_gives_up_after_max_attempts(self):
+        """Bounded retries end in UpstreamUnavailableError"""
+        clock = FakeClock()
+        guard = make_guard(clock, max_attempts=2)
+        provider = FakeProvider(fail_first=10)
+
+        with pytest.raises(UpstreamUnavailableError):
+            guard.call(provider.history, "AAPL", "2024-01-01", "2024-01-06")
+        assert provider.calls == 2
+
+    @pytest.mark.unit
+    def test_open_circuit_fails_fast(self):
+        """Once open, calls are rejected without reaching the provider"""
+        clock = FakeClock()
+        guard = make_guard(clock, max_attempts=1, threshold=2)
+        provider = FakeProvider(fail_first=100)
+        for _ in range(2):
+            with pytest.raises(UpstreamUnavailableError):
+                guard.call(provider.history, "AAPL", "2024-01-01", "2024-01-06")
+
+        with pytest.raises(CircuitOpenError) as exc_info:
+            guard.call(provider.history, "AAPL", "2024-01-01", "2024-01-06")
+
+        assert provider.calls == 2
+        assert exc_info.value.retry_after == pytest.approx(30)
+
+    @pytest.mark.unit
+    def test_non_retryable_errors_pass_through(self):
+        """Ordinary errors are raised immediately and do not trip the breaker"""
+        clock = FakeClock()
+        guard = make_guard(clock, threshold=1)
+
+        def broken(*args, **kwargs):
+            raise ValueError("bad ticker")
+
+        with pytest.raises(ValueError):
+            guard.call(broken)
+        assert guard.breaker.state == CLOSED
+
+    @pytest.mark.unit
+    def test_rate_limits_burst_of_calls(self):
+        """A burst beyond capacity is spread out at the configured rate"""
+        clock = FakeClock()
+        guard = make_guard(clock, rate=5, burst=5)
+        provider = FakeProvider()
+
+        for _ in range(10):
+            guard.call(provider.history, "AAPL", "2024-01-01", "2024-01-06")
+
+        assert clock.now == pytest.approx(1.0)
+
+    @pytest.mark.unit
+    def test_retryable_classification(self):
+        """429s, connection errors and timeouts are retryable"""
+        class YFRateLimitError(Exception):
+            pass
+
+        assert is_retryable(RateLimitedError())
+        assert is_retryable(YFRateLimitError())
+        assert is_retryable(ConnectionResetError())
+        assert is_retryable(TimeoutError())
+        assert not is_retryable(KeyError("Close"))
+
+
+class TestStockDataServiceResilience:
+
+    @pytest.fixture
+    def fake_upstream(self, monkeypatch):
+        """Route StockDataService through a fake provider and a real-time guard with short backoff"""
+        clock = FakeClock()
+        guard = make_guard(clock, max_attempts=3, threshold=3)
+        provider = FakeProvider()
+        monkeypatch.setattr(stock_data, "upstream_guard", guard)
+        monkeypatch.setattr(StockDataService, "provider", provider)
+        return provider, guard
+
+    @pytest.mark.unit
+    def test_fetch_recovers_from_throttling(self, fake_upstream):
+        """A throttled fetch still returns the computed return"""
+        provider, _ = fake_upstream
+        provider.fail_first = 2
+
+        result = StockDataService.fetch_single_day_return("AAPL", "2024-01-02")
+
+        assert result["return"] == 0.05
+        assert provider.calls == 3
+
+    @pytest.mark.unit
+    def test_fetch_raises_when_upstream_down(self, fake_upstream):
+        """Exhausted retries propagate instead of becoming an error payload"""
+        provider, _ = fake_upstream
+        provider.fail_first = 100
+
+        with pytest.raises(UpstreamUnavailableError):
+            StockDataService.fetch_single_day_return("AAPL", "2024-01-02")
+
+    @pytest.mark.unit
+    def test_endpoint_returns_503_and_serves_cache_while_open(self, fake_upstream, clean_cache):
+        """Open breaker: cached entries still served, misses get 503 with Retry-After"""
+        from app import app
+        provider, guard = fake_upstream
+        client = TestClient(app)
+        assert client.get("/ticker-return?ticker=AAPL&date=2024-01-02").status_code == 200
+
+        provider.fail_first = 1000
+        response = client.get("/ticker-return?ticker=MSFT&date=2024-01-02")
+        assert response.status_code == 503
+        assert "Retry-After" in response.headers
+        assert guard.breaker.state == OPEN
+
+        calls = provider.calls
+        assert client.get("/ticker-return?ticker=AAPL&date=2024-01-02").status_code == 200
+        assert client.get("/ticker-return?ticker=GOOGL&date=2024-01-02").status_code == 503
+        assert provider.calls == calls
+
+    @pytest.mark.unit
+    def test_concurrent_burst_against_slow_throttling_provider(self, monkeypatch):
+        """Dozens of simultaneous fetches against a slow provider that 429s every 4th call all succeed"""
+        guard = UpstreamGuard(
+            TokenBucket(rate=200, capacity=10, name="burst"),
+            CircuitBreaker(failure_threshold=50, name="burst"),
+            max_attempts=4, backoff_base=0.01, backoff_max=0.05, name="burst",
+        )
+        provider = FakeProvider(fail_every=4, latency=0.01)
+        monkeypatch.setattr(stock_data, "upstream_guard", guard)
+        monkeypatch.setattr(StockDataService, "provider", provider)
+        results = []
+
+        def fetch():
+            results.append(StockDataService.fetch_single_day_return("AAPL", "2024-01-02"))
+
+        threads = [threading.Thread(target=fetch) for _ in range(24)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+
+        assert len(results) == 24
+        assert all(r["return"] == 0.05 for r in results)
+        assert metrics.counter("upstream_retries_total", provider="burst") > 0
+
+
+class TestMetricsEndpoint:
+
+    @pytest.mark.unit
+    def test_metrics_expose_upstream_state(self):
+        """/metrics returns counters and gauges including the breaker state"""
+        from app import app
+        response = TestClient(app).get("/metrics")
+
+        assert response.status_code == 200
+        body = response.json()
+        assert 'upstream_circuit_state{provider="yahoo"}' in body["gauges"]
@@ -0,0 +1,138 @@
+import pytest
+from datetime import date
+from unittest.mock import patch
+
+import numpy as np
+
+from services.metrics import metrics
+from services.result_cache import MeteredTTLCache, ResultCache, payload_size, query_key
+
+
+class Clock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def result_cache(max_bytes=64 * 1024, clock=None):
+    return ResultCache(max_bytes=max_bytes, ttl_seconds=3600, live_ttl_seconds=60, name="test_queries",
+                       timer=clock or Clock(), today=lambda: date(2024, 6, 3))
+
+
+def payload(points):
+    return {"dates": ["2024-01-02"] * points, "returns": [0.01] * points}
+
+
+class TestPayloadSize:
+
+    @pytest.mark.unit
+    def test_grows_with_contents(self):
+        assert payload_size(payload(100)) > payload_size(payload(10)) > payload_size({})
+
+    @pytest.mark.unit
+    def test_arrays_count_their_buffer(self):
+        assert payload_size(np.zeros(1000)) >= 8000
+
+
+class TestQueryKey:
+
+    @pytest.mark.unit
+    def test_parameter_order_does_not_matter(self):
+        assert query_key("summary", start="a", tickers=["X"]) == query_key("summary", tickers=["X"], start="a")
+        assert query_key("summary", tickers=["X", "Y"]) != query_key("summary", tickers=["Y", "X"])
+        hash(query_key("summary", tickers=["X"]))
+
+
+class TestResultCache:
+
+    @pytest.mark.unit
+    def test_hit_and_miss(self):
+        cache = result_cache()
+        key = query_key("series", ticker="AAPL", start="2024-01-02", end="2024-02-01")
+        hits = metrics.counter("query_cache_total", kind="series", outcome="hit")
+
+        assert cache.get(key) is None
+        assert cache.set(key, payload(10), ["AAPL"], "2024-01-02", "2024-02-01")
+        assert cache.get(key) == payload(10)
+        assert metrics.counter("query_cache_total", kind="series", outcome="hit") == hits + 1
+
+    @pytest.mark.unit
+    def test_evicts_least_recently_used_by_bytes(self):
+        """The budget is bytes: large results push out older ones, and the cache stays under it"""
+        size = payload_size(payload(200)) + payload_size(query_key("series", n=0))
+        cache = result_cache(max_bytes=size * 3 + 100)
+        evictions = metrics.counter("cache_evictions_total", cache="test_queries", reason="size")
+
+        for n in range(5):
+            cache.set(query_key("series", n=n), payload(200), ["AAPL"], "2024-01-02", "2024-02-01")
+
+        assert len(cache) == 3
+        assert cache.memory_usage() <= cache.max_bytes
+        assert cache.get(query_key("series", n=0)) is None
+        assert cache.get(query_key("series", n=4)) is not None
+        assert metrics.counter("cache_evictions_total", cache="test_queries", reason="size") == evictions + 2
+
+    @pytest.mark.unit
+    def test_rejects_results_larger_than_budget(self):
+        cache = result_cache(max_bytes=1024)
+
+        assert not cache.set(query_key("series", n=0), payload(1000), ["AAPL"])
+        assert len(cache) == 0
+
+    @pytest.mark.unit
+    def test_ranges_reaching_today_use_live_ttl(self):
+        clock = Clock()
+        cache = result_cache(clock=clock)
+        cache.set(("historical",), 1, ["AAPL"], "2024-01-02", "2024-02-01")
+        cache.set(("live",), 2, ["AAPL"], "2024-05-01", "2024-06-03")
+
+        clock.now = 61
+        assert cache.get(("live",)) is None
+        assert cache.get(("historical",)) == 1
+
+        clock.now = 3601
+        assert cache.get(("historical",)) is None
+
+    @pytest.mark.unit
+    def test_invalidate_by_ticker_and_overlap(self):
+        cache = result_cache()
+        cache.set(("a",), 1, ["AAPL", "MSFT"], "2024-01-02", "2024-02-01")
+        cache.set(("b",), 2, ["MSFT"], "2024-03-01", "2024-04-01")
+        cache.set(("c",), 3, ["NVDA"], "2024-01-02", "2024-02-01")
+
+        assert cache.invalidate(["MSFT"], start="2024-01-15", end="2024-01-20") == 1
+        assert cache.get(("a",)) is None
+        assert cache.get(("b",)) == 2
+        assert cache.invalidate() == 2
+        assert len(cache) == 0
+
+    @pytest.mark.unit
+    def test_invalidate_looks_up_ticker_keys(self):
+        """Ticker invalidation reads the index instead of scanning, and evicted keys are pruned from it"""
+        cache = result_cache(max_bytes=8 * 1024)
+        for n in range(500):
+            cache.set(("series", n), n, ["AAPL" if n % 2 else "MSFT"], "2024-01-02", "2024-02-01")
+        live = len(cache)
+
+        assert cache._by_ticker._size <= 2 * live + 64
+        with patch.object(cache._cache, "keys", side_effect=AssertionError("scanned")), \
+             patch.object(cache._cache, "items", side_effect=AssertionError("scanned")):
+            removed = cache.invalidate(["AAPL"])
+        assert 0 < removed < live
+        assert cache.get(("series", 499)) is None and cache.get(("series", 498)) == 498
+
+
+class TestMeteredTTLCache:
+
+    @pytest.mark.unit
+    def test_counts_expiries(self):
+        clock = Clock()
+        cache = MeteredTTLCache("test_ttl", maxsize=10, ttl=5, timer=clock)
+        expired = metrics.counter("cache_evictions_total", cache="test_ttl", reason="expired")
+        cache["a"], cache["b"] = 1, 2
+
+        clock.now = 6
+        assert len(cache) == 0
+        assert metrics.counter("cache_evictions_total", cache="test_ttl", reason="expired") == expired + 2
@@ -0,0 +1,98 @@
+import numpy as np
+import pytest
+from unittest.mock import Mock, patch
+
+from services.risk import risk_metrics
+from tests.fakes import random_panel, sessions
+
+
+def walk(returns):
+    """Max drawdown and longest underwater stretch, one session at a time"""
+    wealth = peak = 1.0
+    worst, underwater, longest = 0.0, 0, 0
+    for r in returns:
+        wealth *= 1 + r
+        if wealth >= peak:
+            peak, underwater = wealth, 0
+        else:
+            underwater += 1
+        worst = min(worst, wealth / peak - 1)
+        longest = max(longest, underwater)
+    return worst, longest
+
+
+class TestRiskMetrics:
+
+    @pytest.mark.unit
+    def test_known_drawdown(self):
+        # Up 10%, down to 0.88 of the peak, partial recovery, new high on the last day
+        returns = np.array([0.10, -0.10, -0.02222222, 0.05, 0.10])
+        dates = sessions(5)
+
+        metrics = risk_metrics(dates, returns)[0]
+
+        assert metrics["max_drawdown"] == pytest.approx(-0.12, abs=1e-6)
+        assert metrics["drawdown_peak"] == str(dates[0])
+        assert metrics["drawdown_trough"] == str(dates[2])
+        assert metrics["max_drawdown_duration"] == 3
+        assert metrics["sessions"] == 5
+
+    @pytest.mark.unit
+    def test_panel_columns_match_walk(self):
+        returns = random_panel(1500, 5, seed=7, mean=0.0003)
+
+        results = risk_metrics(sessions(1500), returns, var_level=0.99)
+
+        for column, metrics in enumerate(results):
+            series = returns[:, column]
+            worst, longest = walk(series)
+            assert metrics["max_drawdown"] == pytest.approx(worst, abs=1e-6)
+            assert metrics["max_drawdown_duration"] == longest
+            assert metrics["var"] == pytest.approx(-np.quantile(series, 0.01), abs=1e-6)
+            assert metrics["cvar"] >= metrics["var"]
+            assert metrics["downside_deviation"] == pytest.approx(
+                np.sqrt(np.mean(np.minimum(series, 0) ** 2)), abs=1e-6)
+
+    @pytest.mark.unit
+    def test_rising_series_has_no_drawdown(self):
+        metrics = risk_metrics(sessions(3), np.array([0.01, 0.02, 0.0]))[0]
+
+        assert metrics["max_drawdown"] == 0.0
+        assert metrics["drawdown_peak"] is None
+        assert metrics["max_drawdown_duration"] == 0
+
+    @pytest.mark.unit
+    def test_empty_range(self):
+        assert risk_metrics(sessions(0), np.empty((0, 2)))[1]["max_drawdown"] is None
+
+
+class TestRiskEndpoints:
+
+    @pytest.fixture
+    def client(self, panel_client):
+        summary = Mock(return_value={"count": 1, "min": 0.0, "max": 0.0, "mean": 0.0, "std": 0.0})
+        with patch("app.range_index_service", Mock(summary=summary)):
+            yield panel_client
+
+    @pytest.mark.unit
+    def test_summary_with_risk(self, client):
+        url = "/summary?start_date=2019-01-02&end_date=2021-12-31&tickers=aapl,msft"
+
+        plain = client.get(url).json()
+        with_risk = client.get(url + "&risk=true&var_level=0.99").json()
+
+        assert "risk" not in plain
+        assert set(with_risk["risk"]) == {"AAPL", "MSFT"}
+        aapl = with_risk["risk"]["AAPL"]
+        assert aapl["var_level"] == 0.99
+        assert aapl["sessions"] == 783
+        assert aapl["max_drawdown"] < 0 and aapl["max_drawdown_duration"] > 0
+        assert client.get(url + "&risk=true&var_level=1.5").status_code == 422
+
+    @pytest.mark.unit
+    def test_portfolio_includes_risk(self, client):
+        body = client.get("/portfolio?start_date=2020-01-02&end_date=2020-12-31&tickers=aapl,msft").json()
+
+        worst, longest = walk(np.array(body["returns"]))
+        assert body["risk"]["max_drawdown"] == pytest.approx(worst, abs=1e-4)
+        assert body["risk"]["max_drawdown_duration"] == longest
@@ -232,6 +232,24 @@ class TestStockDataService:
         assert MAG7_SYMBOLS == expected_symbols
         assert len(MAG7_SYMBOLS) == 7
 
+    @pytest.mark.unit
+    def test_app_import_does_not_load_provider(self):
+        """yfinance and pandas are only imported on the first upstream fetch"""
+        import subprocess
+        import sys
+        import os
+
+        backend_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+        code = (
+            "import sys, app; "
+            "assert 'yfinance' not in sys.modules and 'pandas' not in sys.modules; "
+            "app.load_provider(); "
+            "assert 'yfinance' in sys.modules"
+        )
+        result = subprocess.run([sys.executable, "-c", code], cwd=backend_dir, capture_output=True, text=True)
+
+        assert result.returncode == 0, result.stderr
+
     @pytest.mark.integration
     @pytest.mark.slow
     def test_fetch_single_day_return_real_api(self):
@@ -1,9 +1,34 @@
 import { ReturnsResponse, TickerReturn } from '../types';
+import { returnKey, returnStore } from './returnStore';
 
 const API_BASE_URL = import.meta.env.VITE_API_URL || 'http://localhost:8000';
 
 const MAG7_SYMBOLS = ["MSFT", "AAPL", "GOOGL", "AMZN", "NVDA", "META", "TSLA"];
 
+// Stay under the backend's MAX_BATCH_ITEMS
+const MAX_BATCH_ITEMS = 1000;
+
+// Ticker-day requests currently on the wire, shared across renders
+const inFlight = new Map<string, Promise<TickerReturn>>();
+
+interface ReturnKey {
+  ticker: string;
+  date: string;
+}
+
+// Today's return can still change, and transient failures should be retried,
+// so neither is persisted
+function isPersistable(result: TickerReturn, today: string): boolean {
+  return !result.transient && result.date < today;
+}
+
+function localToday(): string {
+  const now = new Date();
+  const month = String(now.getMonth() + 1).padStart(2, '0');
+  const day = String(now.getDate()).padStart(2, '0');
+  return `${now.getFullYear()}-${month}-${day}`;
+}
+
 // Generate business days only (Monday-Friday)
 function generateBusinessDays(startDate: string, endDate: string): string[] {
   const dates: string[] = [];
@@ -44,20 +69,77 @@ export const api = {
     }
   },
 
+  async fetchBatch(items: ReturnKey[]): Promise<TickerReturn[]> {
+    const response = await fetch(`${API_BASE_URL}/batch-returns`, {
+      method: 'POST',
+      headers: { 'Content-Type': 'application/json' },
+      body: JSON.stringify({ items }),
+    });
+
+    if (!response.ok) {
+      const error = await response.json().catch(() => ({ detail: 'Network error' }));
+      throw new Error(error.detail || `HTTP error! status: ${response.status}`);
+    }
+
+    const { results } = await response.json();
+    return results;
+  },
+
+  // Resolve every ticker+date from the persistent store, joining requests already in
+  // flight, and fetch whatever is left in as few batched calls as possible
+  async loadReturns(tickers: string[], dates: string[]): Promise<TickerReturn[]> {
+    const keys: string[] = [];
+    const items: ReturnKey[] = [];
+    for (const ticker of tickers) {
+      for (const date of dates) {
+        keys.push(returnKey(ticker, date));
+        items.push({ ticker, date });
+      }
+    }
+
+    const stored = await returnStore.getMany(keys);
+    const missing: ReturnKey[] = [];
+    keys.forEach((key, i) => {
+      if (!stored.has(key) && !inFlight.has(key)) {
+        missing.push(items[i]);
+      }
+    });
+
+    const today = localToday();
+    for (let offset = 0; offset < missing.length; offset += MAX_BATCH_ITEMS) {
+      const chunk = missing.slice(offset, offset + MAX_BATCH_ITEMS);
+      const batch = this.fetchBatch(chunk).then(async results => {
+        await returnStore.putMany(results.filter(r => isPersistable(r, today))).catch(error => {
+          console.error('Error persisting returns:', error);
+        });
+        return results;
+      });
+      chunk.forEach(({ ticker, date }, i) => {
+        const key = returnKey(ticker, date);
+        const pending = batch.then(results => results[i]);
+        inFlight.set(key, pending);
+        pending.catch(() => undefined).finally(() => {
+          if (inFlight.get(key) === pending) {
+            inFlight.delete(key);
+          }
+        });
+      });
+    }
+
+    return Promise.all(keys.map(key => stored.get(key) ?? inFlight.get(key)!));
+  },
+
+  async clearCache(): Promise<void> {
+    inFlight.clear();
+    await returnStore.clear();
+  },
+
   async fetchReturns(startDate: string, endDate: string): Promise<ReturnsResponse> {
     try {
       const businessDays = generateBusinessDays(startDate, endDate);
       
-      // Create all ticker+date combinations for business days only
-      const requests: Promise<TickerReturn>[] = [];
-      for (const ticker of MAG7_SYMBOLS) {
-        for (const date of businessDays) {
-          requests.push(this.fetchTickerReturn(ticker, date));
-        }
-      }
-      
-      // Fetch all in parallel
-      const results = await Promise.all(requests);
+      // Only ticker+date combinations not already stored locally go over the network
+      const results = await this.loadReturns(MAG7_SYMBOLS, businessDays);
       
       // Transform to old format for compatibility
       const data: Record<string, any[]> = {};
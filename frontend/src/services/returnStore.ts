@@ -0,0 +1,127 @@
+import { TickerReturn } from '../types';
+
+const DB_NAME = 'mag7-returns';
+const STORE_NAME = 'returns';
+const DB_VERSION = 1;
+
+export const returnKey = (ticker: string, date: string): string => `${ticker}:${date}`;
+
+// Persistent ticker-day return cache shared by every render and tab
+export interface ReturnStore {
+  getMany(keys: string[]): Promise<Map<string, TickerReturn>>;
+  putMany(entries: TickerReturn[]): Promise<void>;
+  clear(): Promise<void>;
+}
+
+export class MemoryReturnStore implements ReturnStore {
+  private entries = new Map<string, TickerReturn>();
+
+  async getMany(keys: string[]): Promise<Map<string, TickerReturn>> {
+    const found = new Map<string, TickerReturn>();
+    for (const key of keys) {
+      const entry = this.entries.get(key);
+      if (entry) {
+        found.set(key, entry);
+      }
+    }
+    return found;
+  }
+
+  async putMany(entries: TickerReturn[]): Promise<void> {
+    for (const entry of entries) {
+      this.entries.set(returnKey(entry.ticker, entry.date), entry);
+    }
+  }
+
+  async clear(): Promise<void> {
+    this.entries.clear();
+  }
+}
+
+function requestToPromise<T>(request: IDBRequest<T>): Promise<T> {
+  return new Promise((resolve, reject) => {
+    request.onsuccess = () => resolve(request.result);
+    request.onerror = () => reject(request.error);
+  });
+}
+
+function transactionDone(tx: IDBTransaction): Promise<void> {
+  return new Promise((resolve, reject) => {
+    tx.oncomplete = () => resolve();
+    tx.onerror = () => reject(tx.error);
+    tx.onabort = () => reject(tx.error);
+  });
+}
+
+// IndexedDB-backed store; falls back to memory if the database cannot be opened
+// (e.g. private browsing), so callers never have to care which one they got
+export class IndexedDBReturnStore implements ReturnStore {
+  private db: Promise<IDBDatabase | null>;
+  private fallback = new MemoryReturnStore();
+
+  constructor(factory: IDBFactory = indexedDB) {
+    this.db = new Promise<IDBDatabase | null>(resolve => {
+      try {
+        const request = factory.open(DB_NAME, DB_VERSION);
+        request.onupgradeneeded = () => {
+          request.result.createObjectStore(STORE_NAME);
+        };
+        request.onsuccess = () => resolve(request.result);
+        request.onerror = () => resolve(null);
+        request.onblocked = () => resolve(null);
+      } catch {
+        resolve(null);
+      }
+    });
+  }
+
+  async getMany(keys: string[]): Promise<Map<string, TickerReturn>> {
+    const db = await this.db;
+    if (!db) {
+      return this.fallback.getMany(keys);
+    }
+    const store = db.transaction(STORE_NAME, 'readonly').objectStore(STORE_NAME);
+    const values = await Promise.all(
+      keys.map(key => requestToPromise(store.get(key) as IDBRequest<TickerReturn | undefined>))
+    );
+    const found = new Map<string, TickerReturn>();
+    values.forEach((value, i) => {
+      if (value) {
+        found.set(keys[i], value);
+      }
+    });
+    return found;
+  }
+
+  async putMany(entries: TickerReturn[]): Promise<void> {
+    const db = await this.db;
+    if (!db) {
+      return this.fallback.putMany(entries);
+    }
+    const tx = db.transaction(STORE_NAME, 'readwrite');
+    const store = tx.objectStore(STORE_NAME);
+    for (const entry of entries) {
+      store.put(entry, returnKey(entry.ticker, entry.date));
+    }
+    await transactionDone(tx);
+  }
+
+  async clear(): Promise<void> {
+    const db = await this.db;
+    if (!db) {
+      return this.fallback.clear();
+    }
+    const tx = db.transaction(STORE_NAME, 'readwrite');
+    tx.objectStore(STORE_NAME).clear();
+    await transactionDone(tx);
+  }
+}
+
+export function createReturnStore(): ReturnStore {
+  if (typeof indexedDB === 'undefined') {
+    return new MemoryReturnStore();
+  }
+  return new IndexedDBReturnStore();
+}
+
+export const returnStore = createReturnStore();
@@ -61,14 +61,26 @@ describe('API Service', () => {
   })
 
   describe('fetchReturns', () => {
-    it('should fetch returns for date range successfully', async () => {
-      const mockTickerResponse = {
-        ticker: 'AAPL',
-        date: '2024-01-01',
-        return: 0.02,
-      }
+    // Answer POST /batch-returns by mapping each requested item through respond
+    const mockBatchFetch = (respond: (item: { ticker: string; date: string }) => any) => {
+      global.fetch = vi.fn().mockImplementation((_url: string, init: RequestInit) => {
+        const { items } = JSON.parse(init.body as string)
+        return Promise.resolve({
+          ok: true,
+          json: async () => ({ results: items.map(respond) }),
+        })
+      })
+    }
 
-      mockFetch(mockTickerResponse)
+    const requestedItems = () =>
+      (fetch as any).mock.calls.flatMap((call: any[]) => JSON.parse(call[1].body).items)
+
+    beforeEach(async () => {
+      await api.clearCache()
+    })
+
+    it('should fetch returns for date range successfully', async () => {
+      mockBatchFetch(({ ticker, date }) => ({ ticker, date, return: 0.02 }))
 
       const result = await api.fetchReturns('2024-01-01', '2024-01-01')
 
@@ -81,55 +93,90 @@ describe('API Service', () => {
       expect(result.data).toHaveProperty('NVDA')
       expect(result.data).toHaveProperty('META')
       expect(result.data).toHaveProperty('TSLA')
+      expect(fetch).toHaveBeenCalledWith(
+        'http://localhost:8000/batch-returns',
+        expect.objectContaining({ method: 'POST' })
+      )
     })
 
-    it('should generate business days correctly', async () => {
-      const mockTickerResponse = { ticker: 'AAPL', date: '2024-01-01', return: 0.02 }
-      mockFetch(mockTickerResponse)
+    it('should request every business day in a single batch', async () => {
+      mockBatchFetch(({ ticker, date }) => ({ ticker, date, return: 0.02 }))
 
       // Test Monday to Friday (should include all 5 days)
       await api.fetchReturns('2024-01-01', '2024-01-05')
 
-      // Should make calls for 5 business days × 7 tickers = 35 calls
-      expect(fetch).toHaveBeenCalledTimes(35)
+      // 5 business days × 7 tickers = 35 items, one call
+      expect(fetch).toHaveBeenCalledTimes(1)
+      expect(requestedItems()).toHaveLength(35)
     })
 
     it('should skip weekends in business days', async () => {
-      const mockTickerResponse = { ticker: 'AAPL', date: '2024-01-01', return: 0.02 }
-      mockFetch(mockTickerResponse)
+      mockBatchFetch(({ ticker, date }) => ({ ticker, date, return: 0.02 }))
 
       // Test range that includes a weekend (Jan 6-7, 2024 are Saturday-Sunday)
       await api.fetchReturns('2024-01-05', '2024-01-08')
 
-      // Should make calls for 2 business days (Jan 5, 8) × 7 tickers = 14 calls
-      expect(fetch).toHaveBeenCalledTimes(14)
+      // 2 business days (Jan 5, 8) × 7 tickers = 14 items
+      const items = requestedItems()
+      expect(items).toHaveLength(14)
+
+      // Verify no weekend dates were requested
+      const weekendItems = items.filter((item: any) =>
+        item.date === '2024-01-06' || item.date === '2024-01-07'
+      )
+      expect(weekendItems).toHaveLength(0)
+    })
+
+    it('should only request days missing from the local cache', async () => {
+      mockBatchFetch(({ ticker, date }) => ({ ticker, date, return: 0.02 }))
+
+      await api.fetchReturns('2024-01-01', '2024-01-05')
+      await api.fetchReturns('2024-01-02', '2024-01-08')
+
+      expect(fetch).toHaveBeenCalledTimes(2)
+      const second = JSON.parse((fetch as any).mock.calls[1][1].body).items
+      expect(second).toHaveLength(7)
+      expect(second.every((item: any) => item.date === '2024-01-08')).toBe(true)
 
-      // Verify no weekend calls were made
-      const calls = (fetch as any).mock.calls
-      const weekendCalls = calls.filter((call: any[]) => 
-        call[0].includes('2024-01-06') || call[0].includes('2024-01-07')
+      // A fully cached range makes no request at all
+      await api.fetchReturns('2024-01-03', '2024-01-04')
+      expect(fetch).toHaveBeenCalledTimes(2)
+    })
+
+    it('should deduplicate requests already in flight', async () => {
+      mockBatchFetch(({ ticker, date }) => ({ ticker, date, return: 0.02 }))
+
+      const [first, second] = await Promise.all([
+        api.fetchReturns('2024-01-01', '2024-01-05'),
+        api.fetchReturns('2024-01-01', '2024-01-05'),
+      ])
+
+      expect(fetch).toHaveBeenCalledTimes(1)
+      expect(second).toEqual(first)
+    })
+
+    it('should not keep transient failures', async () => {
+      mockBatchFetch(({ ticker, date }) =>
+        ticker === 'TSLA'
+          ? { ticker, date, return: null, error: 'Upstream data provider unavailable', transient: true }
+          : { ticker, date, return: 0.02 }
       )
-      expect(weekendCalls).toHaveLength(0)
+
+      await api.fetchReturns('2024-01-02', '2024-01-02')
+      await api.fetchReturns('2024-01-02', '2024-01-02')
+
+      const retried = JSON.parse((fetch as any).mock.calls[1][1].body).items
+      expect(retried).toEqual([{ ticker: 'TSLA', date: '2024-01-02' }])
     })
 
     it('should calculate summary statistics correctly', async () => {
       // Mock responses with known values
-      const responses = [
-        { ticker: 'AAPL', date: '2024-01-01', return: 0.02 },
-        { ticker: 'AAPL', date: '2024-01-02', return: 0.05 },
-        { ticker: 'AAPL', date: '2024-01-03', return: -0.01 },
-      ]
-
-      let callCount = 0
-      global.fetch = vi.fn()
-        .mockImplementation(() => {
-          const response = responses[callCount % responses.length]
-          callCount++
-          return Promise.resolve({
-            ok: true,
-            json: async () => response,
-          })
-        })
+      const returns: Record<string, number> = {
+        '2024-01-01': 0.02,
+        '2024-01-02': 0.05,
+        '2024-01-03': -0.01,
+      }
+      mockBatchFetch(({ ticker, date }) => ({ ticker, date, return: returns[date] }))
 
       const result = await api.fetchReturns('2024-01-01', '2024-01-03')
 
@@ -142,21 +189,11 @@ describe('API Service', () => {
 
     it('should handle mixed successful and failed responses', async () => {
       let callCount = 0
-      global.fetch = vi.fn()
-        .mockImplementation(() => {
-          callCount++
-          if (callCount % 2 === 0) {
-            // Every other call fails
-            return Promise.resolve({
-              ok: true,
-              json: async () => ({ ticker: 'AAPL', date: '2024-01-01', return: null }),
-            })
-          }
-          return Promise.resolve({
-            ok: true,
-            json: async () => ({ ticker: 'AAPL', date: '2024-01-01', return: 0.02 }),
-          })
-        })
+      mockBatchFetch(({ ticker, date }) => {
+        callCount++
+        // Every other item has no data
+        return { ticker, date, return: callCount % 2 === 0 ? null : 0.02 }
+      })
 
       const result = await api.fetchReturns('2024-01-01', '2024-01-01')
 
@@ -166,7 +203,7 @@ describe('API Service', () => {
     })
 
     it('should handle all null returns for a ticker', async () => {
-      mockFetch({ ticker: 'AAPL', date: '2024-01-01', return: null })
+      mockBatchFetch(({ ticker, date }) => ({ ticker, date, return: null }))
 
       const result = await api.fetchReturns('2024-01-01', '2024-01-01')
 
@@ -178,7 +215,15 @@ describe('API Service', () => {
       })
     })
 
+    it('should surface HTTP errors from the batch endpoint', async () => {
+      global.fetch = vi.fn().mockResolvedValue({
+        ok: false,
+        status: 400,
+        json: async () => ({ detail: 'Invalid date format' }),
+      })
 
+      await expect(api.fetchReturns('2024-01-01', '2024-01-01')).rejects.toThrow('Invalid date format')
+    })
 
     it('should handle network failures gracefully', async () => {
       mockFetchError('Network connection failed')
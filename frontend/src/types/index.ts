@@ -5,6 +5,7 @@ export interface TickerReturn {
   price?: number;
   previous_price?: number;
   error?: string;
+  transient?: boolean;
 }
 
 export interface ReturnData {